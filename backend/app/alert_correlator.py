@@ -0,0 +1,180 @@
+# backend/app/alert_correlator.py
+
+import os
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .rules import SEVERITY_CRITICAL, SEVERITY_EMERGENCY, SEVERITY_WARNING
+from .sensor_store import ns_to_datetime
+
+# Une condition sans nouvelle lecture anormale pendant ALERT_HYSTERESIS_SECONDS est close
+ALERT_HYSTERESIS_SECONDS = float(os.getenv("ALERT_HYSTERESIS_SECONDS", "60"))
+# Délai minimal entre deux escalades de sévérité d'une même machine
+ALERT_ESCALATION_INTERVAL_SECONDS = float(os.getenv("ALERT_ESCALATION_INTERVAL_SECONDS", "300"))
+
+SEVERITY_RANK = {SEVERITY_WARNING: 1, SEVERITY_CRITICAL: 2, SEVERITY_EMERGENCY: 3}
+
+# (signature de règles, sévérité), les conditions étant regroupées par machine
+ConditionKey = Tuple[str, str]
+
+
+class Condition:
+    """Condition active : l'alerte ouverte et l'instant de la dernière lecture qui l'a confirmée."""
+
+    __slots__ = ("alert", "last_seen_ns")
+
+    def __init__(self, alert, last_seen_ns: int):
+        self.alert = alert
+        self.last_seen_ns = last_seen_ns
+
+
+class AlertCorrelator:
+    """
+    Déduplication des alertes par condition (machine, signature de règles, sévérité).
+
+    La première lecture anormale d'une condition ouvre une alerte ; les suivantes ne font que
+    mettre à jour last_seen et count de cette alerte. Une condition sans lecture depuis
+    hysteresis_seconds est close (closed_at) : la lecture anormale suivante rouvrira une alerte.
+    Une condition plus sévère que toutes celles déjà actives sur la machine est une escalade ;
+    au plus une escalade par machine est émise par escalation_interval_seconds, les autres sont
+    rattachées à l'alerte active la plus sévère. La mémoire est en O(1) par condition active
+    et par machine.
+    """
+
+    def __init__(
+        self,
+        hysteresis_seconds: float = ALERT_HYSTERESIS_SECONDS,
+        escalation_interval_seconds: float = ALERT_ESCALATION_INTERVAL_SECONDS,
+    ):
+        self.hysteresis_ns = int(hysteresis_seconds * 1e9)
+        self.escalation_interval_ns = int(escalation_interval_seconds * 1e9)
+        self._conditions: Dict[Hashable, Dict[ConditionKey, Condition]] = {}
+        # machine -> instant de la dernière escalade émise
+        self._last_escalation: Dict[Hashable, int] = {}
+
+        self.observed = 0
+        self.opened = 0
+        self.suppressed = 0
+        self.escalations = 0
+        self.escalations_suppressed = 0
+        self.closed = 0
+
+    def observe(
+        self,
+        machine_id: Hashable,
+        signature: str,
+        severity: str,
+        timestamp_ns: int,
+        make_alert: Callable[[], Any],
+    ) -> Tuple[Any, bool]:
+        """
+        Rattache une lecture anormale à sa condition. Retourne (alerte, ouverte), ouverte valant True
+        si make_alert() a été appelée pour créer une nouvelle alerte.
+        """
+        self.observed += 1
+        key = (signature, severity)
+        conditions = self._conditions.setdefault(machine_id, {})
+        condition = self._active(conditions, key, timestamp_ns)
+        if condition is not None:
+            return self._fold(condition, timestamp_ns), False
+
+        highest = self._highest_active(conditions, timestamp_ns)
+        if highest is not None and SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(highest.alert.severity, 0):
+            last = self._last_escalation.get(machine_id)
+            if last is not None and timestamp_ns - last < self.escalation_interval_ns:
+                self.escalations_suppressed += 1
+                return self._fold(highest, timestamp_ns), False
+            self._last_escalation[machine_id] = timestamp_ns
+            self.escalations += 1
+
+        alert = make_alert()
+        alert.last_seen = ns_to_datetime(timestamp_ns)
+        conditions[key] = Condition(alert, timestamp_ns)
+        self.opened += 1
+        return alert, True
+
+    def replicate(self, alert, signature: Optional[str], timestamp_ns: int):
+        """
+        Applique une alerte ouverte (signature donnée) ou rattachée à une lecture (signature None)
+        par le worker propriétaire de la machine, seul à en évaluer les lectures : les conditions
+        restent ainsi à jour ici si ce worker reprend la machine.
+        """
+        conditions = self._conditions.setdefault(alert.machine_id, {})
+        if signature is not None:
+            highest = self._highest_active(conditions, timestamp_ns)
+            if highest is not None and SEVERITY_RANK.get(alert.severity, 0) > SEVERITY_RANK.get(highest.alert.severity, 0):
+                self._last_escalation[alert.machine_id] = timestamp_ns
+            conditions[(signature, alert.severity)] = Condition(alert, timestamp_ns)
+            return
+        alert.count += 1
+        for condition in conditions.values():
+            if condition.alert is alert:
+                condition.last_seen_ns = max(condition.last_seen_ns, timestamp_ns)
+                alert.last_seen = ns_to_datetime(condition.last_seen_ns)
+                return
+        # Condition déjà close ici : seule l'alerte est mise à jour
+        if alert.last_seen is None or ns_to_datetime(timestamp_ns) > alert.last_seen:
+            alert.last_seen = ns_to_datetime(timestamp_ns)
+
+    def _active(self, conditions: Dict[ConditionKey, Condition], key: ConditionKey, timestamp_ns: int) -> Optional[Condition]:
+        condition = conditions.get(key)
+        if condition is None:
+            return None
+        if condition.alert.is_resolved or timestamp_ns - condition.last_seen_ns > self.hysteresis_ns:
+            self._close(conditions, key)
+            return None
+        return condition
+
+    def _highest_active(self, conditions: Dict[ConditionKey, Condition], timestamp_ns: int) -> Optional[Condition]:
+        highest = None
+        for key in list(conditions):
+            condition = self._active(conditions, key, timestamp_ns)
+            if condition is not None and (
+                highest is None
+                or SEVERITY_RANK.get(condition.alert.severity, 0) > SEVERITY_RANK.get(highest.alert.severity, 0)
+            ):
+                highest = condition
+        return highest
+
+    def _fold(self, condition: Condition, timestamp_ns: int):
+        condition.last_seen_ns = max(condition.last_seen_ns, timestamp_ns)
+        condition.alert.last_seen = ns_to_datetime(condition.last_seen_ns)
+        condition.alert.count += 1
+        self.suppressed += 1
+        return condition.alert
+
+    def _close(self, conditions: Dict[ConditionKey, Condition], key: ConditionKey):
+        condition = conditions.pop(key)
+        if condition.alert.closed_at is None:
+            condition.alert.closed_at = ns_to_datetime(condition.last_seen_ns + self.hysteresis_ns)
+        self.closed += 1
+
+    def sweep(self, now_ns: Optional[int] = None) -> int:
+        """Clôt les conditions dont la dernière lecture est plus ancienne que la fenêtre d'hystérésis."""
+        now_ns = now_ns if now_ns is not None else time.time_ns()
+        closed = 0
+        for machine_id, conditions in list(self._conditions.items()):
+            for key, condition in list(conditions.items()):
+                if condition.alert.is_resolved or now_ns - condition.last_seen_ns > self.hysteresis_ns:
+                    self._close(conditions, key)
+                    closed += 1
+            if not conditions:
+                del self._conditions[machine_id]
+        stale = [machine_id for machine_id, last in self._last_escalation.items() if now_ns - last > self.escalation_interval_ns]
+        for machine_id in stale:
+            del self._last_escalation[machine_id]
+        return closed
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "active_conditions": sum(len(conditions) for conditions in self._conditions.values()),
+            "readings_observed": self.observed,
+            "alerts_opened": self.opened,
+            "alert_writes_suppressed": self.suppressed,
+            "escalations": self.escalations,
+            "escalations_suppressed": self.escalations_suppressed,
+            "conditions_closed": self.closed,
+            "suppression_ratio": round(self.suppressed / self.observed, 4) if self.observed else 0.0,
+            "hysteresis_seconds": self.hysteresis_ns / 1e9,
+            "escalation_interval_seconds": self.escalation_interval_ns / 1e9,
+        }
@@ -0,0 +1,272 @@
+# backend/app/alert_store.py
+
+import bisect
+import heapq
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+# Les alertes résolues depuis plus de ALERT_RETENTION_SECONDS sont archivées (0 = jamais)
+ALERT_RETENTION_SECONDS = float(os.getenv("ALERT_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# Nombre d'alertes archivées conservées (les plus anciennes sont oubliées)
+ALERT_ARCHIVE_MAX_SIZE = int(os.getenv("ALERT_ARCHIVE_MAX_SIZE", "100000"))
+# Intervalle entre deux passes d'archivage
+ALERT_RETENTION_SWEEP_SECONDS = float(os.getenv("ALERT_RETENTION_SWEEP_SECONDS", "60"))
+# Retard maximal d'une modification répliquée depuis un autre worker (délai du journal et écart
+# d'horloge) : les curseurs de changed_since restent en arrière d'autant (état partagé seulement)
+ALERT_CURSOR_LAG_SECONDS = float(os.getenv("ALERT_CURSOR_LAG_SECONDS", "2"))
+
+
+class MachineAlerts:
+    """Alertes d'une machine : non résolues par ordre d'arrivée, résolues triées par timestamp."""
+
+    __slots__ = ("unresolved", "unresolved_sorted", "resolved", "version")
+
+    def __init__(self):
+        # id -> alerte ; un dict conserve l'ordre d'insertion et retire une alerte en O(1)
+        self.unresolved: Dict[UUID, Any] = {}
+        self.unresolved_sorted = True
+        # (timestamp, rang d'insertion, alerte), triée
+        self.resolved: List[Tuple[datetime, int, Any]] = []
+        # Version de la dernière modification des alertes de la machine
+        self.version = 0
+
+    def newest_unresolved(self) -> Iterator[Any]:
+        if not self.unresolved_sorted:
+            self.unresolved = dict(sorted(self.unresolved.items(), key=lambda item: item[1].timestamp))
+            self.unresolved_sorted = True
+        return reversed(self.unresolved.values())
+
+    def newest_resolved(self) -> Iterator[Any]:
+        return (alert for _, _, alert in reversed(self.resolved))
+
+
+class AlertStore:
+    """
+    Stockage en mémoire des alertes, indexé pour les lectures de l'API.
+
+    - index id -> alerte : resolve() et get() en O(1) ;
+    - par machine, les alertes non résolues dans l'ordre chronologique et les résolues
+      triées par timestamp : une lecture « les N plus récentes » ne trie plus rien ;
+    - vue globale par fusion k-voies (heapq.merge) des séquences déjà triées de chaque machine,
+      en O(machines + N log machines) pour les N premières alertes ;
+    - rétention : sweep() déplace vers une archive bornée les alertes résolues depuis plus de
+      retention_seconds, dans l'ordre de résolution ;
+    - versions : chaque modification (ajout, résolution, touch) reçoit une version, l'horloge en
+      nanosecondes (strictement croissante dans un worker), et les alertes sont tenues dans l'ordre
+      de leur dernière modification : changed_since() lit les alertes modifiées après un curseur en
+      partant de la fin. Une modification répliquée depuis un autre worker garde la version que lui
+      a donnée ce worker : versions, ETag (tag) et curseurs sont ainsi les mêmes sur tous les
+      workers. Elle peut arriver après des modifications plus récentes, d'au plus
+      cursor_lag_seconds : les curseurs renvoyés restent en arrière d'autant, quitte à renvoyer
+      deux fois une modification récente. L'archivage ne change pas les versions (il est fait
+      à des instants différents par chaque worker) mais le nombre d'alertes, qui entre dans tag.
+
+    Les alertes sont des objets exposant id, machine_id, timestamp et is_resolved.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: float = ALERT_RETENTION_SECONDS,
+        archive_max_size: int = ALERT_ARCHIVE_MAX_SIZE,
+        cursor_lag_seconds: float = 0.0,
+    ):
+        self.retention_seconds = retention_seconds
+        self.cursor_lag_ns = int(cursor_lag_seconds * 1e9)
+        self._by_id: Dict[UUID, Any] = {}
+        self._machines: Dict[UUID, MachineAlerts] = {}
+        self._keys: Dict[UUID, Tuple[datetime, int]] = {}
+        self._seq = 0
+        # (instant de résolution, id), dans l'ordre de résolution
+        self._resolution_log: Deque[Tuple[float, UUID]] = deque()
+        self.archive: Deque[Any] = deque(maxlen=archive_max_size)
+        self.archived_total = 0
+        self.version = 0
+        # id -> version de la dernière modification, de la plus ancienne à la plus récente
+        self._changes: "OrderedDict[UUID, int]" = OrderedDict()
+
+    def ensure(self, machine_id: UUID) -> MachineAlerts:
+        machine = self._machines.get(machine_id)
+        if machine is None:
+            machine = self._machines[machine_id] = MachineAlerts()
+        return machine
+
+    def _changed(self, machine: MachineAlerts, alert_id: UUID, version: Optional[int]):
+        if version is None:
+            version = max(time.time_ns(), self.version + 1)
+        version = max(version, self._changes.get(alert_id, 0))
+        self.version = max(self.version, version)
+        machine.version = max(machine.version, version)
+        self._changes[alert_id] = version
+        self._changes.move_to_end(alert_id)
+
+    def add(self, alert, version: Optional[int] = None):
+        """Ajoute une alerte ; version est donnée pour une alerte répliquée (sinon l'horloge de ce worker)."""
+        machine = self.ensure(alert.machine_id)
+        self._changed(machine, alert.id, version)
+        self._by_id[alert.id] = alert
+        self._keys[alert.id] = (alert.timestamp, self._seq)
+        self._seq += 1
+        if alert.is_resolved:
+            bisect.insort(machine.resolved, (*self._keys[alert.id], alert))
+            self._resolution_log.append((time.time(), alert.id))
+            return
+        if machine.unresolved and machine.unresolved_sorted:
+            last = next(reversed(machine.unresolved.values()))
+            if alert.timestamp < last.timestamp:
+                machine.unresolved_sorted = False
+        machine.unresolved[alert.id] = alert
+
+    def get(self, alert_id: UUID):
+        return self._by_id.get(alert_id)
+
+    def resolve(self, alert_id: UUID, version: Optional[int] = None):
+        """Marque une alerte comme résolue ; retourne l'alerte, ou None si elle est inconnue."""
+        alert = self._by_id.get(alert_id)
+        if alert is None or alert.is_resolved:
+            return alert
+        machine = self._machines[alert.machine_id]
+        self._changed(machine, alert_id, version)
+        del machine.unresolved[alert_id]
+        alert.is_resolved = True
+        bisect.insort(machine.resolved, (*self._keys[alert_id], alert))
+        self._resolution_log.append((time.time(), alert_id))
+        return alert
+
+    def touch(self, alert, version: Optional[int] = None):
+        """Signale qu'une alerte conservée a été modifiée sur place (count, last_seen...)."""
+        if alert.id in self._by_id:
+            self._changed(self._machines[alert.machine_id], alert.id, version)
+
+    def version_of(self, alert_id: UUID) -> int:
+        """Version de la dernière modification d'une alerte (0 si elle est inconnue ou archivée)."""
+        return self._changes.get(alert_id, 0)
+
+    def tag(self, machine_id: Optional[UUID] = None) -> str:
+        """Version et nombre d'alertes (du parc ou d'une machine), pour l'ETag des lectures."""
+        if machine_id is None:
+            return f"{self.version}.{len(self._by_id)}"
+        machine = self._machines.get(machine_id)
+        if machine is None:
+            return "0.0"
+        return f"{machine.version}.{len(machine.unresolved) + len(machine.resolved)}"
+
+    def cursor(self) -> int:
+        """Curseur des modifications déjà lues : la dernière version, moins le retard de réplication toléré."""
+        if not self.cursor_lag_ns:
+            return self.version
+        return min(self.version, time.time_ns() - self.cursor_lag_ns)
+
+    def changed_since(self, cursor: int, machine_id: Optional[UUID] = None, limit: Optional[int] = None) -> Tuple[List[Any], int]:
+        """
+        Alertes ajoutées ou modifiées après la version cursor, de la plus ancienne modification à la
+        plus récente, quel que soit leur état de résolution. Retourne (alertes, curseur suivant).
+        """
+        changed = []
+        for alert_id, version in reversed(self._changes.items()):
+            # Une modification arrive au plus cursor_lag_ns après de plus récentes : les précédentes sont toutes lues
+            if version <= cursor - self.cursor_lag_ns:
+                break
+            if version <= cursor:
+                continue
+            alert = self._by_id[alert_id]
+            if machine_id is None or alert.machine_id == machine_id:
+                changed.append((version, alert))
+        changed.sort(key=lambda item: item[0])
+        next_cursor = max(cursor, self.cursor())
+        if limit is not None and len(changed) > limit:
+            changed = changed[:limit]
+            # Lot tronqué : reprise après la dernière alerte renvoyée, sans dépasser le retard toléré
+            # tant que cela fait avancer le curseur
+            next_cursor = min(changed[-1][0], next_cursor)
+            if next_cursor <= cursor:
+                next_cursor = changed[-1][0]
+        return [alert for _, alert in changed], next_cursor
+
+    def unresolved(self, machine_id: UUID) -> List[Any]:
+        """Alertes non résolues d'une machine, de la plus ancienne à la plus récente."""
+        machine = self._machines.get(machine_id)
+        if machine is None:
+            return []
+        return list(machine.newest_unresolved())[::-1]
+
+    def machine_alerts(self, machine_id: UUID, resolved: bool = False, limit: Optional[int] = None) -> List[Any]:
+        """Alertes d'une machine, les plus récentes d'abord."""
+        machine = self._machines.get(machine_id)
+        if machine is None:
+            return []
+        alerts = machine.newest_resolved() if resolved else machine.newest_unresolved()
+        return list(islice(alerts, limit))
+
+    def all_alerts(self, resolved: bool = False, limit: Optional[int] = None) -> List[Any]:
+        """Alertes de toutes les machines, les plus récentes d'abord (fusion des séquences par machine)."""
+        sources = [
+            machine.newest_resolved() if resolved else machine.newest_unresolved()
+            for machine in self._machines.values()
+            if (machine.resolved if resolved else machine.unresolved)
+        ]
+        merged = heapq.merge(*sources, key=lambda alert: alert.timestamp, reverse=True)
+        return list(islice(merged, limit))
+
+    def unresolved_by_machine(self) -> Iterator[Tuple[UUID, List[Any]]]:
+        """(machine_id, alertes non résolues) pour chaque machine en ayant au moins une."""
+        for machine_id, machine in self._machines.items():
+            if machine.unresolved:
+                yield machine_id, list(machine.unresolved.values())
+
+    def count(self, resolved: Optional[bool] = None) -> int:
+        unresolved = sum(len(machine.unresolved) for machine in self._machines.values())
+        if resolved is None:
+            return len(self._by_id)
+        return len(self._by_id) - unresolved if resolved else unresolved
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, alert_id: UUID) -> bool:
+        return alert_id in self._by_id
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Archive les alertes résolues depuis plus de retention_seconds ; retourne leur nombre."""
+        if self.retention_seconds <= 0:
+            return 0
+        cutoff = (now if now is not None else time.time()) - self.retention_seconds
+        expired: Dict[UUID, List[Tuple[datetime, int]]] = {}
+        while self._resolution_log and self._resolution_log[0][0] <= cutoff:
+            _, alert_id = self._resolution_log.popleft()
+            alert = self._by_id.pop(alert_id, None)
+            if alert is None:
+                continue
+            self._changes.pop(alert_id, None)
+            expired.setdefault(alert.machine_id, []).append(self._keys.pop(alert_id))
+            self.archive.append(alert)
+
+        for machine_id, keys in expired.items():
+            machine = self._machines[machine_id]
+            if len(keys) < 32:
+                for key in keys:
+                    del machine.resolved[bisect.bisect_left(machine.resolved, key)]
+            else:
+                # Beaucoup d'alertes expirées : une reconstruction linéaire plutôt que des suppressions une à une
+                seqs = {seq for _, seq in keys}
+                machine.resolved = [entry for entry in machine.resolved if entry[1] not in seqs]
+        archived = sum(len(keys) for keys in expired.values())
+        self.archived_total += archived
+        return archived
+
+    def metrics(self) -> Dict[str, Any]:
+        unresolved = self.count(resolved=False)
+        return {
+            "alerts": len(self._by_id),
+            "unresolved": unresolved,
+            "resolved": len(self._by_id) - unresolved,
+            "machines": len(self._machines),
+            "archived": len(self.archive),
+            "archived_total": self.archived_total,
+            "retention_seconds": self.retention_seconds,
+            "version": self.version,
+        }
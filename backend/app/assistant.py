@@ -0,0 +1,346 @@
+# backend/app/assistant.py
+
+import asyncio
+import os
+import random
+import re
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from .alert_correlator import SEVERITY_RANK
+from .fleet_health import FleetHealth
+from .retrieval import KIND_ALERT, RetrievalIndex, normalize
+from .serialization import dumps
+
+# Délai simulé avant chaque réponse, en secondes : "min,max" (tirage uniforme) ou une valeur ; 0 = aucun
+AI_ASSISTANT_SIMULATED_DELAY = tuple(float(value) for value in os.getenv("AI_ASSISTANT_SIMULATED_DELAY", "0").split(","))
+# Nombre de réponses conservées par intention pour les percentiles de latence
+AI_ASSISTANT_LATENCY_WINDOW = int(os.getenv("AI_ASSISTANT_LATENCY_WINDOW", "1000"))
+
+# Intention des questions qui ne correspondent à aucun mot-clé
+FALLBACK_INTENT = "unknown"
+
+
+class AssistantContext(NamedTuple):
+    """
+    Ce qu'un handler peut lire : la machine sélectionnée et sa fiche de santé, le parc, les machines
+    et l'index de recherche de l'historique (None s'il n'est pas fourni).
+    """
+    question: str
+    machine: Any
+    health: Any
+    fleet: FleetHealth
+    machines: Mapping[UUID, Any]
+    retrieval: Optional[RetrievalIndex]
+
+
+class Intent(NamedTuple):
+    name: str
+    # Les intentions "machine" ne s'appliquent que si une machine connue est sélectionnée
+    machine_scope: bool
+    keywords: Tuple[str, ...]
+    handler: Callable[[AssistantContext], str]
+
+
+class IntentRouter:
+    """
+    Reconnaissance des intentions en un seul passage sur la question : tous les mots-clés sont
+    compilés dans une seule expression régulière (alternative en lookahead, les plus longs
+    d'abord), puis l'intention retenue est la première de la liste, par ordre de priorité, dont un
+    mot-clé apparaît. Équivalent aux tests « mot-clé in question » successifs : un mot-clé caché par
+    un plus long commençant au même endroit en est une sous-chaîne, et chaque mot-clé trouvé active
+    aussi les intentions de ses sous-chaînes.
+    """
+
+    def __init__(self, intents: Iterable[Intent]):
+        self.intents = list(intents)
+        keywords = sorted({keyword for intent in self.intents for keyword in intent.keywords}, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))")
+        self._priority = {intent.name: rank for rank, intent in enumerate(self.intents)}
+        # mot-clé trouvé -> intentions de tous les mots-clés qu'il contient
+        self._matches: Dict[str, Set[str]] = {
+            found: {intent.name for intent in self.intents if any(keyword in found for keyword in intent.keywords)}
+            for found in keywords
+        }
+
+    def matches(self, question: str) -> Set[str]:
+        """Intentions dont au moins un mot-clé apparaît dans la question (en minuscules)."""
+        matched: Set[str] = set()
+        for match in self._pattern.finditer(question):
+            matched |= self._matches[match.group(1)]
+        return matched
+
+    def route(self, question: str, machine_selected: bool) -> Optional[Intent]:
+        matched = self.matches(question)
+        candidates = [
+            self.intents[self._priority[name]] for name in matched
+            if machine_selected or not self.intents[self._priority[name]].machine_scope
+        ]
+        return min(candidates, key=lambda intent: self._priority[intent.name]) if candidates else None
+
+
+# --- Réponses par intention ---
+
+def machine_risk(context: AssistantContext) -> str:
+    active_alerts = context.health.by_severity if context.health is not None else {}
+    active_count = sum(active_alerts.values())
+
+    risk_level = "faible"
+    probability = "5%"
+    if active_alerts.get("Urgence"):
+        risk_level = "extrêmement élevé"
+        probability = "60-80%"
+    elif active_alerts.get("Critique"):
+        risk_level = "élevé"
+        probability = "25-50%"
+    elif active_alerts.get("Avertissement"):
+        risk_level = "modéré"
+        probability = "10-20%"
+    elif random.random() < 0.1:
+        risk_level = "modéré"
+        probability = "8-12%"
+
+    answer = f"**{context.machine.name}**: Le risque de panne est actuellement **{risk_level}**. La probabilité de défaillance cette semaine est estimée à **{probability}**."
+    if active_count:
+        answer += f" Il y a actuellement {active_count} alerte(s) active(s) qui contribuent à ce risque."
+    return answer
+
+
+def machine_alerts(context: AssistantContext) -> str:
+    active = list(context.health.active.values()) if context.health is not None else []
+    if not active:
+        return f"La machine **{context.machine.name}** n'a pas d'alertes actives. Tout semble fonctionner correctement."
+    alert_types = dict.fromkeys(alert.type for alert in active)
+    # La plus sévère, la plus ancienne à sévérité égale
+    most_critical = max(active, key=lambda alert: SEVERITY_RANK.get(alert.severity, 0))
+    return (
+        f"La machine **{context.machine.name}** a actuellement **{len(active)}** alerte(s) active(s) de type(s) : "
+        f"{', '.join(alert_types)}. La plus critique est : '{most_critical.message}' ({most_critical.severity})."
+    )
+
+
+def machine_readings(context: AssistantContext) -> str:
+    health = context.health
+    if health is None or health.last_values is None:
+        return f"Aucune donnée de capteur récente disponible pour **{context.machine.name}**."
+    values = health.last_values
+    return (
+        f"Les dernières lectures pour **{context.machine.name}** ({health.last_timestamp.strftime('%H:%M:%S')}): "
+        f"Température **{values['temperature']:.1f}°C**, Vibration **{values['vibration']:.1f}**, "
+        f"Pression **{values['pressure']:.1f}**, Courant **{values['current']:.1f}**."
+    )
+
+
+def machine_role(context: AssistantContext) -> str:
+    return f"Pour **{context.machine.name}**, mon rôle est de vous fournir des informations en temps réel sur son état, de vous alerter en cas d'anomalie et de vous aider à comprendre les risques de panne potentiels."
+
+
+def machine_info(context: AssistantContext) -> str:
+    machine = context.machine
+    return (
+        f"La machine **{machine.name}** ({machine.type}, à {machine.location}) est actuellement {machine.status}."
+        f" Elle a été installée le {machine.installation_date.strftime('%d/%m/%Y')}."
+    )
+
+
+def mentioned_machine(context: AssistantContext) -> Any:
+    """Machine sélectionnée, sinon celle dont le nom apparaît dans la question (le nom le plus long)."""
+    if context.machine is not None:
+        return context.machine
+    question = normalize(context.question)
+    named = [machine for machine in context.machines.values() if normalize(machine.name) in question]
+    return max(named, key=lambda machine: len(machine.name)) if named else None
+
+
+def machine_name(context: AssistantContext, machine_id: Optional[UUID]) -> str:
+    machine = context.machines.get(machine_id) if machine_id is not None else None
+    return machine.name if machine is not None else "machine inconnue"
+
+
+def last_occurrence(context: AssistantContext) -> str:
+    # Alertes correspondant à la question, de la plus récente à la plus ancienne (voir retrieval.py)
+    machine = mentioned_machine(context)
+    hits = context.retrieval.search(
+        context.question, machine_id=machine.id if machine is not None else None, kind=KIND_ALERT, sort="recent", limit=1,
+    ) if context.retrieval is not None else []
+    scope = f"pour **{machine.name}**" if machine is not None else "sur le parc machines"
+    if not hits:
+        return f"Je n'ai trouvé aucune alerte correspondant à votre question {scope}."
+    hit = hits[0]
+    return (
+        f"La dernière alerte correspondante {scope} date du {hit.timestamp.strftime('%d/%m/%Y à %H:%M:%S')}"
+        f"{'' if machine is not None else ' (' + machine_name(context, hit.machine_id) + ')'} : '{hit.text}' ({hit.severity})."
+    )
+
+
+def similar_incidents(context: AssistantContext) -> str:
+    # Incident de référence : la dernière alerte active de la machine (ou du parc), comparée à tout l'historique
+    machine = mentioned_machine(context)
+    health = context.fleet.get(machine.id) if machine is not None else None
+    if machine is not None:
+        reference = next(reversed(health.active.values()), None) if health is not None else None
+    else:
+        reference = next(iter(context.fleet.recent_alerts(1)), None)
+    if reference is None or context.retrieval is None:
+        return f"Aucune alerte active {'pour **' + machine.name + '**' if machine is not None else 'sur le parc'} à laquelle comparer l'historique."
+    hits = context.retrieval.similar(reference, limit=3, same_machine=False)
+    if not hits:
+        return f"Aucun incident similaire à '{reference.message}' n'a été trouvé dans l'historique."
+    incidents = [
+        f"{hit.timestamp.strftime('%d/%m/%Y %H:%M')} sur {machine_name(context, hit.machine_id)} : '{hit.text}' ({hit.severity})"
+        for hit in hits
+    ]
+    return f"Incidents les plus proches de '{reference.message}' ({machine_name(context, reference.machine_id)}) : {'; '.join(incidents)}."
+
+
+def greeting(context: AssistantContext) -> str:
+    return "Bonjour ! Je suis votre assistant IA pour la maintenance prédictive. Comment puis-je vous aider ?"
+
+
+def help_answer(context: AssistantContext) -> str:
+    return "Je peux répondre à des questions sur le statut des machines, les risques de panne, les alertes, ou vous fournir des informations générales sur la maintenance prédictive. Essayez 'Quelle est la machine la plus à risque ?' ou 'Quelles sont les dernières alertes ?' Vous pouvez aussi me poser des questions spécifiques si une machine est sélectionnée."
+
+
+def most_at_risk(context: AssistantContext) -> str:
+    # Score de risque (Urgence 3, Critique 2, Avertissement 1) lu en tête du tas de fleet_health
+    top = context.fleet.top(1)
+    machine = context.machines.get(top[0].machine_id) if top else None
+    if machine is None:
+        return "Toutes les machines sont actuellement en état normal et n'ont pas d'alertes actives."
+    return f"Actuellement, la machine **{machine.name}** ({machine.location}) présente le risque le plus élevé, avec plusieurs alertes actives."
+
+
+def fleet_alerts(context: AssistantContext) -> str:
+    active_alerts_count = context.fleet.active_count
+    if not active_alerts_count:
+        return "Il n'y a aucune alerte active sur l'ensemble du parc machines. Tout semble normal."
+    alert_messages = []
+    for alert in context.fleet.recent_alerts(3):
+        machine = context.machines.get(alert.machine_id)
+        alert_messages.append(f"'{alert.message}' ({machine.name if machine else 'machine inconnue'}, {alert.severity})")
+    return f"Il y a un total de **{active_alerts_count}** alertes actives sur l'ensemble du parc machines. Les alertes les plus récentes concernent : {'; '.join(alert_messages)}."
+
+
+def objective(context: AssistantContext) -> str:
+    return "Mon objectif est d'améliorer la fiabilité des équipements industriels en détectant les anomalies, en prédisant les pannes et en fournissant des informations actionnables pour optimiser la maintenance et réduire les coûts."
+
+
+def technologies(context: AssistantContext) -> str:
+    return "Ce système utilise des technologies comme Python (FastAPI), ReactJS/Next.js, des bases de données comme PostgreSQL/MongoDB, et des librairies de Machine Learning comme Scikit-learn et TensorFlow."
+
+
+def fallback(context: AssistantContext) -> str:
+    return f"Je n'ai pas de réponse spécifique à votre question : '{context.question}'. Mon développement est en cours, mais je peux vous assurer que toutes les machines sont sous surveillance constante."
+
+
+# Par ordre de priorité : recherche dans l'historique, intentions "machine" puis intentions générales
+INTENTS = [
+    Intent("similar_incidents", False, ("similaire",), similar_incidents),
+    Intent("last_occurrence", False, ("quand", "dernière fois"), last_occurrence),
+    Intent("machine_risk", True, ("risque", "probabilité de panne"), machine_risk),
+    Intent("machine_alerts", True, ("alertes",), machine_alerts),
+    Intent("machine_readings", True, ("dernières données", "capteurs"), machine_readings),
+    Intent("machine_role", True, ("qu'est-ce que tu fais", "ton rôle"), machine_role),
+    Intent("machine_info", True, ("informations", "détails"), machine_info),
+    Intent("greeting", False, ("bonjour", "salut"), greeting),
+    Intent("help", False, ("aide",), help_answer),
+    Intent("most_at_risk", False, ("machine la plus à risque",), most_at_risk),
+    Intent("fleet_alerts", False, ("dernières alertes", "alertes globales"), fleet_alerts),
+    Intent("objective", False, ("quel est l'objectif", "ton but"), objective),
+    Intent("technologies", False, ("technologies",), technologies),
+]
+
+
+class LatencyStats:
+    """Nombre de réponses, moyenne et maximum cumulés, percentiles sur les dernières réponses."""
+
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, window: int = AI_ASSISTANT_LATENCY_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = np.percentile(self.recent, [50, 95]) if self.recent else (0.0, 0.0)
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(float(p50) * 1000, 3),
+            "p95_ms": round(float(p95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+# Découpage des réponses diffusées : un mot et les espaces qui le suivent
+TOKEN_PATTERN = re.compile(r"\s*\S+\s*")
+
+
+class Assistant:
+    """
+    Assistant de maintenance : route la question vers une intention (IntentRouter) et répond
+    depuis les fiches de santé de fleet_health, tenues à jour par l'ingestion et les alertes, sans
+    parcourir les alertes ; les questions sur l'historique (« quand... », « incidents similaires »)
+    sont servies par l'index de recherche. Le délai simulé (AI_ASSISTANT_SIMULATED_DELAY) est désactivé par défaut ;
+    la latence de chaque réponse est mesurée par intention, hors délai simulé.
+    """
+
+    def __init__(self, fleet: FleetHealth, machines: Mapping[UUID, Any], retrieval: Optional[RetrievalIndex] = None,
+                 intents: Iterable[Intent] = INTENTS, simulated_delay: Tuple[float, ...] = AI_ASSISTANT_SIMULATED_DELAY):
+        self.fleet = fleet
+        self.machines = machines
+        self.retrieval = retrieval
+        self.router = IntentRouter(intents)
+        self.simulated_delay = simulated_delay
+        self._latency: Dict[str, LatencyStats] = {}
+
+    def answer(self, question: str, machine_id: Optional[UUID] = None) -> Tuple[str, str]:
+        """Retourne (intention, réponse)."""
+        started = time.perf_counter()
+        machine = self.machines.get(machine_id) if machine_id is not None else None
+        intent = self.router.route(question.lower(), machine is not None)
+        context = AssistantContext(question, machine, self.fleet.get(machine_id) if machine is not None else None,
+                                   self.fleet, self.machines, self.retrieval)
+        name = intent.name if intent is not None else FALLBACK_INTENT
+        text = intent.handler(context) if intent is not None else fallback(context)
+        latency = self._latency.get(name)
+        if latency is None:
+            latency = self._latency[name] = LatencyStats()
+        latency.add(time.perf_counter() - started)
+        return name, text
+
+    def delay(self) -> float:
+        if len(self.simulated_delay) > 1:
+            return random.uniform(self.simulated_delay[0], self.simulated_delay[1])
+        return self.simulated_delay[0]
+
+    async def stream(self, question: str, machine_id: Optional[UUID] = None) -> AsyncIterator[bytes]:
+        """
+        Réponse en Server-Sent Events : un événement token par mot, puis un événement done avec
+        l'intention et la réponse complète. Le délai simulé, s'il est activé, est réparti entre les mots.
+        """
+        intent, text = self.answer(question, machine_id)
+        tokens: List[str] = TOKEN_PATTERN.findall(text) or [text]
+        pause = self.delay() / len(tokens)
+        for token in tokens:
+            if pause:
+                await asyncio.sleep(pause)
+            yield b"event: token\ndata: " + dumps({"text": token}) + b"\n\n"
+        yield b"event: done\ndata: " + dumps({"intent": intent, "response": text}) + b"\n\n"
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "simulated_delay_seconds": list(self.simulated_delay),
+            "intents": {name: latency.snapshot() for name, latency in self._latency.items()},
+        }
@@ -0,0 +1,237 @@
+# backend/app/broadcast.py
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+# Messages en attente par client : au-delà, le client est jugé trop lent et resynchronisé
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", "256"))
+# Les mesures sont diffusées en entiers à 1/BROADCAST_SCALE près (3 décimales par défaut)
+BROADCAST_SCALE = int(os.getenv("BROADCAST_SCALE", "1000"))
+
+ALERTS_TOPIC = "alerts"
+
+
+def machine_topic(machine_id) -> str:
+    return f"machine:{machine_id}"
+
+
+def encode(message: Dict[str, Any]) -> str:
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+class Subscription:
+    """File bornée des messages (déjà encodés) d'un client abonné à un sujet."""
+
+    __slots__ = ("topic", "max_queue", "queue", "closed", "delivered", "dropped", "resyncs", "_ready")
+
+    def __init__(self, topic: str, max_queue: int):
+        self.topic = topic
+        self.max_queue = max_queue
+        self.queue: Deque[str] = deque()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.resyncs = 0
+        self._ready = asyncio.Event()
+
+    def push(self, message: str):
+        self.queue.append(message)
+        self._ready.set()
+
+    async def get(self) -> Optional[str]:
+        """Prochain message ; None quand l'abonnement est fermé."""
+        while not self.queue:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        self.delivered += 1
+        return self.queue.popleft()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class ReadingState:
+    """Dernière lecture diffusée sur un sujet machine, en entiers quantifiés : base des deltas."""
+
+    __slots__ = ("machine_id", "timestamp_ms", "values")
+
+    def __init__(self, machine_id, timestamp_ms: int, values: Dict[str, Optional[int]]):
+        self.machine_id = machine_id
+        self.timestamp_ms = timestamp_ms
+        self.values = values
+
+
+class Topic:
+    __slots__ = ("subscribers", "seq", "reading")
+
+    def __init__(self):
+        self.subscribers: Set[Subscription] = set()
+        self.seq = 0
+        self.reading: Optional[ReadingState] = None
+
+
+class Broadcaster:
+    """
+    Diffusion en direct des lectures et des événements d'alerte.
+
+    Chaque événement est encodé une seule fois puis déposé dans la file de chaque abonné du
+    sujet (machine:<id> ou alerts) : le coût par abonné est un ajout en file. Les files sont
+    bornées ; un client qui ne suit pas perd ses messages en attente et reçoit à la place
+    un message resync suivi d'un snapshot de l'état courant, sans ralentir les autres.
+
+    Les lectures sont encodées en deltas : un snapshot (valeurs entières quantifiées à
+    1/scale près et timestamp en millisecondes) à l'abonnement et à chaque resynchronisation,
+    puis pour chaque lecture l'écart au timestamp précédent ("dt") et les écarts non nuls des
+    mesures ("d"). Une mesure qui devient ou cesse d'être nulle est envoyée en absolu ("set").
+    Le numéro de séquence "seq" permet au client de vérifier qu'aucun delta n'a été perdu.
+    """
+
+    def __init__(self, columns: Sequence[str], max_queue: int = BROADCAST_QUEUE_SIZE, scale: int = BROADCAST_SCALE):
+        self.columns = tuple(columns)
+        self.max_queue = max_queue
+        self.scale = scale
+        self._topics: Dict[str, Topic] = {}
+
+        self.published = 0
+        self.deliveries = 0
+        self.bytes_out = 0
+        self.resyncs = 0
+
+    def _topic(self, name: str) -> Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = Topic()
+        return topic
+
+    def subscribe(self, name: str, max_queue: Optional[int] = None) -> Subscription:
+        topic = self._topic(name)
+        subscription = Subscription(name, max_queue or self.max_queue)
+        topic.subscribers.add(subscription)
+        snapshot = self._snapshot(topic)
+        if snapshot is not None:
+            subscription.push(snapshot)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        topic = self._topics.get(subscription.topic)
+        if topic is not None:
+            topic.subscribers.discard(subscription)
+
+    def _snapshot(self, topic: Topic) -> Optional[str]:
+        state = topic.reading
+        if state is None:
+            return None
+        return encode({
+            "type": "snapshot",
+            "seq": topic.seq,
+            "machine_id": state.machine_id,
+            "timestamp_ms": state.timestamp_ms,
+            "scale": self.scale,
+            "values": state.values,
+        })
+
+    def _fan_out(self, topic: Topic, message: str):
+        self.published += 1
+        for subscription in topic.subscribers:
+            if len(subscription.queue) >= subscription.max_queue:
+                self._resync(topic, subscription)
+                continue
+            subscription.push(message)
+            self.deliveries += 1
+            self.bytes_out += len(message)
+
+    def _resync(self, topic: Topic, subscription: Subscription):
+        """Client trop lent : ses messages en attente sont remplacés par resync + snapshot."""
+        subscription.dropped += len(subscription.queue)
+        subscription.resyncs += 1
+        subscription.queue.clear()
+        subscription.push(encode({"type": "resync", "seq": topic.seq}))
+        snapshot = self._snapshot(topic)
+        if snapshot is not None:
+            subscription.push(snapshot)
+        self.resyncs += 1
+        if subscription.resyncs == 1:
+            logger.info(f"Slow subscriber on {subscription.topic}: resynchronised (queue size {subscription.max_queue})")
+
+    def publish(self, name: str, message: Dict[str, Any]):
+        """Diffuse un événement aux abonnés d'un sujet (rien n'est encodé s'il n'y en a aucun)."""
+        topic = self._topics.get(name)
+        if topic is None or not topic.subscribers:
+            return
+        self._fan_out(topic, encode(message))
+
+    def publish_reading(self, machine_id, timestamp: datetime, values: Sequence[Optional[float]]):
+        """Met à jour l'état du sujet de la machine et diffuse la lecture en delta."""
+        topic = self._topic(machine_topic(machine_id))
+        timestamp_ms = int(timestamp.timestamp() * 1000)
+        quantized = {
+            column: round(value * self.scale) if value is not None else None
+            for column, value in zip(self.columns, values)
+        }
+        previous = topic.reading
+        topic.seq += 1
+        topic.reading = ReadingState(machine_id, timestamp_ms, quantized)
+        if not topic.subscribers:
+            return
+        if previous is None:
+            self._fan_out(topic, self._snapshot(topic))
+            return
+
+        deltas: Dict[str, int] = {}
+        absolute: Dict[str, Optional[int]] = {}
+        for column, value in quantized.items():
+            before = previous.values.get(column)
+            if value is None or before is None:
+                if value != before:
+                    absolute[column] = value
+            elif value != before:
+                deltas[column] = value - before
+        message: Dict[str, Any] = {"type": "reading", "seq": topic.seq, "dt": timestamp_ms - previous.timestamp_ms, "d": deltas}
+        if absolute:
+            message["set"] = absolute
+        self._fan_out(topic, encode(message))
+
+    def publish_alert(self, machine_id, event: str, payload: Callable[[], Dict[str, Any]]):
+        """
+        Diffuse un événement d'alerte (opened, updated, resolved) sur le sujet de la machine et sur alerts.
+        payload() n'est appelée que si l'un de ces sujets a des abonnés.
+        """
+        targets = [
+            topic for topic in (self._topics.get(machine_topic(machine_id)), self._topics.get(ALERTS_TOPIC))
+            if topic is not None and topic.subscribers
+        ]
+        if not targets:
+            return
+        message = encode({"type": "alert", "event": event, "machine_id": str(machine_id), **payload()})
+        for topic in targets:
+            self._fan_out(topic, message)
+
+    def subscriber_count(self, name: Optional[str] = None) -> int:
+        if name is not None:
+            topic = self._topics.get(name)
+            return len(topic.subscribers) if topic is not None else 0
+        return sum(len(topic.subscribers) for topic in self._topics.values())
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "topics": len(self._topics),
+            "subscribers": self.subscriber_count(),
+            "alert_subscribers": self.subscriber_count(ALERTS_TOPIC),
+            "events_published": self.published,
+            "deliveries": self.deliveries,
+            "bytes_out": self.bytes_out,
+            "resyncs": self.resyncs,
+            "queue_size": self.max_queue,
+            "scale": self.scale,
+        }
@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Float, cast, func, select
 from . import models, schemas
-from typing import List, Optional
+from .rules import CHANNELS
+from .sensor_store import COLUMNS
+from typing import List, Optional, Sequence
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 
@@ -19,6 +21,10 @@ def get_machine_by_serial(db: Session, serial_number: str):
 def get_machines(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Machine).offset(skip).limit(limit).all()
 
+def get_machines_by_ids(db: Session, machine_ids: Sequence[uuid.UUID]):
+    """Machines dont l'id figure dans machine_ids, en une seule requête (les ids inconnus sont ignorés)."""
+    return db.query(models.Machine).filter(models.Machine.id.in_(machine_ids)).all()
+
 def create_machine(db: Session, machine: schemas.MachineCreate):
     db_machine = models.Machine(**machine.dict())
     db.add(db_machine)
@@ -49,15 +55,87 @@ def get_sensor_data_for_machine(
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    latest: bool = False
 ):
+    """
+    Lectures d'une machine par ordre chronologique.
+    latest=True renvoie les `limit` lectures les plus récentes de la plage plutôt que les premières.
+    """
     query = db.query(models.SensorData).filter(models.SensorData.machine_id == machine_id)
     if start_time:
         query = query.filter(models.SensorData.timestamp >= start_time)
     if end_time:
         query = query.filter(models.SensorData.timestamp <= end_time)
+    if latest:
+        return query.order_by(models.SensorData.timestamp.desc()).offset(skip).limit(limit).all()[::-1]
     return query.order_by(models.SensorData.timestamp.asc()).offset(skip).limit(limit).all()
 
+def sensor_data_export_query(
+    machine_id: uuid.UUID,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """Colonnes (timestamp, canaux en float, labels) des lectures d'une machine, par ordre chronologique."""
+    query = select(
+        models.SensorData.timestamp,
+        *(cast(getattr(models.SensorData, name), Float).label(name) for name in COLUMNS),
+        models.SensorData.labels,
+    ).where(models.SensorData.machine_id == machine_id)
+    if start_time:
+        query = query.where(models.SensorData.timestamp >= start_time)
+    if end_time:
+        query = query.where(models.SensorData.timestamp <= end_time)
+    return query.order_by(models.SensorData.timestamp.asc())
+
+def stream_sensor_data(
+    db: Session,
+    machine_id: uuid.UUID,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    batch_size: int = 10000
+):
+    """
+    Lectures d'une machine par lots de `batch_size` lignes, lues par un curseur côté serveur
+    (stream_results) : la plage n'est jamais chargée en entier en mémoire. La requête passe par la
+    connexion (Core) plutôt que par la session : des tuples, sans chargement ORM ligne par ligne.
+    """
+    query = sensor_data_export_query(machine_id, start_time, end_time)
+    result = db.connection().execute(query.execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+# Agrégats SQL correspondant à downsampling.AGGREGATE_FUNCTIONS
+SQL_AGGREGATES = {"avg": func.avg, "min": func.min, "max": func.max, "sum": func.sum}
+
+def get_sensor_data_aggregates(
+    db: Session,
+    machine_id: uuid.UUID,
+    bucket: timedelta,
+    functions: Sequence[str] = ("avg", "min", "max"),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    limit: int = 10000
+):
+    """
+    Agrège les données de capteurs d'une machine par intervalle de temps directement dans
+    TimescaleDB (time_bucket), au lieu de rapatrier les lectures brutes.
+    Chaque ligne contient bucket, count et une colonne <canal>_<fonction> par agrégat.
+    Au-delà de `limit` intervalles, seuls les plus récents sont retournés (en ordre chronologique).
+    """
+    bucket_column = func.time_bucket(bucket, models.SensorData.timestamp).label("bucket")
+    columns = [bucket_column, func.count().label("count")]
+    for channel in CHANNELS:
+        for fn in functions:
+            columns.append(SQL_AGGREGATES[fn](getattr(models.SensorData, channel)).label(f"{channel}_{fn}"))
+
+    query = db.query(*columns).filter(models.SensorData.machine_id == machine_id)
+    if start_time:
+        query = query.filter(models.SensorData.timestamp >= start_time)
+    if end_time:
+        query = query.filter(models.SensorData.timestamp <= end_time)
+    rows = query.group_by(bucket_column).order_by(bucket_column.desc()).limit(limit).all()
+    return rows[::-1]
+
 def create_alert(db: Session, alert_item: schemas.AlertCreate):
     db_alert = models.Alert(**alert_item.dict())
     db.add(db_alert)
@@ -65,8 +143,17 @@ def create_alert(db: Session, alert_item: schemas.AlertCreate):
     db.refresh(db_alert)
     return db_alert
 
-def get_alerts_for_machine(db: Session, machine_id: uuid.UUID, skip: int = 0, limit: int = 100):
-    return db.query(models.Alert).filter(models.Alert.machine_id == machine_id).offset(skip).limit(limit).all()
+def get_alerts_for_machine(db: Session, machine_id: uuid.UUID, skip: int = 0, limit: int = 100, resolved: Optional[bool] = None):
+    query = db.query(models.Alert).filter(models.Alert.machine_id == machine_id)
+    if resolved is not None:
+        query = query.filter(models.Alert.is_resolved == resolved)
+    return query.order_by(models.Alert.timestamp.desc()).offset(skip).limit(limit).all()
+
+def get_alerts(db: Session, resolved: Optional[bool] = None, skip: int = 0, limit: int = 100):
+    query = db.query(models.Alert)
+    if resolved is not None:
+        query = query.filter(models.Alert.is_resolved == resolved)
+    return query.order_by(models.Alert.timestamp.desc()).offset(skip).limit(limit).all()
 
 def get_unresolved_alerts(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Alert).filter(models.Alert.is_resolved == False).offset(skip).limit(limit).all()
@@ -0,0 +1,154 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+from .crud import SQL_AGGREGATES, sensor_data_export_query
+from .rules import CHANNELS
+from typing import List, Optional, Sequence
+import uuid
+from datetime import datetime, timedelta
+
+# Équivalents asynchrones des fonctions de crud.py, mêmes noms et mêmes paramètres,
+# pour les sessions issues de database.get_async_session_factory().
+
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(models.User).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_machine(db: AsyncSession, machine_id: uuid.UUID):
+    return await db.get(models.Machine, machine_id)
+
+async def get_machine_by_serial(db: AsyncSession, serial_number: str):
+    result = await db.execute(select(models.Machine).where(models.Machine.serial_number == serial_number))
+    return result.scalars().first()
+
+async def get_machines(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(models.Machine).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_machines_by_ids(db: AsyncSession, machine_ids: Sequence[uuid.UUID]):
+    result = await db.execute(select(models.Machine).where(models.Machine.id.in_(machine_ids)))
+    return result.scalars().all()
+
+async def create_machine(db: AsyncSession, machine: schemas.MachineCreate):
+    db_machine = models.Machine(**machine.dict())
+    db.add(db_machine)
+    await db.commit()
+    await db.refresh(db_machine)
+    return db_machine
+
+async def create_sensor_data(db: AsyncSession, sensor_data_item: schemas.SensorDataCreate):
+    db_sensor_data = models.SensorData(**sensor_data_item.dict())
+    db.add(db_sensor_data)
+    await db.commit()
+    return db_sensor_data
+
+async def create_multiple_sensor_data(db: AsyncSession, sensor_data_items: List[schemas.SensorDataCreate]):
+    # Toutes les colonnes sont fournies par les schémas : pas de refresh() ligne par ligne
+    db_items = [models.SensorData(**item.dict()) for item in sensor_data_items]
+    db.add_all(db_items)
+    await db.commit()
+    return db_items
+
+
+async def get_sensor_data_for_machine(
+    db: AsyncSession,
+    machine_id: uuid.UUID,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 100,
+    latest: bool = False
+):
+    query = select(models.SensorData).where(models.SensorData.machine_id == machine_id)
+    if start_time:
+        query = query.where(models.SensorData.timestamp >= start_time)
+    if end_time:
+        query = query.where(models.SensorData.timestamp <= end_time)
+    if latest:
+        result = await db.execute(query.order_by(models.SensorData.timestamp.desc()).offset(skip).limit(limit))
+        return result.scalars().all()[::-1]
+    result = await db.execute(query.order_by(models.SensorData.timestamp.asc()).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def stream_sensor_data(
+    db: AsyncSession,
+    machine_id: uuid.UUID,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    batch_size: int = 10000
+):
+    query = sensor_data_export_query(machine_id, start_time, end_time)
+    connection = await db.connection()
+    result = await connection.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        yield partition
+
+async def get_sensor_data_aggregates(
+    db: AsyncSession,
+    machine_id: uuid.UUID,
+    bucket: timedelta,
+    functions: Sequence[str] = ("avg", "min", "max"),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    limit: int = 10000
+):
+    bucket_column = func.time_bucket(bucket, models.SensorData.timestamp).label("bucket")
+    columns = [bucket_column, func.count().label("count")]
+    for channel in CHANNELS:
+        for fn in functions:
+            columns.append(SQL_AGGREGATES[fn](getattr(models.SensorData, channel)).label(f"{channel}_{fn}"))
+
+    query = select(*columns).where(models.SensorData.machine_id == machine_id)
+    if start_time:
+        query = query.where(models.SensorData.timestamp >= start_time)
+    if end_time:
+        query = query.where(models.SensorData.timestamp <= end_time)
+    # Les `limit` intervalles les plus récents, en ordre chronologique
+    result = await db.execute(query.group_by(bucket_column).order_by(bucket_column.desc()).limit(limit))
+    return result.all()[::-1]
+
+async def create_alert(db: AsyncSession, alert_item: schemas.AlertCreate):
+    db_alert = models.Alert(**alert_item.dict())
+    db.add(db_alert)
+    await db.commit()
+    await db.refresh(db_alert)
+    return db_alert
+
+async def get_alerts_for_machine(db: AsyncSession, machine_id: uuid.UUID, skip: int = 0, limit: int = 100, resolved: Optional[bool] = None):
+    query = select(models.Alert).where(models.Alert.machine_id == machine_id)
+    if resolved is not None:
+        query = query.where(models.Alert.is_resolved == resolved)
+    result = await db.execute(query.order_by(models.Alert.timestamp.desc()).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_alerts(db: AsyncSession, resolved: Optional[bool] = None, skip: int = 0, limit: int = 100):
+    query = select(models.Alert)
+    if resolved is not None:
+        query = query.where(models.Alert.is_resolved == resolved)
+    result = await db.execute(query.order_by(models.Alert.timestamp.desc()).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_unresolved_alerts(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(models.Alert).where(models.Alert.is_resolved == False).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_user(db: AsyncSession, user_id: uuid.UUID):
+    return await db.get(models.User, user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    fake_hashed_password = user.password + "notreallyhashed"
+    db_user = models.User(
+        username=user.username,
+        email=user.email,
+        hashed_password=fake_hashed_password,
+        role=user.role
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
@@ -0,0 +1,94 @@
+# backend/app/downsampling.py
+
+import re
+from datetime import timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Fonctions d'agrégation disponibles par intervalle de temps (le nombre de points est toujours fourni)
+AGGREGATE_FUNCTIONS = ("avg", "min", "max", "sum")
+
+_BUCKET_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+_BUCKET_PATTERN = re.compile(r"^\s*(\d+)\s*([smhd])\s*$")
+
+
+def parse_bucket(value: str) -> timedelta:
+    """Interprète une taille d'intervalle de la forme '30s', '1m', '5m', '1h' ou '1d'."""
+    match = _BUCKET_PATTERN.match(value)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Intervalle invalide '{value}' (attendu par exemple 30s, 1m, 1h, 1d)")
+    return timedelta(**{_BUCKET_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def parse_functions(value: str) -> List[str]:
+    """Interprète une liste de fonctions d'agrégation séparées par des virgules."""
+    functions = [fn.strip() for fn in value.split(",") if fn.strip()]
+    unknown = [fn for fn in functions if fn not in AGGREGATE_FUNCTIONS]
+    if not functions or unknown:
+        raise ValueError(f"Fonction(s) d'agrégation invalide(s): {', '.join(unknown) or repr(value)} (disponibles: {', '.join(AGGREGATE_FUNCTIONS)})")
+    return functions
+
+
+def bucket_aggregate(timestamps: np.ndarray, columns: Dict[str, np.ndarray], bucket_ns: int, functions: Sequence[str]) -> Dict:
+    """
+    Agrège des séries triées par timestamp en intervalles de bucket_ns, alignés sur l'epoch
+    (comme time_bucket de TimescaleDB pour les intervalles inférieurs à une semaine).
+    Une seule passe vectorisée : les bornes des intervalles sont trouvées sur les timestamps triés,
+    puis chaque fonction est un ufunc.reduceat sur ces bornes.
+    """
+    if not len(timestamps):
+        return {"timestamp": np.empty(0, dtype=np.int64), "count": np.empty(0, dtype=np.int64),
+                **{name: {fn: np.empty(0) for fn in functions} for name in columns}}
+
+    buckets = timestamps // bucket_ns
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    counts = np.diff(np.append(starts, len(timestamps)))
+
+    result = {"timestamp": buckets[starts] * bucket_ns, "count": counts}
+    for name, values in columns.items():
+        aggregates = {}
+        sums = None
+        for fn in functions:
+            if fn in ("avg", "sum"):
+                if sums is None:
+                    sums = np.add.reduceat(values, starts)
+                aggregates[fn] = sums / counts if fn == "avg" else sums
+            elif fn == "min":
+                aggregates[fn] = np.minimum.reduceat(values, starts)
+            elif fn == "max":
+                aggregates[fn] = np.maximum.reduceat(values, starts)
+        result[name] = aggregates
+    return result
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets : indices d'au plus `threshold` points de (x, y) qui
+    préservent l'allure visuelle de la série (premier et dernier points toujours conservés).
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1], dtype=np.intp)[:max(threshold, 0)]
+
+    x = (x - x[0]).astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Sommet « suivant » : moyenne de l'intervalle d'après (ou dernier point)
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_lo:next_hi].mean() if next_hi > next_lo else x[-1]
+        next_y = y[next_lo:next_hi].mean() if next_hi > next_lo else y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (next_y - y[previous])
+        )
+        previous = lo + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
@@ -0,0 +1,168 @@
+# backend/app/export.py
+
+import os
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .sensor_store import COLUMNS, SensorRingBuffer
+
+# Nombre de lectures par record batch (Arrow) ou par row group (Parquet)
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "65536"))
+# Lignes lues par lot sur le curseur de la base : des tuples Python, bien plus coûteux que des colonnes
+EXPORT_DB_BATCH_ROWS = int(os.getenv("EXPORT_DB_BATCH_ROWS", "10000"))
+
+# Formats d'export : type MIME et extension du fichier proposé au téléchargement
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def load_pyarrow():
+    """pyarrow est optionnel : il n'est importé qu'au premier export (ImportError s'il manque)."""
+    import pyarrow
+    import pyarrow.parquet  # noqa: F401  (charge le sous-module pyarrow.parquet)
+    return pyarrow
+
+
+def export_schema(machine_id):
+    """Schéma des exports : timestamp UTC en ns, un float64 par canal, labels en liste de chaînes."""
+    pa = load_pyarrow()
+    fields = [pa.field("timestamp", pa.timestamp("ns", tz="UTC"), nullable=False)]
+    fields += [pa.field(name, pa.float64()) for name in COLUMNS]
+    fields.append(pa.field("labels", pa.list_(pa.string())))
+    return pa.schema(fields, metadata={"machine_id": str(machine_id)})
+
+
+def memory_batches(buffer: SensorRingBuffer, schema, start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                   batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[Any]:
+    """
+    Record batches des lectures du tampon dans [start_ns, end_ns], construits sur les vues des
+    colonnes NumPy sans copie (timestamps int64 et canaux float64 ; seul le masque des NaN et les
+    labels sont matérialisés).
+
+    Le tampon peut changer entre deux batches (ingestion, éviction, compactage) : la position de
+    reprise est recalculée à chaque batch par dichotomie sur le dernier timestamp exporté, unique
+    par machine comme dans la table sensor_data. Chaque batch doit être encodé avant de rendre la
+    main à la boucle d'événements, puisque ses colonnes pointent dans le tampon.
+    """
+    pa = load_pyarrow()
+    timestamp_type = schema.field("timestamp").type
+    labels_type = schema.field("labels").type
+    cursor, side = start_ns, "left"
+    while True:
+        timestamps = buffer.timestamps()
+        lo = int(np.searchsorted(timestamps, cursor, side=side)) if cursor is not None else 0
+        hi = int(np.searchsorted(timestamps, end_ns, side="right")) if end_ns is not None else len(timestamps)
+        if lo >= hi:
+            return
+        hi = min(hi, lo + batch_rows)
+        view = buffer.view(lo, hi)
+        arrays = [pa.Array.from_buffers(timestamp_type, hi - lo, [None, pa.py_buffer(view["timestamp"])])]
+        # from_pandas : NaN (operating_hours absent) devient null ; le buffer de données reste partagé
+        arrays += [pa.array(view[name], type=pa.float64(), from_pandas=True) for name in COLUMNS]
+        arrays.append(pa.array(buffer.labels()[lo:hi], type=labels_type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+        cursor, side = int(timestamps[hi - 1]), "right"
+
+
+def rows_batch(rows: Sequence[Sequence[Any]], schema):
+    """Record batch d'un lot de lignes (timestamp, canaux..., labels) lues en base."""
+    pa = load_pyarrow()
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+class _ChunkSink:
+    """Fichier en écriture seule : accumule les octets écrits par pyarrow jusqu'au prochain drain()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Position absolue : le writer Parquet s'en sert pour les offsets du footer
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class BatchEncoder:
+    """
+    Encode des record batches au fil de l'eau en flux Arrow IPC ou en Parquet (un row group par
+    batch) : write() renvoie les octets produits par ce batch, close() la fin du flux (footer).
+    """
+
+    def __init__(self, export_format: str, schema):
+        pa = load_pyarrow()
+        self._sink = _ChunkSink()
+        stream = pa.PythonFile(self._sink, mode="w")
+        if export_format == "parquet":
+            self._writer = pa.parquet.ParquetWriter(stream, schema)
+        else:
+            self._writer = pa.ipc.new_stream(stream, schema)
+
+    def write(self, batch) -> bytes:
+        self._writer.write_batch(batch)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+def encode_batches(batches: Iterable[Any], export_format: str, schema) -> Iterator[bytes]:
+    encoder = BatchEncoder(export_format, schema)
+    for batch in batches:
+        chunk = encoder.write(batch)
+        if chunk:
+            yield chunk
+    yield encoder.close()
+
+
+async def encode_batches_async(batches: AsyncIterable[Any], export_format: str, schema) -> AsyncIterator[bytes]:
+    encoder = BatchEncoder(export_format, schema)
+    async for batch in batches:
+        chunk = encoder.write(batch)
+        if chunk:
+            yield chunk
+    yield encoder.close()
+
+
+async def in_event_loop(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Parcourt un itérateur synchrone dans la boucle d'événements. StreamingResponse exécuterait
+    sinon l'itérateur dans le pool de threads, en concurrence avec l'ingestion qui modifie les tampons.
+    """
+    for chunk in chunks:
+        yield chunk
+
+
+def export_filename(machine_id, export_format: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> str:
+    parts = [f"sensor-data-{machine_id}"]
+    parts += [value.strftime("%Y%m%dT%H%M%S") for value in (start_time, end_time) if value is not None]
+    return f"{'_'.join(parts)}.{EXPORT_FORMATS[export_format][1]}"
+
+
+def export_headers(machine_id, export_format: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> Dict[str, str]:
+    return {"Content-Disposition": f'attachment; filename="{export_filename(machine_id, export_format, start_time, end_time)}"'}
@@ -0,0 +1,219 @@
+# backend/app/fleet_health.py
+
+import heapq
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from .alert_correlator import SEVERITY_RANK
+from .streaming_stats import STATS_WINDOWS, StreamingStatsEngine
+
+# Poids d'une alerte active dans le score de risque, par sévérité (Urgence 3, Critique 2, Avertissement 1)
+RISK_WEIGHTS = dict(SEVERITY_RANK)
+# Nombre de machines les plus à risque renvoyées par défaut par GET /fleet/health
+FLEET_HEALTH_TOP_K = int(os.getenv("FLEET_HEALTH_TOP_K", "10"))
+# Fenêtre glissante (en lectures, parmi STATS_WINDOWS) résumée dans les fiches de santé
+FLEET_HEALTH_WINDOW = int(os.getenv("FLEET_HEALTH_WINDOW", str(STATS_WINDOWS[0])))
+
+
+class MachineHealth:
+    """Fiche de santé d'une machine, mise à jour sur place par l'ingestion et les alertes."""
+
+    __slots__ = ("machine_id", "last_timestamp", "last_values", "active", "by_severity", "risk_score",
+                 "last_anomaly", "heap_seq", "rolling")
+
+    def __init__(self, machine_id: UUID):
+        self.machine_id = machine_id
+        self.last_timestamp: Optional[datetime] = None
+        self.last_values: Optional[Dict[str, float]] = None
+        # id -> alerte active, par ordre d'ouverture : ouvrir ou résoudre deux fois la même alerte est sans effet
+        self.active: Dict[UUID, Any] = {}
+        self.by_severity: Dict[str, int] = {}
+        self.risk_score = 0
+        self.last_anomaly: Optional[datetime] = None
+        # Rang de l'entrée valide de la machine dans le tas des machines à risque (None : absente)
+        self.heap_seq: Optional[int] = None
+        # Statistiques glissantes publiées par le worker propriétaire de la machine (voir FleetHealth.replicate)
+        self.rolling: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+class FleetHealth:
+    """
+    Santé du parc, maintenue incrémentalement : une fiche par machine (dernière lecture, alertes
+    actives par sévérité, score de risque, dernière anomalie) et un tas des machines à risque.
+
+    Le score de risque est la somme des poids RISK_WEIGHTS des alertes actives ; il ne change qu'à
+    l'ouverture ou à la résolution d'une alerte, et chaque changement pousse une nouvelle entrée
+    (-score, rang, machine) dans le tas. Les entrées périmées ne sont pas retirées mais ignorées à
+    la lecture (suppression paresseuse), et le tas est reconstruit quand elles dépassent la moitié.
+    top(k) coûte O(k log n) quel que soit le nombre de machines, sans parcourir les alertes.
+
+    Les statistiques glissantes ne sont pas dupliquées : elles sont lues dans le moteur de
+    statistiques de l'ingestion (une fenêtre de FLEET_HEALTH_WINDOW lectures par canal). Pour une
+    machine détenue par un autre worker, qui seul reçoit ses lectures, la fiche reprend la dernière
+    lecture, la dernière anomalie et les statistiques publiées par ce worker (replicate).
+    """
+
+    def __init__(self, stats: Optional[StreamingStatsEngine] = None, window: int = FLEET_HEALTH_WINDOW):
+        self.stats = stats
+        self.window = window
+        self._machines: Dict[UUID, MachineHealth] = {}
+        # (-score, rang, machine_id) ; à score égal, la machine à risque depuis le plus longtemps d'abord
+        self._heap: List[Tuple[int, int, UUID]] = []
+        self._seq = 0
+        self._at_risk = 0
+        # Alertes actives de tout le parc, par ordre d'ouverture, et leur nombre par sévérité
+        self._active: Dict[UUID, Any] = {}
+        self.active_by_severity: Dict[str, int] = {}
+        self.compactions = 0
+
+    def ensure(self, machine_id: UUID) -> MachineHealth:
+        health = self._machines.get(machine_id)
+        if health is None:
+            health = self._machines[machine_id] = MachineHealth(machine_id)
+        return health
+
+    def get(self, machine_id: UUID) -> Optional[MachineHealth]:
+        return self._machines.get(machine_id)
+
+    def __len__(self) -> int:
+        return len(self._machines)
+
+    def record_reading(self, machine_id: UUID, timestamp: datetime, values: Dict[str, float]):
+        health = self.ensure(machine_id)
+        # Lecture reçue ici : ce worker est désormais le propriétaire, ses propres statistiques font foi
+        health.rolling = None
+        if health.last_timestamp is None or timestamp >= health.last_timestamp:
+            health.last_timestamp, health.last_values = timestamp, values
+
+    def replicate(
+        self,
+        machine_id: UUID,
+        last_timestamp: Optional[datetime],
+        last_values: Optional[Dict[str, float]],
+        last_anomaly: Optional[datetime],
+        rolling: Dict[str, Dict[str, Any]],
+    ):
+        """Applique la fiche publiée par le worker propriétaire de la machine."""
+        health = self.ensure(machine_id)
+        if last_timestamp is not None and (health.last_timestamp is None or last_timestamp >= health.last_timestamp):
+            health.last_timestamp, health.last_values = last_timestamp, last_values
+        if last_anomaly is not None:
+            self.record_anomaly(machine_id, last_anomaly)
+        health.rolling = rolling
+
+    def record_anomaly(self, machine_id: UUID, timestamp: datetime):
+        health = self.ensure(machine_id)
+        if health.last_anomaly is None or timestamp > health.last_anomaly:
+            health.last_anomaly = timestamp
+
+    def alert_opened(self, alert):
+        if alert.is_resolved:
+            return
+        health = self.ensure(alert.machine_id)
+        if alert.id in health.active:
+            return
+        health.active[alert.id] = self._active[alert.id] = alert
+        self._count(health, alert.severity, 1)
+
+    def alert_resolved(self, alert):
+        health = self._machines.get(alert.machine_id)
+        if health is None or health.active.pop(alert.id, None) is None:
+            return
+        del self._active[alert.id]
+        self._count(health, alert.severity, -1)
+
+    def _count(self, health: MachineHealth, severity: str, delta: int):
+        health.by_severity[severity] = health.by_severity.get(severity, 0) + delta
+        if not health.by_severity[severity]:
+            del health.by_severity[severity]
+        self.active_by_severity[severity] = self.active_by_severity.get(severity, 0) + delta
+        if not self.active_by_severity[severity]:
+            del self.active_by_severity[severity]
+
+        score = health.risk_score + delta * RISK_WEIGHTS.get(severity, 0)
+        if score == health.risk_score:
+            return
+        was_at_risk = health.heap_seq is not None
+        health.risk_score = score
+        if score > 0:
+            health.heap_seq = self._seq
+            heapq.heappush(self._heap, (-score, self._seq, health.machine_id))
+            self._seq += 1
+        else:
+            health.heap_seq = None
+        self._at_risk += (score > 0) - was_at_risk
+        if len(self._heap) > 2 * self._at_risk + 64:
+            self._compact()
+
+    def _valid(self, entry: Tuple[int, int, UUID]) -> bool:
+        health = self._machines.get(entry[2])
+        return health is not None and health.heap_seq == entry[1]
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._valid(entry)]
+        heapq.heapify(self._heap)
+        self.compactions += 1
+
+    def top(self, k: int = FLEET_HEALTH_TOP_K) -> List[MachineHealth]:
+        """Les k machines au score de risque le plus élevé (score > 0), la plus à risque d'abord."""
+        result: List[MachineHealth] = []
+        kept: List[Tuple[int, int, UUID]] = []
+        while self._heap and len(result) < k:
+            entry = heapq.heappop(self._heap)
+            if self._valid(entry):
+                kept.append(entry)
+                result.append(self._machines[entry[2]])
+        for entry in kept:
+            heapq.heappush(self._heap, entry)
+        return result
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def recent_alerts(self, k: int) -> List[Any]:
+        """Les k dernières alertes actives ouvertes sur le parc, la plus récente d'abord."""
+        return list(islice(reversed(self._active.values()), k))
+
+    def rolling(self, machine_id: UUID, channels: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Moyenne, écart-type, min et max de chaque canal sur la fenêtre glissante des fiches."""
+        if self.stats is None:
+            return {}
+        rolling = {}
+        for name in channels:
+            channel = self.stats.get(machine_id, name)
+            if channel is None or channel.total.count == 0:
+                continue
+            window = next((w for w in channel.windows if w.size == self.window), channel.windows[0])
+            summary = window.snapshot()
+            rolling[name] = {field: summary[field] for field in ("count", "mean", "std", "min", "max")}
+        return rolling
+
+    def snapshot(self, health: MachineHealth) -> Dict[str, Any]:
+        channels = self.stats.channels if self.stats is not None else ()
+        return {
+            "machine_id": health.machine_id,
+            "risk_score": health.risk_score,
+            "active_alerts": dict(health.by_severity),
+            "last_anomaly": health.last_anomaly,
+            "last_reading": {"timestamp": health.last_timestamp, **health.last_values} if health.last_values else None,
+            "rolling": health.rolling if health.rolling is not None else self.rolling(health.machine_id, channels),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "machines": len(self._machines),
+            "machines_at_risk": self._at_risk,
+            "active_alerts": dict(self.active_by_severity),
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "heap_entries": len(self._heap),
+            "compactions": self.compactions,
+            "window": self.window,
+        }
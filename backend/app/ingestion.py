@@ -0,0 +1,205 @@
+# backend/app/ingestion.py
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Table
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, InterfaceError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Un lot est écrit dès qu'il atteint INGESTION_FLUSH_ROWS lignes ou après INGESTION_FLUSH_INTERVAL secondes
+INGESTION_FLUSH_ROWS = int(os.getenv("INGESTION_FLUSH_ROWS", "5000"))
+INGESTION_FLUSH_INTERVAL = float(os.getenv("INGESTION_FLUSH_INTERVAL", "1.0"))
+# Nombre maximal de lignes en attente : au-delà, les producteurs attendent (backpressure)
+INGESTION_QUEUE_MAX_ROWS = int(os.getenv("INGESTION_QUEUE_MAX_ROWS", "100000"))
+# Nouvelles tentatives d'un lot sur une erreur transitoire (connexion perdue, base verrouillée...),
+# après INGESTION_RETRY_BACKOFF secondes, doublées à chaque tentative
+INGESTION_RETRY_ATTEMPTS = int(os.getenv("INGESTION_RETRY_ATTEMPTS", "5"))
+INGESTION_RETRY_BACKOFF = float(os.getenv("INGESTION_RETRY_BACKOFF", "0.5"))
+
+_STOP = object()
+
+
+def _dialect_insert(engine: Engine):
+    """insert() du dialecte, qui seul fournit ON CONFLICT DO NOTHING."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Dialecte non supporté pour l'ingestion différée: {engine.dialect.name}")
+    return insert
+
+
+class WriteBehindWriter:
+    """
+    File d'écriture différée vers la table sensor_data.
+
+    Les lectures sont mises en file sans attendre la base ; une tâche de fond les regroupe
+    (par nombre de lignes ou par délai) et les écrit en un seul INSERT multi-lignes
+    ON CONFLICT (timestamp, machine_id) DO NOTHING, exécuté dans un thread pour ne pas
+    bloquer la boucle d'événements. La file est bornée : quand elle est pleine, submit()
+    attend qu'un lot soit écrit. stop() écrit tout ce qui reste avant de rendre la main.
+
+    Un lot en échec sur une erreur transitoire est réécrit jusqu'à retry_attempts fois, avec une
+    attente exponentielle. Sur une erreur propre aux données (clé étrangère, valeur invalide), le
+    lot est coupé en deux récursivement : seules les lignes fautives sont abandonnées (rows_failed).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        table: Optional[Table] = None,
+        flush_rows: int = INGESTION_FLUSH_ROWS,
+        flush_interval: float = INGESTION_FLUSH_INTERVAL,
+        max_queue_rows: int = INGESTION_QUEUE_MAX_ROWS,
+        retry_attempts: int = INGESTION_RETRY_ATTEMPTS,
+        retry_backoff: float = INGESTION_RETRY_BACKOFF,
+    ):
+        if table is None:
+            from .models import SensorData
+            table = SensorData.__table__
+        self.engine = engine
+        self.table = table
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._insert = _dialect_insert(engine)
+        self._conflict_columns = [column.name for column in table.primary_key.columns]
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_rows)
+        self._task: Optional[asyncio.Task] = None
+        self.retry_attempts = retry_attempts
+        self.retry_backoff = retry_backoff
+
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.retries = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.last_flush_rows = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Write-behind ingestion started (flush every {self.flush_rows} rows or {self.flush_interval}s)")
+
+    async def stop(self):
+        """Écrit les lignes en attente puis arrête la tâche de fond."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Write-behind ingestion stopped after {self.rows_written} rows in {self.flushes} flushes")
+
+    async def submit(self, row: Dict[str, Any]):
+        """Met une ligne en file ; attend si la file est pleine."""
+        await self._queue.put(row)
+
+    async def submit_many(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            await self._queue.put(row)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_capacity": self._queue.maxsize,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "retries": self.retries,
+            "flushes": self.flushes,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_latency_ms": round(self.last_flush_seconds * 1000, 3),
+            "avg_flush_latency_ms": round(self.flush_seconds_total / self.flushes * 1000, 3) if self.flushes else 0.0,
+            "max_flush_latency_ms": round(self.max_flush_seconds * 1000, 3),
+            "rows_per_second": round(self.rows_written / self.flush_seconds_total, 1) if self.flush_seconds_total else 0.0,
+        }
+
+    async def _next_batch(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """Attend une première ligne, puis complète le lot jusqu'à flush_rows ou flush_interval."""
+        loop = asyncio.get_running_loop()
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.flush_rows:
+            try:
+                row = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await loop.run_in_executor(None, self.flush, batch)
+
+    def flush(self, rows: List[Dict[str, Any]]):
+        """Écrit un lot (exécuté hors de la boucle d'événements)."""
+        started = time.perf_counter()
+        written = self._write(rows)
+        elapsed = time.perf_counter() - started
+        self.rows_written += written
+        self.flushes += 1
+        self.last_flush_rows = written
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.flush_seconds_total += elapsed
+        logger.debug(f"Flushed {written}/{len(rows)} sensor rows in {elapsed * 1000:.1f} ms")
+
+    def _execute(self, rows: List[Dict[str, Any]]):
+        statement = self._insert(self.table).on_conflict_do_nothing(index_elements=self._conflict_columns)
+        with self.engine.begin() as connection:
+            connection.execute(statement, rows)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        """Écrit des lignes en une instruction ; retourne le nombre de lignes écrites."""
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                self._execute(rows)
+                return len(rows)
+            except (IntegrityError, DataError) as e:
+                if len(rows) == 1:
+                    self.rows_failed += 1
+                    logger.error(f"Sensor row rejected by the database: {e.orig}")
+                    return 0
+                middle = len(rows) // 2
+                return self._write(rows[:middle]) + self._write(rows[middle:])
+            except DBAPIError as e:
+                transient = isinstance(e, (OperationalError, InterfaceError)) or e.connection_invalidated
+                if not transient or attempt == self.retry_attempts:
+                    error = e
+                    break
+                delay = self.retry_backoff * 2 ** attempt
+                self.retries += 1
+                logger.warning(f"Write-behind flush of {len(rows)} rows failed ({e.orig}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+            except Exception as e:
+                error = e
+                break
+        self.rows_failed += len(rows)
+        logger.error(f"Write-behind flush of {len(rows)} rows failed: {error}")
+        return 0
@@ -0,0 +1,111 @@
+# backend/app/machine_cache.py
+
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+# Durée de validité d'un résumé de machine lu en base (les résumés en mémoire suivent machines_version)
+MACHINE_CACHE_TTL_SECONDS = float(os.getenv("MACHINE_CACHE_TTL_SECONDS", "60"))
+# Nombre maximal d'identifiants par appel à POST /machines/lookup
+MACHINE_LOOKUP_MAX_IDS = int(os.getenv("MACHINE_LOOKUP_MAX_IDS", "1000"))
+
+# Champs dénormalisés joints aux alertes et renvoyés par /machines/lookup
+SUMMARY_FIELDS = ("id", "name", "type", "location", "status")
+
+Summary = Dict[str, Any]
+# loader(ids) -> machines trouvées (objets avec les attributs de SUMMARY_FIELDS)
+Loader = Callable[[List[UUID]], Awaitable[Iterable[Any]]]
+
+
+def summarize(machine) -> Summary:
+    return {name: str(machine.id) if name == "id" else getattr(machine, name) for name in SUMMARY_FIELDS}
+
+
+class MachineSummaryCache:
+    """
+    Résumés des machines (id, nom, type, emplacement, statut), prêts à sérialiser, pour joindre
+    les machines à une liste d'alertes sans une requête par alerte.
+
+    En mémoire, le cache est reconstruit depuis machines_db quand sa version change (refresh).
+    En base, les identifiants absents ou expirés d'un lot sont chargés par un seul appel au
+    loader (une requête IN) ; les identifiants inconnus sont aussi mis en cache, pour la même
+    durée, afin qu'un id invalide ne coûte pas une requête à chaque affichage.
+    version change à chaque modification des résumés (métriques du cache).
+    """
+
+    def __init__(self, ttl_seconds: float = MACHINE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        # id -> (expiration, résumé ou None si la machine n'existe pas)
+        self._entries: Dict[UUID, Tuple[float, Optional[Summary]]] = {}
+        self._source_version: Optional[int] = None
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def refresh(self, source_version: int, machines: Iterable[Any]):
+        """Reconstruit le cache depuis la collection en mémoire si sa version a changé."""
+        if source_version == self._source_version:
+            return
+        self._entries = {machine.id: (float("inf"), summarize(machine)) for machine in machines}
+        self._source_version = source_version
+        self.version += 1
+
+    def invalidate(self, machine_id: Optional[UUID] = None):
+        if machine_id is None:
+            self._entries.clear()
+            self._source_version = None
+        else:
+            self._entries.pop(machine_id, None)
+        self.version += 1
+
+    def _split(self, ids: Iterable[UUID]) -> Tuple[Dict[UUID, Optional[Summary]], List[UUID]]:
+        now = time.monotonic()
+        found: Dict[UUID, Optional[Summary]] = {}
+        missing: List[UUID] = []
+        for machine_id in dict.fromkeys(ids):
+            entry = self._entries.get(machine_id)
+            if entry is not None and entry[0] > now:
+                found[machine_id] = entry[1]
+            else:
+                missing.append(machine_id)
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    async def lookup(self, ids: Iterable[UUID], loader: Optional[Loader] = None) -> Dict[UUID, Optional[Summary]]:
+        """
+        Résumés des machines demandées, par id (None pour une machine inconnue).
+        Sans loader, les ids absents du cache sont inconnus.
+        """
+        found, missing = self._split(ids)
+        if missing and loader is not None:
+            loaded = {machine.id: summarize(machine) for machine in await loader(missing)}
+            self.loads += 1
+            expires = time.monotonic() + self.ttl_seconds
+            for machine_id in missing:
+                summary = loaded.get(machine_id)
+                previous = self._entries.get(machine_id)
+                if previous is None or previous[1] != summary:
+                    self.version += 1
+                self._entries[machine_id] = (expires, summary)
+                found[machine_id] = summary
+        else:
+            for machine_id in missing:
+                found[machine_id] = None
+        return found
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "ttl_seconds": self.ttl_seconds,
+        }
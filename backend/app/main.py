@@ -1,16 +1,42 @@
 import logging
 import asyncio
-from uuid import UUID, uuid4
+import hashlib
+from uuid import UUID, uuid4, uuid5
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional, Deque, Any
-from collections import deque
+from typing import List, Dict, Iterable, Optional, Any, Tuple, Union
+import os
 import random
+import time
 
-from fastapi import FastAPI, HTTPException, Body, Response, status, Request, BackgroundTasks
-from fastapi.responses import JSONResponse
+import numpy as np
+
+from fastapi import FastAPI, HTTPException, Body, Response, status, Request, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
+from .rules import CHANNELS, RuleEngine
+from .ingestion import WriteBehindWriter
+from .ml.inference import INFERENCE_ENABLED, InferenceBatcher
+from .ml.training import JOB_SUCCEEDED, TrainingJob, TrainingScheduler
+from .downsampling import bucket_aggregate, lttb, parse_bucket, parse_functions
+from .sensor_store import COLUMNS, SensorDataStore, datetime_to_ns, ns_to_datetime
+from .alert_store import ALERT_CURSOR_LAG_SECONDS, ALERT_RETENTION_SWEEP_SECONDS, AlertStore
+from .alert_correlator import AlertCorrelator
+from .prediction_store import PredictionStore
+from .streaming_stats import StreamingStatsEngine
+from .fleet_health import FLEET_HEALTH_TOP_K, FleetHealth
+from .assistant import Assistant
+from .retrieval import KIND_ALERT, KINDS, SORTS, RetrievalIndex, log_timestamp
+from .state import create_state_backend
+from .state_routing import OwnerForwardingMiddleware, StateRouter
+from .broadcast import ALERTS_TOPIC, Broadcaster, machine_topic
+from .machine_cache import MACHINE_LOOKUP_MAX_IDS, MachineSummaryCache
+from .serialization import RESPONSE_FORMATS, dumps, loads, sensor_data_json
+from .export import (EXPORT_DB_BATCH_ROWS, EXPORT_FORMATS, encode_batches, encode_batches_async, export_headers,
+                     export_schema, in_event_loop, memory_batches, rows_batch)
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 app = FastAPI(
@@ -31,8 +57,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Content-Disposition"],
 )
 
+# Partage de l'état entre workers (uvicorn --workers N) : chaque machine a un worker propriétaire
+# (sa partition, voir state.py) qui seul garde son historique et évalue ses lectures. Les autres
+# workers lui transmettent les lectures reçues et les lectures d'historique, et ne rejouent que
+# l'état dérivé : alertes et fiches de santé (voir state_routing.py, state_router en fin de module).
+# STATE_BACKEND=memory, shared-memory ou database
+state_backend = create_state_backend()
+
 class UserBase(BaseModel):
     name: str
     email: str
@@ -56,10 +90,13 @@ class UserInDB(UserBase):
             UUID: str
         }
 
+# Identifiants des données initiales dérivés de leur clé naturelle : les mêmes dans chaque worker
+SEED_NAMESPACE = UUID("6f1b0c9e-3a52-4d8e-9b7a-2c4f5e8d1a30")
+
 db_users: List[UserInDB] = []
 
 db_users.append(UserInDB(
-    id=uuid4(),
+    id=uuid5(SEED_NAMESPACE, "alice@example.com"),
     name="Alice Smith",
     email="alice@example.com",
     role="Administrateur",
@@ -68,7 +105,7 @@ db_users.append(UserInDB(
     updated_at=datetime.now(timezone.utc)
 ))
 db_users.append(UserInDB(
-    id=uuid4(),
+    id=uuid5(SEED_NAMESPACE, "bob@example.com"),
     name="Bob Johnson",
     email="bob@example.com",
     role="Ingénieur",
@@ -77,7 +114,7 @@ db_users.append(UserInDB(
     updated_at=datetime.now(timezone.utc)
 ))
 db_users.append(UserInDB(
-    id=uuid4(),
+    id=uuid5(SEED_NAMESPACE, "charlie@example.com"),
     name="Charlie Brown",
     email="charlie@example.com",
     role="Technicien",
@@ -103,6 +140,7 @@ async def create_user(user: UserCreate):
         updated_at=datetime.now(timezone.utc)
     )
     db_users.append(new_user)
+    state_router.user_saved(new_user)
     return new_user
 
 @app.put("/users/{user_id}", response_model=UserInDB, tags=["Users"])
@@ -113,16 +151,18 @@ async def update_user(user_id: UUID, user_update: UserUpdate):
             for key, value in updated_user_data.items():
                 setattr(existing_user, key, value)
             existing_user.updated_at = datetime.now(timezone.utc)
+            state_router.user_saved(existing_user)
             return existing_user
     raise HTTPException(status_code=404, detail="User not found")
 
 @app.delete("/users/{user_id}", status_code=204, tags=["Users"])
 async def delete_user(user_id: UUID):
-    global db_users
     initial_len = len(db_users)
-    db_users = [user for user in db_users if user.id != user_id]
+    # Liste modifiée en place : elle est partagée avec state_router
+    db_users[:] = [user for user in db_users if user.id != user_id]
     if len(db_users) == initial_len:
         raise HTTPException(status_code=404, detail="User not found")
+    state_router.user_deleted(user_id)
     return Response(status_code=204)
 
 # --- Modèles de données Pydantic (machines, capteurs, alertes) ---
@@ -148,8 +188,186 @@ class SensorDataPoint(BaseModel):
     labels: Optional[List[str]] = None 
 
 
+class BatchItemResult(BaseModel):
+    index: int
+    accepted: bool
+    machine_id: Optional[UUID] = None
+    is_anomaly: Optional[bool] = None
+    error: Optional[str] = None
+
+class SensorDataBatchResult(BaseModel):
+    received: int
+    accepted: int
+    rejected: int
+    anomalies: int
+    items: List[BatchItemResult]
+
+# Nombre maximal de lectures acceptées par POST /sensor-data/batch
+SENSOR_BATCH_MAX_SIZE = int(os.getenv("SENSOR_BATCH_MAX_SIZE", "10000"))
+
 # UNIFICATION des variables de stockage pour les données de capteurs
-sensor_data_db: Dict[UUID, Deque[SensorDataPoint]] = {} 
+# Historique par machine en colonnes NumPy (rétention : SENSOR_RETENTION_POINTS / SENSOR_RETENTION_SECONDS)
+sensor_data_db = SensorDataStore()
+
+# Statistiques glissantes par (machine, canal), mises à jour en O(1) à chaque lecture
+sensor_stats = StreamingStatsEngine(CHANNELS)
+
+# Fiches de santé par machine et machines les plus à risque, tenues à jour par l'ingestion et les alertes
+fleet_health = FleetHealth(sensor_stats)
+
+# Diffusion en direct des nouvelles lectures et des événements d'alerte (/ws/machines/{id}, /ws/alerts)
+broadcaster = Broadcaster(COLUMNS)
+
+# Lectures conditionnelles : les versions des machines (en mémoire) et de l'historique repartent de zéro à
+# chaque démarrage et sont propres au worker, d'où un identifiant d'instance dans leur ETag. Celles des
+# alertes sont communes à tous les workers (voir alert_store.py)
+ETAG_INSTANCE = uuid4().hex[:8]
+# Version de la collection des machines, incrémentée à chaque modification de machines_db
+machines_version = 0
+
+def not_modified(request: Request, response: Response, collection: str, version: Union[int, str]) -> Optional[Response]:
+    """
+    Pose l'ETag d'une lecture (collection, version, paramètres de la requête). Retourne une
+    réponse 304 si le client a déjà cette version (If-None-Match), None sinon.
+    """
+    query = hashlib.blake2s(str(sorted(request.query_params.multi_items())).encode(), digest_size=4).hexdigest()
+    etag = f'W/"{collection}-{version}-{query}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+# Expansions acceptées par les endpoints d'alertes (?expand=machine)
+ALERT_EXPANSIONS = ("machine",)
+
+async def machine_summaries(machine_ids) -> Dict[UUID, Optional[Dict[str, Any]]]:
+    """Résumés des machines demandées, depuis machine_cache (une seule requête en base pour les absents)."""
+    if DATA_BACKEND == "memory":
+        machine_cache.refresh(machines_version, machines_db.values())
+        return await machine_cache.lookup(machine_ids)
+
+    async def load(missing):
+        return [machine_from_db(row) for row in await query_database("get_machines_by_ids", missing)]
+
+    return await machine_cache.lookup(machine_ids, load)
+
+def check_expand(expand: Optional[str]):
+    if expand is not None and expand not in ALERT_EXPANSIONS:
+        raise HTTPException(status_code=400, detail="Expansion invalide (attendu: machine)")
+
+async def expanded_alerts(alerts, headers=None) -> Response:
+    """Alertes sérialisées avec le résumé de leur machine (champ machine), sans requête par alerte."""
+    summaries = await machine_summaries(alert.machine_id for alert in alerts)
+    body = dumps([{**vars(alert), "machine": summaries.get(alert.machine_id)} for alert in alerts])
+    return Response(body, media_type="application/json", headers=headers)
+
+def store_sensor_data(point: SensorDataPoint):
+    """Ajoute une lecture validée à l'historique en mémoire de sa machine et à ses statistiques."""
+    values = [getattr(point, name) for name in COLUMNS]
+    sensor_data_db.append(point.machine_id, point.timestamp, values, point.labels)
+    readings = dict(zip(COLUMNS, values))
+    sensor_stats.update(point.machine_id, point.timestamp, readings)
+    fleet_health.record_reading(point.machine_id, point.timestamp, readings)
+    broadcaster.publish_reading(point.machine_id, point.timestamp, values)
+    state_router.reading_stored(point.machine_id, point.timestamp, values)
+
+async def ingest_sensor_data(point: SensorDataPoint):
+    """Lecture unique (POST /sensor-data/, simulateur) : stockée ou transmise, persistée, puis évaluée en tâche de fond."""
+    local = await state_router.route_readings([point])
+    await persist_sensor_data([point])
+    if local[0]:
+        asyncio.create_task(predict_anomaly_internal(point))
+
+# Persistance différée des lectures dans TimescaleDB (INGESTION_WRITE_BEHIND=true pour l'activer)
+INGESTION_WRITE_BEHIND = os.getenv("INGESTION_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+sensor_data_writer: Optional[WriteBehindWriter] = None
+
+async def persist_sensor_data(points: List[SensorDataPoint]):
+    """Met les lectures en file d'écriture vers la base ; attend si la file est pleine."""
+    if sensor_data_writer is None:
+        return
+    await sensor_data_writer.submit_many(
+        {**point.model_dump(include={"timestamp", "machine_id", *COLUMNS}), "labels": point.labels or []}
+        for point in points
+    )
+
+# Scoring Isolation Forest en micro-lots sur le chemin d'ingestion (INFERENCE_ENABLED=false pour le désactiver)
+inference_batcher: Optional[InferenceBatcher] = None
+# Modèles par machine ou type de machine, chargés à la demande (voir ml/registry.py)
+model_registry = None
+
+def sensor_matrix(points: List[SensorDataPoint]) -> np.ndarray:
+    """Matrice (n, len(CHANNELS)) des mesures d'un lot, dans l'ordre des features du modèle."""
+    values = np.empty((len(points), len(CHANNELS)), dtype=np.float64)
+    for i, point in enumerate(points):
+        values[i] = (point.temperature, point.vibration, point.pressure, point.current)
+    return values
+
+async def score_sensor_data(points: List[SensorDataPoint]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Scores Isolation Forest (decisions, scores) d'un lot, chaque lecture étant évaluée par le modèle
+    de sa machine (ou de son type, ou le modèle par défaut). Les lectures sans modèle reçoivent NaN ;
+    retourne None si aucune n'a pu être scorée.
+    """
+    if inference_batcher is None or not points:
+        return None
+
+    machine_keys: Dict[UUID, Any] = {}
+    rows_by_key: Dict[Any, List[int]] = {}
+    for i, point in enumerate(points):
+        if point.machine_id not in machine_keys:
+            machine = machines_db.get(point.machine_id)
+            machine_keys[point.machine_id] = model_registry.resolve(point.machine_id, machine.type if machine else None)
+        key = machine_keys[point.machine_id]
+        if key is not None:
+            rows_by_key.setdefault(key, []).append(i)
+    if not rows_by_key:
+        return None
+
+    values = sensor_matrix(points)
+    keys = list(rows_by_key)
+    results = await asyncio.gather(
+        *(inference_batcher.score_many(values[rows_by_key[key]], key) for key in keys),
+        return_exceptions=True
+    )
+    decisions = np.full(len(points), np.nan)
+    scores = np.full(len(points), np.nan)
+    scored = False
+    for key, result in zip(keys, results):
+        if isinstance(result, Exception):
+            logging.error(f"Isolation Forest scoring failed for model {key[0]} v{key[1]}: {result}")
+            continue
+        if result is not None:
+            decisions[rows_by_key[key]], scores[rows_by_key[key]] = result
+            scored = True
+    return (decisions, scores) if scored else None
+
+def sync_ml_models_residency():
+    """Reflète dans db_ml_models les modèles du registre actuellement en mémoire."""
+    if model_registry is None:
+        return
+    resident = {(entry["key"], entry["version"]): entry for entry in model_registry.resident()}
+    for model in db_ml_models.values():
+        if model.id.startswith("registry:"):
+            model.is_resident = False
+    for (key, version), entry in resident.items():
+        model_id = f"registry:{key}@{version}"
+        if model_id not in db_ml_models:
+            # Fiche écrite à l'entraînement (ml/training.py, ml/train_fleet.py) : hyperparamètres et métriques
+            metadata = model_registry.metadata((key, version))
+            db_ml_models[model_id] = MLModel(
+                id=model_id,
+                name=f"Isolation Forest {key}",
+                algorithm="Isolation Forest",
+                version=version,
+                status="Actif",
+                last_trained=metadata.get("trained_at") or datetime.fromtimestamp(os.path.getmtime(entry["path"]), tz=timezone.utc),
+                deployed_machines_count=len(metadata.get("machines", [])) or None,
+                evaluation_metrics=metadata.get("evaluation_metrics", {}),
+                hyperparameters=metadata.get("hyperparameters", {}),
+            )
+        db_ml_models[model_id].is_resident = True
 
 
 class AnomalyPrediction(BaseModel):
@@ -169,6 +387,25 @@ class Alert(BaseModel):
     message: str
     is_resolved: bool = False
     details: Optional[Dict] = None
+    # Dernière lecture rattachée à l'alerte et nombre de lectures (voir alert_correlator.py)
+    last_seen: Optional[datetime] = None
+    count: int = 1
+    # Fin de la condition, après la fenêtre d'hystérésis sans nouvelle lecture anormale
+    closed_at: Optional[datetime] = None
+
+class MachineSummary(BaseModel):
+    id: UUID
+    name: str
+    type: str
+    location: str
+    status: str
+
+class MachineLookupRequest(BaseModel):
+    ids: List[UUID]
+
+class MachineLookupResult(BaseModel):
+    machines: Dict[UUID, MachineSummary]
+    missing: List[UUID]
 
 class AIQuestion(BaseModel):
     question: str
@@ -188,19 +425,152 @@ class MLModel(BaseModel):
     evaluation_metrics: Dict[str, float] = Field(default_factory=dict)
     hyperparameters: Dict[str, Any] = Field(default_factory=dict)
     feature_importance: Dict[str, float] = Field(default_factory=dict)
+    is_resident: bool = False
+
+class RetrainRequest(BaseModel):
+    # Machines à ré-entraîner ; toutes les machines si absent
+    machine_ids: Optional[List[UUID]] = None
+
+class TrainingJobStatus(BaseModel):
+    id: str
+    model_id: str
+    machine_id: str
+    status: str
+    progress: float
+    logs: List[str]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 # --- Stockage en mémoire (pour la démonstration) ---
 machines_db: Dict[UUID, Machine] = {}
-alerts_db: Dict[UUID, List[Alert]] = {}
-predictions_db: Dict[UUID, List[AnomalyPrediction]] = {}
+# Alertes indexées par id et par machine, avec archivage des alertes résolues (voir alert_store.py) ;
+# les modifications répliquées depuis les autres workers peuvent arriver en retard
+alerts_db = AlertStore(cursor_lag_seconds=ALERT_CURSOR_LAG_SECONDS if state_backend.shared else 0.0)
+# Index BM25 local de l'historique des alertes et des training_logs, un shard par machine (voir retrieval.py)
+retrieval_index = RetrievalIndex()
+# Résumés des machines joints aux alertes (expand=machine) et servis par POST /machines/lookup
+machine_cache = MachineSummaryCache()
+# Une alerte par condition (machine, règles dépassées, sévérité) tant que la condition dure
+alert_correlator = AlertCorrelator()
+# Seuils de chaque machine compilés en matrices, recompilés après rule_engine.invalidate() (voir rules.py)
+rule_engine = RuleEngine()
+# Anomalies complètes et résumés par intervalle des prédictions normales, en mémoire bornée (voir prediction_store.py)
+predictions_db = PredictionStore()
+# Assistant IA : intentions reconnues en un passage, réponses lues dans les fiches de fleet_health (voir assistant.py)
+assistant = Assistant(fleet_health, machines_db, retrieval_index)
 db_ml_models: Dict[str, MLModel] = {}
 
+# Source des endpoints de lecture (machines, données de capteurs, alertes) :
+# "memory" (stockage en mémoire ci-dessus), "database" (moteur asynchrone, crud_async)
+# ou "database-sync" (crud synchrone exécuté dans le pool de threads)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "memory")
+# Nombre maximal de lectures rapatriées de la base pour un sous-échantillonnage LTTB
+AGGREGATE_DB_MAX_ROWS = int(os.getenv("AGGREGATE_DB_MAX_ROWS", "100000"))
+# Nombre maximal d'intervalles d'une agrégation (mode=bucket)
+AGGREGATE_MAX_BUCKETS = int(os.getenv("AGGREGATE_MAX_BUCKETS", "10000"))
+
+async def query_database(name: str, *args, **kwargs):
+    """
+    Exécute la fonction crud `name` dans une session dédiée, avec le moteur choisi par DATA_BACKEND.
+    """
+    if DATA_BACKEND == "database":
+        from . import crud_async
+        from .database import get_async_session_factory
+        async with get_async_session_factory()() as db:
+            return await getattr(crud_async, name)(db, *args, **kwargs)
+
+    from . import crud
+    from .database import SessionLocal
+
+    def run():
+        with SessionLocal() as db:
+            return getattr(crud, name)(db, *args, **kwargs)
+    return await run_in_threadpool(run)
+
+def machine_from_db(row) -> Machine:
+    fields = {
+        "id": row.id,
+        "name": row.name,
+        "location": row.location or "",
+        "type": row.type or "",
+        "serial_number": row.serial_number or "",
+        "installation_date": row.installation_date,
+        "last_maintenance": row.last_maintenance_date,
+        "thresholds_config": row.thresholds_config or {},
+    }
+    return Machine(**{key: value for key, value in fields.items() if value is not None})
+
+def sensor_data_from_db(row) -> SensorDataPoint:
+    return SensorDataPoint(
+        machine_id=row.machine_id,
+        timestamp=row.timestamp,
+        temperature=row.temperature,
+        vibration=row.vibration,
+        pressure=row.pressure,
+        current=row.current,
+        operating_hours=row.operating_hours,
+        labels=row.labels
+    )
+
+def alert_from_db(row) -> Alert:
+    return Alert(
+        id=row.id,
+        machine_id=row.machine_id,
+        timestamp=row.timestamp,
+        type=row.type,
+        severity=row.severity,
+        message=row.message,
+        is_resolved=bool(row.is_resolved)
+    )
+
 # --- Données initiales (pour le test) ---
+def register_machine(machine: Machine):
+    """Ajoute une machine à machines_db et prépare son historique, ses alertes, sa fiche de santé et ses prédictions."""
+    global machines_version
+    machines_db[machine.id] = machine
+    machines_version += 1
+    # Une machine remplacée peut avoir d'autres seuils : ses règles sont recompilées à la prochaine lecture
+    rule_engine.invalidate(machine.id)
+    sensor_data_db.ensure(machine.id)
+    alerts_db.ensure(machine.id)
+    fleet_health.ensure(machine.id)
+    predictions_db.ensure(machine.id)
+
+async def load_machines(machine_ids: Optional[Iterable[UUID]] = None):
+    """
+    Avec DATA_BACKEND=database(-sync), ajoute à machines_db les machines de la base qui n'y sont pas
+    encore : toutes au démarrage, ou celles de machine_ids à l'ingestion (une seule requête). Les
+    lectures de la base et l'ingestion, qui valide les machines dans machines_db, voient ainsi les
+    mêmes machines. Sans effet avec DATA_BACKEND=memory.
+    """
+    if DATA_BACKEND == "memory":
+        return
+    if machine_ids is None:
+        rows = await query_database("get_machines", limit=None)
+    else:
+        missing = list({machine_id for machine_id in machine_ids if machine_id not in machines_db})
+        if not missing:
+            return
+        rows = await query_database("get_machines_by_ids", missing)
+    for row in rows:
+        if row.id not in machines_db:
+            register_machine(machine_from_db(row))
+
 def create_initial_data():
+    # Les machines de démonstration n'existent pas en base : avec DATA_BACKEND=database(-sync),
+    # machines_db est chargé depuis la base au démarrage (load_machines)
+    if DATA_BACKEND == "memory":
+        create_initial_machines()
+    create_initial_ml_models()
+
+def create_initial_machines():
     logging.info("Creating initial machine data...")
     
     # Machine 1
-    machine1_id = uuid4()
+    machine1_id = uuid5(SEED_NAMESPACE, "BRYR-A-001")
     machine1 = Machine(
         id=machine1_id,
         name="Broyeur Alpha",
@@ -210,13 +580,10 @@ def create_initial_data():
         installation_date=datetime.now(timezone.utc) - timedelta(days=365),
         thresholds_config={"temperature_critique": 85.0, "vibration_max": 18.5, "pressure_max": 5.0, "current_max": 25.0}
     )
-    machines_db[machine1_id] = machine1
-    sensor_data_db[machine1_id] = deque(maxlen=1000)
-    alerts_db[machine1_id] = []
-    predictions_db[machine1_id] = []
+    register_machine(machine1)
 
     # Machine 2
-    machine2_id = uuid4()
+    machine2_id = uuid5(SEED_NAMESPACE, "PRES-B-002")
     machine2 = Machine(
         id=machine2_id,
         name="Presse Hydraulique Beta",
@@ -226,13 +593,10 @@ def create_initial_data():
         installation_date=datetime.now(timezone.utc) - timedelta(days=180),
         thresholds_config={"temperature_critique": 80.0, "vibration_max": 15.0, "pressure_max": 6.5, "current_max": 30.0}
     )
-    machines_db[machine2_id] = machine2
-    sensor_data_db[machine2_id] = deque(maxlen=1000)
-    alerts_db[machine2_id] = []
-    predictions_db[machine2_id] = []
+    register_machine(machine2)
 
     # Machine 3
-    machine3_id = uuid4()
+    machine3_id = uuid5(SEED_NAMESPACE, "CNVY-G-003")
     machine3 = Machine(
         id=machine3_id,
         name="Convoyeur Gamma",
@@ -242,13 +606,11 @@ def create_initial_data():
         installation_date=datetime.now(timezone.utc) - timedelta(days=90),
         thresholds_config={"temperature_critique": 70.0, "vibration_max": 10.0, "pressure_max": 3.0, "current_max": 18.0}
     )
-    machines_db[machine3_id] = machine3
-    sensor_data_db[machine3_id] = deque(maxlen=1000)
-    alerts_db[machine3_id] = []
-    predictions_db[machine3_id] = []
+    register_machine(machine3)
 
     logging.info(f"Initialised with {len(machines_db)} machines.")
 
+def create_initial_ml_models():
     logging.info("Creating initial ML models data...")
     db_ml_models["model_1"] = MLModel(
         id="model_1",
@@ -302,13 +664,77 @@ def create_initial_data():
         training_logs=["2023-10-24 11:00:00 - Tentative d'entraînement Isolation Forest.", "2023-10-24 11:05:00 - Erreur: Données d'entraînement manquantes."],
         hyperparameters={"contamination": 0.1}
     )
+    for model in db_ml_models.values():
+        for line in model.training_logs:
+            retrieval_index.add_training_log(model.id, line, log_timestamp(line))
     logging.info(f"Initialised with {len(db_ml_models)} ML models.")
 
 @app.on_event("startup")
 async def startup_event():
+    global sensor_data_writer
     create_initial_data()
+    if DATA_BACKEND != "memory":
+        try:
+            await load_machines()
+            logging.info(f"Loaded {len(machines_db)} machines from the database.")
+        except Exception as e:
+            # Les machines manquantes seront chargées à la première lecture reçue
+            logging.error(f"Could not load machines from the database: {e}")
+    if INGESTION_WRITE_BEHIND:
+        from .database import engine
+        sensor_data_writer = WriteBehindWriter(engine)
+        await sensor_data_writer.start()
+    if INFERENCE_ENABLED:
+        await start_inference()
+    asyncio.create_task(sweep_alerts())
+    await state_backend.start()
+    await state_router.start()
+    if state_backend.shared:
+        logging.info(f"State shared through the {state_backend.name} backend (leader: {state_backend.is_leader})")
     logging.info("Starting sensor data simulator...")
     asyncio.create_task(simulate_sensor_data())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if sensor_data_writer is not None:
+        await sensor_data_writer.stop()
+    if inference_batcher is not None:
+        await inference_batcher.stop()
+    if model_registry is not None:
+        await model_registry.stop()
+    await training_scheduler.stop()
+    await state_backend.close()
+
+async def sweep_alerts():
+    """Clôt périodiquement les conditions d'alerte expirées et archive les alertes résolues depuis plus de ALERT_RETENTION_SECONDS."""
+    while True:
+        await asyncio.sleep(ALERT_RETENTION_SWEEP_SECONDS)
+        alert_correlator.sweep()
+        archived = alerts_db.sweep()
+        if archived:
+            logging.info(f"{archived} resolved alerts archived ({len(alerts_db)} alerts kept).")
+
+async def start_inference():
+    """Indexe les modèles disponibles, démarre leur surveillance et le micro-batcher."""
+    global inference_batcher, model_registry
+    try:
+        from .ml import ml_model
+        from .ml.registry import ModelRegistry
+    except ImportError as e:
+        logging.warning(f"Isolation Forest scoring disabled, ML dependencies missing: {e}")
+        return
+    model_registry = await run_in_threadpool(ModelRegistry, default_path=ml_model.MODEL_PATH)
+    if not model_registry.metrics()["available"]:
+        logging.warning("No trained model available yet: readings are scored by threshold rules only.")
+    await model_registry.start(on_change=sync_ml_models_residency)
+
+    def score(X: np.ndarray, key):
+        model = model_registry.get(key)
+        return ml_model.score_batch(X, model) if model is not None else None
+
+    inference_batcher = InferenceBatcher(score)
+    await inference_batcher.start()
+
 # --- Endpoints de l'API ---
 
 @app.get("/")
@@ -316,17 +742,52 @@ async def read_root():
     return {"message": "Bienvenue sur l'API de Maintenance Prédictive Industrielle"}
 
 @app.get("/machines/", response_model=List[Machine], tags=["Machines"])
-async def get_machines():
+async def get_machines(request: Request, response: Response):
     """
     Récupère la liste de toutes les machines enregistrées.
+    Réponse 304 si If-None-Match correspond à l'ETag de la version courante de la liste.
     """
+    if DATA_BACKEND != "memory":
+        rows = await query_database("get_machines", limit=10000)
+        # La base peut être modifiée hors de l'API : la version est une empreinte des lignes lues
+        # (et non des Machine construites, dont les dates absentes en base valent maintenant)
+        fields = [
+            (row.id, row.name, row.location, row.type, row.serial_number,
+             row.installation_date, row.last_maintenance_date, row.thresholds_config)
+            for row in rows
+        ]
+        digest = hashlib.blake2s(repr(fields).encode(), digest_size=8).hexdigest()
+        if (cached := not_modified(request, response, "machines", digest)) is not None:
+            return cached
+        return [machine_from_db(row) for row in rows]
+    if (cached := not_modified(request, response, "machines", f"{ETAG_INSTANCE}.{machines_version}")) is not None:
+        return cached
     return list(machines_db.values())
 
+@app.post("/machines/lookup", response_model=MachineLookupResult, tags=["Machines"])
+async def lookup_machines(request: MachineLookupRequest):
+    """
+    Résout plusieurs machines en un appel : résumés (id, nom, type, emplacement, statut) indexés
+    par id, et liste des ids inconnus. Servi depuis le cache des résumés de machines.
+    """
+    if len(request.ids) > MACHINE_LOOKUP_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Trop d'identifiants ({MACHINE_LOOKUP_MAX_IDS} maximum)")
+    summaries = await machine_summaries(request.ids)
+    return Response(dumps({
+        "machines": {str(machine_id): summary for machine_id, summary in summaries.items() if summary is not None},
+        "missing": [machine_id for machine_id, summary in summaries.items() if summary is None],
+    }), media_type="application/json")
+
 @app.get("/machines/{machine_id}", response_model=Machine, tags=["Machines"])
 async def get_machine(machine_id: UUID):
     """
     Récupère les détails d'une machine spécifique par son ID.
     """
+    if DATA_BACKEND != "memory":
+        row = await query_database("get_machine", machine_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Machine non trouvée")
+        return machine_from_db(row)
     if machine_id not in machines_db:
         raise HTTPException(status_code=404, detail="Machine non trouvée")
     return machines_db[machine_id]
@@ -337,44 +798,410 @@ async def create_sensor_data(sensor_data_point: SensorDataPoint): # Renommé l'a
     """
     Enregistre de nouvelles données de capteurs pour une machine.
     """
+    await load_machines([sensor_data_point.machine_id])
     if sensor_data_point.machine_id not in machines_db:
         raise HTTPException(status_code=404, detail="Machine non trouvée")
 
-    if sensor_data_point.machine_id not in sensor_data_db:
-        sensor_data_db[sensor_data_point.machine_id] = deque(maxlen=1000)
-    sensor_data_db[sensor_data_point.machine_id].append(sensor_data_point)
+    await ingest_sensor_data(sensor_data_point)
     logging.info(f"Sensor data received for machine {sensor_data_point.machine_id}: T={sensor_data_point.temperature}°C, V={sensor_data_point.vibration} vib")
     
-    asyncio.create_task(predict_anomaly_internal(sensor_data_point))
-    
     return sensor_data_point
 
+@app.post("/sensor-data/batch", response_model=SensorDataBatchResult, tags=["Sensor Data"])
+async def create_sensor_data_batch(readings: List[Dict[str, Any]] = Body(...)):
+    """
+    Enregistre un lot de lectures de capteurs en une seule requête.
+    Chaque lecture est validée individuellement : les lectures invalides ou destinées à une
+    machine inconnue sont rejetées sans bloquer le reste du lot. Les seuils sont évalués
+    pour tout le lot en une seule passe vectorisée. Les lectures des machines détenues par un
+    autre worker lui sont transmises avec leurs scores : il les stocke et en tire les alertes.
+    """
+    if len(readings) > SENSOR_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lot trop volumineux ({len(readings)} lectures, maximum {SENSOR_BATCH_MAX_SIZE})"
+        )
+
+    items: List[BatchItemResult] = []
+    valid: List[Tuple[int, SensorDataPoint]] = []
+    for index, raw in enumerate(readings):
+        try:
+            valid.append((index, SensorDataPoint.model_validate(raw)))
+        except ValidationError as e:
+            items.append(BatchItemResult(index=index, accepted=False, error=f"Données invalides: {e.error_count()} erreur(s) de validation"))
+    await load_machines(point.machine_id for _, point in valid)
+
+    accepted_points: List[SensorDataPoint] = []
+    accepted_items: List[BatchItemResult] = []
+    for index, point in valid:
+        if point.machine_id not in machines_db:
+            items.append(BatchItemResult(index=index, accepted=False, machine_id=point.machine_id, error="Machine non trouvée"))
+            continue
+
+        item = BatchItemResult(index=index, accepted=True, machine_id=point.machine_id)
+        items.append(item)
+        accepted_points.append(point)
+        accepted_items.append(item)
+
+    await persist_sensor_data(accepted_points)
+    ml_result = await score_sensor_data(accepted_points)
+    local = await state_router.route_readings(accepted_points, ml_result)
+    is_anomaly = evaluate_sensor_batch(accepted_points, ml_result, record=local)
+    for item, anomaly in zip(accepted_items, is_anomaly):
+        item.is_anomaly = bool(anomaly)
+
+    items.sort(key=lambda item: item.index)
+    result = SensorDataBatchResult(
+        received=len(readings),
+        accepted=len(accepted_points),
+        rejected=len(readings) - len(accepted_points),
+        anomalies=int(is_anomaly.sum()),
+        items=items
+    )
+    logging.info(f"Sensor data batch received: {result.accepted} accepted, {result.rejected} rejected, {result.anomalies} anomalies")
+    return result
+
 @app.get("/machines/{machine_id}/sensor-data/", response_model=List[SensorDataPoint])
 async def get_machine_sensor_data(
+    request: Request,
+    response: Response,
     machine_id: UUID, 
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    limit: int = 500
+    limit: int = 500,
+    since: Optional[int] = None,
+    format: str = "rows"
 ):
     logging.info(f"Fetching sensor data for machine_id: {machine_id}")
     """
     Récupère les données de capteurs pour une machine spécifique, avec options de filtrage temporel et de limitation.
+    Avec since=<curseur>, seules les lectures ingérées après ce curseur sont renvoyées, dans l'ordre
+    d'ingestion (les `limit` premières). L'en-tête X-Next-Cursor donne le curseur de l'appel suivant,
+    et une réponse 304 est renvoyée si If-None-Match correspond à la version courante.
+    format=columnar renvoie un objet de colonnes ({"timestamp": [...], "temperature": [...], ...}).
+    En mémoire, la réponse est sérialisée directement depuis les colonnes du tampon.
     """
+    if format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail="Format invalide (attendu: rows ou columnar)")
+    if DATA_BACKEND != "memory":
+        if since is not None:
+            raise HTTPException(status_code=400, detail="Le paramètre since n'est disponible qu'avec DATA_BACKEND=memory")
+        rows = await query_database("get_sensor_data_for_machine", machine_id, start_time, end_time, limit=limit, latest=True)
+        points = [sensor_data_from_db(row) for row in rows]
+        if format == "columnar":
+            return JSONResponse({
+                "machine_id": str(machine_id),
+                "timestamp": [point.timestamp.isoformat() for point in points],
+                **{name: [getattr(point, name) for point in points] for name in (*COLUMNS, "labels")},
+            })
+        return points
+
     if machine_id not in machines_db:
         raise HTTPException(status_code=404, detail="Machine non trouvée")
 
-    all_data = list(sensor_data_db.get(machine_id, []))
+    buffer = sensor_data_db.get(machine_id)
+    version = buffer.version if buffer is not None else 0
+    if (cached := not_modified(request, response, f"sensor-data-{machine_id}", f"{ETAG_INSTANCE}.{version}")) is not None:
+        return cached
+    response.headers["X-Next-Cursor"] = str(sensor_data_db.seq)
+    if buffer is None or not len(buffer):
+        return Response(sensor_data_json(machine_id, None, [], format), media_type="application/json", headers=response.headers)
+
+    lo, hi = buffer.range(
+        datetime_to_ns(start_time) if start_time else None,
+        datetime_to_ns(end_time) if end_time else None,
+    )
+    if since is not None:
+        selected = buffer.since(since, lo, hi, limit)
+        if len(selected) == limit:
+            # Lot tronqué : la suite reprendra après la dernière lecture renvoyée
+            response.headers["X-Next-Cursor"] = str(int(buffer.seqs()[selected[-1]]))
+    else:
+        selected = range(lo, hi)[-limit:]
+    return Response(sensor_data_json(machine_id, buffer, selected, format), media_type="application/json", headers=response.headers)
+
+@app.get("/machines/{machine_id}/sensor-data/export", tags=["Sensor Data"])
+async def export_machine_sensor_data(
+    machine_id: UUID,
+    format: str = "arrow",
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """
+    Exporte l'historique d'une machine en flux binaire colonnes, pour l'entraînement hors ligne :
+    format=arrow (flux Arrow IPC, un record batch par lot) ou format=parquet (un row group par lot).
+    Les lots de lectures sont encodés et envoyés au fil de l'eau, depuis les colonnes du tampon
+    en mémoire (sans copie) ou depuis un curseur côté serveur sur sensor_data :
+    la mémoire utilisée ne dépend pas de la taille de la plage.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format invalide (attendu: arrow ou parquet)")
+    try:
+        schema = export_schema(machine_id)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Export indisponible : pyarrow n'est pas installé")
+    media_type = EXPORT_FORMATS[format][0]
+    headers = export_headers(machine_id, format, start_time, end_time)
+
+    if DATA_BACKEND == "database":
+        from . import crud_async
+        from .database import get_async_session_factory
+
+        async def database_batches():
+            async with get_async_session_factory()() as db:
+                async for rows in crud_async.stream_sensor_data(db, machine_id, start_time, end_time, EXPORT_DB_BATCH_ROWS):
+                    yield rows_batch(rows, schema)
+
+        return StreamingResponse(encode_batches_async(database_batches(), format, schema), media_type=media_type, headers=headers)
+
+    if DATA_BACKEND == "database-sync":
+        from . import crud
+        from .database import SessionLocal
+
+        def database_batches():
+            with SessionLocal() as db:
+                for rows in crud.stream_sensor_data(db, machine_id, start_time, end_time, EXPORT_DB_BATCH_ROWS):
+                    yield rows_batch(rows, schema)
+
+        # Itérateur synchrone : StreamingResponse le parcourt dans le pool de threads
+        return StreamingResponse(encode_batches(database_batches(), format, schema), media_type=media_type, headers=headers)
+
+    if machine_id not in machines_db:
+        raise HTTPException(status_code=404, detail="Machine non trouvée")
+    buffer = sensor_data_db.get(machine_id)
+    batches = memory_batches(
+        buffer, schema,
+        datetime_to_ns(start_time) if start_time else None,
+        datetime_to_ns(end_time) if end_time else None,
+    ) if buffer is not None else iter(())
+    return StreamingResponse(in_event_loop(encode_batches(batches, format, schema)), media_type=media_type, headers=headers)
+
+@app.get("/machines/{machine_id}/sensor-data/aggregate", tags=["Sensor Data"])
+async def get_machine_sensor_data_aggregate(
+    machine_id: UUID,
+    bucket: str = "1m",
+    fn: str = "avg,min,max",
+    mode: str = "bucket",
+    points: int = 500,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """
+    Récupère l'historique d'une machine sous-échantillonné côté serveur, au format colonnes.
+    mode=bucket : agrégats (fn=avg,min,max,sum) par intervalle de temps (bucket=30s, 1m, 1h...).
+    mode=lttb : au plus `points` points par canal, choisis par Largest-Triangle-Three-Buckets.
+    Une plage de plus de AGGREGATE_MAX_BUCKETS intervalles est refusée (400) ; sans plage complète,
+    seuls les AGGREGATE_MAX_BUCKETS intervalles les plus récents sont retournés (truncated=true).
+    """
+    if DATA_BACKEND == "memory" and machine_id not in machines_db:
+        raise HTTPException(status_code=404, detail="Machine non trouvée")
+    if mode not in ("bucket", "lttb"):
+        raise HTTPException(status_code=400, detail="Mode invalide (attendu: bucket ou lttb)")
+    try:
+        bucket_size = parse_bucket(bucket)
+        functions = parse_functions(fn)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if mode == "bucket" and start_time and end_time and (end_time - start_time) / bucket_size > AGGREGATE_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Plage trop longue pour l'intervalle {bucket} (plus de {AGGREGATE_MAX_BUCKETS} intervalles) : élargir bucket ou réduire la plage"
+        )
 
-    if not all_data: 
-        return []
+    if DATA_BACKEND != "memory" and mode == "bucket":
+        # Agrégation poussée dans TimescaleDB (time_bucket) ; un intervalle de plus pour détecter la troncature
+        rows = await query_database("get_sensor_data_aggregates", machine_id, bucket_size, functions, start_time, end_time, limit=AGGREGATE_MAX_BUCKETS + 1)
+        truncated = len(rows) > AGGREGATE_MAX_BUCKETS
+        if truncated:
+            rows = rows[-AGGREGATE_MAX_BUCKETS:]
+        return {
+            "machine_id": machine_id,
+            "mode": mode,
+            "bucket": bucket,
+            "truncated": truncated,
+            "timestamp": [row.bucket for row in rows],
+            "count": [row.count for row in rows],
+            **{name: {f: [float(getattr(row, f"{name}_{f}")) for row in rows] for f in functions} for name in CHANNELS},
+        }
 
-    if start_time:
-        all_data = [d for d in all_data if d.timestamp >= start_time]
-    if end_time:
-        all_data = [d for d in all_data if d.timestamp <= end_time]
+    if DATA_BACKEND != "memory":
+        rows = await query_database("get_sensor_data_for_machine", machine_id, start_time, end_time, limit=AGGREGATE_DB_MAX_ROWS, latest=True)
+        columns = {"timestamp": np.array([datetime_to_ns(row.timestamp) for row in rows], dtype=np.int64)}
+        for name in CHANNELS:
+            columns[name] = np.array([float(getattr(row, name)) for row in rows], dtype=np.float64)
+    else:
+        buffer = sensor_data_db.ensure(machine_id)
+        lo, hi = buffer.range(
+            datetime_to_ns(start_time) if start_time else None,
+            datetime_to_ns(end_time) if end_time else None,
+        )
+        columns = buffer.view(lo, hi)
+    timestamps = columns["timestamp"]
+
+    if mode == "lttb":
+        series = {}
+        for name in CHANNELS:
+            selected = lttb(timestamps, columns[name], points)
+            series[name] = {
+                "timestamp": [ns_to_datetime(ts) for ts in timestamps[selected].tolist()],
+                "value": columns[name][selected].tolist(),
+            }
+        return {"machine_id": machine_id, "mode": mode, "points": points, "series": series}
+
+    aggregates = bucket_aggregate(timestamps, {name: columns[name] for name in CHANNELS}, bucket_size // timedelta(microseconds=1) * 1000, functions)
+    # Mêmes règles que l'agrégation en base : les AGGREGATE_MAX_BUCKETS intervalles les plus récents
+    kept = slice(-AGGREGATE_MAX_BUCKETS, None)
+    return {
+        "machine_id": machine_id,
+        "mode": mode,
+        "bucket": bucket,
+        "truncated": len(aggregates["count"]) > AGGREGATE_MAX_BUCKETS,
+        "timestamp": [ns_to_datetime(ts) for ts in aggregates["timestamp"][kept].tolist()],
+        "count": aggregates["count"][kept].tolist(),
+        **{name: {f: values[kept].tolist() for f, values in aggregates[name].items()} for name in CHANNELS},
+    }
+
+
+@app.get("/machines/{machine_id}/stats", tags=["Sensor Data"])
+async def get_machine_stats(machine_id: UUID):
+    """
+    Récupère les statistiques glissantes de chaque canal d'une machine : moyenne/écart-type
+    cumulés, EWMA, taux de variation, et min/max/moyenne/écart-type sur plusieurs fenêtres.
+    """
+    if machine_id not in machines_db:
+        raise HTTPException(status_code=404, detail="Machine non trouvée")
+    return {"machine_id": machine_id, "channels": sensor_stats.snapshot(machine_id)}
 
-    sorted_data = sorted(all_data, key=lambda x: x.timestamp) 
-    return sorted_data[-limit:] 
+@app.get("/fleet/health", tags=["Machines"])
+async def get_fleet_health(limit: int = FLEET_HEALTH_TOP_K):
+    """
+    Vue d'ensemble du parc : nombre de machines, machines à risque, alertes actives par sévérité,
+    et fiches des `limit` machines les plus à risque (score de risque, alertes actives par sévérité,
+    dernière anomalie, dernière lecture, statistiques glissantes, résumé de la machine).
+    Les fiches sont tenues à jour à l'ingestion et à chaque alerte : le coût ne dépend que de limit.
+    """
+    if limit < 0:
+        raise HTTPException(status_code=400, detail="limit doit être positif")
+    top = fleet_health.top(limit)
+    summaries = await machine_summaries(health.machine_id for health in top)
+    return Response(dumps({
+        **fleet_health.summary(),
+        "top_at_risk": [{**fleet_health.snapshot(health), "machine": summaries.get(health.machine_id)} for health in top],
+    }), media_type="application/json")
+
+@app.get("/fleet/health/metrics", tags=["Machines"])
+async def get_fleet_health_metrics():
+    """
+    État des fiches de santé : machines suivies, entrées du tas des machines à risque et reconstructions.
+    """
+    return fleet_health.metrics()
+
+@app.get("/ingestion/metrics", tags=["Sensor Data"])
+async def get_ingestion_metrics():
+    """
+    Métriques de la persistance différée : profondeur de file, latence des écritures, débit.
+    """
+    if sensor_data_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **sensor_data_writer.metrics()}
+
+@app.get("/inference/metrics", tags=["Machine Learning"])
+async def get_inference_metrics():
+    """
+    Métriques du scoring Isolation Forest : nombre de lots, taille moyenne des lots, latence du modèle.
+    """
+    if inference_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **inference_batcher.metrics()}
+
+def evaluate_sensor_batch(
+    points: List[SensorDataPoint],
+    ml_result: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    record: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Évalue les seuils d'un lot de lectures en une seule passe vectorisée,
+    puis enregistre les alertes et prédictions correspondantes.
+    ml_result contient les (decisions, scores) Isolation Forest du lot, s'ils sont disponibles :
+    le score du modèle devient l'anomaly_score de la prédiction, et une lecture est anormale
+    si elle dépasse un seuil ou si le modèle l'isole. Les alertes restent fondées sur les seuils.
+    record limite l'enregistrement aux lectures des machines de ce worker (les autres le sont par
+    leur propriétaire, voir StateRouter.route_readings). Retourne le masque des lectures anormales.
+    """
+    if not points:
+        return np.zeros(0, dtype=bool)
+
+    machine_rows: Dict[UUID, int] = {}
+    row_index = np.empty(len(points), dtype=np.intp)
+    for i, point in enumerate(points):
+        row = machine_rows.get(point.machine_id)
+        if row is None:
+            row = machine_rows[point.machine_id] = rule_engine.row(point.machine_id, machines_db[point.machine_id].thresholds_config)
+        row_index[i] = row
+    values = sensor_matrix(points)
+
+    result = rule_engine.evaluate(row_index, values)
+    exceeded, below, scores, severities = result
+    rule_anomaly = result.violated.any(axis=1)
+    anomaly_scores = np.where(rule_anomaly, scores, 0.0)
+    if ml_result is not None:
+        # Les lectures sans modèle (NaN) gardent le score des seuils
+        decisions, ml_scores = ml_result
+        is_anomaly = rule_anomaly | (decisions < 0)
+        anomaly_scores = np.where(np.isnan(ml_scores), anomaly_scores, ml_scores)
+    else:
+        is_anomaly = rule_anomaly
+
+    # Alertes publiées pour les autres workers (voir StateRouter.alerts_changed)
+    opened_alerts, touched_alerts = [], []
+    for i, data in enumerate(points):
+        if record is not None and not record[i]:
+            continue
+        machine = machines_db[data.machine_id]
+        if rule_anomaly[i]:
+            severity = str(severities[i])
+            signature = rule_engine.signature(exceeded[i], below[i])
+
+            def make_alert():
+                message = rule_engine.message(row_index[i], values[i], exceeded[i], below[i]) or f"Anomalie de type '{severity}' détectée."
+                return Alert(
+                    machine_id=data.machine_id,
+                    type="anomaly_detection",
+                    severity=severity,
+                    message=message,
+                    details=data.model_dump()
+                )
+
+            alert, opened = alert_correlator.observe(data.machine_id, signature, severity, datetime_to_ns(data.timestamp), make_alert)
+            if opened:
+                alerts_db.add(alert)
+                fleet_health.alert_opened(alert)
+                retrieval_index.add_alert(alert)
+                logging.warning(f"Alerte générée pour {machine.name} ({data.machine_id}): {alert.message} (Sévérité: {severity})")
+                broadcaster.publish_alert(data.machine_id, "opened", lambda: {"alert": alert.model_dump(mode="json")})
+                # Copie à l'ouverture : les lectures suivantes du lot sont répliquées comme rattachements
+                opened_alerts.append((alert.model_copy(), signature))
+            else:
+                alerts_db.touch(alert)
+                broadcaster.publish_alert(data.machine_id, "updated", lambda: alert.model_dump(mode="json", include={"id", "count", "last_seen"}))
+                touched_alerts.append((alert, datetime_to_ns(data.timestamp)))
+
+        if is_anomaly[i]:
+            fleet_health.record_anomaly(data.machine_id, data.timestamp)
+            state_router.anomaly_recorded(data.machine_id)
+        prediction = AnomalyPrediction(
+            machine_id=data.machine_id,
+            anomaly_score=float(anomaly_scores[i]),
+            is_anomaly=bool(is_anomaly[i]),
+            predicted_label="Anomaly" if is_anomaly[i] else "Normal",
+            # Les lectures ne sont conservées que pour les anomalies
+            sensor_readings=data.model_dump() if is_anomaly[i] else None
+        )
+        predictions_db.add(prediction)
+        logging.debug(f"Anomaly prediction recorded for {machine.name}: is_anomaly={prediction.is_anomaly}, score={prediction.anomaly_score:.2f}")
+
+    state_router.alerts_changed(opened_alerts, touched_alerts)
+    return is_anomaly
 
 
 async def predict_anomaly_internal(data: SensorDataPoint):
@@ -387,292 +1214,501 @@ async def predict_anomaly_internal(data: SensorDataPoint):
         logging.error(f"Machine {data.machine_id} not found for internal prediction.")
         return
 
-    machine = machines_db[data.machine_id]
-    is_anomaly = False
-    anomaly_score = 0.0
-    message_parts = []
-    severity = "Avertissement" 
-
-    if data.temperature > machine.thresholds_config.get("temperature_critique", 90.0):
-        is_anomaly = True
-        anomaly_score += 0.4
-        message_parts.append(f"Température ({data.temperature:.1f}°C) dépasse le seuil critique ({machine.thresholds_config.get('temperature_critique', 'N/A')}°C).")
-        severity = "Critique"
-
-    if data.vibration > machine.thresholds_config.get("vibration_max", 20.0):
-        is_anomaly = True
-        anomaly_score += 0.3
-        message_parts.append(f"Vibration ({data.vibration:.1f}) dépasse le seuil maximal ({machine.thresholds_config.get('vibration_max', 'N/A')}).")
-        if severity == "Avertissement": severity = "Critique" 
-
-    if data.pressure > machine.thresholds_config.get("pressure_max", 7.0):
-        is_anomaly = True
-        anomaly_score += 0.15
-        message_parts.append(f"Pression ({data.pressure:.1f}) dépasse le seuil maximal ({machine.thresholds_config.get('pressure_max', 'N/A')}).")
-
-    if data.current > machine.thresholds_config.get("current_max", 35.0):
-        is_anomaly = True
-        anomaly_score += 0.15
-        message_parts.append(f"Courant ({data.current:.1f}) dépasse le seuil maximal ({machine.thresholds_config.get('current_max', 'N/A')}).")
-        if severity == "Avertissement": severity = "Critique"
-
-    if anomaly_score > 0.7:
-        severity = "Urgence"
-    elif anomaly_score > 0.4 and severity != "Urgence":
-        severity = "Critique"
-
-    if is_anomaly:
-        anomaly_score = min(anomaly_score, 1.0)
-        final_message = " et ".join(message_parts) if message_parts else f"Anomalie de type '{severity}' détectée."
-
-        new_alert = Alert(
-            machine_id=data.machine_id,
-            type="anomaly_detection",
-            severity=severity,
-            message=final_message,
-            details=data.model_dump() 
-        )
-        if data.machine_id not in alerts_db:
-            alerts_db[data.machine_id] = []
-        alerts_db[data.machine_id].append(new_alert)
-        logging.warning(f"Alerte générée pour {machine.name} ({data.machine_id}): {final_message} (Sévérité: {severity})")
-    else:
-        final_message = "Données normales, pas d'anomalie détectée."
-
-    prediction = AnomalyPrediction(
-        machine_id=data.machine_id,
-        anomaly_score=anomaly_score,
-        is_anomaly=is_anomaly,
-        predicted_label="Anomaly" if is_anomaly else "Normal",
-        sensor_readings=data.model_dump()
-    )
-    if data.machine_id not in predictions_db:
-        predictions_db[data.machine_id] = []
-    predictions_db[data.machine_id].append(prediction)
-    logging.debug(f"Anomaly prediction recorded for {machine.name}: is_anomaly={is_anomaly}, score={anomaly_score:.2f}")
+    evaluate_sensor_batch([data], await score_sensor_data([data]))
 
 @app.get("/machines/{machine_id}/predictions/", response_model=List[AnomalyPrediction], tags=["Machine Learning"])
 async def get_machine_predictions(
     machine_id: UUID,
     limit: int = 100,
-    is_anomaly: Optional[bool] = None
+    is_anomaly: Optional[bool] = None,
+    format: str = "rows"
 ):
     """
-    Récupère les prédictions d'anomalies pour une machine spécifique.
+    Récupère les prédictions d'anomalies pour une machine spécifique, les plus récentes d'abord.
+    Toutes les anomalies récentes sont conservées ; pour les prédictions normales, seule une courte
+    fenêtre récente est gardée (sans lectures), le reste est résumé par /predictions/summary.
+    format=columnar renvoie un objet de colonnes. Les prédictions étant déjà validées à leur création,
+    leurs champs sont sérialisés directement par orjson, sans revalidation par FastAPI.
     """
-    if machine_id not in predictions_db:
-        return []
-    
-    predictions = list(predictions_db[machine_id])
-    if is_anomaly is not None:
-        predictions = [p for p in predictions if p.is_anomaly == is_anomaly]
-        
-    sorted_predictions = sorted(predictions, key=lambda x: x.timestamp, reverse=True)
-    return sorted_predictions[:limit]
+    if format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail="Format invalide (attendu: rows ou columnar)")
+    predictions = predictions_db.latest(machine_id, limit=limit, is_anomaly=is_anomaly)
+    if format == "columnar":
+        content = dumps({
+            "machine_id": str(machine_id),
+            **{
+                name: [getattr(prediction, name) for prediction in predictions]
+                for name in ("timestamp", "anomaly_score", "is_anomaly", "predicted_label", "sensor_readings")
+            },
+        })
+    else:
+        content = dumps([vars(prediction) for prediction in predictions])
+    return Response(content, media_type="application/json")
+
+@app.get("/machines/{machine_id}/predictions/summary", tags=["Machine Learning"])
+async def get_machine_predictions_summary(machine_id: UUID, since: Optional[datetime] = None):
+    """
+    Résumés des prédictions d'une machine par intervalle (PREDICTION_SUMMARY_INTERVAL_SECONDS) :
+    nombre de prédictions et d'anomalies, score moyen et maximal, histogramme des scores.
+    """
+    if machine_id not in machines_db:
+        raise HTTPException(status_code=404, detail="Machine non trouvée")
+    return {"machine_id": machine_id, "intervals": predictions_db.summaries(machine_id, since)}
+
+@app.get("/predictions/metrics", tags=["Machine Learning"])
+async def get_predictions_metrics():
+    """
+    Occupation mémoire estimée de l'historique des prédictions et rétention effective.
+    """
+    return predictions_db.metrics()
 
 @app.get("/alerts/", response_model=List[Alert], tags=["Alerts"])
-async def get_all_alerts(resolved: Optional[bool] = False, limit: int = 100):
+async def get_all_alerts(
+    request: Request,
+    response: Response,
+    resolved: Optional[bool] = False,
+    limit: int = 100,
+    since: Optional[int] = None,
+    expand: Optional[str] = None
+):
     """
     Récupère toutes les alertes du système, avec option de filtrage par résolution.
+    Avec since=<curseur>, renvoie les alertes ajoutées ou modifiées après ce curseur, résolues ou non
+    (pour que le client retire les alertes résolues), de la plus ancienne modification à la plus récente.
+    L'en-tête X-Next-Cursor donne le curseur de l'appel suivant ; réponse 304 si rien n'a changé.
+    expand=machine joint à chaque alerte le résumé de sa machine (champ machine : id, nom, type,
+    emplacement, statut ; null si la machine n'existe plus), sans requête par alerte.
     """
-    all_filtered_alerts: List[Alert] = []
-    for machine_id in alerts_db:
-        for alert in alerts_db[machine_id]:
-            if alert.is_resolved == resolved:
-                all_filtered_alerts.append(alert)
+    check_expand(expand)
+    if DATA_BACKEND != "memory":
+        if since is not None:
+            raise HTTPException(status_code=400, detail="Le paramètre since n'est disponible qu'avec DATA_BACKEND=memory")
+        alerts = [alert_from_db(row) for row in await query_database("get_alerts", resolved=resolved, limit=limit)]
+        return await expanded_alerts(alerts) if expand else alerts
+
+    if expand:
+        machine_cache.refresh(machines_version, machines_db.values())
+    # Les résumés joints suivent machines_version, identique sur les workers ayant chargé les mêmes machines
+    version = f"{alerts_db.tag()}.{machines_version}" if expand else alerts_db.tag()
+    if (cached := not_modified(request, response, "alerts", version)) is not None:
+        return cached
+    if since is not None:
+        alerts, cursor = alerts_db.changed_since(since, limit=limit)
+        response.headers["X-Next-Cursor"] = str(cursor)
+    else:
+        response.headers["X-Next-Cursor"] = str(alerts_db.cursor())
+        alerts = alerts_db.all_alerts(resolved=bool(resolved), limit=limit)
+    return await expanded_alerts(alerts, response.headers) if expand else alerts
 
-    sorted_alerts = sorted(all_filtered_alerts, key=lambda x: x.timestamp, reverse=True)
-    return sorted_alerts[:limit]
+@app.get("/alerts/metrics", tags=["Alerts"])
+async def get_alerts_metrics():
+    """
+    Métriques de déduplication des alertes : conditions actives, alertes ouvertes,
+    écritures supprimées, escalades émises ou limitées, ainsi que l'état du stockage des alertes
+    et du cache des résumés de machines joints par expand=machine.
+    """
+    return {"correlator": alert_correlator.metrics(), "store": alerts_db.metrics(), "machine_cache": machine_cache.metrics()}
 
 @app.get("/machines/{machine_id}/alerts/", response_model=List[Alert], tags=["Alerts"])
 async def get_machine_alerts(
+    request: Request,
+    response: Response,
     machine_id: UUID,
     resolved: Optional[bool] = False,
-    limit: int = 50
+    limit: int = 50,
+    since: Optional[int] = None,
+    expand: Optional[str] = None
 ):
     """
     Récupère les alertes pour une machine spécifique, avec option de filtrage par résolution.
+    since, X-Next-Cursor, ETag et expand : comme pour /alerts/, limités aux alertes de la machine.
     """
-    if machine_id not in alerts_db or not alerts_db[machine_id]:
-        return []
-
-    all_machine_alerts = list(alerts_db[machine_id])
-
-    all_machine_alerts = [alert for alert in all_machine_alerts if alert.is_resolved == resolved]
-
-    sorted_alerts = sorted(all_machine_alerts, key=lambda x: x.timestamp, reverse=True)
-    return sorted_alerts[:limit]
+    check_expand(expand)
+    if DATA_BACKEND != "memory":
+        if since is not None:
+            raise HTTPException(status_code=400, detail="Le paramètre since n'est disponible qu'avec DATA_BACKEND=memory")
+        alerts = [alert_from_db(row) for row in await query_database("get_alerts_for_machine", machine_id, limit=limit, resolved=resolved)]
+        return await expanded_alerts(alerts) if expand else alerts
+
+    if expand:
+        machine_cache.refresh(machines_version, machines_db.values())
+    version = alerts_db.tag(machine_id)
+    if expand:
+        version = f"{version}.{machines_version}"
+    if (cached := not_modified(request, response, f"alerts-{machine_id}", version)) is not None:
+        return cached
+    if since is not None:
+        alerts, cursor = alerts_db.changed_since(since, machine_id=machine_id, limit=limit)
+        response.headers["X-Next-Cursor"] = str(cursor)
+    else:
+        response.headers["X-Next-Cursor"] = str(alerts_db.cursor())
+        alerts = alerts_db.machine_alerts(machine_id, resolved=bool(resolved), limit=limit)
+    return await expanded_alerts(alerts, response.headers) if expand else alerts
 
 @app.put("/alerts/{alert_id}/resolve/", response_model=Alert, tags=["Alerts"])
 async def resolve_alert(alert_id: UUID):
     """
     Marque une alerte spécifique comme résolue.
     """
-    for machine_id in alerts_db:
-        for alert in alerts_db[machine_id]:
-            if alert.id == alert_id:
-                alert.is_resolved = True
-                logging.info(f"Alert {alert_id} for machine {machine_id} resolved.")
-                return alert
-    raise HTTPException(status_code=404, detail="Alerte non trouvée")
+    alert = alerts_db.resolve(alert_id)
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Alerte non trouvée")
+    fleet_health.alert_resolved(alert)
+    logging.info(f"Alert {alert_id} for machine {alert.machine_id} resolved.")
+    broadcaster.publish_alert(alert.machine_id, "resolved", lambda: {"id": str(alert_id)})
+    state_router.alert_resolved(alert_id)
+    return alert
+
+# Nombre maximal de résultats d'une recherche
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+
+def search_hits_json(hits) -> List[Dict[str, Any]]:
+    """Résultats de recherche, avec l'état actuel des alertes encore présentes dans alerts_db."""
+    results = []
+    for hit in hits:
+        result = hit._asdict()
+        if hit.kind == KIND_ALERT:
+            alert = alerts_db.get(hit.ref)
+            result["is_resolved"] = alert.is_resolved if alert is not None else None
+        results.append(result)
+    return results
+
+@app.get("/search", tags=["Alerts"])
+async def search_history(
+    q: str,
+    machine_id: Optional[UUID] = None,
+    kind: Optional[str] = None,
+    sort: str = "relevance",
+    limit: int = 10,
+    since: Optional[datetime] = None
+):
+    """
+    Recherche plein texte (BM25, index local) dans l'historique des alertes (message, type, details)
+    et les training_logs des modèles, d'une machine ou de tout le parc.
+    kind=alert|training_log filtre le type de document ; sort=recent trie les documents
+    correspondants du plus récent au plus ancien (« quand ... pour la dernière fois »).
+    """
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"Type invalide (attendu: {', '.join(KINDS)})")
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"Tri invalide (attendu: {', '.join(SORTS)})")
+    if not 0 < limit <= SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit doit être compris entre 1 et {SEARCH_MAX_LIMIT}")
+    hits = retrieval_index.search(q, machine_id=machine_id, kind=kind, sort=sort, limit=limit, since=since)
+    return Response(dumps({"query": q, "hits": search_hits_json(hits)}), media_type="application/json")
+
+@app.get("/alerts/{alert_id}/similar", tags=["Alerts"])
+async def get_similar_alerts(alert_id: UUID, limit: int = 5, same_machine: bool = True):
+    """
+    Incidents les plus proches d'une alerte (BM25 sur son message, son type et ses details),
+    sur la même machine par défaut ou sur tout le parc (same_machine=false).
+    """
+    alert = alerts_db.get(alert_id)
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Alerte non trouvée")
+    if not 0 < limit <= SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit doit être compris entre 1 et {SEARCH_MAX_LIMIT}")
+    hits = retrieval_index.similar(alert, limit=limit, same_machine=same_machine)
+    return Response(dumps({"alert_id": alert_id, "hits": search_hits_json(hits)}), media_type="application/json")
+
+@app.get("/search/metrics", tags=["Alerts"])
+async def get_search_metrics():
+    """
+    Taille de l'index de recherche : shards, documents, termes, entrées des listes inversées, requêtes.
+    """
+    return retrieval_index.metrics()
 
 @app.get("/ml-models/", response_model=List[MLModel], tags=["Machine Learning"])
 async def get_ml_models():
     """
     Récupère la liste de tous les modèles de Machine Learning enregistrés.
+    Les modèles du registre indiquent s'ils sont actuellement chargés en mémoire (is_resident).
     """
+    sync_ml_models_residency()
     return list(db_ml_models.values())
 
-async def simulate_training(model_id: str):
-    logging.info(f"Début de la simulation d'entraînement pour le modèle {model_id}...")
-    await asyncio.sleep(10) 
-    if model_id in db_ml_models:
-        model = db_ml_models[model_id]
-        model.status = "Actif"
-        model.last_trained = datetime.now(timezone.utc)
-        model.performance_score = round(0.85 + (0.1 * (len(model_id) % 2)), 2)
-        model.training_logs.append(f"{model.last_trained.isoformat()} - Entraînement terminé avec succès!")
-        logging.info(f"Modèle {model_id} ré-entraîné et actif. Nouveau score: {model.performance_score}")
-    else:
-        logging.warning(f"Modèle {model_id} non trouvé après entraînement simulé.")
+@app.get("/ml-models/registry", tags=["Machine Learning"])
+async def get_model_registry():
+    """
+    État du registre de modèles : artefacts disponibles, modèles résidents, budget mémoire, chargements et évictions.
+    """
+    if model_registry is None:
+        return {"enabled": False}
+    return {"enabled": True, **model_registry.metrics(), "models": model_registry.resident()}
+
+# Jobs de la dernière demande de ré-entraînement de chaque modèle
+training_rounds: Dict[str, List[str]] = {}
+
+def append_training_log(model: MLModel, message: str, machine_id: Optional[UUID] = None):
+    """Ajoute une ligne horodatée aux training_logs d'un modèle et l'indexe pour la recherche."""
+    now = datetime.now(timezone.utc)
+    line = f"{now.isoformat()} - {message}"
+    model.training_logs.append(line)
+    retrieval_index.add_training_log(model.id, line, now, machine_id)
+    # Les autres workers reçoivent la fiche du modèle (statut, métriques) avec la nouvelle ligne
+    state_router.model_updated(model, line, now, machine_id)
+
+def on_training_update(job: TrainingJob, message: Optional[str]):
+    """Relaie la progression d'un job dans les journaux de son modèle et met à jour le modèle à la fin du ré-entraînement."""
+    model = db_ml_models.get(job.model_id)
+    if model is None:
+        return
+    if message:
+        machine_id = UUID(job.machine_id)
+        machine = machines_db.get(machine_id)
+        append_training_log(model, f"[{machine.name if machine else job.machine_id}] {message}", machine_id)
+    if not job.finished or job.id not in training_rounds.get(job.model_id, []):
+        return
+
+    if job.status == JOB_SUCCEEDED:
+        model.last_trained = job.finished_at
+        model.evaluation_metrics = job.result["evaluation_metrics"]
+        if model_registry is not None:
+            model_registry.refresh_index()
+    round_jobs = [training_scheduler.get(job_id) for job_id in training_rounds[job.model_id]]
+    if all(round_job.finished for round_job in round_jobs):
+        succeeded = sum(1 for round_job in round_jobs if round_job.status == JOB_SUCCEEDED)
+        model.status = "Actif" if succeeded else "Erreur"
+        model.deployed_machines_count = succeeded
+        append_training_log(model, f"Ré-entraînement terminé: {succeeded}/{len(round_jobs)} machine(s) entraînée(s).")
+        logging.info(f"Modèle {job.model_id} ré-entraîné: {succeeded}/{len(round_jobs)} machines, statut {model.status}")
+
+# Entraînements exécutés dans un pool de processus, créé au premier job (voir ml/training.py)
+training_scheduler = TrainingScheduler(on_update=on_training_update)
 
 
-@app.post("/ml-models/{model_id}/retrain", response_model=Dict[str, str], tags=["Machine Learning"])
-async def retrain_ml_model(model_id: str, background_tasks: BackgroundTasks):
+async def training_columns(machine_id: UUID) -> Optional[Dict[str, Any]]:
+    """
+    Historique en mémoire d'une machine, en colonnes, transmis à son job d'entraînement : copie du
+    tampon de ce worker, ou colonnes lues chez le worker propriétaire de la machine. None hors
+    mode memory : le job relit l'historique en base.
+    """
+    if DATA_BACKEND != "memory":
+        return None
+    if await state_router.owns_machine(machine_id):
+        buffer = sensor_data_db.get(machine_id)
+        return {name: buffer.column(name).copy() if buffer is not None else [] for name in CHANNELS}
+    try:
+        status_code, body = await state_router.fetch_from_owner(
+            machine_id, f"/machines/{machine_id}/sensor-data/", f"format=columnar&limit={sensor_data_db.retention_points}"
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Le worker propriétaire de la machine {machine_id} n'a pas répondu")
+    if status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Historique de la machine {machine_id} indisponible sur son worker propriétaire")
+    data = loads(body)
+    # null (valeur absente) devient NaN
+    return {name: np.array(data[name], dtype=np.float64) for name in CHANNELS}
+
+@app.post("/ml-models/{model_id}/retrain", response_model=Dict[str, Any], tags=["Machine Learning"])
+async def retrain_ml_model(model_id: str, request: Optional[RetrainRequest] = Body(None)):
     """
     Déclenche le ré-entraînement d'un modèle de Machine Learning spécifique.
-    Le processus d'entraînement est exécuté en tâche de fond.
+    Un job par machine (toutes les machines par défaut) est exécuté dans un pool de processus,
+    en parallèle sur tous les cœurs ; chaque machine obtient un artefact versionné dans le registre.
+    La progression est ajoutée aux training_logs du modèle.
     """
     if model_id not in db_ml_models:
         raise HTTPException(status_code=404, detail="Modèle non trouvé")
 
     model = db_ml_models[model_id]
+    # Les jobs entraînent et évaluent un Isolation Forest : ré-entraîner un autre algorithme
+    # remplacerait ses métriques par celles d'un Isolation Forest
+    if model.algorithm != "Isolation Forest":
+        raise HTTPException(status_code=400, detail=f"Ré-entraînement non pris en charge pour l'algorithme {model.algorithm} (Isolation Forest uniquement)")
     if model.status == "Entraînement":
         raise HTTPException(status_code=400, detail="Le modèle est déjà en cours d'entraînement")
 
-    model.status = "Entraînement"
-    model.training_logs.append(f"{datetime.now(timezone.utc).isoformat()} - Déclenchement du ré-entraînement...")
+    machine_ids = request.machine_ids if request and request.machine_ids else list(machines_db)
+    unknown = [str(machine_id) for machine_id in machine_ids if machine_id not in machines_db]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Machine(s) non trouvée(s): {', '.join(unknown)}")
+    if training_scheduler.active_jobs + len(machine_ids) > training_scheduler.max_pending:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Trop de jobs d'entraînement en attente")
+
+    from .ml.registry import artifact_path
+
+    # Statut posé avant la lecture des historiques, pour refuser un second déclenchement concurrent
+    previous_status, model.status = model.status, "Entraînement"
+    try:
+        columns = await asyncio.gather(*(training_columns(machine_id) for machine_id in machine_ids))
+    except HTTPException:
+        model.status = previous_status
+        raise
+    append_training_log(model, f"Déclenchement du ré-entraînement pour {len(machine_ids)} machine(s)...")
     logging.info(f"Déclenchement du ré-entraînement pour le modèle {model_id}. Statut mis à jour en 'Entraînement'.")
 
-    background_tasks.add_task(simulate_training, model_id)
+    version = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    # Seule la dernière vague de chaque modèle est conservée : les jobs terminés de la précédente
+    # (et leurs journaux, déjà copiés dans training_logs) sont oubliés
+    training_scheduler.discard(training_rounds.get(model_id, []))
+    training_rounds[model_id] = []
+    for machine_id, data in zip(machine_ids, columns):
+        job = training_scheduler.submit(model_id, str(machine_id), artifact_path(machine_id, version), model.hyperparameters, data)
+        training_rounds[model_id].append(job.id)
 
-    return {"message": f"Ré-entraînement du modèle {model_id} déclenché."}
+    return {"message": f"Ré-entraînement du modèle {model_id} déclenché.", "jobs": training_rounds[model_id]}
+
+@app.get("/ml-models/{model_id}/jobs", response_model=List[TrainingJobStatus], tags=["Machine Learning"])
+async def get_ml_model_jobs(model_id: str):
+    """
+    Liste les jobs d'entraînement d'un modèle, avec leur statut et leur progression.
+    """
+    if model_id not in db_ml_models:
+        raise HTTPException(status_code=404, detail="Modèle non trouvé")
+    return [job.to_dict() for job in training_scheduler.jobs(model_id)]
+
+@app.get("/training-jobs/{job_id}", response_model=TrainingJobStatus, tags=["Machine Learning"])
+async def get_training_job(job_id: str):
+    job = training_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job d'entraînement non trouvé")
+    return job.to_dict()
+
+@app.post("/training-jobs/{job_id}/cancel", response_model=TrainingJobStatus, tags=["Machine Learning"])
+async def cancel_training_job(job_id: str):
+    """
+    Annule un job d'entraînement : immédiatement s'il est en attente, à sa prochaine étape s'il est en cours.
+    """
+    job = training_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job d'entraînement non trouvé")
+    if not training_scheduler.cancel(job_id):
+        raise HTTPException(status_code=400, detail="Le job d'entraînement est déjà terminé")
+    return job.to_dict()
+
+# --- Diffusion en direct (WebSocket) ---
+
+async def stream_topic(websocket: WebSocket, topic: str):
+    """
+    Relaie vers le client les messages d'un sujet du broadcaster jusqu'à sa déconnexion.
+    Les messages reçus du client sont ignorés ; leur lecture sert à détecter la fermeture.
+    """
+    await websocket.accept()
+    subscription = broadcaster.subscribe(topic)
+
+    async def watch_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except Exception:
+            pass
+        finally:
+            subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while (message := await subscription.get()) is not None:
+            await websocket.send_text(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        watcher.cancel()
+        broadcaster.unsubscribe(subscription)
+
+@app.websocket("/ws/machines/{machine_id}")
+async def machine_stream(websocket: WebSocket, machine_id: UUID):
+    """
+    Nouvelles lectures (snapshot puis deltas, voir broadcast.py) et événements d'alerte d'une machine.
+    Après un message resync, le client doit recharger les alertes de la machine.
+    """
+    if machine_id not in machines_db:
+        await websocket.close(code=4404)
+        return
+    # Machine d'un autre worker : ses lectures sont demandées à son propriétaire
+    async with state_router.remote_watch(machine_id):
+        await stream_topic(websocket, machine_topic(machine_id))
+
+@app.websocket("/ws/alerts")
+async def alerts_stream(websocket: WebSocket):
+    """
+    Événements d'alerte de tout le parc : opened (alerte complète), updated (count, last_seen), resolved.
+    Après un message resync, le client doit recharger /alerts/.
+    """
+    await stream_topic(websocket, ALERTS_TOPIC)
+
+@app.get("/stream/metrics", tags=["Sensor Data"])
+async def get_stream_metrics():
+    """
+    Abonnés connectés, événements diffusés, messages remis et resynchronisations de clients lents.
+    """
+    return broadcaster.metrics()
 
 # --- Endpoint de l'Assistant IA ---
 @app.post("/ai-assistant/", response_model=dict, tags=["AI Assistant"])
 async def ask_ai(question_data: AIQuestion):
     """
     Interagit avec l'assistant IA pour poser des questions sur les machines ou la maintenance.
+    La réponse indique l'intention reconnue (voir assistant.py).
     """
     logging.info(f"Received AI question: '{question_data.question}' for machine {question_data.machine_id}")
+    intent, answer = assistant.answer(question_data.question, question_data.machine_id)
+    delay = assistant.delay()
+    if delay:
+        await asyncio.sleep(delay)
+    return {"response": answer, "intent": intent}
+
+@app.post("/ai-assistant/stream", tags=["AI Assistant"])
+async def ask_ai_stream(question_data: AIQuestion):
+    """
+    Comme /ai-assistant/, réponse diffusée en Server-Sent Events : événements token (un mot par
+    événement, champ text) puis un événement done (intent, response).
+    """
+    logging.info(f"Received AI question (stream): '{question_data.question}' for machine {question_data.machine_id}")
+    return StreamingResponse(
+        assistant.stream(question_data.question, question_data.machine_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    question_lower = question_data.question.lower()
-    answer = ""
-
-    machine_name = "une machine non spécifiée"
-    machine_status_info = ""
-
-    if question_data.machine_id and question_data.machine_id in machines_db:
-        machine = machines_db[question_data.machine_id]
-        machine_name = machine.name
-        machine_status_info = f"La machine **{machine_name}** ({machine.type}, à {machine.location}) est actuellement {machine.status}."
-
-        if "risque" in question_lower or "probabilité de panne" in question_lower:
-            machine_alerts = [a for a in alerts_db.get(question_data.machine_id, []) if not a.is_resolved]
-            
-            risk_level = "faible"
-            probability = "5%"
-            if any(a.severity == "Urgence" for a in machine_alerts):
-                risk_level = "extrêmement élevé"
-                probability = "60-80%"
-            elif any(a.severity == "Critique" for a in machine_alerts):
-                risk_level = "élevé"
-                probability = "25-50%"
-            elif any(a.severity == "Avertissement" for a in machine_alerts):
-                risk_level = "modéré"
-                probability = "10-20%"
-            else:
-                 if random.random() < 0.1:
-                     risk_level = "modéré"
-                     probability = "8-12%"
-            
-            answer = f"**{machine_name}**: Le risque de panne est actuellement **{risk_level}**. La probabilité de défaillance cette semaine est estimée à **{probability}**."
-            if machine_alerts:
-                answer += f" Il y a actuellement {len(machine_alerts)} alerte(s) active(s) qui contribuent à ce risque."
-                
-        elif "alertes" in question_lower:
-            machine_alerts = [a for a in alerts_db.get(question_data.machine_id, []) if not a.is_resolved]
-            
-            if len(machine_alerts) > 0:
-                alert_types = {a.type for a in machine_alerts}
-                answer = f"La machine **{machine_name}** a actuellement **{len(machine_alerts)}** alerte(s) active(s) de type(s) : {', '.join(alert_types)}. La plus critique est : '{machine_alerts[0].message}' ({machine_alerts[0].severity})."
-            else:
-                answer = f"La machine **{machine_name}** n'a pas d'alertes actives. Tout semble fonctionner correctement."
-                
-        elif "dernières données" in question_lower or "capteurs" in question_lower:
-            if question_data.machine_id in sensor_data_db and sensor_data_db[question_data.machine_id]:
-                last_data = sensor_data_db[question_data.machine_id][-1]
-                answer = f"Les dernières lectures pour **{machine_name}** ({last_data.timestamp.strftime('%H:%M:%S')}): Température **{last_data.temperature:.1f}°C**, Vibration **{last_data.vibration:.1f}**, Pression **{last_data.pressure:.1f}**, Courant **{last_data.current:.1f}**."
-            else:
-                answer = f"Aucune donnée de capteur récente disponible pour **{machine_name}**."
-                
-        elif "qu'est-ce que tu fais" in question_lower or "ton rôle" in question_lower:
-            answer = f"Pour **{machine_name}**, mon rôle est de vous fournir des informations en temps réel sur son état, de vous alerter en cas d'anomalie et de vous aider à comprendre les risques de panne potentiels."
-        
-        elif "informations" in question_lower or "détails" in question_lower:
-             answer = machine_status_info + f" Elle a été installée le {machine.installation_date.strftime('%d/%m/%Y')}."
-
-    if not answer: 
-        if "bonjour" in question_lower or "salut" in question_lower:
-            answer = "Bonjour ! Je suis votre assistant IA pour la maintenance prédictive. Comment puis-je vous aider ?"
-        elif "aide" in question_lower:
-            answer = "Je peux répondre à des questions sur le statut des machines, les risques de panne, les alertes, ou vous fournir des informations générales sur la maintenance prédictive. Essayez 'Quelle est la machine la plus à risque ?' ou 'Quelles sont les dernières alertes ?' Vous pouvez aussi me poser des questions spécifiques si une machine est sélectionnée."
-        elif "machine la plus à risque" in question_lower:
-            machine_risk_scores: Dict[UUID, float] = {}
-            for mid, alerts in alerts_db.items():
-                active_alerts = [a for a in alerts if not a.is_resolved]
-                if active_alerts:
-                    score = 0.0
-                    for alert in active_alerts:
-                        if alert.severity == "Urgence": score += 3
-                        elif alert.severity == "Critique": score += 2
-                        elif alert.severity == "Avertissement": score += 1
-                    machine_risk_scores[mid] = score
-            
-            if machine_risk_scores:
-                most_at_risk_id = max(machine_risk_scores, key=machine_risk_scores.get) # type: ignore
-                most_at_risk_machine = machines_db[most_at_risk_id]
-                answer = f"Actuellement, la machine **{most_at_risk_machine.name}** ({most_at_risk_machine.location}) présente le risque le plus élevé, avec plusieurs alertes actives."
-            else:
-                answer = "Toutes les machines sont actuellement en état normal et n'ont pas d'alertes actives."
-        
-        elif "dernières alertes" in question_lower or "alertes globales" in question_lower:
-            global_active_alerts = []
-            for mid in alerts_db:
-                global_active_alerts.extend([a for a in alerts_db[mid] if not a.is_resolved])
-            
-            if len(global_active_alerts) > 0:
-                latest_alerts = sorted(global_active_alerts, key=lambda x: x.timestamp, reverse=True)[:3]
-                alert_messages = [f"'{a.message}' ({machines_db[a.machine_id].name}, {a.severity})" for a in latest_alerts]
-                answer = f"Il y a un total de **{len(global_active_alerts)}** alertes actives sur l'ensemble du parc machines. Les alertes les plus récentes concernent : {'; '.join(alert_messages)}."
-            else:
-                answer = "Il n'y a aucune alerte active sur l'ensemble du parc machines. Tout semble normal."
-        elif "quel est l'objectif" in question_lower or "ton but" in question_lower:
-            answer = "Mon objectif est d'améliorer la fiabilité des équipements industriels en détectant les anomalies, en prédisant les pannes et en fournissant des informations actionnables pour optimiser la maintenance et réduire les coûts."
-        elif "technologies" in question_lower:
-            answer = "Ce système utilise des technologies comme Python (FastAPI), ReactJS/Next.js, des bases de données comme PostgreSQL/MongoDB, et des librairies de Machine Learning comme Scikit-learn et TensorFlow."
-        else:
-            answer = f"Je n'ai pas de réponse spécifique à votre question : '{question_data.question}'. Mon développement est en cours, mais je peux vous assurer que toutes les machines sont sous surveillance constante."
-    
-    await asyncio.sleep(random.uniform(1.0, 2.5))
+@app.get("/ai-assistant/metrics", tags=["AI Assistant"])
+async def get_ai_assistant_metrics():
+    """
+    Latence des réponses par intention (nombre, moyenne, p50, p95, maximum), hors délai simulé.
+    """
+    return assistant.metrics()
+
+# --- Partage de l'état entre workers ---
+
+state_router = StateRouter(
+    state_backend,
+    app,
+    machines=machines_db,
+    data_backend=DATA_BACKEND,
+    store_reading=store_sensor_data,
+    evaluate=evaluate_sensor_batch,
+    predict=predict_anomaly_internal,
+    reading_type=SensorDataPoint,
+    alerts=alerts_db,
+    alert_type=Alert,
+    alert_correlator=alert_correlator,
+    fleet_health=fleet_health,
+    sensor_stats=sensor_stats,
+    retrieval_index=retrieval_index,
+    broadcaster=broadcaster,
+    users=db_users,
+    user_type=UserInDB,
+    ml_models=db_ml_models,
+    ml_model_type=MLModel,
+)
+app.add_middleware(OwnerForwardingMiddleware, router=state_router)
 
-    return {"response": answer}
+@app.get("/state/metrics", tags=["Monitoring"])
+async def get_state_metrics():
+    """
+    Partage de l'état du worker qui répond : backend, rôle de leader, partitions détenues,
+    événements publiés et reçus, lectures acceptées, stockées ici et transmises à leur propriétaire.
+    """
+    return state_router.metrics()
 
 # --- Simulateur de données de capteurs (pour le développement) ---
 async def simulate_sensor_data():
     while True:
         await asyncio.sleep(random.uniform(3, 7))
-        
+        # Un seul simulateur pour tous les workers : celui du leader
+        if not state_backend.is_leader:
+            continue
+
         for machine_id, machine in machines_db.items(): 
             temp = random.uniform(60.0, 75.0)
             vib = random.uniform(5.0, 12.0)
@@ -702,10 +1738,7 @@ async def simulate_sensor_data():
             )
             
             try:
-                if machine_id not in sensor_data_db:
-                    sensor_data_db[machine_id] = deque(maxlen=1000)
-                sensor_data_db[machine_id].append(sensor_data_point) 
-                asyncio.create_task(predict_anomaly_internal(sensor_data_point)) 
+                await ingest_sensor_data(sensor_data_point)
                 logging.debug(f"Simulated data sent for {machine.name}")
             except ValidationError as e:
                 logging.error(f"Validation error in simulator for machine {machine_id}: {e}")
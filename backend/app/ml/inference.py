@@ -0,0 +1,187 @@
+# backend/app/ml/inference.py
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching de l'inférence : un lot part dès INFERENCE_MAX_BATCH lignes ou après INFERENCE_MAX_WAIT_MS
+INFERENCE_ENABLED = os.getenv("INFERENCE_ENABLED", "true").lower() in ("1", "true", "yes")
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "256"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+# Demandes de scoring en attente au plus ; au-delà, les appelants attendent qu'une place se libère
+INFERENCE_QUEUE_MAX = int(os.getenv("INFERENCE_QUEUE_MAX", "1024"))
+
+# score_fn(X, model_key) -> (decisions, scores), ou None si aucun modèle ne correspond à model_key
+ScoreFunction = Callable[[np.ndarray, Hashable], Optional[Tuple[np.ndarray, np.ndarray]]]
+
+
+class InferenceBatcher:
+    """
+    Regroupe les demandes de scoring concurrentes en un seul appel au modèle.
+
+    Chaque demande (une ou plusieurs lignes de features) est mise en file avec un Future ;
+    une tâche de fond accumule les demandes pendant au plus max_wait_ms ou jusqu'à max_batch
+    lignes, les regroupe par modèle, empile chaque groupe en une matrice NumPy et appelle
+    score_fn une fois par modèle dans un pool de threads, hors de la boucle d'événements.
+    Les résultats sont ensuite redistribués.
+
+    La file est bornée à max_queue demandes : quand elle est pleine, score_many attend
+    (backpressure). Un échec du scoring est transmis aux demandes du groupe concerné sans
+    arrêter la tâche de fond ; stop() fait échouer les demandes en cours et en file.
+    """
+
+    def __init__(
+        self,
+        score_fn: ScoreFunction,
+        max_batch: int = INFERENCE_MAX_BATCH,
+        max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+        executor: Optional[Executor] = None,
+        max_queue: int = INFERENCE_QUEUE_MAX,
+    ):
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._executor = executor or ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        # Demandes retirées de la file et pas encore résolues
+        self._inflight: List[Tuple[Hashable, np.ndarray, asyncio.Future]] = []
+        self._stopped = False
+
+        self.batches = 0
+        self.rows = 0
+        self.inference_seconds = 0.0
+
+    async def start(self):
+        if self._task is None:
+            self._stopped = False
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Inference micro-batcher started (max batch {self.max_batch}, max wait {self.max_wait * 1000:.1f} ms)")
+
+    async def stop(self):
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Les appelants en attente dans score_many reçoivent une erreur au lieu d'attendre indéfiniment
+        pending = self._fail_pending(self._inflight)
+        self._inflight = []
+        if pending:
+            logger.warning(f"Inference micro-batcher stopped with {pending} pending scoring requests")
+        self._executor.shutdown(wait=False)
+
+    def _fail_pending(self, requests=()) -> int:
+        """Fait échouer les demandes données et celles encore en file ; retourne leur nombre."""
+        requests = list(requests)
+        while not self._queue.empty():
+            requests.append(self._queue.get_nowait())
+        for _, _, future in requests:
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+        return len(requests)
+
+    async def score_many(self, features: np.ndarray, model_key: Hashable = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Score de plusieurs lignes (matrice (n, n_features)) ; retourne (decisions, scores) ou None sans modèle."""
+        if self._stopped:
+            raise RuntimeError("Inference batcher stopped")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((model_key, np.atleast_2d(np.asarray(features, dtype=np.float64)), future))
+        if self._stopped:
+            # Mise en file après que stop() a vidé la file (producteur qui attendait une place) :
+            # personne ne la traitera, elle échoue avec les autres demandes restées en file
+            self._fail_pending()
+        return await future
+
+    async def score(self, features, model_key: Hashable = None) -> Optional[Tuple[float, float]]:
+        """Score d'une seule ligne ; retourne (decision, score) ou None sans modèle."""
+        result = await self.score_many(features, model_key)
+        if result is None:
+            return None
+        decisions, scores = result
+        return float(decisions[0]), float(scores[0])
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "avg_inference_ms": round(self.inference_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+        }
+
+    async def _next_batch(self) -> List[Tuple[Hashable, np.ndarray, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        # Tenu dans _inflight dès le retrait de la file, pour que stop() le fasse échouer
+        batch = self._inflight = [await self._queue.get()]
+        rows = len(batch[0][1])
+        deadline = loop.time() + self.max_wait
+        while rows < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _score(self, X: np.ndarray, model_key: Hashable):
+        started = time.perf_counter()
+        result = self.score_fn(X, model_key)
+        self.inference_seconds += time.perf_counter() - started
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            groups: Dict[Hashable, List[Tuple[np.ndarray, asyncio.Future]]] = {}
+            for model_key, features, future in batch:
+                groups.setdefault(model_key, []).append((features, future))
+            for model_key, requests in groups.items():
+                await self._run_group(loop, model_key, requests)
+            self._inflight = []
+
+    async def _run_group(self, loop, model_key: Hashable, requests: List[Tuple[np.ndarray, asyncio.Future]]):
+        # Toute erreur (empilement, scoring, découpage du résultat) échoue les demandes du groupe,
+        # jamais la tâche de fond : les appels suivants à score_many sont toujours servis
+        try:
+            X = requests[0][0] if len(requests) == 1 else np.vstack([features for features, _ in requests])
+            result = await loop.run_in_executor(self._executor, self._score, X, model_key)
+            self.batches += 1
+            self.rows += len(X)
+
+            offset = 0
+            for features, future in requests:
+                if not future.done():
+                    if result is None:
+                        future.set_result(None)
+                    else:
+                        decisions, scores = result
+                        future.set_result((decisions[offset:offset + len(features)], scores[offset:offset + len(features)]))
+                offset += len(features)
+        except Exception as e:
+            logger.error(f"Inference failed for a group of {len(requests)} scoring requests: {e}")
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
@@ -1,5 +1,5 @@
+import numpy as np
 import pandas as pd
-import sys
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sklearn.ensemble import IsolationForest
@@ -8,6 +8,9 @@ import os
 from datetime import datetime, timedelta
 import uuid
 import logging
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Pour entraîner les modèles de la flotte : cd backend && python -m app.ml.train_fleet --help (voir train_fleet.py)
 
 # Configuration du logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,44 +26,152 @@ MODEL_PATH = "app/ml/isolation_forest_model.joblib"
 # Caractéristiques (features) que le modèle va utiliser
 FEATURES = ['temperature', 'vibration', 'pressure', 'current']
 
-def fetch_data_for_training(machine_id: uuid.UUID, duration_days: int = 7) -> pd.DataFrame:
+# Lectures rapatriées par lot depuis le curseur côté serveur
+TRAINING_CHUNK_ROWS = int(os.getenv("TRAINING_CHUNK_ROWS", "50000"))
+# Taille maximale de l'échantillon d'entraînement (échantillonnage réservoir, 0 = tout l'historique) :
+# Isolation Forest ne voit que max_samples points par arbre, un échantillon uniforme suffit
+TRAINING_MAX_SAMPLES = int(os.getenv("TRAINING_MAX_SAMPLES", "200000"))
+
+# Hyperparamètres d'IsolationForest acceptés depuis MLModel.hyperparameters
+ISOLATION_FOREST_PARAMS = ("n_estimators", "max_samples", "contamination", "max_features", "bootstrap", "random_state")
+
+# Types des colonnes fixés dès la lecture : float32 comme les arbres de sklearn, sans objets Decimal
+TRAINING_DTYPES = {name: np.float32 for name in (*FEATURES, "operating_hours")}
+
+TRAINING_QUERY = text("""
+    SELECT timestamp,
+           CAST(temperature AS DOUBLE PRECISION) AS temperature,
+           CAST(vibration AS DOUBLE PRECISION) AS vibration,
+           CAST(pressure AS DOUBLE PRECISION) AS pressure,
+           CAST("current" AS DOUBLE PRECISION) AS "current",
+           CAST(operating_hours AS DOUBLE PRECISION) AS operating_hours
+    FROM sensor_data
+    WHERE machine_id = :machine_id
+      AND timestamp >= :start_time
+      AND timestamp <= :end_time
+    ORDER BY timestamp ASC
+""")
+
+def iter_training_chunks(
+    machine_id: uuid.UUID,
+    start_time: datetime,
+    end_time: datetime,
+    chunksize: int = TRAINING_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Historique d'une machine par DataFrames de `chunksize` lectures, au fil d'un curseur nommé
+    côté serveur (stream_results) : seul le lot courant est en mémoire. La requête est paramétrée
+    et les colonnes arrivent déjà typées (TRAINING_DTYPES, timestamp en datetime UTC).
+    """
+    with engine.connect() as connection:
+        connection = connection.execution_options(stream_results=True, max_row_buffer=chunksize)
+        yield from pd.read_sql_query(
+            TRAINING_QUERY,
+            connection,
+            params={"machine_id": str(machine_id), "start_time": start_time, "end_time": end_time},
+            chunksize=chunksize,
+            dtype=TRAINING_DTYPES,
+            parse_dates={"timestamp": {"utc": True}},
+        )
+
+def sample_training_data(chunks: Iterator[pd.DataFrame], max_samples: int = TRAINING_MAX_SAMPLES, seed: int = 42) -> pd.DataFrame:
+    """
+    Échantillon uniforme d'au plus max_samples lectures parmi tous les lots (échantillonnage
+    réservoir, vectorisé par lot), remis dans l'ordre chronologique. La mémoire est bornée par
+    max_samples quelle que soit la longueur de l'historique. df.attrs["n_rows"] donne le nombre
+    de lectures parcourues. max_samples <= 0 conserve tout l'historique.
+    """
+    rng = np.random.default_rng(seed)
+    kept = []
+    reservoir: Optional[Dict[str, np.ndarray]] = None
+    dtypes = None
+    seen = 0
+    for chunk in chunks:
+        if max_samples <= 0:
+            kept.append(chunk)
+            seen += len(chunk)
+            continue
+        # .values : datetime64 UTC pour les timestamps (to_numpy() donnerait des objets Timestamp)
+        columns = {name: chunk[name].values for name in chunk.columns}
+        if reservoir is None:
+            dtypes = chunk.dtypes
+            reservoir = {name: np.empty(max_samples, dtype=values.dtype) for name, values in columns.items()}
+        # Les premières lectures remplissent le réservoir
+        fill = min(max(max_samples - seen, 0), len(chunk))
+        for name, values in columns.items():
+            reservoir[name][seen:seen + fill] = values[:fill]
+        # La lecture d'indice global i remplace l'emplacement j, tiré dans [0, i], si j < max_samples
+        positions = np.arange(seen + fill, seen + len(chunk))
+        slots = rng.integers(0, positions + 1)
+        accepted = np.flatnonzero(slots < max_samples)
+        if len(accepted):
+            # Un emplacement tiré plusieurs fois garde la dernière lecture, comme en séquentiel
+            last = len(accepted) - 1 - np.unique(slots[accepted][::-1], return_index=True)[1]
+            rows = fill + accepted[last]
+            for name, values in columns.items():
+                reservoir[name][slots[accepted][last]] = values[rows]
+        seen += len(chunk)
+
+    if max_samples <= 0:
+        df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame()
+    elif reservoir is None:
+        df = pd.DataFrame()
+    else:
+        df = pd.DataFrame({name: values[:min(seen, max_samples)] for name, values in reservoir.items()})
+        for name, dtype in dtypes.items():
+            if isinstance(dtype, pd.DatetimeTZDtype):
+                df[name] = df[name].dt.tz_localize(dtype.tz)
+        df = df.sort_values("timestamp", ignore_index=True)
+    df.attrs["n_rows"] = seen
+    return df
+
+def fetch_data_for_training(machine_id: uuid.UUID, duration_days: int = 7, max_samples: int = TRAINING_MAX_SAMPLES) -> pd.DataFrame:
     """
-    Récupère les données historiques d'une machine pour l'entraînement.
+    Récupère les données historiques d'une machine pour l'entraînement : lecture par lots sur un
+    curseur côté serveur, ramenée à un échantillon d'au plus max_samples lectures.
     """
     logger.info(f"Fetching data for machine {machine_id} for the last {duration_days} days...")
     end_time = datetime.utcnow()
     start_time = end_time - timedelta(days=duration_days)
 
-    query = f"""
-    SELECT timestamp, temperature, vibration, pressure, "current", operating_hours
-    FROM sensor_data
-    WHERE machine_id = '{machine_id}'
-      AND timestamp >= '{start_time.isoformat()}'
-      AND timestamp <= '{end_time.isoformat()}'
-    ORDER BY timestamp ASC;
-    """
     try:
-        df = pd.read_sql(text(query), engine)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        logger.info(f"Fetched {len(df)} data points.")
+        df = sample_training_data(iter_training_chunks(machine_id, start_time, end_time), max_samples)
+        logger.info(f"Fetched {df.attrs['n_rows']} data points, {len(df)} kept for training.")
         return df
     except Exception as e:
         logger.error(f"Error fetching data: {e}")
         return pd.DataFrame()
 
-def train_isolation_forest(df: pd.DataFrame, contamination: float = 0.01):
+def extract_features(df: pd.DataFrame) -> np.ndarray:
+    """
+    Matrice (n, len(FEATURES)) float32 contiguë de l'historique, sans les lectures incomplètes :
+    calculée une fois par machine puis réutilisée pour l'entraînement et l'évaluation.
+    """
+    if df.empty:
+        return np.empty((0, len(FEATURES)), dtype=np.float32)
+    X = np.ascontiguousarray(df[FEATURES].to_numpy(dtype=np.float32))
+    return X[~np.isnan(X).any(axis=1)]
+
+def isolation_forest_params(hyperparameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Hyperparamètres d'un MLModel applicables à IsolationForest ; les autres clés sont ignorées."""
+    return {name: value for name, value in hyperparameters.items() if name in ISOLATION_FOREST_PARAMS}
+
+def train_isolation_forest(data, contamination: float = 0.01, **hyperparameters):
     """
-    Entraîne un modèle Isolation Forest.
+    Entraîne un modèle Isolation Forest sur un DataFrame d'historique ou une matrice de features.
     contamination: la proportion estimée d'anomalies dans les données (important pour la détection).
+    Les autres hyperparamètres d'IsolationForest (n_estimators, max_samples, max_features...) sont
+    transmis tels quels.
     """
-    if df.empty or len(df) < 40: # Minimum de données pour un entraînement significatif
+    X = extract_features(data) if isinstance(data, pd.DataFrame) else data
+    if len(X) < 40: # Minimum de données pour un entraînement significatif
         logger.warning("Not enough data to train Isolation Forest. Returning None.")
         return None
 
-    X = df[FEATURES]
-    model = IsolationForest(contamination=0.05, random_state=42)
+    params = {"random_state": 42, **isolation_forest_params(hyperparameters), "contamination": contamination}
+    model = IsolationForest(**params)
     model.fit(X)
-    logger.info("Isolation Forest model trained successfully.")
+    logger.info(f"Isolation Forest model trained successfully on {len(X)} samples ({params}).")
     return model
 
 def save_model(model, path=MODEL_PATH):
@@ -107,47 +218,21 @@ def predict_anomaly(data_point: pd.DataFrame):
     prediction = model.predict(X_predict)
     return prediction[0] # Renvoie la prédiction pour le premier (et unique) point
 
+def score_batch(X: np.ndarray, model=None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Score d'anomalie d'un lot de points en un seul appel à decision_function.
+    X est une matrice (n, len(FEATURES)). Retourne (decisions, scores) : decision < 0 signale
+    une anomalie, et score = -(decision + offset_) est le score d'Isolation Forest dans [0, 1]
+    (proche de 1 pour une anomalie, sous 0.5 pour un point normal).
+    """
+    if model is None:
+        model = get_anomaly_detector_model()
+    if model is None or len(X) == 0:
+        return None
 
-if __name__ == "__main__":
-    # Ceci est un exemple d'utilisation pour entraîner et tester le modèle localement
-    # Remplacez par un UUID de machine réel que vous avez dans votre DB
-    test_machine_id = "250d3447-a6ee-4451-85b3-8a9ce46c906e" # !!! METTEZ UN UUID RÉEL ICI !!!
-
-    if test_machine_id == "VOTRE_UUID_MACHINE_1":
-        logger.error("Please replace 'VOTRE_UUID_MACHINE_1' with an actual machine UUID from your database.")
-        sys.exit(1)
-
-    logger.info(f"--- Starting ML Model Training for machine {test_machine_id} ---")
-
-    # 1. Récupérer des données pour l'entraînement (par exemple, les 3 derniers jours)
-    training_data = fetch_data_for_training(uuid.UUID(test_machine_id), duration_days=3)
-
-    if not training_data.empty:
-        # 2. Entraîner le modèle
-        trained_model = train_isolation_forest(training_data)
-
-        if trained_model:
-            # 3. Sauvegarder le modèle
-            save_model(trained_model)
-
-            # 4. Charger et tester le modèle (simule un redémarrage de l'app)
-            _loaded_model = None # Réinitialise le modèle global pour forcer le rechargement
-            loaded_model = get_anomaly_detector_model()
-
-            if loaded_model:
-                logger.info("Model loaded successfully for testing.")
-                # Créer un point de données normal pour test
-                normal_data_point = pd.DataFrame([[70, 10, 5, 25]], columns=FEATURES)
-                prediction_normal = predict_anomaly(normal_data_point)
-                logger.info(f"Prediction for normal data (temperature=70, vibration=10...): {prediction_normal} (1=Normal, -1=Anomaly)")
+    if hasattr(model, "feature_names_in_"):
+        # Un seul DataFrame par lot : évite l'avertissement de sklearn sur les noms de colonnes
+        X = pd.DataFrame(X, columns=FEATURES, copy=False)
+    decisions = model.decision_function(X)
+    return decisions, -(decisions + model.offset_)
 
-                # Créer un point de données anormal pour test (ex: surchauffe et vibrations excessives)
-                anomaly_data_point = pd.DataFrame([[150, 50, 5, 25]], columns=FEATURES)
-                prediction_anomaly = predict_anomaly(anomaly_data_point)
-                logger.info(f"Prediction for ANOMALOUS data (temperature=150, vibration=50...): {prediction_anomaly} (1=Normal, -1=Anomaly)")
-            else:
-                logger.error("Failed to load model after training.")
-        else:
-            logger.error("Failed to train model.")
-    else:
-        logger.error(f"No sufficient training data found for machine {test_machine_id}.")
\ No newline at end of file
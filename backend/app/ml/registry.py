@@ -0,0 +1,277 @@
+# backend/app/ml/registry.py
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+# Répertoire des artefacts versionnés : <clé>__v<version>.joblib, la clé étant un UUID de machine ou un type de machine
+ML_MODEL_DIR = os.getenv("ML_MODEL_DIR", "app/ml/models")
+# Mémoire maximale occupée par les modèles résidents (estimée par la taille des artefacts)
+ML_MODEL_MEMORY_BUDGET_MB = float(os.getenv("ML_MODEL_MEMORY_BUDGET_MB", "512"))
+# Intervalle de vérification des artefacts modifiés sur disque
+ML_MODEL_POLL_SECONDS = float(os.getenv("ML_MODEL_POLL_SECONDS", "10"))
+
+# Clé du modèle commun à toute la flotte (l'artefact historique MODEL_PATH)
+DEFAULT_MODEL_KEY = "default"
+DEFAULT_MODEL_VERSION = "1"
+
+ARTIFACT_PATTERN = re.compile(r"^(?P<key>.+)__v(?P<version>[^_/]+)\.joblib$")
+
+ModelKey = Tuple[str, str]
+
+
+def model_key(value: Any) -> str:
+    """Clé de registre d'un UUID de machine ou d'un type de machine ("Presse Hydraulique" -> "presse_hydraulique")."""
+    text = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9-]+", "_", text.lower()).strip("_")
+
+
+def artifact_path(key: Any, version: str, model_dir: str = ML_MODEL_DIR) -> str:
+    """Chemin de l'artefact d'une (clé, version) : <model_dir>/<clé>__v<version>.joblib."""
+    return os.path.join(model_dir, f"{model_key(key)}__v{version}.joblib")
+
+
+def metadata_path(path: str) -> str:
+    """Fiche JSON d'un artefact (hyperparamètres, métriques d'évaluation, durées) : <clé>__v<version>.json."""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def write_metadata(path: str, metadata: Dict[str, Any]):
+    """Écrit la fiche d'un artefact de façon atomique, avant l'artefact lui-même."""
+    target = metadata_path(path)
+    with open(f"{target}.tmp", "w") as f:
+        json.dump(metadata, f, indent=2, default=str)
+    os.replace(f"{target}.tmp", target)
+
+
+def version_order(version: str):
+    """Ordre des versions : numérique par composant ("1.10.0" > "1.9.2"), lexical sinon."""
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in version.split(".")]
+
+
+class ResidentModel:
+    __slots__ = ("model", "path", "mtime", "nbytes")
+
+    def __init__(self, model, path: str, mtime: float, nbytes: int):
+        self.model = model
+        self.path = path
+        self.mtime = mtime
+        self.nbytes = nbytes
+
+
+class ModelRegistry:
+    """
+    Registre des modèles par (machine ou type de machine, version).
+
+    Les artefacts sont indexés sur disque et chargés à la première demande avec
+    joblib.load(mmap_mode='r') : les tableaux NumPy des arbres restent projetés en mémoire
+    et partagés entre processus plutôt que copiés. Les modèles résidents forment un cache
+    LRU borné par memory_budget_bytes ; au-delà, les moins récemment utilisés sont libérés.
+    check_for_updates(), appelée périodiquement après start(), recharge les artefacts modifiés.
+
+    Résolution d'une machine : modèle de la machine, puis modèle de son type, puis modèle par défaut.
+    """
+
+    def __init__(
+        self,
+        model_dir: str = ML_MODEL_DIR,
+        default_path: Optional[str] = None,
+        memory_budget_bytes: int = int(ML_MODEL_MEMORY_BUDGET_MB * 1024 * 1024),
+        poll_interval: float = ML_MODEL_POLL_SECONDS,
+    ):
+        self.model_dir = model_dir
+        self.default_path = default_path
+        self.memory_budget_bytes = memory_budget_bytes
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        # clé -> {version: chemin}
+        self._index: Dict[str, Dict[str, str]] = {}
+        self._resident: "OrderedDict[ModelKey, ResidentModel]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.refresh_index()
+
+    def artifact_path(self, key: Any, version: str) -> str:
+        return artifact_path(key, version, self.model_dir)
+
+    def refresh_index(self):
+        """Relit la liste des artefacts disponibles."""
+        index: Dict[str, Dict[str, str]] = {}
+        if self.default_path and os.path.exists(self.default_path):
+            index[DEFAULT_MODEL_KEY] = {DEFAULT_MODEL_VERSION: self.default_path}
+        if os.path.isdir(self.model_dir):
+            for name in os.listdir(self.model_dir):
+                match = ARTIFACT_PATTERN.match(name)
+                if match:
+                    index.setdefault(match["key"], {})[match["version"]] = os.path.join(self.model_dir, name)
+        with self._lock:
+            self._index = index
+
+    def versions(self, key: str) -> List[str]:
+        with self._lock:
+            return sorted(self._index.get(model_key(key), {}), key=version_order)
+
+    def resolve(self, machine_id: Any = None, machine_type: Optional[str] = None, version: Optional[str] = None) -> Optional[ModelKey]:
+        """(clé, version) du modèle à utiliser pour une machine, ou None si aucun artefact ne convient."""
+        with self._lock:
+            for candidate in (machine_id, machine_type, DEFAULT_MODEL_KEY):
+                if candidate is None:
+                    continue
+                versions = self._index.get(model_key(candidate))
+                if not versions:
+                    continue
+                if version is None:
+                    return model_key(candidate), max(versions, key=version_order)
+                if version in versions:
+                    return model_key(candidate), version
+        return None
+
+    def get(self, key: ModelKey):
+        """Modèle d'une (clé, version), chargé à la demande ; None si l'artefact n'existe pas."""
+        with self._lock:
+            entry = self._resident.get(key)
+            if entry is not None:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return entry.model
+            path = self._index.get(key[0], {}).get(key[1])
+            if path is None:
+                return None
+            entry = self._load(path)
+            self._resident[key] = entry
+            self.loads += 1
+            self._evict()
+            return entry.model
+
+    def get_for_machine(self, machine_id: Any = None, machine_type: Optional[str] = None):
+        key = self.resolve(machine_id, machine_type)
+        return self.get(key) if key is not None else None
+
+    def metadata(self, key: ModelKey) -> Dict[str, Any]:
+        """Fiche d'une (clé, version) écrite à l'entraînement ; vide si l'artefact n'en a pas."""
+        with self._lock:
+            path = self._index.get(key[0], {}).get(key[1])
+        if path is None:
+            return {}
+        try:
+            with open(metadata_path(path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_resident(self, key: ModelKey) -> bool:
+        with self._lock:
+            return key in self._resident
+
+    def evict(self, key: ModelKey):
+        with self._lock:
+            self._resident.pop(key, None)
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes for entry in self._resident.values())
+
+    def resident(self) -> List[Dict[str, Any]]:
+        """Modèles actuellement en mémoire, du moins au plus récemment utilisé."""
+        with self._lock:
+            return [
+                {"key": key, "version": version, "path": entry.path, "nbytes": entry.nbytes}
+                for (key, version), entry in self._resident.items()
+            ]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "available": sum(len(versions) for versions in self._index.values()),
+                "resident": len(self._resident),
+                "resident_bytes": self.resident_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+            }
+
+    def check_for_updates(self) -> bool:
+        """Réindexe le répertoire et recharge les modèles résidents dont l'artefact a changé."""
+        self.refresh_index()
+        changed = False
+        with self._lock:
+            for key, entry in list(self._resident.items()):
+                path = self._index.get(key[0], {}).get(key[1])
+                if path is None:
+                    del self._resident[key]
+                    changed = True
+                    continue
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue
+                if path != entry.path or mtime != entry.mtime:
+                    try:
+                        self._resident[key] = self._load(path)
+                    except Exception as e:
+                        logger.error(f"Reload of model {key[0]} v{key[1]} failed, keeping the previous one: {e}")
+                        continue
+                    self.reloads += 1
+                    changed = True
+                    logger.info(f"Model {key[0]} v{key[1]} reloaded from {path}")
+            self._evict()
+        return changed
+
+    async def start(self, on_change=None):
+        """Démarre la surveillance périodique des artefacts ; on_change est appelée après chaque rechargement."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch(on_change))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self, on_change):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                changed = await loop.run_in_executor(None, self.check_for_updates)
+            except Exception as e:
+                logger.error(f"Model registry update check failed: {e}")
+                continue
+            if changed and on_change is not None:
+                on_change()
+
+    def _load(self, path: str) -> ResidentModel:
+        stat = os.stat(path)
+        model = joblib.load(path, mmap_mode="r")
+        logger.info(f"Model loaded from {path} ({stat.st_size / 1024:.0f} KiB)")
+        return ResidentModel(model, path, stat.st_mtime, stat.st_size)
+
+    def _evict(self):
+        """Libère les modèles les moins récemment utilisés, en gardant toujours le plus récent."""
+        used = sum(entry.nbytes for entry in self._resident.values())
+        for key in list(self._resident)[:-1]:
+            if used <= self.memory_budget_bytes:
+                break
+            used -= self._resident.pop(key).nbytes
+            self.evictions += 1
+            logger.info(f"Model {key[0]} v{key[1]} evicted from memory")
@@ -0,0 +1,280 @@
+# backend/app/ml/train_fleet.py
+"""
+Entraîne les modèles Isolation Forest de toute la flotte, en parallèle sur tous les cœurs.
+
+Chaque machine est lue une seule fois (chargement par lots et échantillonnage, voir
+ml_model.fetch_data_for_training) ; sa matrice de features sert à son propre modèle et, avec
+--by type ou both, au modèle de son type de machine, entraîné ensuite sur l'union des features
+déjà extraites. Les artefacts sont écrits dans le registre en versions <clé>__v<version>.joblib,
+avec une fiche <clé>__v<version>.json (hyperparamètres, métriques d'évaluation, durées).
+L'API les prend en compte à la prochaine vérification du registre.
+
+    cd backend && python -m app.ml.train_fleet --by both --workers 8
+    cd backend && python -m app.ml.train_fleet --api http://localhost:8000 --model-id model_4
+    cd backend && python -m app.ml.train_fleet --machines <uuid>:"Presse Hydraulique" --hyperparameters '{"contamination": 0.02}'
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .registry import ML_MODEL_DIR, artifact_path, model_key
+from .training import TRAINING_DURATION_DAYS, TRAINING_MAX_WORKERS, fit_and_evaluate, save_artifact
+
+logger = logging.getLogger(__name__)
+
+TRAIN_BY = ("machine", "type", "both")
+
+
+def _timings(result: Dict[str, Any], started: float) -> Dict[str, Any]:
+    result["total_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def train_machine(
+    machine_id: str,
+    duration_days: int,
+    hyperparameters: Dict[str, Any],
+    artifact: Optional[str],
+    features_path: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Dans un processus du pool : une seule extraction des features de la machine, puis
+    l'entraînement de son modèle (si artifact) et la mise en cache des features pour le
+    modèle de son type (si features_path).
+    """
+    from . import ml_model
+
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"key": model_key(machine_id), "kind": "machine", "machines": [machine_id]}
+    df = ml_model.fetch_data_for_training(machine_id, duration_days)
+    result["n_rows"] = int(df.attrs.get("n_rows", len(df)))
+    X = ml_model.extract_features(df)
+    del df
+    result["load_seconds"] = round(time.perf_counter() - started, 3)
+    if features_path is not None:
+        np.save(features_path, X)
+    if artifact is None:
+        result["status"] = "extracted"
+        return _timings(result, started)
+
+    model, metrics = fit_and_evaluate(X, hyperparameters)
+    if model is None:
+        result.update(status="skipped", n_samples=len(X))
+        return _timings(result, started)
+    metrics.update(n_rows=float(result["n_rows"]), load_seconds=result["load_seconds"])
+    save_artifact(model, artifact, {
+        "key": result["key"],
+        "machines": [machine_id],
+        "hyperparameters": hyperparameters,
+        "evaluation_metrics": metrics,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+    })
+    result.update(status="trained", artifact=artifact, n_samples=len(X), fit_seconds=metrics["fit_seconds"],
+                  anomaly_rate=metrics["anomaly_rate"])
+    return _timings(result, started)
+
+
+def train_group(
+    key: str,
+    machine_ids: Sequence[str],
+    features_paths: Sequence[str],
+    hyperparameters: Dict[str, Any],
+    artifact: str,
+    max_samples: int,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    Dans un processus du pool : modèle d'un type de machine, entraîné sur l'union des features
+    déjà extraites de ses machines (projetées en mémoire), ramenée à au plus max_samples lignes.
+    """
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"key": key, "kind": "type", "machines": list(machine_ids)}
+    parts = [np.load(path, mmap_mode="r") for path in features_paths]
+    offsets = np.cumsum([0] + [len(part) for part in parts])
+    total = int(offsets[-1])
+    if 0 < max_samples < total:
+        chosen = np.sort(np.random.default_rng(seed).choice(total, size=max_samples, replace=False))
+        bounds = np.searchsorted(chosen, offsets)
+        X = np.concatenate([part[chosen[bounds[i]:bounds[i + 1]] - offsets[i]] for i, part in enumerate(parts)])
+    else:
+        X = np.concatenate([np.asarray(part) for part in parts]) if parts else np.empty((0, 0), dtype=np.float32)
+    result["n_rows"] = total
+    result["load_seconds"] = round(time.perf_counter() - started, 3)
+
+    model, metrics = fit_and_evaluate(X, hyperparameters)
+    if model is None:
+        result.update(status="skipped", n_samples=len(X))
+        return _timings(result, started)
+    metrics.update(n_rows=float(total), load_seconds=result["load_seconds"])
+    save_artifact(model, artifact, {
+        "key": key,
+        "machines": list(machine_ids),
+        "hyperparameters": hyperparameters,
+        "evaluation_metrics": metrics,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+    })
+    result.update(status="trained", artifact=artifact, n_samples=len(X), fit_seconds=metrics["fit_seconds"],
+                  anomaly_rate=metrics["anomaly_rate"])
+    return _timings(result, started)
+
+
+def train_fleet(
+    machines: Sequence[Tuple[str, Optional[str]]],
+    by: str = "machine",
+    hyperparameters: Optional[Dict[str, Any]] = None,
+    version: Optional[str] = None,
+    max_workers: int = TRAINING_MAX_WORKERS,
+    duration_days: int = TRAINING_DURATION_DAYS,
+    model_dir: str = ML_MODEL_DIR,
+    max_samples: Optional[int] = None,
+    on_result=None,
+) -> List[Dict[str, Any]]:
+    """
+    Entraîne les modèles de machines (by=machine), de types de machine (by=type) ou les deux,
+    pour les machines données sous forme (machine_id, type). Retourne un résultat par modèle
+    (statut, lectures, échantillons, durées de chargement, d'entraînement et totale) ;
+    on_result(result) est appelée à chaque modèle terminé.
+    """
+    from . import ml_model
+
+    if by not in TRAIN_BY:
+        raise ValueError(f"by doit valoir {', '.join(TRAIN_BY)}")
+    hyperparameters = dict(hyperparameters or {})
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    max_samples = ml_model.TRAINING_MAX_SAMPLES if max_samples is None else max_samples
+    by_machine = by in ("machine", "both")
+    groups: Dict[str, List[str]] = {}
+    if by in ("type", "both"):
+        for machine_id, machine_type in machines:
+            if machine_type:
+                groups.setdefault(model_key(machine_type), []).append(str(machine_id))
+    grouped = {machine_id for members in groups.values() for machine_id in members}
+
+    results: List[Dict[str, Any]] = []
+
+    def collect(future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {**futures[future], "status": "failed", "error": str(e)}
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    with tempfile.TemporaryDirectory(prefix="fleet-features-") as cache_dir, \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+        for machine_id, _ in machines:
+            machine_id = str(machine_id)
+            if not by_machine and machine_id not in grouped:
+                continue
+            features_path = os.path.join(cache_dir, f"{model_key(machine_id)}.npy") if machine_id in grouped else None
+            artifact = artifact_path(machine_id, version, model_dir) if by_machine else None
+            future = executor.submit(train_machine, machine_id, duration_days, hyperparameters, artifact, features_path)
+            futures[future] = {"key": model_key(machine_id), "kind": "machine", "machines": [machine_id]}
+
+        extracted = set()
+        for future in as_completed(list(futures)):
+            result = collect(future)
+            if result.get("status") != "failed":
+                extracted.add(result["machines"][0])
+
+        futures = {}
+        for key, members in groups.items():
+            members = [machine_id for machine_id in members if machine_id in extracted]
+            if not members:
+                continue
+            paths = [os.path.join(cache_dir, f"{model_key(machine_id)}.npy") for machine_id in members]
+            future = executor.submit(train_group, key, members, paths, hyperparameters,
+                                     artifact_path(key, version, model_dir), max_samples)
+            futures[future] = {"key": key, "kind": "type", "machines": members}
+        for future in as_completed(list(futures)):
+            collect(future)
+    return results
+
+
+def list_machines() -> List[Tuple[str, Optional[str]]]:
+    """(id, type) de toutes les machines de la base."""
+    from sqlalchemy import text
+    from . import ml_model
+
+    with ml_model.engine.connect() as connection:
+        return [(str(row.id), row.type) for row in connection.execute(text("SELECT id, type FROM machines ORDER BY id"))]
+
+
+def fetch_model_hyperparameters(api_url: str, model_id: str) -> Dict[str, Any]:
+    """Hyperparamètres d'un MLModel de l'API (GET /ml-models/)."""
+    with urllib.request.urlopen(f"{api_url.rstrip('/')}/ml-models/") as response:
+        models = json.load(response)
+    for model in models:
+        if model["id"] == model_id:
+            return model.get("hyperparameters") or {}
+    raise SystemExit(f"Modèle {model_id} introuvable sur {api_url}")
+
+
+def parse_machine(value: str) -> Tuple[str, Optional[str]]:
+    machine_id, _, machine_type = value.partition(":")
+    return machine_id, machine_type or None
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--by", choices=TRAIN_BY, default="machine", help="modèles par machine, par type de machine, ou les deux")
+    parser.add_argument("--machines", nargs="+", type=parse_machine, metavar="ID[:TYPE]", help="machines à entraîner (par défaut : toutes celles de la base)")
+    parser.add_argument("--hyperparameters", type=json.loads, default=None, help="hyperparamètres JSON, ex. '{\"contamination\": 0.02}'")
+    parser.add_argument("--api", help="URL de l'API d'où lire les hyperparamètres de --model-id")
+    parser.add_argument("--model-id", help="MLModel dont les hyperparamètres sont appliqués")
+    parser.add_argument("--days", type=int, default=TRAINING_DURATION_DAYS)
+    parser.add_argument("--workers", type=int, default=TRAINING_MAX_WORKERS)
+    parser.add_argument("--version", help="version des artefacts (par défaut : horodatage UTC)")
+    parser.add_argument("--model-dir", default=ML_MODEL_DIR)
+    parser.add_argument("--report", help="fichier JSON où écrire les résultats par modèle")
+    args = parser.parse_args(argv)
+
+    hyperparameters = args.hyperparameters
+    if hyperparameters is None and args.model_id:
+        if not args.api:
+            parser.error("--model-id nécessite --api")
+        hyperparameters = fetch_model_hyperparameters(args.api, args.model_id)
+    machines = args.machines or list_machines()
+    if not machines:
+        parser.error("aucune machine à entraîner")
+    version = args.version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    print(f"Training {len(machines)} machine(s) by {args.by}, version {version}, {args.workers} workers, "
+          f"hyperparameters {hyperparameters or {}}", flush=True)
+
+    def show(result):
+        print(f"{result['kind']:<8}{result['key'][:40]:<42}{result['status']:<10}{result.get('n_rows', 0):>10}"
+              f"{result.get('n_samples', 0):>10}{result.get('load_seconds', 0):>9.2f}{result.get('fit_seconds', 0):>9.2f}"
+              f"{result.get('total_seconds', 0):>9.2f}  {result.get('error', '')}", flush=True)
+
+    print(f"{'kind':<8}{'key':<42}{'status':<10}{'rows':>10}{'samples':>10}{'load s':>9}{'fit s':>9}{'total s':>9}")
+    started = time.perf_counter()
+    results = train_fleet(machines, args.by, hyperparameters, version, args.workers, args.days, args.model_dir, on_result=show)
+    elapsed = time.perf_counter() - started
+    trained = [result for result in results if result["status"] == "trained"]
+    busy = sum(result.get("total_seconds", 0) for result in results)
+    print(f"{len(trained)}/{len(results)} model(s) trained in {elapsed:.1f}s "
+          f"({busy:.1f}s of per-model work, {busy / elapsed if elapsed else 0:.1f}x parallelism)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"version": version, "by": args.by, "hyperparameters": hyperparameters or {},
+                       "elapsed_seconds": round(elapsed, 3), "results": results}, f, indent=2)
+    if not trained:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# backend/app/ml/training.py
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Nombre de processus d'entraînement (par défaut un par cœur) et nombre maximal de jobs en attente ou en cours
+TRAINING_MAX_WORKERS = int(os.getenv("TRAINING_MAX_WORKERS", str(os.cpu_count() or 1)))
+TRAINING_MAX_PENDING_JOBS = int(os.getenv("TRAINING_MAX_PENDING_JOBS", "1000"))
+# Fenêtre d'historique utilisée pour l'entraînement
+TRAINING_DURATION_DAYS = int(os.getenv("TRAINING_DURATION_DAYS", "7"))
+
+JOB_PENDING = "En attente"
+JOB_RUNNING = "En cours"
+JOB_SUCCEEDED = "Terminé"
+JOB_FAILED = "Échec"
+JOB_CANCELLED = "Annulé"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class TrainingCancelled(Exception):
+    pass
+
+
+def fit_and_evaluate(X, hyperparameters: Dict[str, Any]):
+    """
+    Entraîne Isolation Forest sur la matrice de features d'une machine (ou d'un type) avec les
+    hyperparamètres du MLModel, puis l'évalue sur la même matrice.
+    Retourne (modèle, métriques), ou (None, {}) si les données sont insuffisantes.
+    """
+    from . import ml_model
+
+    started = time.perf_counter()
+    model = ml_model.train_isolation_forest(X, **hyperparameters)
+    if model is None:
+        return None, {}
+    fitted = time.perf_counter()
+    decisions = model.decision_function(X)
+    return model, {
+        "n_samples": float(len(X)),
+        "anomaly_rate": float((decisions < 0).mean()),
+        "fit_seconds": round(fitted - started, 3),
+        "evaluation_seconds": round(time.perf_counter() - fitted, 3),
+    }
+
+
+def save_artifact(model, artifact_path: str, metadata: Dict[str, Any]):
+    """
+    Écrit l'artefact versionné et sa fiche JSON (lue par ModelRegistry.metadata).
+    Écriture atomique : le registre ne doit jamais lire un artefact partiel.
+    """
+    from . import ml_model
+    from .registry import write_metadata
+
+    os.makedirs(os.path.dirname(artifact_path) or ".", exist_ok=True)
+    write_metadata(artifact_path, metadata)
+    tmp_path = f"{artifact_path}.tmp"
+    ml_model.save_model(model, tmp_path)
+    os.replace(tmp_path, artifact_path)
+
+
+def run_training_job(
+    job_id: str,
+    machine_id: str,
+    artifact_path: str,
+    hyperparameters: Dict[str, Any],
+    duration_days: int,
+    progress,
+    cancel_event,
+    data: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Entraîne le modèle d'une machine dans un processus du pool.
+    data contient l'historique en colonnes quand il vient de la mémoire de l'API ; sinon il est lu en base.
+    La progression est envoyée dans la file progress sous forme (job_id, fraction, message),
+    et cancel_event est vérifié entre les étapes.
+    """
+    import pandas as pd
+    from . import ml_model
+
+    def report(fraction: float, message: str):
+        progress.put((job_id, fraction, message))
+        if cancel_event.is_set():
+            raise TrainingCancelled()
+
+    started = time.perf_counter()
+    report(0.0, "Chargement des données d'entraînement...")
+    if data is None:
+        df = ml_model.fetch_data_for_training(machine_id, duration_days)
+    else:
+        df = pd.DataFrame(data)
+    # Lu en base, l'historique est ramené à un échantillon (voir ml_model.sample_training_data)
+    n_rows = df.attrs.get("n_rows", len(df))
+    X = ml_model.extract_features(df)
+    del df
+    load_seconds = time.perf_counter() - started
+    report(0.3, f"{n_rows} lectures chargées ({len(X)} échantillonnées), entraînement Isolation Forest...")
+
+    model, metrics = fit_and_evaluate(X, hyperparameters)
+    if model is None:
+        raise ValueError(f"Données insuffisantes pour l'entraînement ({len(X)} lectures)")
+    report(0.8, "Évaluation et sauvegarde du modèle...")
+
+    metrics.update({
+        "n_rows": float(n_rows),
+        "load_seconds": round(load_seconds, 3),
+        "training_seconds": round(time.perf_counter() - started, 3),
+    })
+    save_artifact(model, artifact_path, {
+        "key": machine_id,
+        "machines": [machine_id],
+        "hyperparameters": hyperparameters,
+        "evaluation_metrics": metrics,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+    })
+    return {"artifact_path": artifact_path, "evaluation_metrics": metrics}
+
+
+class TrainingJob:
+    __slots__ = (
+        "id", "model_id", "machine_id", "status", "progress", "logs", "result", "error",
+        "submitted_at", "started_at", "finished_at", "future", "cancel_event",
+    )
+
+    def __init__(self, model_id: str, machine_id: str):
+        self.id = str(uuid4())
+        self.model_id = model_id
+        self.machine_id = machine_id
+        self.status = JOB_PENDING
+        self.progress = 0.0
+        self.logs: List[str] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.future: Optional[Future] = None
+        self.cancel_event = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "model_id": self.model_id,
+            "machine_id": self.machine_id,
+            "status": self.status,
+            "progress": self.progress,
+            "logs": list(self.logs),
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class TrainingScheduler:
+    """
+    Ordonnanceur des entraînements, exécutés dans un ProcessPoolExecutor pour ne jamais
+    bloquer la boucle d'événements de l'API.
+
+    Le pool (max_workers processus) borne le nombre d'entraînements simultanés, et au plus
+    max_pending jobs peuvent être en attente ou en cours. Les processus remontent leur
+    progression par une file partagée (multiprocessing.Manager) qu'une tâche de fond relaie
+    à on_update(job, message). Un job en attente est annulé directement ; un job en cours
+    s'arrête à sa prochaine étape via un Event partagé. Les jobs terminés restent consultables
+    jusqu'à discard(), que l'appelant invoque quand il n'en a plus besoin.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = TRAINING_MAX_WORKERS,
+        max_pending: int = TRAINING_MAX_PENDING_JOBS,
+        on_update: Optional[Callable[[TrainingJob, Optional[str]], None]] = None,
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.on_update = on_update
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+        self._pump: Optional[asyncio.Task] = None
+
+    def _ensure_started(self):
+        # Processus créés au premier job : l'API démarre sans coût si personne n'entraîne
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._progress = self._manager.Queue()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            self._pump = asyncio.create_task(self._pump_progress())
+            logger.info(f"Training process pool started with {self.max_workers} workers")
+
+    @property
+    def active_jobs(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(
+        self,
+        model_id: str,
+        machine_id: str,
+        artifact_path: str,
+        hyperparameters: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        duration_days: int = TRAINING_DURATION_DAYS,
+    ) -> TrainingJob:
+        """Met un entraînement en file ; lève OverflowError si trop de jobs sont déjà en attente."""
+        if self.active_jobs >= self.max_pending:
+            raise OverflowError(f"Trop de jobs d'entraînement en attente ({self.max_pending} maximum)")
+        self._ensure_started()
+        job = TrainingJob(model_id, str(machine_id))
+        job.cancel_event = self._manager.Event()
+        job.future = self._executor.submit(
+            run_training_job, job.id, job.machine_id, artifact_path, dict(hyperparameters or {}),
+            duration_days, self._progress, job.cancel_event, data,
+        )
+        self._jobs[job.id] = job
+        loop = asyncio.get_running_loop()
+        job.future.add_done_callback(lambda future: loop.call_soon_threadsafe(self._finish, job))
+        self._notify(job, "Job d'entraînement mis en file.")
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if not job.future.cancel():
+            job.cancel_event.set()
+        return True
+
+    def discard(self, job_ids) -> int:
+        """Oublie les jobs terminés parmi job_ids (avec leurs journaux) ; retourne le nombre de jobs oubliés."""
+        discarded = 0
+        for job_id in job_ids:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+                discarded += 1
+        return discarded
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, model_id: Optional[str] = None) -> List[TrainingJob]:
+        return [job for job in self._jobs.values() if model_id is None or job.model_id == model_id]
+
+    async def stop(self):
+        if self._executor is None:
+            return
+        for job in self._jobs.values():
+            if not job.finished:
+                self.cancel(job.id)
+        self._pump.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+        self._executor = self._manager = self._progress = self._pump = None
+
+    def _notify(self, job: TrainingJob, message: Optional[str]):
+        if message:
+            job.logs.append(message)
+        if self.on_update is not None:
+            try:
+                self.on_update(job, message)
+            except Exception as e:
+                logger.error(f"Training job {job.id} update callback failed: {e}")
+
+    def _drain_progress(self):
+        while True:
+            try:
+                job_id, fraction, message = self._progress.get_nowait()
+            except queue.Empty:
+                return
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                continue
+            if job.status == JOB_PENDING:
+                job.status = JOB_RUNNING
+                job.started_at = datetime.now(timezone.utc)
+            job.progress = fraction
+            self._notify(job, message)
+
+    async def _pump_progress(self):
+        while True:
+            await asyncio.sleep(0.2)
+            if any(not job.finished for job in self._jobs.values()):
+                self._drain_progress()
+
+    def _finish(self, job: TrainingJob):
+        self._drain_progress()
+        job.finished_at = datetime.now(timezone.utc)
+        future = job.future
+        if future.cancelled():
+            job.status = JOB_CANCELLED
+            self._notify(job, "Job d'entraînement annulé avant son démarrage.")
+            return
+        error = future.exception()
+        if isinstance(error, TrainingCancelled):
+            job.status = JOB_CANCELLED
+            self._notify(job, "Entraînement annulé.")
+        elif error is not None:
+            job.status = JOB_FAILED
+            job.error = str(error)
+            self._notify(job, f"Erreur: {error}")
+        else:
+            job.status = JOB_SUCCEEDED
+            job.progress = 1.0
+            job.result = future.result()
+            self._notify(job, "Entraînement terminé avec succès!")
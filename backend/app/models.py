@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, Numeric, Boolean, ForeignKey, func, ARRAY, JSON
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, Numeric, Boolean, ForeignKey, func, ARRAY, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -66,3 +66,16 @@ class User(UUIDMixin, TimestampMixin, Base):
     role = Column(String, nullable=False, default="technician")
 
     alerts_resolved = relationship("Alert", foreign_keys=[Alert.resolved_by_user_id], back_populates="resolved_by_user")
+
+class StateEvent(Base):
+    """Journal des changements d'état partagé entre les workers de l'API (voir state.py)."""
+    __tablename__ = "state_events"
+
+    # INTEGER sous SQLite, seul type de clé auto-incrémentée
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    origin = Column(String, nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # Destinataire : un worker (> 0) ou le propriétaire d'une partition (< 0) ; NULL pour tous les workers
+    target = Column(BigInteger, nullable=True)
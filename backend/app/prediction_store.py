@@ -0,0 +1,212 @@
+# backend/app/prediction_store.py
+
+import heapq
+import math
+import os
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from .sensor_store import datetime_to_ns, ns_to_datetime
+
+# Prédictions complètes conservées par machine : anomalies (avec leurs lectures) et normales (sans lectures)
+PREDICTION_ANOMALY_RETENTION = int(os.getenv("PREDICTION_ANOMALY_RETENTION", "1000"))
+PREDICTION_NORMAL_RETENTION = int(os.getenv("PREDICTION_NORMAL_RETENTION", "100"))
+# Résumés des prédictions par intervalle : durée d'un intervalle et nombre d'intervalles conservés par machine
+PREDICTION_SUMMARY_INTERVAL_SECONDS = int(os.getenv("PREDICTION_SUMMARY_INTERVAL_SECONDS", "60"))
+PREDICTION_SUMMARY_RETENTION = int(os.getenv("PREDICTION_SUMMARY_RETENTION", "1440"))
+PREDICTION_HISTOGRAM_BINS = int(os.getenv("PREDICTION_HISTOGRAM_BINS", "10"))
+# Plafond mémoire de l'ensemble du stockage des prédictions
+PREDICTION_MEMORY_BUDGET_MB = float(os.getenv("PREDICTION_MEMORY_BUDGET_MB", "256"))
+
+# Empreinte mesurée (tracemalloc, CPython 3.11) d'une AnomalyPrediction avec sensor_readings,
+# d'une prédiction normale sans lectures, et d'un résumé d'intervalle à 10 classes d'histogramme
+ANOMALY_RECORD_BYTES = 1400
+NORMAL_RECORD_BYTES = 600
+SUMMARY_BYTES = 250
+
+
+class IntervalSummary:
+    """Compteurs et histogramme des scores des prédictions d'un intervalle."""
+
+    __slots__ = ("start_ns", "count", "anomalies", "score_sum", "score_max", "histogram")
+
+    def __init__(self, start_ns: int, bins: int):
+        self.start_ns = start_ns
+        self.count = 0
+        self.anomalies = 0
+        self.score_sum = 0.0
+        self.score_max = 0.0
+        self.histogram = [0] * bins
+
+    def add(self, score: float, is_anomaly: bool):
+        self.count += 1
+        self.anomalies += is_anomaly
+        self.score_sum += score
+        self.score_max = max(self.score_max, score)
+        bins = len(self.histogram)
+        # Scores dans [0, 1] : la dernière classe inclut 1
+        self.histogram[min(max(int(score * bins), 0), bins - 1)] += 1
+
+    def to_dict(self, interval_seconds: int) -> Dict[str, Any]:
+        return {
+            "start": ns_to_datetime(self.start_ns),
+            "interval_seconds": interval_seconds,
+            "count": self.count,
+            "anomalies": self.anomalies,
+            "mean_score": self.score_sum / self.count if self.count else 0.0,
+            "max_score": self.score_max,
+            "score_histogram": list(self.histogram),
+        }
+
+
+class MachinePredictions:
+    __slots__ = ("anomalies", "normals", "summaries")
+
+    def __init__(self, anomaly_retention: int, normal_retention: int, summary_retention: int):
+        self.anomalies: Deque[Any] = deque(maxlen=anomaly_retention)
+        self.normals: Deque[Any] = deque(maxlen=normal_retention)
+        self.summaries: Deque[IntervalSummary] = deque(maxlen=summary_retention)
+
+
+class PredictionStore:
+    """
+    Historique borné des prédictions d'anomalies.
+
+    Par machine, seules les anomalies sont conservées en entier (avec leurs lectures), dans une
+    deque bornée ; les prédictions normales ne gardent qu'une courte fenêtre récente sans
+    sensor_readings, et toutes les prédictions alimentent des résumés par intervalle (compteurs,
+    score moyen/max, histogramme des scores). Les prédictions arrivant dans l'ordre chronologique,
+    les lectures « plus récentes d'abord » parcourent les deques à l'envers sans tri.
+
+    Empreinte mémoire par machine, au plus :
+        anomaly_retention * 1.4 Ko + normal_retention * 0.6 Ko + summary_retention * 0.25 Ko
+    soit environ 1.8 Mo avec les valeurs par défaut (1000, 100, 1440). Quand le parc ne tient plus
+    dans memory_budget_bytes, les trois rétentions sont réduites dans la même proportion pour toutes
+    les machines.
+    """
+
+    def __init__(
+        self,
+        anomaly_retention: int = PREDICTION_ANOMALY_RETENTION,
+        normal_retention: int = PREDICTION_NORMAL_RETENTION,
+        summary_interval_seconds: int = PREDICTION_SUMMARY_INTERVAL_SECONDS,
+        summary_retention: int = PREDICTION_SUMMARY_RETENTION,
+        histogram_bins: int = PREDICTION_HISTOGRAM_BINS,
+        memory_budget_bytes: int = int(PREDICTION_MEMORY_BUDGET_MB * 1024 * 1024),
+    ):
+        self.anomaly_retention = anomaly_retention
+        self.normal_retention = normal_retention
+        self.summary_interval_ns = summary_interval_seconds * 1_000_000_000
+        self.summary_retention = summary_retention
+        self.histogram_bins = histogram_bins
+        self.memory_budget_bytes = memory_budget_bytes
+        # Rétentions appliquées (anomalies, normales, résumés), réduites si le budget l'exige
+        self.effective_retention = (anomaly_retention, normal_retention, summary_retention)
+        self._machines: Dict[UUID, MachinePredictions] = {}
+
+    def ensure(self, machine_id: UUID) -> MachinePredictions:
+        machine = self._machines.get(machine_id)
+        if machine is None:
+            machine = self._machines[machine_id] = MachinePredictions(*self.effective_retention)
+            self._enforce_budget()
+        return machine
+
+    def _enforce_budget(self):
+        """Réduit proportionnellement les trois rétentions pour que le pire cas du parc tienne dans le budget."""
+        per_machine = (
+            self.anomaly_retention * ANOMALY_RECORD_BYTES
+            + self.normal_retention * NORMAL_RECORD_BYTES
+            + self.summary_retention * SUMMARY_BYTES
+        )
+        scale = min(1.0, self.memory_budget_bytes / max(len(self._machines) * per_machine, 1))
+        retention = (
+            max(int(self.anomaly_retention * scale), 1),
+            max(int(self.normal_retention * scale), 1),
+            max(int(self.summary_retention * scale), 1),
+        )
+        if retention == self.effective_retention:
+            return
+        self.effective_retention = retention
+        anomalies, normals, summaries = retention
+        for machine in self._machines.values():
+            machine.anomalies = deque(machine.anomalies, maxlen=anomalies)
+            machine.normals = deque(machine.normals, maxlen=normals)
+            machine.summaries = deque(machine.summaries, maxlen=summaries)
+
+    def add(self, prediction):
+        """Enregistre une prédiction (objet exposant machine_id, timestamp, anomaly_score, is_anomaly, sensor_readings)."""
+        machine = self.ensure(prediction.machine_id)
+        if prediction.is_anomaly:
+            machine.anomalies.append(prediction)
+        else:
+            prediction.sensor_readings = None
+            machine.normals.append(prediction)
+
+        timestamp_ns = datetime_to_ns(prediction.timestamp)
+        start_ns = timestamp_ns - timestamp_ns % self.summary_interval_ns
+        summaries = machine.summaries
+        if not summaries or summaries[-1].start_ns < start_ns:
+            summaries.append(IntervalSummary(start_ns, self.histogram_bins))
+            summary = summaries[-1]
+        else:
+            # Prédiction en retard : comptée dans son intervalle s'il existe encore
+            summary = next((s for s in reversed(summaries) if s.start_ns <= start_ns), None)
+            if summary is None or summary.start_ns != start_ns:
+                return
+        summary.add(float(prediction.anomaly_score), bool(prediction.is_anomaly))
+
+    def latest(self, machine_id: UUID, limit: Optional[int] = None, is_anomaly: Optional[bool] = None) -> List[Any]:
+        """Prédictions conservées d'une machine, les plus récentes d'abord."""
+        machine = self._machines.get(machine_id)
+        if machine is None:
+            return []
+        if is_anomaly is True:
+            predictions: Iterator[Any] = reversed(machine.anomalies)
+        elif is_anomaly is False:
+            predictions = reversed(machine.normals)
+        else:
+            predictions = heapq.merge(
+                reversed(machine.anomalies), reversed(machine.normals),
+                key=lambda prediction: prediction.timestamp, reverse=True,
+            )
+        return list(islice(predictions, limit))
+
+    def summaries(self, machine_id: UUID, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Résumés par intervalle d'une machine, du plus ancien au plus récent."""
+        machine = self._machines.get(machine_id)
+        if machine is None:
+            return []
+        interval_seconds = self.summary_interval_ns // 1_000_000_000
+        since_ns = datetime_to_ns(since) if since is not None else -math.inf
+        return [
+            summary.to_dict(interval_seconds)
+            for summary in machine.summaries
+            if summary.start_ns + self.summary_interval_ns > since_ns
+        ]
+
+    def __contains__(self, machine_id: UUID) -> bool:
+        return machine_id in self._machines
+
+    def estimated_nbytes(self) -> int:
+        return sum(
+            len(machine.anomalies) * ANOMALY_RECORD_BYTES
+            + len(machine.normals) * NORMAL_RECORD_BYTES
+            + len(machine.summaries) * SUMMARY_BYTES
+            for machine in self._machines.values()
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "machines": len(self._machines),
+            "anomalies_kept": sum(len(machine.anomalies) for machine in self._machines.values()),
+            "normals_kept": sum(len(machine.normals) for machine in self._machines.values()),
+            "summaries_kept": sum(len(machine.summaries) for machine in self._machines.values()),
+            "anomaly_retention": self.effective_retention[0],
+            "normal_retention": self.effective_retention[1],
+            "summary_retention": self.effective_retention[2],
+            "estimated_bytes": self.estimated_nbytes(),
+            "memory_budget_bytes": self.memory_budget_bytes,
+        }
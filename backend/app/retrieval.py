@@ -0,0 +1,326 @@
+# backend/app/retrieval.py
+
+import math
+import os
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from .sensor_store import datetime_to_ns, ns_to_datetime
+
+# Paramètres BM25 : saturation de la fréquence d'un terme et normalisation par la longueur du document
+RETRIEVAL_BM25_K1 = float(os.getenv("RETRIEVAL_BM25_K1", "1.2"))
+RETRIEVAL_BM25_B = float(os.getenv("RETRIEVAL_BM25_B", "0.75"))
+# Avec sort=recent, seuls les documents dont le score atteint cette fraction du meilleur score sont triés par date
+RETRIEVAL_RECENT_MIN_SCORE_RATIO = float(os.getenv("RETRIEVAL_RECENT_MIN_SCORE_RATIO", "0.5"))
+# Termes présents dans plus de cette fraction des documents d'un shard ignorés si la requête en a de plus rares
+RETRIEVAL_MAX_DF_RATIO = float(os.getenv("RETRIEVAL_MAX_DF_RATIO", "0.5"))
+# Documents par machine au-delà desquels la moitié la plus ancienne est retirée de l'index
+RETRIEVAL_MAX_DOCUMENTS_PER_SHARD = int(os.getenv("RETRIEVAL_MAX_DOCUMENTS_PER_SHARD", "1000000"))
+
+# Types de documents indexés
+KIND_ALERT = "alert"
+KIND_TRAINING_LOG = "training_log"
+KINDS = (KIND_ALERT, KIND_TRAINING_LOG)
+SORTS = ("relevance", "recent")
+
+# Mots vides (sans accents, comme les termes indexés), ignorés à l'indexation et dans les requêtes
+STOPWORDS = frozenset(
+    "a au aux avec ce ces dans de des du elle en est et il ils je la le les leur lui ma mais me mes "
+    "mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sont sur ta te tes ton tu un une "
+    "vos votre vous quand quel quelle quels quelles comment combien derniere dernier dernieres derniers "
+    "fois eu ete etait the of and to is was when last did".split()
+)
+# Formulations des questions ramenées au vocabulaire des alertes (appliqué aux termes normalisés)
+QUERY_SYNONYMS = {
+    "surchauffe": "temperature", "chauffe": "temperature", "chaud": "temperature", "overheat": "temperature",
+    "overheated": "temperature", "vibre": "vibration", "vibrations": "vibration", "pressure": "pression",
+    "current": "courant", "intensite": "courant",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9_]+")
+
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents : « Température » et « temperature » sont le même terme."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Termes d'un texte : mots de deux lettres ou plus hors mots vides, pluriels en -s réduits."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(normalize(text)):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def query_terms(text: str) -> List[str]:
+    return [QUERY_SYNONYMS.get(token, token) for token in tokenize(text)]
+
+
+def _strings(value: Any) -> Iterator[str]:
+    """Chaînes contenues dans une valeur de details (les nombres, UUID et dates ne sont pas indexés)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+
+
+def alert_text(alert) -> str:
+    """Texte indexé d'une alerte : message, type et chaînes de details (labels...)."""
+    return " ".join([alert.message, alert.type, *_strings(alert.details or {})])
+
+
+def log_timestamp(line: str) -> Optional[datetime]:
+    """Horodatage en tête d'une ligne de training_logs (« 2023-10-26 10:00:00 - ... » ou ISO 8601), en UTC."""
+    try:
+        timestamp = datetime.fromisoformat(line.split(" - ", 1)[0].strip())
+    except ValueError:
+        return None
+    return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=timezone.utc)
+
+
+class Document(NamedTuple):
+    kind: str
+    # id de l'alerte, ou id du modèle pour une ligne de training_logs
+    ref: Any
+    text: str
+    severity: Optional[str]
+
+
+class Hit(NamedTuple):
+    kind: str
+    ref: Any
+    machine_id: Optional[UUID]
+    timestamp: Optional[datetime]
+    score: float
+    text: str
+    severity: Optional[str]
+
+
+class Postings:
+    """Documents contenant un terme (rangs croissants) et fréquence du terme dans chacun, en tableaux compacts."""
+
+    __slots__ = ("docs", "tfs")
+
+    def __init__(self):
+        self.docs = array("i")
+        self.tfs = array("H")
+
+
+class Shard:
+    """
+    Index inversé BM25 des documents d'une machine. Les documents reçoivent des rangs croissants
+    dans l'ordre d'indexation ; longueurs, timestamps et types sont tenus dans des tableaux
+    compacts, lus sans copie par NumPy au moment de la requête.
+    """
+
+    def __init__(self, max_documents: int = RETRIEVAL_MAX_DOCUMENTS_PER_SHARD):
+        self.max_documents = max_documents
+        self.terms: Dict[str, Postings] = {}
+        self.documents: List[Document] = []
+        self.lengths = array("I")
+        self.timestamps = array("q")
+        self.kinds = array("b")
+        self.total_length = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, document: Document, tokens: Sequence[str], timestamp_ns: int):
+        if len(self.documents) >= self.max_documents:
+            self._evict(len(self.documents) // 2)
+        doc = len(self.documents)
+        for term, tf in Counter(tokens).items():
+            postings = self.terms.get(term)
+            if postings is None:
+                postings = self.terms[term] = Postings()
+            postings.docs.append(doc)
+            postings.tfs.append(min(tf, 65535))
+        self.documents.append(document)
+        self.lengths.append(len(tokens))
+        self.timestamps.append(timestamp_ns)
+        self.kinds.append(KINDS.index(document.kind))
+        self.total_length += len(tokens)
+
+    def _evict(self, count: int):
+        """Retire les count documents les plus anciens et renumérote les autres."""
+        for term in list(self.terms):
+            postings = self.terms[term]
+            docs = np.frombuffer(postings.docs, dtype=np.int32)
+            keep = int(np.searchsorted(docs, count))
+            if keep == len(docs):
+                del self.terms[term]
+                continue
+            shifted = array("i", (docs[keep:] - count).tobytes())
+            tfs = postings.tfs[keep:]
+            del docs
+            postings.docs, postings.tfs = shifted, tfs
+        del self.documents[:count]
+        self.total_length -= sum(self.lengths[:count])
+        del self.lengths[:count]
+        del self.timestamps[:count]
+        del self.kinds[:count]
+        self.evicted += count
+
+    def search(self, terms: Sequence[str], limit: int, sort: str = "relevance", kind: Optional[str] = None,
+               since_ns: Optional[int] = None, k1: float = RETRIEVAL_BM25_K1, b: float = RETRIEVAL_BM25_B,
+               exclude: Any = None) -> Tuple[bool, List[Tuple[float, int, int]]]:
+        """
+        (score, timestamp_ns, rang) des limit meilleurs documents contenant au moins un terme,
+        par score BM25 décroissant ou, avec sort="recent", du plus récent au plus ancien parmi les
+        documents proches du meilleur score (RETRIEVAL_RECENT_MIN_SCORE_RATIO). Le booléen indique
+        si des termes sélectifs ont servi (sinon seuls des termes quasi universels correspondent).
+        """
+        n = len(self.documents)
+        query = [(term, count) for term, count in Counter(terms).items() if term in self.terms]
+        if not n or not query or limit <= 0:
+            return False, []
+        # Les termes quasi universels (« seuil », « depasse ») ont un idf presque nul mais les plus longues listes
+        selective = [(term, count) for term, count in query if len(self.terms[term].docs) <= RETRIEVAL_MAX_DF_RATIO * n]
+        query = selective or query
+        selected = bool(selective)
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+        average = self.total_length / n or 1.0
+        scores = np.zeros(n, dtype=np.float64)
+        for term, count in query:
+            postings = self.terms[term]
+            docs = np.frombuffer(postings.docs, dtype=np.int32)
+            tfs = np.frombuffer(postings.tfs, dtype=np.uint16).astype(np.float64)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1 - b + b * lengths[docs] / average)
+            # Un document n'apparaît qu'une fois par liste : += indexé est sûr
+            scores[docs] += count * idf * tfs * (k1 + 1) / (tfs + norm)
+
+        timestamps = np.frombuffer(self.timestamps, dtype=np.int64)
+        candidates = np.flatnonzero(scores > 0)
+        if kind is not None:
+            kinds = np.frombuffer(self.kinds, dtype=np.int8)
+            candidates = candidates[kinds[candidates] == KINDS.index(kind)]
+        if since_ns is not None:
+            candidates = candidates[timestamps[candidates] >= since_ns]
+        if not len(candidates):
+            return selected, []
+        if sort == "recent":
+            # Les documents qui ne partagent que des termes courants (« seuil », « dépasse ») ne sont pas retenus
+            candidates = candidates[scores[candidates] >= RETRIEVAL_RECENT_MIN_SCORE_RATIO * scores[candidates].max()]
+
+        keys = timestamps[candidates] if sort == "recent" else scores[candidates]
+        # Un document de plus quand la référence exclue peut en faire partie
+        wanted = min(limit + (exclude is not None), len(candidates))
+        if wanted < len(candidates):
+            top = np.argpartition(-keys, wanted - 1)[:wanted]
+            candidates, keys = candidates[top], keys[top]
+        order = np.argsort(-keys, kind="stable")
+        results = [(float(scores[doc]), int(timestamps[doc]), int(doc)) for doc in candidates[order].tolist()]
+        if exclude is not None:
+            results = [result for result in results if self.documents[result[2]].ref != exclude]
+        return selected, results[:limit]
+
+    @property
+    def postings(self) -> int:
+        return sum(len(postings.docs) for postings in self.terms.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Taille des tableaux de l'index (hors dictionnaire des termes et documents)."""
+        arrays = (self.lengths, self.timestamps, self.kinds)
+        return sum(len(a) * a.itemsize for a in arrays) + self.postings * 6
+
+
+class RetrievalIndex:
+    """
+    Recherche locale (BM25, sans service externe) dans l'historique des alertes (message, type,
+    chaînes de details) et les training_logs des modèles. Un shard par machine, mis à jour à
+    chaque alerte ou ligne de journal ; les lignes de journal sans machine vont dans le shard None.
+
+    Une recherche sur une machine ne lit que son shard ; une recherche sur tout le parc interroge
+    chaque shard (statistiques BM25 propres au shard) puis fusionne les meilleurs résultats.
+    """
+
+    def __init__(self, max_documents_per_shard: int = RETRIEVAL_MAX_DOCUMENTS_PER_SHARD):
+        self.max_documents_per_shard = max_documents_per_shard
+        self._shards: Dict[Optional[UUID], Shard] = {}
+        self.queries = 0
+
+    def _shard(self, machine_id: Optional[UUID]) -> Shard:
+        shard = self._shards.get(machine_id)
+        if shard is None:
+            shard = self._shards[machine_id] = Shard(self.max_documents_per_shard)
+        return shard
+
+    def add_alert(self, alert):
+        self._shard(alert.machine_id).add(
+            Document(KIND_ALERT, alert.id, alert.message, alert.severity), tokenize(alert_text(alert)),
+            datetime_to_ns(alert.timestamp),
+        )
+
+    def add_training_log(self, model_id: str, line: str, timestamp: Optional[datetime] = None,
+                         machine_id: Optional[UUID] = None):
+        timestamp_ns = datetime_to_ns(timestamp) if timestamp is not None else 0
+        self._shard(machine_id).add(Document(KIND_TRAINING_LOG, model_id, line, None), tokenize(line), timestamp_ns)
+
+    def search(self, query: str, machine_id: Optional[UUID] = None, kind: Optional[str] = None,
+               sort: str = "relevance", limit: int = 10, since: Optional[datetime] = None,
+               exclude: Any = None) -> List[Hit]:
+        """Documents correspondant à la requête, d'une machine ou de tout le parc (machine_id=None)."""
+        self.queries += 1
+        terms = query_terms(query)
+        since_ns = datetime_to_ns(since) if since is not None else None
+        if machine_id is not None:
+            shards: Iterable[Tuple[Optional[UUID], Shard]] = [(machine_id, self._shards[machine_id])] if machine_id in self._shards else []
+        else:
+            shards = self._shards.items()
+        found = []
+        for shard_id, shard in shards:
+            selected, results = shard.search(terms, limit, sort, kind, since_ns, exclude=exclude)
+            for score, timestamp_ns, doc in results:
+                found.append((selected, (timestamp_ns if sort == "recent" else score), shard_id, shard, score, timestamp_ns, doc))
+        if any(item[0] for item in found):
+            # Scores non comparables : un shard qui ne trouve que « seuil », « depasse » est écarté
+            found = [item for item in found if item[0]]
+        if sort == "recent" and found:
+            # Même seuil entre shards : une machine sans document pertinent ne remonte pas ses meilleurs à-peu-près
+            best = max(item[4] for item in found)
+            found = [item for item in found if item[4] >= RETRIEVAL_RECENT_MIN_SCORE_RATIO * best]
+        found.sort(key=lambda item: item[1], reverse=True)
+        hits = []
+        for _, _, shard_id, shard, score, timestamp_ns, doc in found[:limit]:
+            document = shard.documents[doc]
+            hits.append(Hit(document.kind, document.ref, shard_id, ns_to_datetime(timestamp_ns) if timestamp_ns else None,
+                            round(score, 4), document.text, document.severity))
+        return hits
+
+    def similar(self, alert, limit: int = 5, same_machine: bool = True) -> List[Hit]:
+        """Alertes les plus proches d'une alerte (son texte sert de requête), elle-même exclue."""
+        return self.search(alert_text(alert), machine_id=alert.machine_id if same_machine else None, kind=KIND_ALERT,
+                           limit=limit, exclude=alert.id)
+
+    def metrics(self) -> Dict[str, Any]:
+        shards = list(self._shards.values())
+        return {
+            "shards": len(shards),
+            "documents": sum(len(shard) for shard in shards),
+            "terms": sum(len(shard.terms) for shard in shards),
+            "postings": sum(shard.postings for shard in shards),
+            "evicted": sum(shard.evicted for shard in shards),
+            "index_bytes": sum(shard.nbytes for shard in shards),
+            "queries": self.queries,
+            "max_documents_per_shard": self.max_documents_per_shard,
+        }
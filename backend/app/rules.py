@@ -0,0 +1,211 @@
+# backend/app/rules.py
+
+import os
+from typing import Dict, Hashable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Canaux évalués, dans l'ordre des colonnes des matrices de lectures
+CHANNELS = ("temperature", "vibration", "pressure", "current")
+
+# Règles de seuil : (clé de configuration, seuil par défaut, poids, rend l'alerte critique, libellé, unité)
+# L'ordre est celui des contrôles historiques de predict_anomaly_internal : il fixe l'ordre
+# des additions du score (et donc son arrondi) ainsi que l'ordre des messages.
+THRESHOLD_RULES = (
+    ("temperature_critique", 90.0, 0.4, True, "Température", "°C"),
+    ("vibration_max", 20.0, 0.3, True, "Vibration", ""),
+    ("pressure_max", 7.0, 0.15, False, "Pression", ""),
+    ("current_max", 35.0, 0.15, True, "Courant", ""),
+)
+
+# Autres clés acceptées pour le seuil haut d'un canal (par ordre de priorité après la clé historique) ;
+# le seuil bas d'un canal se configure avec la clé "<canal>_min"
+UPPER_BOUND_ALIASES = {
+    "temperature": ("temperature_max",),
+}
+
+SEVERITY_WARNING = "Avertissement"
+SEVERITY_CRITICAL = "Critique"
+SEVERITY_EMERGENCY = "Urgence"
+
+
+def _env_mapping(name: str) -> Dict[str, float]:
+    """Lit une variable "canal=valeur,canal=valeur" (ex. RULE_WEIGHTS="temperature=0.5,vibration=0.2")."""
+    mapping = {}
+    for item in filter(None, os.getenv(name, "").split(",")):
+        channel, _, value = item.partition("=")
+        mapping[channel.strip()] = float(value)
+    return mapping
+
+
+# Poids des canaux dans le score, canaux qui rendent une alerte critique, et seuils de score des sévérités.
+# Un poids peut aussi être fixé par machine avec la clé "<canal>_weight" de thresholds_config.
+RULE_WEIGHTS = {**{channel: rule[2] for channel, rule in zip(CHANNELS, THRESHOLD_RULES)}, **_env_mapping("RULE_WEIGHTS")}
+RULE_CRITICAL_CHANNELS = tuple(
+    os.getenv("RULE_CRITICAL_CHANNELS", ",".join(channel for channel, rule in zip(CHANNELS, THRESHOLD_RULES) if rule[3])).split(",")
+)
+RULE_EMERGENCY_SCORE = float(os.getenv("RULE_EMERGENCY_SCORE", "0.7"))
+RULE_CRITICAL_SCORE = float(os.getenv("RULE_CRITICAL_SCORE", "0.4"))
+
+
+class CompiledRules(NamedTuple):
+    """Règles d'une machine compilées en vecteurs, dans l'ordre de CHANNELS."""
+    lower: np.ndarray
+    upper: np.ndarray
+    weights: np.ndarray
+    critical: np.ndarray
+    # Pour les messages : (clé, valeur affichée) des seuils haut et bas de chaque canal
+    upper_keys: Tuple[Tuple[str, object], ...]
+    lower_keys: Tuple[Tuple[str, object], ...]
+
+
+class RuleResult(NamedTuple):
+    exceeded: np.ndarray  # (n, canaux) seuil haut dépassé
+    below: np.ndarray  # (n, canaux) sous le seuil bas
+    scores: np.ndarray  # (n,) somme des poids des canaux en défaut, plafonnée à 1
+    severities: np.ndarray  # (n,)
+
+    @property
+    def violated(self) -> np.ndarray:
+        return self.exceeded | self.below
+
+
+def compile_rules(
+    thresholds_config: Mapping[str, float],
+    weights: Mapping[str, float] = RULE_WEIGHTS,
+    critical_channels: Sequence[str] = RULE_CRITICAL_CHANNELS,
+) -> CompiledRules:
+    """
+    Compile la configuration de seuils d'une machine. Seuil haut : clé historique
+    (temperature_critique, vibration_max...), puis ses alias (temperature_max), puis la valeur
+    par défaut ; seuil bas : "<canal>_min", sans seuil bas par défaut.
+    """
+    lower, upper, channel_weights, upper_keys, lower_keys = [], [], [], [], []
+    for channel, (key, default, *_) in zip(CHANNELS, THRESHOLD_RULES):
+        upper_key = next((k for k in (key, *UPPER_BOUND_ALIASES.get(channel, ())) if k in thresholds_config), key)
+        upper.append(float(thresholds_config.get(upper_key, default)))
+        upper_keys.append((upper_key, thresholds_config.get(upper_key, "N/A")))
+        lower_key = f"{channel}_min"
+        lower.append(float(thresholds_config.get(lower_key, -np.inf)))
+        lower_keys.append((lower_key, thresholds_config.get(lower_key, "N/A")))
+        channel_weights.append(float(thresholds_config.get(f"{channel}_weight", weights.get(channel, 0.0))))
+    return CompiledRules(
+        lower=np.array(lower),
+        upper=np.array(upper),
+        weights=np.array(channel_weights),
+        critical=np.array([channel in critical_channels for channel in CHANNELS]),
+        upper_keys=tuple(upper_keys),
+        lower_keys=tuple(lower_keys),
+    )
+
+
+class RuleEngine:
+    """
+    Moteur de règles de seuils pour tout le parc.
+
+    La configuration de chaque machine est compilée une fois, à sa première évaluation ou après
+    invalidate() (appelé par le code qui modifie thresholds_config), en une ligne de matrices (seuils bas, seuils hauts, poids, canaux critiques)
+    partagées par toutes les machines. Un lot de lectures de plusieurs machines est ensuite
+    évalué par une comparaison vectorisée contre les lignes de ses machines.
+    """
+
+    def __init__(
+        self,
+        weights: Mapping[str, float] = RULE_WEIGHTS,
+        critical_channels: Sequence[str] = RULE_CRITICAL_CHANNELS,
+        emergency_score: float = RULE_EMERGENCY_SCORE,
+        critical_score: float = RULE_CRITICAL_SCORE,
+    ):
+        self.weights = dict(weights)
+        self.critical_channels = tuple(critical_channels)
+        self.emergency_score = emergency_score
+        self.critical_score = critical_score
+        self._rows: Dict[Hashable, int] = {}
+        # Machines dont la configuration a changé depuis leur dernière compilation
+        self._stale: Set[Hashable] = set()
+        self._compiled: List[CompiledRules] = []
+        capacity = 16
+        self.lower = np.empty((capacity, len(CHANNELS)))
+        self.upper = np.empty((capacity, len(CHANNELS)))
+        self.weight_matrix = np.empty((capacity, len(CHANNELS)))
+        self.critical = np.empty((capacity, len(CHANNELS)), dtype=bool)
+        self.compilations = 0
+
+    def row(self, machine_id: Hashable, thresholds_config: Mapping[str, float]) -> int:
+        """Ligne des règles d'une machine, compilée à sa première évaluation ou après invalidate()."""
+        row = self._rows.get(machine_id)
+        if row is not None and machine_id not in self._stale:
+            return row
+        compiled = compile_rules(thresholds_config, self.weights, self.critical_channels)
+        if row is None:
+            row = self._rows[machine_id] = len(self._compiled)
+            self._compiled.append(compiled)
+            if row == len(self.lower):
+                self._grow()
+        else:
+            self._compiled[row] = compiled
+        self.lower[row], self.upper[row] = compiled.lower, compiled.upper
+        self.weight_matrix[row], self.critical[row] = compiled.weights, compiled.critical
+        self._stale.discard(machine_id)
+        self.compilations += 1
+        return row
+
+    def invalidate(self, machine_id: Hashable):
+        """Force la recompilation des règles d'une machine à sa prochaine évaluation (thresholds_config modifié)."""
+        if machine_id in self._rows:
+            self._stale.add(machine_id)
+
+    def _grow(self):
+        for name in ("lower", "upper", "weight_matrix", "critical"):
+            matrix = getattr(self, name)
+            grown = np.empty((len(matrix) * 2, matrix.shape[1]), dtype=matrix.dtype)
+            grown[:len(matrix)] = matrix
+            setattr(self, name, grown)
+
+    def evaluate(self, rows: np.ndarray, values: np.ndarray) -> RuleResult:
+        """
+        Évalue un lot : values est une matrice (n, len(CHANNELS)), rows la ligne de règles de chaque lecture.
+        """
+        exceeded = values > self.upper[rows]
+        below = values < self.lower[rows]
+        violated = exceeded | below
+        weights = self.weight_matrix[rows]
+        # Addition colonne par colonne, dans l'ordre des règles : même arrondi que les contrôles historiques
+        scores = np.zeros(len(values), dtype=np.float64)
+        for col in range(len(CHANNELS)):
+            scores += np.where(violated[:, col], weights[:, col], 0.0)
+        critical = (violated & self.critical[rows]).any(axis=1)
+        severities = np.where(
+            scores > self.emergency_score,
+            SEVERITY_EMERGENCY,
+            np.where(critical | (scores > self.critical_score), SEVERITY_CRITICAL, SEVERITY_WARNING),
+        )
+        return RuleResult(exceeded, below, np.minimum(scores, 1.0), severities)
+
+    def signature(self, exceeded: Sequence[bool], below: Sequence[bool]) -> str:
+        """Identifiant des règles en défaut d'une lecture (ex. "temperature_max+pressure_min")."""
+        parts = []
+        for channel, high, low in zip(CHANNELS, exceeded, below):
+            if high:
+                parts.append(f"{channel}_max")
+            if low:
+                parts.append(f"{channel}_min")
+        return "+".join(parts)
+
+    def message(self, row: int, values: Sequence[float], exceeded: Sequence[bool], below: Sequence[bool]) -> str:
+        """Message d'alerte d'une lecture à partir de ses dépassements."""
+        compiled = self._compiled[row]
+        message_parts = []
+        for col, (_, _, _, _, label, unit) in enumerate(THRESHOLD_RULES):
+            if exceeded[col]:
+                key, threshold = compiled.upper_keys[col]
+                qualifier = "critique" if key.endswith("_critique") else "maximal"
+                message_parts.append(f"{label} ({values[col]:.1f}{unit}) dépasse le seuil {qualifier} ({threshold}{unit}).")
+            if below[col]:
+                _, threshold = compiled.lower_keys[col]
+                message_parts.append(f"{label} ({values[col]:.1f}{unit}) est sous le seuil minimal ({threshold}{unit}).")
+        return " et ".join(message_parts)
+
+    def compiled(self, machine_id: Hashable) -> Optional[CompiledRules]:
+        row = self._rows.get(machine_id)
+        return self._compiled[row] if row is not None else None
@@ -0,0 +1,223 @@
+# backend/app/sensor_store.py
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+# Colonnes numériques stockées pour chaque lecture (operating_hours absent = NaN)
+COLUMNS = ("temperature", "vibration", "pressure", "current", "operating_hours")
+
+# Rétention par défaut : nombre de points par machine, et âge maximal (0 = pas de limite d'âge)
+SENSOR_RETENTION_POINTS = int(os.getenv("SENSOR_RETENTION_POINTS", "1000"))
+SENSOR_RETENTION_SECONDS = float(os.getenv("SENSOR_RETENTION_SECONDS", "0"))
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def datetime_to_ns(value: datetime) -> int:
+    """Convertit un datetime en nanosecondes depuis l'epoch (un datetime naïf est supposé UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def ns_to_datetime(value: int) -> datetime:
+    """Convertit des nanosecondes depuis l'epoch en datetime UTC (précision microseconde)."""
+    return EPOCH + timedelta(microseconds=int(value) // 1000)
+
+
+class SensorRingBuffer:
+    """
+    Historique borné des lectures d'une machine, stocké en colonnes NumPy préallouées :
+    un tableau int64 de timestamps (ns depuis l'epoch), une ligne float64 par canal et le
+    numéro d'ingestion (seq) de chaque lecture, qui sert de curseur aux lectures incrémentales.
+
+    Les points retenus occupent toujours une plage contiguë [start, end) des tableaux, triée
+    par timestamp, ce qui permet d'exposer des vues sans copie et de répondre aux requêtes
+    temporelles par dichotomie. Une marge est allouée au-delà de la capacité :
+    quand elle est épuisée, les points retenus sont ramenés en tête (compactage amorti).
+    """
+
+    def __init__(self, capacity: int = SENSOR_RETENTION_POINTS, max_age_seconds: float = SENSOR_RETENTION_SECONDS):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.max_age_ns = int(max_age_seconds * 1e9) if max_age_seconds > 0 else 0
+        size = capacity + max(capacity // 4, 16)
+        self._timestamps = np.empty(size, dtype=np.int64)
+        self._seqs = np.zeros(size, dtype=np.int64)
+        self._values = np.full((len(COLUMNS), size), np.nan, dtype=np.float64)
+        # Les labels sont rares : un pointeur par emplacement, None le plus souvent
+        self._labels = np.full(size, None, dtype=object)
+        self._start = 0
+        self._end = 0
+        # seq de la dernière lecture conservée : change à chaque modification du tampon
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire préallouée par le tampon (hors objets labels eux-mêmes)."""
+        return self._timestamps.nbytes + self._seqs.nbytes + self._values.nbytes + self._labels.nbytes
+
+    def _compact(self):
+        count = len(self)
+        self._timestamps[:count] = self._timestamps[self._start:self._end]
+        self._seqs[:count] = self._seqs[self._start:self._end]
+        self._values[:, :count] = self._values[:, self._start:self._end]
+        self._labels[:count] = self._labels[self._start:self._end]
+        self._labels[count:] = None
+        self._start, self._end = 0, count
+
+    def _evict(self, count: int):
+        self._labels[self._start:self._start + count] = None
+        self._start += count
+
+    def append(self, timestamp_ns: int, values: Sequence[Optional[float]], labels: Optional[List[str]] = None, seq: Optional[int] = None):
+        """
+        Ajoute une lecture en conservant l'ordre des timestamps ; values suit l'ordre de COLUMNS.
+        seq est le numéro d'ingestion de la lecture (par défaut, celui qui suit la version courante).
+        Une lecture en retard est insérée à sa place (recherche dichotomique puis décalage des
+        seules lectures plus récentes) ; si elle est plus ancienne que tout ce que la rétention
+        conserve, elle est ignorée.
+        """
+        count = len(self)
+        if count and timestamp_ns < self._timestamps[self._end - 1]:
+            pos = self._start + int(np.searchsorted(self.timestamps(), timestamp_ns, side="right"))
+            if pos == self._start and count >= self.capacity:
+                return
+            if self.max_age_ns and timestamp_ns < self._timestamps[self._end - 1] - self.max_age_ns:
+                return
+        else:
+            pos = self._end
+
+        if self._end == len(self._timestamps):
+            pos -= self._start
+            self._compact()
+        if pos < self._end:
+            self._timestamps[pos + 1:self._end + 1] = self._timestamps[pos:self._end]
+            self._seqs[pos + 1:self._end + 1] = self._seqs[pos:self._end]
+            self._values[:, pos + 1:self._end + 1] = self._values[:, pos:self._end]
+            self._labels[pos + 1:self._end + 1] = self._labels[pos:self._end]
+        self._timestamps[pos] = timestamp_ns
+        self.version = seq if seq is not None else self.version + 1
+        self._seqs[pos] = self.version
+        self._values[:, pos] = [np.nan if v is None else v for v in values]
+        self._labels[pos] = labels or None
+        self._end += 1
+
+        if len(self) > self.capacity:
+            self._evict(len(self) - self.capacity)
+        if self.max_age_ns:
+            cutoff = self._timestamps[self._end - 1] - self.max_age_ns
+            expired = int(np.searchsorted(self.timestamps(), cutoff, side="left"))
+            if expired:
+                self._evict(expired)
+
+    def range(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Positions [lo, hi) des lectures dont le timestamp est dans [start_ns, end_ns],
+        trouvées par dichotomie : O(log n).
+        """
+        timestamps = self.timestamps()
+        lo = int(np.searchsorted(timestamps, start_ns, side="left")) if start_ns is not None else 0
+        hi = int(np.searchsorted(timestamps, end_ns, side="right")) if end_ns is not None else len(timestamps)
+        return lo, max(lo, hi)
+
+    def timestamps(self) -> np.ndarray:
+        """Vue (sans copie) des timestamps retenus, en ns depuis l'epoch."""
+        return self._timestamps[self._start:self._end]
+
+    def seqs(self) -> np.ndarray:
+        """Vue (sans copie) des numéros d'ingestion des lectures retenues (non triés si des lectures sont arrivées en retard)."""
+        return self._seqs[self._start:self._end]
+
+    def since(self, seq: int, lo: int = 0, hi: Optional[int] = None, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Positions, parmi [lo, hi), des lectures ingérées après le curseur seq,
+        dans l'ordre d'ingestion (les `limit` premières).
+        """
+        seqs = self.seqs()
+        positions = lo + np.flatnonzero(seqs[lo:hi] > seq)
+        positions = positions[np.argsort(seqs[positions], kind="stable")]
+        return positions[:limit] if limit is not None else positions
+
+    def column(self, name: str) -> np.ndarray:
+        """Vue (sans copie) d'un canal."""
+        return self._values[COLUMNS.index(name), self._start:self._end]
+
+    def labels(self) -> np.ndarray:
+        return self._labels[self._start:self._end]
+
+    def view(self, lo: int = 0, hi: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Vues de toutes les colonnes sur la plage [lo, hi) des points retenus."""
+        count = len(self)
+        lo, hi, _ = slice(lo, hi).indices(count)
+        base = self._start
+        columns = {"timestamp": self._timestamps[base + lo:base + hi]}
+        for row, name in enumerate(COLUMNS):
+            columns[name] = self._values[row, base + lo:base + hi]
+        return columns
+
+    def records(self, indices: Sequence[int]) -> Iterator[Dict[str, Any]]:
+        """Reconstruit des lectures (dict) pour les positions données, dans l'ordre fourni."""
+        indices = np.asarray(indices, dtype=np.intp) + self._start
+        timestamps = self._timestamps[indices].tolist()
+        columns = self._values[:, indices].tolist()
+        labels = self._labels[indices]
+        for i, ts in enumerate(timestamps):
+            record = {"timestamp": ns_to_datetime(ts)}
+            for row, name in enumerate(COLUMNS):
+                record[name] = columns[row][i]
+            if record["operating_hours"] != record["operating_hours"]:  # NaN
+                record["operating_hours"] = None
+            record["labels"] = labels[i]
+            yield record
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        if not len(self):
+            return None
+        return next(self.records([len(self) - 1]))
+
+
+class SensorDataStore:
+    """Un SensorRingBuffer par machine, avec une politique de rétention commune."""
+
+    def __init__(self, retention_points: int = SENSOR_RETENTION_POINTS, retention_seconds: float = SENSOR_RETENTION_SECONDS):
+        self.retention_points = retention_points
+        self.retention_seconds = retention_seconds
+        self._buffers: Dict[UUID, SensorRingBuffer] = {}
+        # Numéro d'ingestion de la dernière lecture, commun à toutes les machines et strictement croissant
+        self.seq = 0
+
+    def __contains__(self, machine_id: UUID) -> bool:
+        return machine_id in self._buffers
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def ensure(self, machine_id: UUID) -> SensorRingBuffer:
+        buffer = self._buffers.get(machine_id)
+        if buffer is None:
+            buffer = self._buffers[machine_id] = SensorRingBuffer(self.retention_points, self.retention_seconds)
+        return buffer
+
+    def get(self, machine_id: UUID) -> Optional[SensorRingBuffer]:
+        return self._buffers.get(machine_id)
+
+    def append(self, machine_id: UUID, timestamp: datetime, values: Sequence[Optional[float]], labels: Optional[List[str]] = None):
+        self.seq += 1
+        self.ensure(machine_id).append(datetime_to_ns(timestamp), values, labels, seq=self.seq)
+
+    def latest(self, machine_id: UUID) -> Optional[Dict[str, Any]]:
+        buffer = self._buffers.get(machine_id)
+        return buffer.latest() if buffer is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self._buffers.values())
@@ -0,0 +1,84 @@
+# backend/app/serialization.py
+
+import json
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .sensor_store import COLUMNS, SensorRingBuffer
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur json, plus lent
+    orjson = None
+
+# Formats de réponse des lectures : une liste d'objets, ou un objet de colonnes
+RESPONSE_FORMATS = ("rows", "columnar")
+
+
+def dumps(content: Any) -> bytes:
+    """Sérialise en JSON ; les tableaux NumPy sont acceptés et NaN devient null."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z)
+    return json.dumps(_replace_nan(content), separators=(",", ":"), default=str).encode()
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _replace_nan(content: Any) -> Any:
+    if isinstance(content, np.ndarray):
+        content = content.tolist()
+    if isinstance(content, float) and content != content:
+        return None
+    if isinstance(content, dict):
+        return {key: _replace_nan(value) for key, value in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [_replace_nan(value) for value in content]
+    return content
+
+
+def iso_timestamps(timestamps_ns: np.ndarray) -> np.ndarray:
+    """Timestamps (ns depuis l'epoch) en chaînes ISO 8601 UTC à la microseconde, converties en un seul appel."""
+    return np.char.add(np.datetime_as_string(timestamps_ns.astype("datetime64[ns]"), unit="us"), "Z")
+
+
+def sensor_columns(buffer: SensorRingBuffer, indices: Sequence[int]) -> Dict[str, Any]:
+    """Colonnes des lectures aux positions données, lues directement dans le tampon (sans objet par lecture)."""
+    indices = np.asarray(indices, dtype=np.intp)
+    view = buffer.view()
+    columns: Dict[str, Any] = {"timestamp": iso_timestamps(view["timestamp"][indices])}
+    for name in COLUMNS:
+        columns[name] = view[name][indices]
+    columns["labels"] = buffer.labels()[indices]
+    return columns
+
+
+def sensor_data_json(machine_id, buffer: Optional[SensorRingBuffer], indices: Sequence[int], response_format: str = "rows") -> bytes:
+    """
+    Corps JSON des lectures d'une machine, sans passer par SensorDataPoint.
+    rows : [{"machine_id", "timestamp", "temperature", ...}], comme la réponse validée par FastAPI ;
+    columnar : {"machine_id", "timestamp": [...], "temperature": [...], ...}.
+    """
+    if buffer is None or not len(indices):
+        empty = {"machine_id": str(machine_id), "timestamp": [], **{name: [] for name in COLUMNS}, "labels": []}
+        return dumps(empty if response_format == "columnar" else [])
+
+    columns = sensor_columns(buffer, indices)
+    if response_format == "columnar":
+        # orjson sérialise les tableaux numériques tels quels ; chaînes et labels passent par des listes
+        columns["timestamp"] = columns["timestamp"].tolist()
+        columns["labels"] = columns["labels"].tolist()
+        return dumps({"machine_id": str(machine_id), **columns})
+
+    machine = str(machine_id)
+    timestamps = columns["timestamp"].tolist()
+    # NaN (operating_hours absent) est sérialisé en null par dumps()
+    values = [columns[name].tolist() for name in COLUMNS]
+    labels = columns["labels"].tolist()
+    rows = [
+        {"machine_id": machine, "timestamp": timestamp, **dict(zip(COLUMNS, row)), "labels": row_labels}
+        for timestamp, *row, row_labels in zip(timestamps, *values, labels)
+    ]
+    return dumps(rows)
@@ -0,0 +1,674 @@
+# backend/app/state.py
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKENDS = ("memory", "shared-memory", "database")
+# Partage de l'état entre workers : "memory" (un seul processus), "shared-memory" (workers d'un
+# même hôte, journal en mémoire partagée) ou "database" (plusieurs hôtes, table state_events)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+# Intervalle de lecture des changements publiés par les autres workers
+STATE_POLL_INTERVAL = float(os.getenv("STATE_POLL_INTERVAL", "0.05"))
+# Intervalle entre deux tentatives de prise (ou vérifications) du rôle de leader
+STATE_LEADER_RETRY_SECONDS = float(os.getenv("STATE_LEADER_RETRY_SECONDS", "5"))
+_STATE_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+# Fichier du journal partagé (shared-memory), sur tmpfs par défaut
+STATE_SHM_PATH = os.getenv("STATE_SHM_PATH", os.path.join(_STATE_DIR, "predictive-maintenance-state"))
+# Taille du journal partagé ; les événements les plus anciens sont écrasés
+STATE_SHM_SIZE = int(os.getenv("STATE_SHM_SIZE", str(64 * 2**20)))
+# Fichier verrouillé (flock) par le leader, quand Postgres n'est pas disponible pour l'élection
+STATE_LEADER_LOCK_PATH = os.getenv("STATE_LEADER_LOCK_PATH", os.path.join(_STATE_DIR, "predictive-maintenance-leader.lock"))
+# Nombre de partitions des machines : chaque partition (et donc chaque machine) a un seul worker propriétaire
+STATE_PARTITIONS = int(os.getenv("STATE_PARTITIONS", "64"))
+# Nombre de workers attendus (par défaut WEB_CONCURRENCY, lu aussi par uvicorn pour --workers) : au démarrage,
+# chaque worker ne prend que sa part des partitions, puis toutes celles restées libres après STATE_PARTITION_GRACE_SECONDS
+STATE_WORKERS = int(os.getenv("STATE_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+STATE_PARTITION_GRACE_SECONDS = float(os.getenv("STATE_PARTITION_GRACE_SECONDS", "30"))
+# Fichier dont l'octet n est verrouillé (fcntl) par le propriétaire de la partition n, quand Postgres n'est pas utilisé
+STATE_PARTITION_LOCK_PATH = os.getenv("STATE_PARTITION_LOCK_PATH", os.path.join(_STATE_DIR, "predictive-maintenance-partitions.lock"))
+# Durée de conservation des événements dans la table state_events
+STATE_DB_RETENTION_SECONDS = float(os.getenv("STATE_DB_RETENTION_SECONDS", "3600"))
+# Nombre maximal d'événements lus par requête (database)
+STATE_DB_POLL_LIMIT = int(os.getenv("STATE_DB_POLL_LIMIT", "1000"))
+# Clé du verrou consultatif Postgres du leader ; key + 1 sérialise les écritures du journal
+STATE_DB_LOCK_KEY = int(os.getenv("STATE_DB_LOCK_KEY", "7310"))
+
+# (type d'événement, contenu JSON)
+Event = Tuple[str, Dict[str, Any]]
+# Annonce des partitions détenues par un worker, traitée par le backend lui-même
+PARTITIONS_EVENT = "partitions"
+
+
+def partition_of(machine_id, partitions: int = STATE_PARTITIONS) -> int:
+    """Partition d'une machine (UUID), identique pour tous les workers et d'un lancement à l'autre."""
+    return machine_id.int % partitions
+
+
+def partition_target(partition: int) -> int:
+    """Destinataire d'un événement réservé au propriétaire d'une partition (les workers sont des cibles positives)."""
+    return -1 - partition
+
+
+class StateBackend(ABC):
+    """
+    Partage de l'état entre les workers de l'API (uvicorn --workers N, plusieurs hôtes).
+
+    Chaque worker garde ses structures en mémoire (historique des lectures, alertes, santé du
+    parc, index de recherche...) : elles restent des index locaux, reconstruits à partir d'un
+    journal d'événements commun. Un worker applique ses écritures localement puis les publie
+    (publish) ; les autres les relisent (poll) et les rejouent. La cohérence est donc à terme,
+    avec un retard de l'ordre de STATE_POLL_INTERVAL.
+
+    Un seul worker est leader (acquire_leadership) : c'est lui qui exécute les tâches qui ne
+    doivent tourner qu'une fois, comme le simulateur de capteurs.
+
+    Les machines sont réparties en partitions (partition_of) dont chacune a un seul propriétaire,
+    qui détient son verrou (acquire_partitions, claim) et l'annonce aux autres. Seul le
+    propriétaire d'une machine garde son historique et évalue ses lectures : un événement peut
+    donc être adressé à une partition ou à un worker (target), et les autres workers l'ignorent
+    sans le décoder. Les événements sans destinataire (alertes, fiches de santé...) sont lus par tous.
+    """
+
+    name = ""
+    # False quand aucun autre processus ne lit le journal : les appelants évitent alors de construire les événements
+    shared = True
+
+    def __init__(self, partitions: int = STATE_PARTITIONS, workers: int = STATE_WORKERS, partition_lock_path: str = STATE_PARTITION_LOCK_PATH):
+        # Identifiant du worker, pour ne pas rejouer ses propres événements ; > 0, c'est aussi sa cible
+        self.origin = random.getrandbits(62) + 1
+        self.is_leader = False
+        self.partition_count = partitions
+        self.workers = max(1, workers)
+        self.partitions: Set[int] = set()
+        # partition -> (worker qui l'a annoncée, 0 si son verrou est simplement pris ; expiration)
+        self._owners: Dict[int, Tuple[int, float]] = {}
+        self._partition_locks = _PartitionLocks(partition_lock_path)
+        self._started_at = time.monotonic()
+        self.published = 0
+        self.received = 0
+        self.skipped = 0
+        self.publish_failed = 0
+
+    async def start(self):
+        await self.acquire_leadership()
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    def publish(self, kind: str, payload: Dict[str, Any], target: Optional[int] = None) -> bool:
+        """
+        Publie un événement pour les autres workers (ou pour le seul destinataire target : un worker,
+        ou partition_target(p)), sans attendre d'entrée-sortie réseau. Retourne False s'il est refusé.
+        """
+
+    async def flush(self):
+        """Écrit les événements publiés qui sont encore en attente."""
+
+    @abstractmethod
+    async def poll(self) -> List[Event]:
+        """Événements des autres workers publiés depuis le dernier appel, dans l'ordre du journal."""
+
+    @abstractmethod
+    async def acquire_leadership(self) -> bool:
+        """Tente de devenir leader (ou vérifie que le rôle est toujours détenu) ; retourne is_leader."""
+
+    def owns(self, partition: int) -> bool:
+        return partition in self.partitions
+
+    async def claim(self, partition: int) -> bool:
+        """
+        True si ce worker possède la partition. Une partition qu'aucun worker vivant n'annonce est
+        prise à la volée, pour qu'aucune lecture ne soit adressée à une partition sans propriétaire.
+        """
+        if partition in self.partitions:
+            return True
+        owner = self._owners.get(partition)
+        now = time.monotonic()
+        if owner is not None and owner[1] > now:
+            return False
+        if await self._acquire([partition], 1):
+            self.partitions.add(partition)
+            self._announce()
+            return True
+        # Verrou détenu par un worker dont l'annonce n'est pas encore lue
+        self._owners[partition] = (0, now + STATE_LEADER_RETRY_SECONDS)
+        return False
+
+    async def acquire_partitions(self) -> Set[int]:
+        """
+        Prend des partitions libres : la part de ce worker (partitions / workers) pendant
+        STATE_PARTITION_GRACE_SECONDS, le temps que tous les workers démarrent, puis toutes celles
+        qu'aucun worker vivant n'annonce (worker arrêté). Annonce ensuite les partitions détenues.
+        """
+        now = time.monotonic()
+        if now - self._started_at < STATE_PARTITION_GRACE_SECONDS:
+            limit = -(-self.partition_count // self.workers)
+        else:
+            limit = self.partition_count
+        if len(self.partitions) < limit:
+            start = self.origin % self.partition_count
+            candidates = [
+                partition for partition in ((start + i) % self.partition_count for i in range(self.partition_count))
+                if partition not in self.partitions and self._owners.get(partition, (0, 0.0))[1] <= now
+            ]
+            acquired = await self._acquire(candidates, limit - len(self.partitions))
+            if acquired:
+                self.partitions.update(acquired)
+                logger.info(f"Worker {os.getpid()} now owns {len(self.partitions)}/{self.partition_count} machine partitions")
+        self._announce()
+        return self.partitions
+
+    async def _acquire(self, candidates: List[int], limit: int) -> List[int]:
+        return self._lock_partitions(candidates, limit)
+
+    def _lock_partitions(self, candidates: Iterable[int], limit: int) -> List[int]:
+        """Verrouille au plus limit partitions parmi candidates ; retourne celles obtenues."""
+        acquired = []
+        for partition in candidates:
+            if len(acquired) >= limit:
+                break
+            if self._partition_locks.try_acquire(partition):
+                acquired.append(partition)
+        return acquired
+
+    def _announce(self):
+        self.publish(PARTITIONS_EVENT, {"worker": self.origin, "partitions": sorted(self.partitions)})
+
+    def _targets(self) -> Set[int]:
+        """Destinataires dont ce worker lit les événements (en plus des événements sans destinataire)."""
+        return {self.origin, *(partition_target(partition) for partition in self.partitions)}
+
+    def _receive(self, kind: str, payload: Dict[str, Any]) -> bool:
+        """Traite les événements propres au backend ; retourne True si l'événement ne doit pas être rejoué."""
+        if kind != PARTITIONS_EVENT:
+            return False
+        worker = payload["worker"]
+        # Une annonce vaut jusqu'à trois intervalles d'élection : au-delà, le worker est considéré arrêté
+        expires = time.monotonic() + 3 * STATE_LEADER_RETRY_SECONDS
+        announced = set(payload["partitions"])
+        for partition, (owner, _) in list(self._owners.items()):
+            if owner == worker and partition not in announced:
+                del self._owners[partition]
+        for partition in announced:
+            self._owners[partition] = (worker, expires)
+            if partition in self.partitions:
+                # Deux propriétaires ne peuvent pas détenir le même verrou : annonce périmée
+                logger.warning(f"Partition {partition} announced by worker {worker:016x} but owned here")
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "worker": f"{self.origin:016x}",
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "partition_count": self.partition_count,
+            "partitions": sorted(self.partitions),
+            "events_published": self.published,
+            "events_received": self.received,
+            "events_skipped": self.skipped,
+            "publish_failed": self.publish_failed,
+        }
+
+
+class MemoryStateBackend(StateBackend):
+    """Un seul processus : rien à publier, et ce processus est toujours leader et propriétaire de toutes les partitions."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self):
+        super().__init__()
+        self.partitions = set(range(self.partition_count))
+
+    def publish(self, kind: str, payload: Dict[str, Any], target: Optional[int] = None) -> bool:
+        return True
+
+    async def poll(self) -> List[Event]:
+        return []
+
+    async def acquire_leadership(self) -> bool:
+        self.is_leader = True
+        return True
+
+    async def acquire_partitions(self) -> Set[int]:
+        return self.partitions
+
+
+class _FileLock:
+    """Verrou exclusif flock, détenu jusqu'à release() ou la fin du processus (même en cas de crash)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        import fcntl
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _PartitionLocks:
+    """
+    Verrous des partitions : l'octet n d'un fichier, verrouillé (fcntl) par le propriétaire de la
+    partition n. Comme flock, les verrous disparaissent à la mort du processus qui les détient.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self, partition: int) -> bool:
+        import fcntl
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, partition)
+        except OSError:
+            return False
+        return True
+
+    def release(self):
+        # Fermer le fichier relâche tous les verrous fcntl du processus sur ce fichier
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# En-tête du journal partagé : magic, génération, capacité, head, tail, nombre d'événements
+_HEADER = struct.Struct("<8sQQQQQ")
+_HEADER_SIZE = 64
+_MAGIC = b"PMSTATE2"
+# En-tête d'un événement : taille du contenu, worker d'origine, destinataire (0 : tous les workers)
+_RECORD = struct.Struct("<IQq")
+
+
+class SharedMemoryStateBackend(StateBackend):
+    """
+    Workers d'un même hôte : journal circulaire dans un fichier mappé en mémoire (tmpfs).
+
+    head et tail sont des positions absolues (en octets depuis le début du journal) : un
+    événement est écrit à head modulo la capacité, et les plus anciens sont écrasés quand le
+    journal est plein (tail avance). Les écritures prennent un flock exclusif sur le fichier,
+    les lectures un flock partagé, le temps d'une copie. Un worker trop lent, dépassé par tail,
+    perd les événements écrasés (compteur lapped) et reprend au plus ancien disponible. Un
+    événement adressé à un autre worker ou à une partition détenue ailleurs est sauté sur la
+    seule lecture de son en-tête.
+
+    Le journal est réinitialisé quand il a été créé par une autre génération de workers
+    (processus parent différent, c.-à-d. un autre lancement d'uvicorn) ; un worker redémarré
+    dans la même génération rejoue le journal disponible. Le leader est le worker qui détient
+    le flock de STATE_LEADER_LOCK_PATH, relâché automatiquement à sa mort.
+    """
+
+    name = "shared-memory"
+
+    def __init__(self, path: str = STATE_SHM_PATH, capacity: int = STATE_SHM_SIZE, leader_lock_path: str = STATE_LEADER_LOCK_PATH):
+        super().__init__()
+        self.path = path
+        self.capacity = capacity
+        self._leader_lock = _FileLock(leader_lock_path)
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._offset = 0
+        self.lapped = 0
+
+    async def start(self):
+        self._open()
+        await super().start()
+
+    def _open(self):
+        import fcntl
+        generation = os.getppid()
+        size = _HEADER_SIZE + self.capacity
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            valid = (
+                len(header) == _HEADER.size and os.fstat(self._fd).st_size == size
+                and _HEADER.unpack(header)[:3] == (_MAGIC, generation, self.capacity)
+            )
+            if not valid:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, generation, self.capacity, 0, 0, 0), 0)
+                logger.info(f"Shared state log initialised at {self.path} ({self.capacity // 2**20} MiB)")
+            self._map = mmap.mmap(self._fd, size)
+            # Un worker (re)démarré rejoue les événements encore présents
+            self._offset = self._positions()[1]
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    async def close(self):
+        self._leader_lock.release()
+        self._partition_locks.release()
+        self.is_leader = False
+        self.partitions = set()
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+            self._map = self._fd = None
+
+    def _positions(self) -> Tuple[int, int, int]:
+        """(head, tail, nombre d'événements écrits)."""
+        return _HEADER.unpack_from(self._map, 0)[3:]
+
+    def _read(self, offset: int, size: int) -> bytes:
+        start = _HEADER_SIZE + offset % self.capacity
+        end = start + size
+        if end <= _HEADER_SIZE + self.capacity:
+            return self._map[start:end]
+        wrapped = end - _HEADER_SIZE - self.capacity
+        return self._map[start:] + self._map[_HEADER_SIZE:_HEADER_SIZE + wrapped]
+
+    def _write(self, offset: int, data: bytes):
+        start = _HEADER_SIZE + offset % self.capacity
+        first = min(len(data), _HEADER_SIZE + self.capacity - start)
+        self._map[start:start + first] = data[:first]
+        if first < len(data):
+            self._map[_HEADER_SIZE:_HEADER_SIZE + len(data) - first] = data[first:]
+
+    def publish(self, kind: str, payload: Dict[str, Any], target: Optional[int] = None) -> bool:
+        import fcntl
+        body = dumps([kind, payload])
+        record = _RECORD.pack(len(body), self.origin, target or 0) + body
+        if len(record) > self.capacity:
+            self.publish_failed += 1
+            logger.error(f"State event '{kind}' of {len(record)} bytes exceeds the shared log capacity ({self.capacity} bytes)")
+            return False
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            head, tail, events = self._positions()
+            # Libère la place nécessaire en avançant tail d'un événement entier à la fois
+            while head + len(record) - tail > self.capacity:
+                tail += _RECORD.size + _RECORD.unpack(self._read(tail, _RECORD.size))[0]
+            self._write(head, record)
+            _HEADER.pack_into(self._map, 0, _MAGIC, os.getppid(), self.capacity, head + len(record), tail, events + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self.published += 1
+        return True
+
+    async def poll(self) -> List[Event]:
+        import fcntl
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        try:
+            head, tail, _ = self._positions()
+            if self._offset < tail:
+                self.lapped += 1
+                logger.warning(f"Shared state log overwritten before being read: {tail - self._offset} bytes of events lost")
+                self._offset = tail
+            data = self._read(self._offset, head - self._offset) if head > self._offset else b""
+            self._offset = head
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        events = []
+        targets = self._targets()
+        position = 0
+        while position < len(data):
+            size, origin, target = _RECORD.unpack_from(data, position)
+            position += _RECORD.size
+            if origin == self.origin:
+                pass
+            elif target and target not in targets:
+                self.skipped += 1
+            else:
+                kind, payload = loads(data[position:position + size])
+                self.received += 1
+                if not self._receive(kind, payload):
+                    events.append((kind, payload))
+            position += size
+        return events
+
+    async def acquire_leadership(self) -> bool:
+        self.is_leader = self._leader_lock.try_acquire()
+        return self.is_leader
+
+    def metrics(self) -> Dict[str, Any]:
+        head, tail, events = self._positions() if self._map is not None else (0, 0, 0)
+        return {
+            **super().metrics(),
+            "path": self.path,
+            "capacity_bytes": self.capacity,
+            "used_bytes": head - tail,
+            "log_events": events,
+            "lag_bytes": head - self._offset,
+            "lapped": self.lapped,
+        }
+
+
+class DatabaseStateBackend(StateBackend):
+    """
+    Workers répartis sur plusieurs hôtes : journal dans la table state_events (models.StateEvent).
+
+    Les événements publiés sont regroupés et insérés à chaque flush() dans un thread. Les
+    insertions prennent le verrou consultatif de transaction STATE_DB_LOCK_KEY + 1 : les id
+    (BIGSERIAL) sont ainsi visibles dans l'ordre où ils ont été attribués, et un lecteur qui suit
+    le plus grand id lu ne saute aucun événement. Le leader détient le verrou consultatif de
+    session STATE_DB_LOCK_KEY sur une connexion dédiée (relâché si la connexion est perdue) et
+    supprime les événements plus anciens que STATE_DB_RETENTION_SECONDS. Chaque partition est
+    détenue par le verrou consultatif de session (STATE_DB_LOCK_KEY, partition), sur la même
+    connexion dédiée ; les événements adressés à d'autres workers sont écartés par la requête de
+    lecture (colonne target). Hors Postgres (SQLite en développement), l'élection et les
+    partitions reposent sur les verrous de fichiers de STATE_LEADER_LOCK_PATH et STATE_PARTITION_LOCK_PATH.
+    """
+
+    name = "database"
+
+    def __init__(
+        self,
+        engine=None,
+        table=None,
+        poll_limit: int = STATE_DB_POLL_LIMIT,
+        retention_seconds: float = STATE_DB_RETENTION_SECONDS,
+        lock_key: int = STATE_DB_LOCK_KEY,
+    ):
+        super().__init__()
+        if engine is None:
+            from .database import engine
+        if table is None:
+            from .models import StateEvent
+            table = StateEvent.__table__
+        self.engine = engine
+        self.table = table
+        self.poll_limit = poll_limit
+        self.retention_seconds = retention_seconds
+        self.lock_key = lock_key
+        self._postgres = engine.dialect.name == "postgresql"
+        self._file_lock = None if self._postgres else _FileLock(STATE_LEADER_LOCK_PATH)
+        # Connexion qui porte les verrous consultatifs de session (leader et partitions)
+        self._lock_connection = None
+        self._outbox: List[Dict[str, Any]] = []
+        self._last_id = 0
+        self._last_prune = 0.0
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def close(self):
+        await self.flush()
+        await self._run(self._release_locks)
+
+    def publish(self, kind: str, payload: Dict[str, Any], target: Optional[int] = None) -> bool:
+        self._outbox.append({"origin": f"{self.origin:016x}", "kind": kind, "payload": payload, "target": target})
+        self.published += 1
+        return True
+
+    async def flush(self):
+        if self._outbox:
+            rows, self._outbox = self._outbox, []
+            await self._run(self._insert, rows)
+        if self.is_leader and time.monotonic() - self._last_prune > self.retention_seconds / 10:
+            self._last_prune = time.monotonic()
+            await self._run(self._prune)
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        from sqlalchemy import insert, text
+        try:
+            with self.engine.begin() as connection:
+                if self._postgres:
+                    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": self.lock_key + 1})
+                connection.execute(insert(self.table), rows)
+        except Exception as e:
+            self.publish_failed += len(rows)
+            logger.error(f"Writing {len(rows)} state events failed: {e}")
+
+    def _prune(self):
+        from sqlalchemy import delete
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention_seconds)
+        try:
+            with self.engine.begin() as connection:
+                deleted = connection.execute(delete(self.table).where(self.table.c.created_at < cutoff)).rowcount
+        except Exception as e:
+            logger.error(f"Pruning state events failed: {e}")
+            return
+        if deleted:
+            logger.info(f"{deleted} state events older than {self.retention_seconds:.0f}s deleted")
+
+    async def poll(self) -> List[Event]:
+        events = []
+        while True:
+            rows = await self._run(self._select)
+            if rows:
+                self._last_id = rows[-1].id
+            own = f"{self.origin:016x}"
+            for row in rows:
+                if row.origin == own:
+                    continue
+                self.received += 1
+                if not self._receive(row.kind, row.payload):
+                    events.append((row.kind, row.payload))
+            if len(rows) < self.poll_limit:
+                break
+        return events
+
+    def _select(self):
+        from sqlalchemy import or_, select
+        columns = self.table.c
+        statement = (
+            select(columns.id, columns.origin, columns.kind, columns.payload)
+            .where(columns.id > self._last_id, or_(columns.target.is_(None), columns.target.in_(self._targets())))
+            .order_by(columns.id).limit(self.poll_limit)
+        )
+        with self.engine.connect() as connection:
+            return connection.execute(statement).all()
+
+    async def acquire_leadership(self) -> bool:
+        self.is_leader = await self._run(self._acquire_leadership)
+        return self.is_leader
+
+    def _connection(self):
+        """Connexion des verrous de session, vérifiée ; si elle a été perdue, les verrous l'ont été avec elle."""
+        from sqlalchemy import text
+        if self._lock_connection is not None:
+            try:
+                self._lock_connection.execute(text("SELECT 1"))
+                self._lock_connection.commit()
+                return self._lock_connection
+            except Exception as e:
+                logger.warning(f"Lock connection lost, leadership and partitions released: {e}")
+                self._release_locks()
+        try:
+            self._lock_connection = self.engine.connect()
+        except Exception as e:
+            logger.error(f"Leader election failed: {e}")
+            return None
+        return self._lock_connection
+
+    def _acquire_leadership(self) -> bool:
+        from sqlalchemy import text
+        if not self._postgres:
+            return self._file_lock.try_acquire()
+        connection = self._connection()
+        if connection is None:
+            return False
+        if self.is_leader:
+            return True
+        try:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}).scalar()
+            connection.commit()
+        except Exception as e:
+            logger.error(f"Leader election failed: {e}")
+            acquired = False
+        return bool(acquired)
+
+    async def _acquire(self, candidates: List[int], limit: int) -> List[int]:
+        return await self._run(self._lock_partitions, candidates, limit)
+
+    def _lock_partitions(self, candidates: Iterable[int], limit: int) -> List[int]:
+        from sqlalchemy import text
+        if not self._postgres:
+            return super()._lock_partitions(candidates, limit)
+        connection = self._lock_connection or self._connection()
+        if connection is None:
+            return []
+        acquired = []
+        for partition in candidates:
+            if len(acquired) >= limit:
+                break
+            try:
+                locked = connection.execute(
+                    text("SELECT pg_try_advisory_lock(:key, :partition)"), {"key": self.lock_key, "partition": partition}
+                ).scalar()
+                connection.commit()
+            except Exception as e:
+                logger.error(f"Partition lock failed: {e}")
+                break
+            if locked:
+                acquired.append(partition)
+        return acquired
+
+    def _release_locks(self):
+        if self._file_lock is not None:
+            self._file_lock.release()
+        self._partition_locks.release()
+        if self._lock_connection is not None:
+            try:
+                self._lock_connection.close()
+            except Exception:
+                pass
+            self._lock_connection = None
+        self.is_leader = False
+        self.partitions = set()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**super().metrics(), "last_event_id": self._last_id, "outbox": len(self._outbox)}
+
+
+def create_state_backend(name: str = STATE_BACKEND) -> StateBackend:
+    if name == "memory":
+        return MemoryStateBackend()
+    if name == "shared-memory":
+        return SharedMemoryStateBackend()
+    if name == "database":
+        return DatabaseStateBackend()
+    raise ValueError(f"STATE_BACKEND inconnu: {name} (attendu: {', '.join(STATE_BACKENDS)})")
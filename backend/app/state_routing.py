@@ -0,0 +1,650 @@
+# backend/app/state_routing.py
+
+import asyncio
+import base64
+import contextlib
+import logging
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .sensor_store import COLUMNS, datetime_to_ns, ns_to_datetime
+from .serialization import dumps
+from .state import STATE_LEADER_RETRY_SECONDS, STATE_POLL_INTERVAL, StateBackend, partition_of, partition_target
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de publication des fiches de santé modifiées des machines de ce worker
+STATE_HEALTH_INTERVAL = float(os.getenv("STATE_HEALTH_INTERVAL", "1"))
+# Délai de réponse du propriétaire d'une machine à une lecture transmise (504 au-delà), puis entre deux fragments
+STATE_FORWARD_TIMEOUT = float(os.getenv("STATE_FORWARD_TIMEOUT", "5"))
+# Taille d'un fragment de réponse transmise ; le journal partagé doit pouvoir contenir STATE_FORWARD_WINDOW fragments
+STATE_FORWARD_CHUNK_BYTES = int(os.getenv("STATE_FORWARD_CHUNK_BYTES", str(256 * 2**10)))
+# Fragments publiés par le propriétaire avant l'acquittement du premier par le worker qui sert le client
+STATE_FORWARD_WINDOW = int(os.getenv("STATE_FORWARD_WINDOW", "4"))
+
+# Lectures servies depuis l'état en mémoire du propriétaire de la machine : historique et exports
+# (en mode memory seulement, sinon ils sont lus en base), statistiques glissantes et prédictions
+FORWARDED_PATH = re.compile(r"^/machines/([0-9a-fA-F-]{36})/(sensor-data|stats|predictions)")
+# En-têtes de la requête d'origine repris par la requête transmise
+FORWARDED_HEADERS = ("accept", "if-none-match", "origin")
+# Marque une requête transmise, pour que le propriétaire la serve sans la retransmettre
+FORWARDED_MARKER = b"x-state-forwarded"
+
+
+class _ForwardCancelled(Exception):
+    """Le worker qui sert le client a abandonné la réponse (client déconnecté)."""
+
+
+class _ServedForward:
+    """Réponse servie ici pour un autre worker : fragments acquittés, abandon."""
+
+    __slots__ = ("acked", "acknowledged", "cancelled", "done")
+
+    def __init__(self):
+        self.acked = 0
+        self.acknowledged = asyncio.Event()
+        self.cancelled = False
+        self.done = asyncio.Event()
+
+
+class StateRouter:
+    """
+    Partage de l'état entre les workers de l'API (uvicorn --workers N), au-dessus d'un StateBackend.
+
+    Chaque machine a un worker propriétaire (sa partition, voir state.py) qui seul garde son
+    historique et évalue ses lectures : route_readings stocke les lectures des machines de ce
+    worker et transmet les autres à leur propriétaire. Les autres workers ne rejouent que l'état
+    dérivé (alertes, fiches de santé publiées toutes les STATE_HEALTH_INTERVAL secondes), les
+    utilisateurs et les fiches des modèles. Les lectures qui dépendent de l'état en mémoire d'une
+    machine sont transmises à son propriétaire (OwnerForwardingMiddleware), et les clients
+    WebSocket d'une machine détenue ailleurs reçoivent ses lectures par watch/live.
+
+    Les stores, les types Pydantic et les fonctions d'ingestion de l'API sont fournis par main.py ;
+    run() rejoue les événements des autres workers toutes les STATE_POLL_INTERVAL secondes.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        app,
+        *,
+        machines: Dict[UUID, Any],
+        data_backend: str,
+        store_reading: Callable[[Any], None],
+        evaluate: Callable[[List[Any], Optional[Tuple[np.ndarray, np.ndarray]]], Any],
+        predict: Callable[[Any], Awaitable[None]],
+        reading_type,
+        alerts,
+        alert_type,
+        alert_correlator,
+        fleet_health,
+        sensor_stats,
+        retrieval_index,
+        broadcaster,
+        users: List[Any],
+        user_type,
+        ml_models: Dict[str, Any],
+        ml_model_type,
+    ):
+        self.backend = backend
+        self.app = app
+        self.machines = machines
+        self.data_backend = data_backend
+        self.store_reading = store_reading
+        self.evaluate = evaluate
+        self.predict = predict
+        self.reading_type = reading_type
+        self.alerts = alerts
+        self.alert_type = alert_type
+        self.alert_correlator = alert_correlator
+        self.fleet_health = fleet_health
+        self.sensor_stats = sensor_stats
+        self.retrieval_index = retrieval_index
+        self.broadcaster = broadcaster
+        self.users = users
+        self.user_type = user_type
+        self.ml_models = ml_models
+        self.ml_model_type = ml_model_type
+
+        # Lectures acceptées par ce worker, et lectures stockées ici (y compris celles transmises par les autres)
+        self.counters = {"readings_ingested": 0, "readings_stored": 0, "readings_forwarded": 0}
+        # Machines de ce worker dont la fiche de santé a changé depuis sa dernière publication
+        self._health_dirty: Set[UUID] = set()
+        # Machines de ce worker suivies en direct depuis un autre worker -> expiration de la demande
+        self._live_watchers: Dict[UUID, float] = {}
+        self._live_pending: List[list] = []
+        # Machines d'un autre worker suivies par des clients WebSocket de ce worker -> nombre de clients
+        self._remote_watches: Dict[UUID, int] = {}
+        # Requêtes transmises par ce worker en attente de réponse : id -> début de réponse puis fragments
+        self._pending_forwards: Dict[str, asyncio.Queue] = {}
+        # Requêtes transmises par un autre worker servies ici : id -> fenêtre d'acquittement
+        self._serving: Dict[str, _ServedForward] = {}
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {
+            "readings": self._apply_readings,
+            "evaluation": self._apply_evaluation,
+            "health": self._apply_health,
+            "watch": self._apply_watch,
+            "live": self._apply_live,
+            "forward_request": self._apply_forward_request,
+            "forward_response": self._apply_forward_reply,
+            "forward_body": self._apply_forward_reply,
+            "forward_ack": self._apply_forward_ack,
+            "forward_cancel": self._apply_forward_cancel,
+            "alert_resolved": self._apply_alert_resolved,
+            "user": self._apply_user,
+            "user_deleted": self._apply_user_deleted,
+            "ml_model": self._apply_ml_model,
+        }
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.shared
+
+    def _partition(self, machine_id: UUID) -> int:
+        return partition_of(machine_id, self.backend.partition_count)
+
+    async def owns_machine(self, machine_id: UUID) -> bool:
+        """True si ce worker est (ou devient, la partition étant libre) le propriétaire de la machine."""
+        return await self.backend.claim(self._partition(machine_id))
+
+    # --- Lectures de capteurs ---
+
+    async def route_readings(self, points: List[Any], ml_result: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+        """
+        Stocke les lectures des machines de ce worker et transmet les autres au propriétaire de leur
+        machine, en un événement par partition (avec leurs scores Isolation Forest s'ils sont déjà
+        calculés). Retourne le masque des lectures stockées ici, que ce worker doit donc évaluer.
+        """
+        self.counters["readings_ingested"] += len(points)
+        local = np.ones(len(points), dtype=bool)
+        remote: Dict[int, List[int]] = {}
+        owned: Dict[int, bool] = {}
+        for i, point in enumerate(points):
+            partition = self._partition(point.machine_id)
+            if partition not in owned:
+                owned[partition] = await self.backend.claim(partition)
+            if owned[partition]:
+                self.store_reading(point)
+            else:
+                local[i] = False
+                remote.setdefault(partition, []).append(i)
+        for partition, indices in remote.items():
+            self.backend.publish("readings", {
+                "rows": [
+                    [str(points[i].machine_id), datetime_to_ns(points[i].timestamp),
+                     *(getattr(points[i], name) for name in COLUMNS), points[i].labels]
+                    for i in indices
+                ],
+                # NaN (lecture sans modèle) devient null
+                "ml": None if ml_result is None else [ml_result[0][indices], ml_result[1][indices]],
+            }, target=partition_target(partition))
+            self.counters["readings_forwarded"] += len(indices)
+        return local
+
+    def reading_stored(self, machine_id: UUID, timestamp, values: List[float]):
+        """Appelée pour chaque lecture stockée ici : fiche de santé à publier, clients d'autres workers à servir."""
+        self.counters["readings_stored"] += 1
+        if self.shared:
+            self._health_dirty.add(machine_id)
+            if machine_id in self._live_watchers:
+                self._live_pending.append([str(machine_id), datetime_to_ns(timestamp), *values])
+
+    def anomaly_recorded(self, machine_id: UUID):
+        if self.shared:
+            self._health_dirty.add(machine_id)
+
+    def _apply_readings(self, payload: Dict[str, Any]):
+        """
+        Stocke et évalue les lectures transmises par un autre worker pour des machines de ce worker,
+        avec les scores Isolation Forest déjà calculés par l'émetteur s'il y en a.
+        """
+        points, kept = [], []
+        for i, (machine_id, timestamp_ns, *values, labels) in enumerate(payload["rows"]):
+            machine_id = UUID(machine_id)
+            if machine_id not in self.machines:
+                continue
+            point = self.reading_type.model_construct(
+                machine_id=machine_id, timestamp=ns_to_datetime(timestamp_ns), labels=labels, **dict(zip(COLUMNS, values))
+            )
+            self.store_reading(point)
+            points.append(point)
+            kept.append(i)
+        if not points:
+            return
+        if payload["ml"] is None:
+            for point in points:
+                asyncio.create_task(self.predict(point))
+            return
+        decisions, scores = (
+            np.array([np.nan if value is None else value for value in column], dtype=np.float64)[kept]
+            for column in payload["ml"]
+        )
+        self.evaluate(points, (decisions, scores))
+
+    # --- Alertes ---
+
+    def alerts_changed(self, opened: List[Tuple[Any, str]], touched: List[Tuple[Any, int]]):
+        """Publie les alertes ouvertes (avec leur signature) ou rattachées à une lecture (avec son instant) par ce worker."""
+        if self.shared and (opened or touched):
+            self.backend.publish("evaluation", {
+                # Les versions données par ce worker sont reprises telles quelles (voir AlertStore)
+                "opened": [
+                    {"alert": alert.model_dump(mode="json"), "signature": signature, "version": self.alerts.version_of(alert.id)}
+                    for alert, signature in opened
+                ],
+                "touched": [[str(alert.id), timestamp_ns, self.alerts.version_of(alert.id)] for alert, timestamp_ns in touched],
+            })
+
+    def _apply_evaluation(self, payload: Dict[str, Any]):
+        """Rejoue les alertes ouvertes ou mises à jour par le worker propriétaire des machines évaluées."""
+        for item in payload["opened"]:
+            alert = self.alert_type.model_validate(item["alert"])
+            if alert.machine_id not in self.machines or alert.id in self.alerts:
+                continue
+            self.alerts.add(alert, version=item["version"])
+            self.fleet_health.alert_opened(alert)
+            self.retrieval_index.add_alert(alert)
+            self.alert_correlator.replicate(alert, item["signature"], datetime_to_ns(alert.last_seen or alert.timestamp))
+            self.broadcaster.publish_alert(alert.machine_id, "opened", lambda: {"alert": alert.model_dump(mode="json")})
+        for alert_id, timestamp_ns, version in payload["touched"]:
+            alert = self.alerts.get(UUID(alert_id))
+            if alert is None:
+                continue
+            self.alert_correlator.replicate(alert, None, timestamp_ns)
+            self.alerts.touch(alert, version=version)
+            self.broadcaster.publish_alert(alert.machine_id, "updated", lambda: alert.model_dump(mode="json", include={"id", "count", "last_seen"}))
+
+    def alert_resolved(self, alert_id: UUID):
+        self.backend.publish("alert_resolved", {"id": str(alert_id), "version": self.alerts.version_of(alert_id)})
+
+    def _apply_alert_resolved(self, payload: Dict[str, Any]):
+        alert = self.alerts.get(UUID(payload["id"]))
+        if alert is None or alert.is_resolved:
+            return
+        self.alerts.resolve(alert.id, version=payload["version"])
+        self.fleet_health.alert_resolved(alert)
+        self.broadcaster.publish_alert(alert.machine_id, "resolved", lambda: {"id": payload["id"]})
+
+    # --- Fiches de santé ---
+
+    def publish_health(self):
+        """Publie les fiches de santé modifiées des machines de ce worker (voir FleetHealth.replicate)."""
+        machines = []
+        for machine_id in self._health_dirty:
+            health = self.fleet_health.get(machine_id)
+            if health is None:
+                continue
+            machines.append([
+                str(machine_id),
+                datetime_to_ns(health.last_timestamp) if health.last_timestamp else None,
+                health.last_values,
+                datetime_to_ns(health.last_anomaly) if health.last_anomaly else None,
+                self.fleet_health.rolling(machine_id, self.sensor_stats.channels),
+            ])
+        self._health_dirty.clear()
+        if machines:
+            self.backend.publish("health", {"machines": machines})
+
+    def _apply_health(self, payload: Dict[str, Any]):
+        for machine_id, last_ns, last_values, anomaly_ns, rolling in payload["machines"]:
+            machine_id = UUID(machine_id)
+            if machine_id not in self.machines or self.backend.owns(self._partition(machine_id)):
+                continue
+            self.fleet_health.replicate(
+                machine_id,
+                ns_to_datetime(last_ns) if last_ns is not None else None,
+                last_values,
+                ns_to_datetime(anomaly_ns) if anomaly_ns is not None else None,
+                rolling,
+            )
+
+    # --- Lectures en direct (WebSocket) ---
+
+    @contextlib.asynccontextmanager
+    async def remote_watch(self, machine_id: UUID):
+        """
+        Pendant le bloc, demande au propriétaire de la machine (si ce n'est pas ce worker) ses
+        nouvelles lectures, que apply_live relaie aux clients WebSocket de ce worker.
+        """
+        if not self.shared or await self.owns_machine(machine_id):
+            yield
+            return
+        self._remote_watches[machine_id] = self._remote_watches.get(machine_id, 0) + 1
+        self.publish_watches([machine_id])
+        try:
+            yield
+        finally:
+            self._remote_watches[machine_id] -= 1
+            if not self._remote_watches[machine_id]:
+                del self._remote_watches[machine_id]
+
+    def publish_watches(self, machine_ids: Iterable[UUID]):
+        """Demande aux propriétaires de ces machines leurs nouvelles lectures, pour les clients WebSocket de ce worker."""
+        by_partition: Dict[int, List[str]] = {}
+        for machine_id in machine_ids:
+            by_partition.setdefault(self._partition(machine_id), []).append(str(machine_id))
+        for partition, ids in by_partition.items():
+            self.backend.publish("watch", {"machines": ids}, target=partition_target(partition))
+
+    def _apply_watch(self, payload: Dict[str, Any]):
+        # Une demande vaut trois intervalles d'élection : elle est renouvelée tant que des clients sont connectés
+        expires = time.monotonic() + 3 * STATE_LEADER_RETRY_SECONDS
+        for machine_id in payload["machines"]:
+            self._live_watchers[UUID(machine_id)] = expires
+
+    def publish_live(self):
+        """Publie les lectures stockées ici des machines suivies depuis un autre worker."""
+        if self._live_pending:
+            self.backend.publish("live", {"rows": self._live_pending[:]})
+            self._live_pending.clear()
+
+    def _apply_live(self, payload: Dict[str, Any]):
+        for machine_id, timestamp_ns, *values in payload["rows"]:
+            machine_id = UUID(machine_id)
+            if machine_id in self._remote_watches:
+                self.broadcaster.publish_reading(machine_id, ns_to_datetime(timestamp_ns), values)
+
+    # --- Lectures transmises au propriétaire ---
+
+    def forwarded_machine(self, scope: Dict[str, Any]) -> Optional[UUID]:
+        """Machine dont l'état en mémoire sert la requête, si elle doit être servie par son propriétaire."""
+        match = FORWARDED_PATH.match(scope["path"])
+        if match is None or (match.group(2) == "sensor-data" and self.data_backend != "memory"):
+            return None
+        if any(name == FORWARDED_MARKER for name, _ in scope["headers"]):
+            return None
+        try:
+            machine_id = UUID(match.group(1))
+        except ValueError:
+            return None
+        return machine_id if machine_id in self.machines else None
+
+    async def forward_request(self, machine_id: UUID, request: Request) -> Response:
+        """
+        Transmet une lecture au propriétaire de la machine et relaie sa réponse au fil de ses
+        fragments (504 si elle ne commence pas à temps) : un export n'est jamais entièrement
+        chargé en mémoire, ni d'un côté ni de l'autre.
+        """
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        try:
+            start, body = await self._forward(machine_id, request.url.path, request.url.query, headers)
+        except asyncio.TimeoutError:
+            return JSONResponse({"detail": "Le worker propriétaire de la machine n'a pas répondu"}, status_code=504)
+        return StreamingResponse(body, status_code=start["status"], headers=start["headers"])
+
+    async def fetch_from_owner(self, machine_id: UUID, path: str, query: str = "") -> Tuple[int, bytes]:
+        """
+        Lecture GET servie par le propriétaire de la machine, détenue par un autre worker ; retourne
+        (statut, corps). asyncio.TimeoutError si le propriétaire ne répond pas à temps.
+        """
+        start, body = await self._forward(machine_id, path, query, {})
+        try:
+            return start["status"], b"".join([chunk async for chunk in body])
+        except RuntimeError as e:
+            raise asyncio.TimeoutError(str(e)) from e
+
+    async def _forward(self, machine_id: UUID, path: str, query: str, headers: Dict[str, str]) -> Tuple[Dict[str, Any], AsyncIterator[bytes]]:
+        """Publie une requête transmise et attend le début de sa réponse : (statut et en-têtes, fragments du corps)."""
+        request_id = uuid4().hex
+        replies = self._pending_forwards[request_id] = asyncio.Queue()
+        self.backend.publish("forward_request", {
+            "id": request_id,
+            "worker": self.backend.origin,
+            # Horodatage d'expiration : une requête rejouée depuis le journal (database) n'est pas servie
+            "deadline": time.time() + STATE_FORWARD_TIMEOUT,
+            "path": path,
+            "query": query,
+            "headers": headers,
+        }, target=partition_target(self._partition(machine_id)))
+        try:
+            start = await asyncio.wait_for(replies.get(), STATE_FORWARD_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._pending_forwards.pop(request_id, None)
+            raise
+        return start, self._forwarded_body(request_id, start["owner"], replies)
+
+    async def _forwarded_body(self, request_id: str, owner: int, replies: asyncio.Queue) -> AsyncIterator[bytes]:
+        """Fragments de la réponse du propriétaire, chacun acquitté une fois envoyé au client."""
+        complete = False
+        try:
+            while not complete:
+                try:
+                    chunk = await asyncio.wait_for(replies.get(), STATE_FORWARD_TIMEOUT)
+                except asyncio.TimeoutError:
+                    raise RuntimeError(f"Forwarded response {request_id} interrupted: the owner worker stopped sending") from None
+                if chunk.get("failed"):
+                    raise RuntimeError(f"Forwarded response {request_id} failed on the owner worker")
+                complete = not chunk["more"]
+                yield base64.b64decode(chunk["body"])
+                if not complete:
+                    self.backend.publish("forward_ack", {"id": request_id, "seq": chunk["seq"]}, target=owner)
+        finally:
+            self._pending_forwards.pop(request_id, None)
+            # Client déconnecté ou réponse interrompue : le propriétaire arrête de produire
+            if not complete:
+                self.backend.publish("forward_cancel", {"id": request_id}, target=owner)
+
+    def _apply_forward_reply(self, payload: Dict[str, Any]):
+        """Début de réponse (forward_response) ou fragment (forward_body) d'une lecture transmise par ce worker."""
+        replies = self._pending_forwards.get(payload["id"])
+        if replies is not None:
+            replies.put_nowait(payload)
+
+    def _apply_forward_request(self, payload: Dict[str, Any]):
+        if payload["deadline"] > time.time():
+            asyncio.create_task(self._serve_forwarded_request(payload))
+
+    async def _serve_forwarded_request(self, payload: Dict[str, Any]):
+        """
+        Exécute dans ce worker, sans passer par le réseau, une lecture transmise par un autre worker
+        et lui publie sa réponse en fragments d'au plus STATE_FORWARD_CHUNK_BYTES octets. Au plus
+        STATE_FORWARD_WINDOW fragments restent non acquittés : au-delà, la production de la réponse
+        (itérateur d'un StreamingResponse) attend le client.
+        """
+        request_id, requester = payload["id"], payload["worker"]
+        served = self._serving[request_id] = _ServedForward()
+        path = payload["path"]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "root_path": "", "query_string": payload["query"].encode(),
+            "headers": [(FORWARDED_MARKER, b"1"), *((name.encode(), value.encode()) for name, value in payload["headers"].items())],
+            "client": None, "server": None,
+        }
+        requested = started = False
+        pending = bytearray()
+        seq = 0
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await served.done.wait()
+            return {"type": "http.disconnect"}
+
+        async def publish_chunk(body: bytes, more: bool):
+            nonlocal seq
+            if not self.backend.publish("forward_body", {
+                "id": request_id, "seq": seq, "body": base64.b64encode(body).decode(), "more": more,
+            }, target=requester):
+                raise RuntimeError(f"Chunk of forwarded response {request_id} rejected by the state log")
+            seq += 1
+            while seq - served.acked > STATE_FORWARD_WINDOW and not served.cancelled:
+                served.acknowledged.clear()
+                await asyncio.wait_for(served.acknowledged.wait(), STATE_FORWARD_TIMEOUT)
+
+        async def send(message):
+            nonlocal started
+            if served.cancelled:
+                raise _ForwardCancelled()
+            if message["type"] == "http.response.start":
+                self.backend.publish("forward_response", {
+                    "id": request_id,
+                    "owner": self.backend.origin,
+                    "status": message["status"],
+                    "headers": {
+                        name.decode(): value.decode() for name, value in message.get("headers", [])
+                        if name.lower() != b"content-length"
+                    },
+                }, target=requester)
+                started = True
+            elif message["type"] == "http.response.body":
+                more = message.get("more_body", False)
+                pending.extend(message.get("body", b""))
+                while len(pending) >= STATE_FORWARD_CHUNK_BYTES:
+                    chunk = bytes(pending[:STATE_FORWARD_CHUNK_BYTES])
+                    del pending[:STATE_FORWARD_CHUNK_BYTES]
+                    await publish_chunk(chunk, True)
+                if not more:
+                    await publish_chunk(bytes(pending), False)
+                    pending.clear()
+
+        try:
+            await self.app(scope, receive, send)
+        except _ForwardCancelled:
+            pass
+        except Exception as e:
+            logger.error(f"Forwarded request {path} failed: {e}")
+            if not started:
+                self.backend.publish("forward_response", {
+                    "id": request_id, "owner": self.backend.origin, "status": 500, "headers": {"content-type": "application/json"},
+                }, target=requester)
+                self.backend.publish("forward_body", {
+                    "id": request_id, "seq": seq, "body": base64.b64encode(dumps({"detail": "Erreur interne"})).decode(), "more": False,
+                }, target=requester)
+            elif not served.cancelled:
+                self.backend.publish("forward_body", {"id": request_id, "seq": seq, "body": "", "more": False, "failed": True}, target=requester)
+        finally:
+            served.done.set()
+            self._serving.pop(request_id, None)
+
+    def _apply_forward_ack(self, payload: Dict[str, Any]):
+        served = self._serving.get(payload["id"])
+        if served is not None:
+            served.acked = max(served.acked, payload["seq"] + 1)
+            served.acknowledged.set()
+
+    def _apply_forward_cancel(self, payload: Dict[str, Any]):
+        served = self._serving.get(payload["id"])
+        if served is not None:
+            served.cancelled = True
+            served.acknowledged.set()
+            served.done.set()
+
+    # --- Utilisateurs et modèles ---
+
+    def user_saved(self, user):
+        self.backend.publish("user", {"user": user.model_dump(mode="json")})
+
+    def user_deleted(self, user_id: UUID):
+        self.backend.publish("user_deleted", {"id": str(user_id)})
+
+    def _apply_user(self, payload: Dict[str, Any]):
+        user = self.user_type.model_validate(payload["user"])
+        for idx, existing_user in enumerate(self.users):
+            if existing_user.id == user.id:
+                self.users[idx] = user
+                return
+        self.users.append(user)
+
+    def _apply_user_deleted(self, payload: Dict[str, Any]):
+        user_id = UUID(payload["id"])
+        self.users[:] = [user for user in self.users if user.id != user_id]
+
+    def model_updated(self, model, line: str, timestamp, machine_id: Optional[UUID]):
+        """Publie la fiche d'un modèle (statut, métriques) avec la nouvelle ligne de son journal."""
+        self.backend.publish("ml_model", {
+            "model": model.model_dump(mode="json", exclude={"training_logs", "is_resident"}),
+            "log": [line, datetime_to_ns(timestamp), str(machine_id) if machine_id else None],
+        })
+
+    def _apply_ml_model(self, payload: Dict[str, Any]):
+        """Met à jour la fiche d'un modèle modifiée par un autre worker et indexe sa nouvelle ligne de journal."""
+        fields = payload["model"]
+        updated = self.ml_model_type.model_validate(fields)
+        model = self.ml_models.get(updated.id)
+        if model is None:
+            model = self.ml_models[updated.id] = updated
+        else:
+            for key in fields:
+                setattr(model, key, getattr(updated, key))
+        line, timestamp_ns, machine_id = payload["log"]
+        model.training_logs.append(line)
+        self.retrieval_index.add_training_log(model.id, line, ns_to_datetime(timestamp_ns), UUID(machine_id) if machine_id else None)
+
+    # --- Boucle de synchronisation ---
+
+    async def start(self):
+        """Prend les partitions de ce worker et lance la synchronisation (sans effet sans partage d'état)."""
+        if self.shared:
+            await self.backend.acquire_partitions()
+            asyncio.create_task(self.run())
+
+    async def run(self):
+        """
+        Écrit les événements publiés par ce worker, rejoue ceux des autres toutes les STATE_POLL_INTERVAL
+        secondes, publie les fiches de santé modifiées toutes les STATE_HEALTH_INTERVAL secondes et,
+        toutes les STATE_LEADER_RETRY_SECONDS, retente la prise du rôle de leader et des partitions libres.
+        """
+        loop = asyncio.get_running_loop()
+        next_election = loop.time() + STATE_LEADER_RETRY_SECONDS
+        next_health = loop.time() + STATE_HEALTH_INTERVAL
+        while True:
+            await asyncio.sleep(STATE_POLL_INTERVAL)
+            try:
+                self.publish_live()
+                if loop.time() >= next_health:
+                    next_health = loop.time() + STATE_HEALTH_INTERVAL
+                    self.publish_health()
+                await self.backend.flush()
+                for kind, payload in await self.backend.poll():
+                    handler = self.handlers.get(kind)
+                    if handler is None:
+                        logger.warning(f"Unknown state event '{kind}' ignored")
+                        continue
+                    handler(payload)
+                if loop.time() >= next_election:
+                    next_election = loop.time() + STATE_LEADER_RETRY_SECONDS
+                    was_leader = self.backend.is_leader
+                    if await self.backend.acquire_leadership() and not was_leader:
+                        logger.info(f"Worker {os.getpid()} is now the leader (sensor data simulator)")
+                    await self.backend.acquire_partitions()
+                    self.publish_watches(self._remote_watches)
+                    now = time.monotonic()
+                    for machine_id in [machine_id for machine_id, expires in self._live_watchers.items() if expires <= now]:
+                        del self._live_watchers[machine_id]
+            except Exception as e:
+                logger.error(f"State synchronisation failed: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.backend.metrics(),
+            **self.counters,
+            "forwards_pending": len(self._pending_forwards),
+            "forwards_serving": len(self._serving),
+            "remote_watches": len(self._remote_watches),
+        }
+
+
+class OwnerForwardingMiddleware:
+    """Transmet au worker propriétaire les lectures d'une machine détenue par un autre worker (voir StateRouter.forwarded_machine)."""
+
+    def __init__(self, app, router: StateRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET" and self.router.shared:
+            machine_id = self.router.forwarded_machine(scope)
+            if machine_id is not None and not await self.router.owns_machine(machine_id):
+                response = await self.router.forward_request(machine_id, Request(scope))
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,173 @@
+# backend/app/streaming_stats.py
+
+import math
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+from .sensor_store import datetime_to_ns
+
+# Fenêtres glissantes (en nombre de lectures) et facteur de lissage de l'EWMA
+STATS_WINDOWS = tuple(int(size) for size in os.getenv("STATS_WINDOWS", "10,60,300").split(","))
+STATS_EWMA_ALPHA = float(os.getenv("STATS_EWMA_ALPHA", "0.1"))
+
+
+class Welford:
+    """Moyenne et variance cumulées depuis le début du flux (algorithme de Welford)."""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+class EWMA:
+    """Moyenne mobile exponentielle."""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, alpha: float = STATS_EWMA_ALPHA):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    def update(self, value: float):
+        self.value = value if self.value is None else self.alpha * value + (1 - self.alpha) * self.value
+
+
+class RollingWindow:
+    """
+    Statistiques sur les `size` dernières lectures, mises à jour en O(1) amorti :
+    moyenne/variance par ajout et retrait de Welford, min/max par files monotones,
+    taux de variation entre la plus ancienne et la plus récente lecture de la fenêtre.
+    """
+
+    __slots__ = ("size", "_values", "_seen", "_min", "_max", "mean", "m2")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values: Deque[Tuple[float, float]] = deque()
+        self._seen = 0
+        # (rang de la lecture, valeur), valeurs croissantes pour _min et décroissantes pour _max
+        self._min: Deque[Tuple[int, float]] = deque()
+        self._max: Deque[Tuple[int, float]] = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, timestamp: float, value: float):
+        if len(self._values) == self.size:
+            _, old = self._values.popleft()
+            count = len(self._values)
+            if count:
+                delta = old - self.mean
+                self.mean -= delta / count
+                self.m2 -= delta * (old - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+
+        self._values.append((timestamp, value))
+        delta = value - self.mean
+        self.mean += delta / len(self._values)
+        self.m2 += delta * (value - self.mean)
+
+        rank = self._seen
+        self._seen += 1
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((rank, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((rank, value))
+        oldest_rank = self._seen - self.size
+        while self._min[0][0] < oldest_rank:
+            self._min.popleft()
+        while self._max[0][0] < oldest_rank:
+            self._max.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        count = len(self._values)
+        (first_time, first_value), (last_time, last_value) = self._values[0], self._values[-1]
+        elapsed = last_time - first_time
+        return {
+            "count": count,
+            "mean": self.mean,
+            "std": math.sqrt(max(self.m2, 0.0) / (count - 1)) if count > 1 else 0.0,
+            "min": self._min[0][1],
+            "max": self._max[0][1],
+            "rate_per_second": (last_value - first_value) / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class ChannelStats:
+    """Toutes les statistiques incrémentales d'un canal d'une machine."""
+
+    __slots__ = ("total", "ewma", "windows", "last_value", "last_time", "rate")
+
+    def __init__(self, windows: Sequence[int] = STATS_WINDOWS, alpha: float = STATS_EWMA_ALPHA):
+        self.total = Welford()
+        self.ewma = EWMA(alpha)
+        self.windows = [RollingWindow(size) for size in windows]
+        self.last_value: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.rate = 0.0
+
+    def update(self, timestamp: float, value: float):
+        if self.last_time is not None and timestamp > self.last_time:
+            self.rate = (value - self.last_value) / (timestamp - self.last_time)
+        self.last_value, self.last_time = value, timestamp
+        self.total.update(value)
+        self.ewma.update(value)
+        for window in self.windows:
+            window.update(timestamp, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "last": self.last_value,
+            "count": self.total.count,
+            "mean": self.total.mean,
+            "std": math.sqrt(self.total.variance),
+            "ewma": self.ewma.value,
+            "rate_per_second": self.rate,
+            "windows": {str(window.size): window.snapshot() for window in self.windows},
+        }
+
+
+class StreamingStatsEngine:
+    """Statistiques incrémentales par (machine, canal), mises à jour à chaque lecture ingérée."""
+
+    def __init__(self, channels: Sequence[str], windows: Sequence[int] = STATS_WINDOWS, alpha: float = STATS_EWMA_ALPHA):
+        self.channels = tuple(channels)
+        self.windows = tuple(windows)
+        self.alpha = alpha
+        self._stats: Dict[UUID, Dict[str, ChannelStats]] = {}
+
+    def update(self, machine_id: UUID, timestamp: datetime, values: Mapping[str, float]):
+        machine_stats = self._stats.get(machine_id)
+        if machine_stats is None:
+            machine_stats = self._stats[machine_id] = {
+                name: ChannelStats(self.windows, self.alpha) for name in self.channels
+            }
+        seconds = datetime_to_ns(timestamp) / 1e9
+        for name, channel in machine_stats.items():
+            channel.update(seconds, values[name])
+
+    def get(self, machine_id: UUID, channel: str) -> Optional[ChannelStats]:
+        machine_stats = self._stats.get(machine_id)
+        return machine_stats.get(channel) if machine_stats else None
+
+    def snapshot(self, machine_id: UUID) -> Dict[str, Dict[str, Any]]:
+        machine_stats = self._stats.get(machine_id, {})
+        return {name: channel.snapshot() for name, channel in machine_stats.items()}
@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_alert_store.py
+"""
+Compare les lectures d'alertes sur un grand volume :
+ancien chemin (dict machine -> liste, parcours complet, filtre is_resolved et tri à chaque appel,
+recherche linéaire pour resolve) contre AlertStore (index par id, séquences triées par machine,
+fusion k-voies pour la vue globale).
+
+    cd backend && python benchmarks/bench_alert_store.py --alerts 1000000 --machines 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.main import Alert
+from app.alert_store import AlertStore
+
+
+def old_all_alerts(alerts_db, resolved, limit):
+    filtered = [alert for alerts in alerts_db.values() for alert in alerts if alert.is_resolved == resolved]
+    return sorted(filtered, key=lambda x: x.timestamp, reverse=True)[:limit]
+
+
+def old_machine_alerts(alerts_db, machine_id, resolved, limit):
+    filtered = [alert for alert in alerts_db.get(machine_id, []) if alert.is_resolved == resolved]
+    return sorted(filtered, key=lambda x: x.timestamp, reverse=True)[:limit]
+
+
+def old_resolve(alerts_db, alert_id):
+    for alerts in alerts_db.values():
+        for alert in alerts:
+            if alert.id == alert_id:
+                alert.is_resolved = True
+                return alert
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=1_000_000)
+    parser.add_argument("--machines", type=int, default=1000)
+    parser.add_argument("--resolved-ratio", type=float, default=0.9)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    machine_ids = [uuid4() for _ in range(args.machines)]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    alerts = []
+    for i in range(args.alerts):
+        alerts.append(Alert.model_construct(
+            id=uuid4(), machine_id=random.choice(machine_ids), timestamp=start + timedelta(seconds=i),
+            type="anomaly_detection", severity="Critique", message="", is_resolved=random.random() < args.resolved_ratio,
+            details=None,
+        ))
+
+    old_db = {}
+    for alert in alerts:
+        old_db.setdefault(alert.machine_id, []).append(alert)
+    store = AlertStore()
+    started = time.perf_counter()
+    for alert in alerts:
+        store.add(alert)
+    print(f"{args.alerts} alerts, {args.machines} machines, AlertStore build {time.perf_counter() - started:.2f}s")
+
+    machine_id = machine_ids[0]
+    target = alerts[len(alerts) // 2].id
+    cases = [
+        ("all unresolved (100)", lambda: old_all_alerts(old_db, False, 100), lambda: store.all_alerts(False, 100)),
+        ("all resolved (100)", lambda: old_all_alerts(old_db, True, 100), lambda: store.all_alerts(True, 100)),
+        ("machine unresolved (50)", lambda: old_machine_alerts(old_db, machine_id, False, 50), lambda: store.machine_alerts(machine_id, False, 50)),
+        ("resolve by id", lambda: old_resolve(old_db, target), lambda: store.resolve(target)),
+    ]
+    print(f"{'query':<26}{'old (ms)':>12}{'store (ms)':>12}{'speedup':>10}")
+    for name, old_fn, new_fn in cases:
+        old = timeit(old_fn, args.repeat)
+        new = timeit(new_fn, args.repeat)
+        print(f"{name:<26}{old * 1000:>12.2f}{new * 1000:>12.3f}{old / new:>9.0f}x")
+
+    store.retention_seconds = 1
+    started = time.perf_counter()
+    archived = store.sweep(now=time.time() + 2)
+    print(f"retention sweep: {archived} resolved alerts archived in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
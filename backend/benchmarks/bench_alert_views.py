@@ -0,0 +1,108 @@
+# backend/benchmarks/bench_alert_views.py
+"""
+Compare le chargement des vues alertes, historique et tableau de bord du client :
+ancien chemin (liste des alertes puis un GET /machines/{id} par alerte) contre
+GET /alerts/?expand=machine (une requête) et liste des alertes + POST /machines/lookup
+(deux requêtes), de bout en bout à travers l'application (TestClient, backend mémoire).
+
+Le TestClient n'a pas de latence réseau : --rtt-ms estime en plus le temps d'affichage côté
+navigateur, avec 6 connexions HTTP/1.1 parallèles par hôte pour les requêtes du Promise.all.
+
+    cd backend && python benchmarks/bench_alert_views.py --machines 50 --alerts 200 --rtt-ms 20
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault("DATA_BACKEND", "memory")
+os.environ.setdefault("INFERENCE_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+
+from app import main as api
+from app.main import Alert, Machine
+
+# Vues du client : (nom, requête des alertes)
+VIEWS = [
+    ("alerts", "/alerts/?resolved=false"),
+    ("history", "/alerts/?limit=20"),
+    ("dashboard", "/alerts/?resolved=false&limit=10"),
+]
+# Connexions simultanées par hôte d'un navigateur en HTTP/1.1
+BROWSER_CONNECTIONS = 6
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def old_view(client, url):
+    alerts = client.get(url).json()
+    names = {alert["id"]: client.get(f"/machines/{alert['machine_id']}").json()["name"] for alert in alerts}
+    return 1 + len(alerts), names
+
+
+def expanded_view(client, url):
+    alerts = client.get(f"{url}&expand=machine").json()
+    names = {alert["id"]: alert["machine"]["name"] for alert in alerts}
+    return 1, names
+
+
+def lookup_view(client, url):
+    alerts = client.get(url).json()
+    machines = client.post("/machines/lookup", json={"ids": list({alert["machine_id"] for alert in alerts})}).json()["machines"]
+    names = {alert["id"]: machines[alert["machine_id"]]["name"] for alert in alerts}
+    return 2, names
+
+
+def browser_ms(requests, rtt_ms):
+    """Aller-retour des alertes, puis les requêtes suivantes par vagues de BROWSER_CONNECTIONS."""
+    return rtt_ms * (1 + math.ceil((requests - 1) / BROWSER_CONNECTIONS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--machines", type=int, default=50)
+    parser.add_argument("--alerts", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with TestClient(api.app) as client:
+        # Pas d'endpoint de création : les machines supplémentaires sont ajoutées comme au démarrage
+        for i in range(args.machines - len(api.machines_db)):
+            machine = Machine(name=f"Machine {i}", location="Atelier", type="Pompe", serial_number=f"SN-{i}")
+            api.machines_db[machine.id] = machine
+        api.machines_version += 1
+        machine_ids = list(api.machines_db)
+        for i in range(args.alerts):
+            api.alerts_db.add(Alert(
+                machine_id=machine_ids[i % len(machine_ids)], type="Anomalie", severity="Critique",
+                message=f"Alerte {i}", is_resolved=i % 4 == 0,
+            ))
+
+        print(f"{len(machine_ids)} machines, {args.alerts} alertes, RTT estimé {args.rtt_ms:.0f} ms")
+        print(f"{'view':<11}{'pattern':<10}{'requests':>9}{'in-process (ms)':>17}{'browser est. (ms)':>19}")
+        for view, url in VIEWS:
+            expected = None
+            for pattern, fn in (("n+1", old_view), ("expand", expanded_view), ("lookup", lookup_view)):
+                requests, names = fn(client, url)
+                # Les trois chemins doivent afficher les mêmes noms de machine
+                assert expected is None or names == expected, (view, pattern)
+                expected = names
+                elapsed = timeit(lambda: fn(client, url), args.repeat)
+                print(f"{view:<11}{pattern:<10}{requests:>9}{elapsed * 1000:>17.2f}{browser_ms(requests, args.rtt_ms):>19.0f}")
+        print(api.machine_cache.metrics())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# backend/benchmarks/bench_assistant.py
+"""
+Compare le traitement d'une question par l'assistant IA : ancien endpoint (tests « mot-clé in
+question » successifs, alertes relues dans alerts_db à chaque réponse, puis délai simulé de 1 à
+2,5 s) contre Assistant.answer (intentions reconnues par une seule expression régulière, réponses
+lues dans les fiches de FleetHealth), pour un parc de --machines machines avec des alertes actives.
+Le délai simulé n'est pas exécuté : il est ajouté à la latence de l'ancien endpoint.
+
+    cd backend && python benchmarks/bench_assistant.py --machines 1000 --alerts-per-machine 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.alert_store import AlertStore
+from app.assistant import Assistant
+from app.fleet_health import FleetHealth
+from app.rules import SEVERITY_CRITICAL, SEVERITY_EMERGENCY, SEVERITY_WARNING
+
+# Délai simulé de l'ancien endpoint (random.uniform(1.0, 2.5)), en moyenne
+OLD_SIMULATED_DELAY = (1.0 + 2.5) / 2
+
+QUESTIONS = [
+    ("machine", "Quel est le risque de panne ?"),
+    ("machine", "Quelles sont les alertes de cette machine ?"),
+    ("fleet", "Quelle est la machine la plus à risque ?"),
+    ("fleet", "Quelles sont les dernières alertes ?"),
+    ("fleet", "Quelles technologies utilisez-vous ?"),
+    ("fleet", "Une question sans mot-clé"),
+]
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def old_answer(question, machine_id, machines, alerts_db):
+    """Parcours de l'ancien endpoint, sans le délai simulé ni les réponses sans accès aux données."""
+    question_lower = question.lower()
+    if machine_id in machines:
+        if "risque" in question_lower or "probabilité de panne" in question_lower:
+            machine_alerts = alerts_db.unresolved(machine_id)
+            return any(a.severity == "Urgence" for a in machine_alerts), len(machine_alerts)
+        elif "alertes" in question_lower:
+            machine_alerts = alerts_db.unresolved(machine_id)
+            return {a.type for a in machine_alerts}, machine_alerts[0].message if machine_alerts else None
+    if "bonjour" in question_lower or "salut" in question_lower:
+        return "greeting"
+    elif "aide" in question_lower:
+        return "help"
+    elif "machine la plus à risque" in question_lower:
+        machine_risk_scores = {}
+        for mid, active_alerts in alerts_db.unresolved_by_machine():
+            score = 0.0
+            for alert in active_alerts:
+                if alert.severity == "Urgence": score += 3
+                elif alert.severity == "Critique": score += 2
+                elif alert.severity == "Avertissement": score += 1
+            machine_risk_scores[mid] = score
+        return max(machine_risk_scores, key=machine_risk_scores.get) if machine_risk_scores else None
+    elif "dernières alertes" in question_lower or "alertes globales" in question_lower:
+        count = alerts_db.count(resolved=False)
+        return count, [machines[a.machine_id].name for a in alerts_db.all_alerts(resolved=False, limit=3)]
+    elif "quel est l'objectif" in question_lower or "ton but" in question_lower:
+        return "objective"
+    elif "technologies" in question_lower:
+        return "technologies"
+    return "fallback"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--machines", type=int, default=1000)
+    parser.add_argument("--alerts-per-machine", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    machines = {}
+    alerts_db = AlertStore()
+    fleet_health = FleetHealth()
+    for m in range(args.machines):
+        machine = SimpleNamespace(id=uuid.uuid4(), name=f"Machine {m}", location="Atelier", type="Pompe")
+        machines[machine.id] = machine
+        for _ in range(rng.randint(0, 2 * args.alerts_per_machine)):
+            alert = SimpleNamespace(
+                id=uuid.uuid4(), machine_id=machine.id, timestamp=start + timedelta(seconds=rng.randrange(86400)),
+                type="anomaly_detection", severity=rng.choice((SEVERITY_WARNING, SEVERITY_CRITICAL, SEVERITY_EMERGENCY)),
+                message="Alerte", is_resolved=False,
+            )
+            alerts_db.add(alert)
+            fleet_health.alert_opened(alert)
+    assistant = Assistant(fleet_health, machines, simulated_delay=(0.0,))
+    machine_id = next(iter(machines))
+
+    print(f"{args.machines} machines, {alerts_db.count(resolved=False)} alertes actives")
+    print(f"{'question':<45}{'old (ms)':>10}{'+ delay (ms)':>14}{'new (µs)':>10}{'intent':>16}")
+    for scope, question in QUESTIONS:
+        selected = machine_id if scope == "machine" else None
+        old = timeit(lambda: old_answer(question, selected, machines, alerts_db), args.repeat)
+        new = timeit(lambda: assistant.answer(question, selected), args.repeat)
+        intent, _ = assistant.answer(question, selected)
+        print(f"{question:<45}{old * 1000:>10.3f}{(old + OLD_SIMULATED_DELAY) * 1000:>14.0f}{new * 1e6:>10.1f}{intent:>16}")
+
+
+if __name__ == "__main__":
+    main()
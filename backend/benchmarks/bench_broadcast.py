@@ -0,0 +1,215 @@
+# backend/benchmarks/bench_broadcast.py
+"""
+Test de charge de la diffusion en direct avec 1000 abonnés simultanés.
+
+Par défaut, en mémoire : un Broadcaster, des abonnés répartis sur plusieurs machines (dont une
+part de clients lents), des lectures publiées en continu. Mesure le coût de publication, la latence
+de remise, les resynchronisations, et la taille des messages delta comparée au JSON complet.
+
+Avec --url, contre un serveur lancé (uvicorn app.main:app) : ouvre les WebSocket /ws/machines/{id},
+envoie les lectures par POST /sensor-data/batch et mesure la latence de bout en bout.
+Prévoir `ulimit -n 4096` pour 1000 connexions.
+
+    cd backend && python benchmarks/bench_broadcast.py --subscribers 1000 --machines 10
+    cd backend && python benchmarks/bench_broadcast.py --url http://localhost:8000 --subscribers 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.broadcast import Broadcaster, machine_topic
+from app.sensor_store import COLUMNS
+
+
+class Decoder:
+    """Reconstitue les lectures d'un sujet machine à partir des snapshots et deltas."""
+
+    def __init__(self):
+        self.seq = None
+        self.timestamp_ms = None
+        self.values = None
+        self.scale = None
+        self.readings = 0
+        self.resyncs = 0
+        self.gaps = 0
+
+    def feed(self, message: dict) -> bool:
+        """Applique un message ; retourne True si une lecture a été reconstituée."""
+        kind = message["type"]
+        if kind == "snapshot":
+            self.seq, self.timestamp_ms, self.scale = message["seq"], message["timestamp_ms"], message["scale"]
+            self.values = dict(message["values"])
+        elif kind == "reading":
+            if self.seq is None or message["seq"] != self.seq + 1:
+                self.gaps += 1
+                return False
+            self.seq = message["seq"]
+            self.timestamp_ms += message["dt"]
+            for column, delta in message["d"].items():
+                self.values[column] += delta
+            self.values.update(message.get("set", {}))
+        elif kind == "resync":
+            self.resyncs += 1
+            return False
+        else:
+            return False
+        self.readings += 1
+        return True
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+async def run_memory(args):
+    broadcaster = Broadcaster(COLUMNS, max_queue=args.queue_size)
+    machine_ids = [uuid4() for _ in range(args.machines)]
+    published_at = {machine_id: {} for machine_id in machine_ids}
+    latencies = []
+    decoders = []
+
+    async def consume(machine_id, slow):
+        subscription = broadcaster.subscribe(machine_topic(machine_id))
+        decoder = Decoder()
+        decoders.append((slow, machine_id, decoder))
+        while (message := await subscription.get()) is not None:
+            if decoder.feed(json.loads(message)):
+                sent = published_at[machine_id].get(decoder.seq)
+                if sent is not None and not slow:
+                    latencies.append(time.perf_counter() - sent)
+            if slow:
+                await asyncio.sleep(args.slow_delay)
+        broadcaster.unsubscribe(subscription)
+
+    slow_count = int(args.subscribers * args.slow)
+    consumers = [
+        asyncio.create_task(consume(machine_ids[i % args.machines], i < slow_count))
+        for i in range(args.subscribers)
+    ]
+    await asyncio.sleep(0)
+
+    random.seed(0)
+    last = {machine_id: [70.0, 8.0, 3.0, 15.0, 1000.0] for machine_id in machine_ids}
+    publish_seconds = 0.0
+    events = 0
+    started = time.perf_counter()
+    for _ in range(args.readings // args.machines):
+        for machine_id in machine_ids:
+            values = [value + random.gauss(0, 0.2) for value in last[machine_id]]
+            values[4] = last[machine_id][4] + 0.001
+            last[machine_id] = values
+            t0 = time.perf_counter()
+            topic_seq = broadcaster._topic(machine_topic(machine_id)).seq + 1
+            published_at[machine_id][topic_seq] = t0
+            broadcaster.publish_reading(machine_id, datetime.now(timezone.utc), values)
+            publish_seconds += time.perf_counter() - t0
+            events += 1
+        # Laisse les abonnés consommer entre deux vagues de lectures
+        await asyncio.sleep(args.interval)
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(args.slow_delay * 2 + 0.1)
+    for subscription in [s for topic in broadcaster._topics.values() for s in topic.subscribers]:
+        subscription.close()
+    await asyncio.gather(*consumers)
+
+    fast = [decoder for slow, _, decoder in decoders if not slow]
+    slow = [decoder for slow, _, decoder in decoders if slow]
+    exact = sum(
+        1 for is_slow, machine_id, decoder in decoders
+        if not is_slow and decoder.values == {c: round(v * broadcaster.scale) for c, v in zip(COLUMNS, last[machine_id])}
+    )
+    metrics = broadcaster.metrics()
+
+    # Même lecture sérialisée en entier, comme dans les réponses de /machines/{id}/sensor-data/
+    full_bytes = len(json.dumps({"machine_id": str(machine_ids[0]), "timestamp": datetime.now(timezone.utc).isoformat(),
+                                 **dict(zip(COLUMNS, last[machine_ids[0]])), "labels": None}))
+    delta_bytes = metrics["bytes_out"] / max(metrics["deliveries"], 1)
+    print(f"{args.subscribers} subscribers ({slow_count} slow), {args.machines} machines, {events} readings in {elapsed:.2f}s")
+    print(f"publish: {publish_seconds / events * 1e6:.1f} µs/reading, {publish_seconds / max(metrics['deliveries'], 1) * 1e6:.2f} µs/delivery")
+    print(f"deliveries: {metrics['deliveries']} ({metrics['deliveries'] / elapsed:.0f}/s)")
+    print(f"fast subscribers latency: p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"gaps {sum(d.gaps for d in fast)}, resyncs {sum(d.resyncs for d in fast)}, exact final state {exact}/{len(fast)}")
+    print(f"slow subscribers: resyncs {sum(d.resyncs for d in slow)}, readings applied {sum(d.readings for d in slow)}, gaps {sum(d.gaps for d in slow)}")
+    print(f"bytes/message: delta {delta_bytes:.0f} vs full JSON reading {full_bytes}")
+
+
+async def run_server(args):
+    import httpx
+    import websockets
+
+    base = args.url.rstrip("/")
+    ws_base = base.replace("http", "ws", 1)
+    async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+        machines = (await client.get("/machines/")).json()
+        machine_ids = [machine["id"] for machine in machines][:args.machines]
+        latencies = []
+        decoders = []
+
+        async def consume(machine_id, ready):
+            decoder = Decoder()
+            decoders.append(decoder)
+            async with websockets.connect(f"{ws_base}/ws/machines/{machine_id}", max_queue=None) as ws:
+                ready.release()
+                try:
+                    async for raw in ws:
+                        if decoder.feed(json.loads(raw)):
+                            latencies.append(time.time() * 1000 - decoder.timestamp_ms)
+                except websockets.ConnectionClosed:
+                    pass
+
+        ready = asyncio.Semaphore(0)
+        consumers = [asyncio.create_task(consume(machine_ids[i % len(machine_ids)], ready)) for i in range(args.subscribers)]
+        for _ in range(args.subscribers):
+            await ready.acquire()
+        print(f"{args.subscribers} WebSocket subscribers connected on {len(machine_ids)} machines")
+
+        started = time.perf_counter()
+        for _ in range(args.readings // len(machine_ids)):
+            batch = [
+                {"machine_id": machine_id, "temperature": random.uniform(60, 75), "vibration": random.uniform(5, 12),
+                 "pressure": random.uniform(2, 4), "current": random.uniform(10, 20)}
+                for machine_id in machine_ids
+            ]
+            await client.post("/sensor-data/batch", json=batch)
+            await asyncio.sleep(args.interval)
+        await asyncio.sleep(1.0)
+        elapsed = time.perf_counter() - started
+        metrics = (await client.get("/stream/metrics")).json()
+        for task in consumers:
+            task.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+
+    print(f"readings applied: {sum(d.readings for d in decoders)} in {elapsed:.2f}s, "
+          f"gaps {sum(d.gaps for d in decoders)}, resyncs {sum(d.resyncs for d in decoders)}")
+    print(f"end-to-end latency: p50 {percentile(latencies, 0.5):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms")
+    print(f"server: {metrics}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--machines", type=int, default=10)
+    parser.add_argument("--readings", type=int, default=5000)
+    parser.add_argument("--interval", type=float, default=0.005, help="pause entre deux vagues de lectures (s)")
+    parser.add_argument("--slow", type=float, default=0.05, help="part des abonnés lents (en mémoire)")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="temps de traitement d'un message par un abonné lent (s)")
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--url", help="URL d'un serveur lancé, ex. http://localhost:8000")
+    args = parser.parse_args()
+    asyncio.run(run_server(args) if args.url else run_memory(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# backend/benchmarks/bench_db_latency.py
+"""
+Mesure la latence de GET /machines/{id}/sensor-data/ sous charge concurrente (p50/p99, débit),
+pour comparer les moteurs de base synchrone et asynchrone sur un serveur déjà démarré :
+
+    DATA_BACKEND=database-sync uvicorn app.main:app --port 8000
+    python benchmarks/bench_db_latency.py --url http://localhost:8000 --clients 50 --duration 20
+
+    DATA_BACKEND=database uvicorn app.main:app --port 8000
+    python benchmarks/bench_db_latency.py --url http://localhost:8000 --clients 50 --duration 20
+
+Nécessite httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def client_loop(client, path, params, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        machine_id = args.machine_id
+        if machine_id is None:
+            machines = (await client.get("/machines/")).json()
+            if not machines:
+                raise SystemExit("Aucune machine renvoyée par /machines/")
+            machine_id = machines[0]["id"]
+
+        path = f"/machines/{machine_id}/sensor-data/"
+        params = {"limit": args.limit}
+        latencies, errors = [], []
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(client_loop(client, path, params, deadline, latencies, errors) for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    if not latencies:
+        raise SystemExit(f"Aucune requête réussie ({len(errors)} erreurs)")
+    print(f"{path} limit={args.limit}, {args.clients} concurrent clients, {elapsed:.1f}s")
+    print(f"requests: {len(latencies)} ok, {len(errors)} errors, {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency ms: p50={percentile(latencies, 0.50) * 1e3:.2f} p99={percentile(latencies, 0.99) * 1e3:.2f} "
+          f"mean={statistics.mean(latencies) * 1e3:.2f} max={max(latencies) * 1e3:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--machine-id", default=None, help="Par défaut, la première machine de /machines/")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--limit", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
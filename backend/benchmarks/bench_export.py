@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_export.py
+"""
+Compare l'export de l'historique d'une machine : réponse JSON de /machines/{id}/sensor-data/
+et pd.read_sql (comme fetch_data_for_training) contre l'export Arrow IPC / Parquet par lots
+(app/export.py), depuis le tampon en mémoire puis depuis une base SQLite temporaire.
+Mesure le temps, la taille produite et le pic de mémoire allouée (tracemalloc).
+
+    cd backend && python benchmarks/bench_export.py --points 1000000 --db-points 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.export import EXPORT_BATCH_ROWS, EXPORT_DB_BATCH_ROWS, encode_batches, export_schema, memory_batches, rows_batch
+from app.sensor_store import SensorRingBuffer
+from app.serialization import sensor_data_json
+
+
+def measure(fn):
+    """Temps, octets produits, puis pic de mémoire allouée pendant un second appel (tracemalloc ralentit fn)."""
+    started = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def consume(chunks):
+    return sum(len(chunk) for chunk in chunks)
+
+
+def report(name, elapsed, size, peak):
+    print(f"{name:<28}{elapsed * 1000:>10.0f}{size / 2**20:>10.1f}{peak / 2**20:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000, help="lectures dans le tampon en mémoire")
+    parser.add_argument("--db-points", type=int, default=200_000, help="lectures dans la base SQLite")
+    parser.add_argument("--batch-rows", type=int, default=EXPORT_BATCH_ROWS)
+    parser.add_argument("--db-batch-rows", type=int, default=EXPORT_DB_BATCH_ROWS)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    machine_id = uuid.uuid4()
+    schema = export_schema(machine_id)
+    buffer = SensorRingBuffer(capacity=args.points)
+    values = rng.uniform(0, 100, size=(args.points, 5))
+    for i in range(args.points):
+        buffer.append(1_700_000_000_000_000_000 + i * 1_000_000_000, values[i])
+
+    print(f"{'memory, ' + str(args.points) + ' points':<28}{'ms':>10}{'MiB out':>10}{'peak MiB':>10}")
+    report("json rows", *measure(lambda: len(sensor_data_json(machine_id, buffer, range(len(buffer))))))
+    report("json columnar", *measure(lambda: len(sensor_data_json(machine_id, buffer, range(len(buffer)), "columnar"))))
+    for export_format in ("arrow", "parquet"):
+        report(f"export {export_format}", *measure(lambda: consume(
+            encode_batches(memory_batches(buffer, schema, batch_rows=args.batch_rows), export_format, schema))))
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/export.db")
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE sensor_data (timestamp DATETIME, machine_id CHAR(32), temperature NUMERIC, vibration NUMERIC, "
+                "pressure NUMERIC, current NUMERIC, operating_hours NUMERIC, labels TEXT)"
+            ))
+            start = datetime(2024, 1, 1)
+            connection.execute(
+                text("INSERT INTO sensor_data VALUES (:timestamp, :machine_id, :t, :v, :p, :c, :h, NULL)"),
+                [
+                    {"timestamp": start + timedelta(seconds=i), "machine_id": machine_id.hex,
+                     "t": row[0], "v": row[1], "p": row[2], "c": row[3], "h": row[4]}
+                    for i, row in enumerate(rng.uniform(0, 100, size=(args.db_points, 5)).tolist())
+                ],
+            )
+            connection.execute(text("CREATE INDEX ix_sensor_data ON sensor_data (machine_id, timestamp)"))
+
+        def read_sql():
+            query = f"""
+            SELECT timestamp, temperature, vibration, pressure, "current", operating_hours
+            FROM sensor_data
+            WHERE machine_id = '{machine_id.hex}'
+            ORDER BY timestamp ASC;
+            """
+            df = pd.read_sql(text(query), engine)
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+            return int(df.memory_usage(deep=True).sum())
+
+        def export(export_format):
+            with Session(engine) as db:
+                partitions = crud.stream_sensor_data(db, machine_id, batch_size=args.db_batch_rows)
+                return consume(encode_batches((rows_batch(rows, schema) for rows in partitions), export_format, schema))
+
+        print(f"{'sqlite, ' + str(args.db_points) + ' points':<28}{'ms':>10}{'MiB out':>10}{'peak MiB':>10}")
+        report("pd.read_sql (DataFrame)", *measure(read_sql))
+        for export_format in ("arrow", "parquet"):
+            report(f"export {export_format}", *measure(lambda: export(export_format)))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# backend/benchmarks/bench_fleet_health.py
+"""
+Compare la recherche des machines les plus à risque : ancien calcul de l'assistant (parcours de
+toutes les alertes actives de toutes les machines à chaque question) contre FleetHealth.top(k)
+(tas des scores de risque tenu à jour à l'ouverture et à la résolution des alertes), pour des
+parcs de taille croissante. Mesure aussi le coût ajouté à chaque ouverture/résolution d'alerte.
+
+    cd backend && python benchmarks/bench_fleet_health.py --machines 100,1000,10000 --alerts-per-machine 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.alert_store import AlertStore
+from app.fleet_health import FleetHealth
+from app.rules import SEVERITY_CRITICAL, SEVERITY_EMERGENCY, SEVERITY_WARNING
+
+SEVERITIES = (SEVERITY_WARNING, SEVERITY_CRITICAL, SEVERITY_EMERGENCY)
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def rescan_top(alerts_db, k):
+    """Calcul de ask_ai avant FleetHealth, étendu aux k premières machines."""
+    machine_risk_scores = {}
+    for mid, active_alerts in alerts_db.unresolved_by_machine():
+        score = 0.0
+        for alert in active_alerts:
+            if alert.severity == "Urgence": score += 3
+            elif alert.severity == "Critique": score += 2
+            elif alert.severity == "Avertissement": score += 1
+        machine_risk_scores[mid] = score
+    return sorted(machine_risk_scores, key=machine_risk_scores.get, reverse=True)[:k]
+
+
+def make_alert(machine_id, rng):
+    return SimpleNamespace(
+        id=uuid.uuid4(), machine_id=machine_id, timestamp=time.time(), severity=rng.choice(SEVERITIES), is_resolved=False,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--machines", default="100,1000,10000")
+    parser.add_argument("--alerts-per-machine", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'machines':>9}{'alerts':>9}{'rescan (ms)':>13}{'top(1) (µs)':>13}{'top(k) (µs)':>13}{'update (µs)':>13}")
+    for machines in (int(value) for value in args.machines.split(",")):
+        rng = random.Random(0)
+        alerts_db = AlertStore()
+        fleet_health = FleetHealth()
+        machine_ids = [uuid.uuid4() for _ in range(machines)]
+        alerts = []
+        for machine_id in machine_ids:
+            for _ in range(rng.randint(0, 2 * args.alerts_per_machine)):
+                alert = make_alert(machine_id, rng)
+                alerts_db.add(alert)
+                fleet_health.alert_opened(alert)
+                alerts.append(alert)
+
+        rescan = timeit(lambda: rescan_top(alerts_db, args.top), args.repeat)
+        top_one = timeit(lambda: fleet_health.top(1), args.repeat)
+        top_k = timeit(lambda: fleet_health.top(args.top), args.repeat)
+        assert {h.risk_score for h in fleet_health.top(1)} == {max(h.risk_score for h in fleet_health.top(machines))}
+
+        # Résolution d'une alerte puis ouverture d'une nouvelle, tas mis à jour à chaque fois
+        operations = 10_000
+        started = time.perf_counter()
+        for _ in range(operations):
+            index = rng.randrange(len(alerts))
+            fleet_health.alert_resolved(alerts[index])
+            alerts[index] = make_alert(rng.choice(machine_ids), rng)
+            fleet_health.alert_opened(alerts[index])
+        update = (time.perf_counter() - started) / (2 * operations)
+
+        print(f"{machines:>9}{len(alerts):>9}{rescan * 1000:>13.2f}{top_one * 1e6:>13.1f}{top_k * 1e6:>13.1f}{update * 1e6:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
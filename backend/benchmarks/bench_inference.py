@@ -0,0 +1,116 @@
+# backend/benchmarks/bench_inference.py
+"""
+Compare le débit du scoring Isolation Forest :
+ancien chemin (un DataFrame et un appel model.predict par lecture, comme ml_model.predict_anomaly)
+contre InferenceBatcher (lectures concurrentes regroupées en un appel decision_function par lot).
+Vérifie aussi que le batcher survit à un lot invalide, borne sa file et fait échouer à l'arrêt
+les demandes en attente.
+
+    cd backend && python benchmarks/bench_inference.py --readings 5000 --concurrency 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+# Le module ml_model crée un moteur SQLAlchemy à l'import ; le benchmark n'accède pas à la base
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.ml import ml_model
+from app.ml.inference import InferenceBatcher
+
+
+def load_or_train_model():
+    model = ml_model.load_model()
+    if model is None:
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(rng.normal((70, 10, 3, 15), (3, 2, 0.5, 2), size=(5000, 4)), columns=ml_model.FEATURES)
+        model = ml_model.train_isolation_forest(df)
+    return model
+
+
+def per_row(model, readings):
+    started = time.perf_counter()
+    for row in readings:
+        model.predict(pd.DataFrame([row], columns=ml_model.FEATURES))
+    return time.perf_counter() - started
+
+
+async def batched(model, readings, concurrency, max_batch, max_wait_ms):
+    batcher = InferenceBatcher(lambda X, model_key: ml_model.score_batch(X, model), max_batch=max_batch, max_wait_ms=max_wait_ms)
+    await batcher.start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def score(row):
+        async with semaphore:
+            await batcher.score(row)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(score(row) for row in readings))
+    elapsed = time.perf_counter() - started
+    metrics = batcher.metrics()
+    await batcher.stop()
+    return elapsed, metrics
+
+
+async def check_robustness():
+    release = asyncio.Event()
+
+    def slow_score(X, model_key):
+        # Bloque le thread de scoring jusqu'à release, pour remplir la file
+        while not release.is_set():
+            time.sleep(0.01)
+        return np.zeros(len(X)), np.zeros(len(X))
+
+    batcher = InferenceBatcher(slow_score, max_batch=4, max_wait_ms=1, max_queue=8)
+    await batcher.start()
+
+    # Deux largeurs de features dans un même groupe : np.vstack échoue, le batcher continue
+    release.set()
+    mixed = await asyncio.gather(batcher.score_many(np.zeros((1, 4))), batcher.score_many(np.zeros((1, 3))), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in mixed), mixed
+    assert (await batcher.score(np.zeros(4)))[0] == 0.0
+
+    # File bornée : les producteurs au-delà de max_queue attendent, puis stop() fait tout échouer
+    release.clear()
+    tasks = [asyncio.create_task(batcher.score(np.zeros(4))) for _ in range(40)]
+    await asyncio.sleep(0.2)
+    depth = batcher.metrics()["queue_depth"]
+    assert depth <= 8, depth
+    await asyncio.wait_for(batcher.stop(), 5)
+    release.set()
+    results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 5)
+    failed = sum(isinstance(result, RuntimeError) for result in results)
+    assert failed == len(tasks), results
+    print(f"robustesse : lot invalide isolé, file ≤ {depth}/8 demandes, {failed} demandes en attente échouées à l'arrêt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500, help="lectures en attente de score simultanément")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = load_or_train_model()
+    rng = np.random.default_rng(1)
+    readings = rng.normal((70, 10, 3, 15), (5, 3, 1, 4), size=(args.readings, 4))
+
+    row_seconds = per_row(model, readings)
+    batch_seconds, metrics = asyncio.run(batched(model, readings, args.concurrency, args.max_batch, args.max_wait_ms))
+
+    print(f"{'path':<12}{'total (s)':>12}{'readings/s':>14}{'avg batch':>12}")
+    print(f"{'per-row':<12}{row_seconds:>12.3f}{args.readings / row_seconds:>14.0f}{1:>12}")
+    print(f"{'batched':<12}{batch_seconds:>12.3f}{args.readings / batch_seconds:>14.0f}{metrics['avg_batch_size']:>12}")
+    print(f"speedup: {row_seconds / batch_seconds:.1f}x")
+    asyncio.run(check_robustness())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# backend/benchmarks/bench_ingestion.py
+"""
+Vérifie et mesure l'écriture différée (app/ingestion.py, WriteBehindWriter) contre SQLite, avec
+une table compatible avec sensor_data (labels en JSON au lieu d'ARRAY, clé étrangère vers
+machines activée) :
+
+- débit d'écriture et écriture complète de la file à l'arrêt (stop) ;
+- backpressure : une base lente et une file bornée font attendre les producteurs ;
+- lignes refusées (machine inconnue) : seules ces lignes sont abandonnées, le reste du lot est écrit ;
+- erreurs transitoires : le lot est réécrit après une attente, sans perte.
+
+    cd backend && python benchmarks/bench_ingestion.py --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, MetaData, Table, Uuid, create_engine, event, func, select
+from sqlalchemy.exc import OperationalError
+
+from app.ingestion import WriteBehindWriter
+
+
+def make_tables(path):
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(connection, _):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    metadata = MetaData()
+    machines = Table("machines", metadata, Column("id", Uuid, primary_key=True))
+    sensor_data = Table(
+        "sensor_data", metadata,
+        Column("timestamp", DateTime(timezone=True), primary_key=True),
+        Column("machine_id", Uuid, ForeignKey("machines.id"), primary_key=True),
+        *(Column(name, Float, nullable=False) for name in ("temperature", "vibration", "pressure", "current")),
+        Column("operating_hours", Float),
+        Column("labels", JSON),
+    )
+    metadata.create_all(engine)
+    return engine, machines, sensor_data
+
+
+def make_rows(machine_ids, count, start):
+    return [
+        {"timestamp": start + timedelta(milliseconds=i), "machine_id": machine_ids[i % len(machine_ids)],
+         "temperature": 60.0, "vibration": 5.0, "pressure": 2.0, "current": 10.0, "operating_hours": None, "labels": []}
+        for i in range(count)
+    ]
+
+
+def count_rows(engine, table):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+
+
+async def check_throughput(engine, table, machine_ids, rows):
+    writer = WriteBehindWriter(engine, table, flush_rows=5000, flush_interval=0.2)
+    await writer.start()
+    started = time.perf_counter()
+    await writer.submit_many(make_rows(machine_ids, rows, datetime(2024, 1, 1, tzinfo=timezone.utc)))
+    submitted = time.perf_counter() - started
+    # stop() doit écrire tout ce qui reste dans la file
+    await writer.stop()
+    elapsed = time.perf_counter() - started
+    assert writer.rows_written == rows == count_rows(engine, table), (writer.rows_written, count_rows(engine, table))
+    print(f"débit : {rows} lignes en file en {submitted:.2f}s, toutes écrites à l'arrêt en {elapsed:.2f}s "
+          f"({rows / elapsed:,.0f} lignes/s, {writer.flushes} lots)")
+
+
+async def check_backpressure(engine, table, machine_ids):
+    delay = 0.05
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow_database(*_):
+        time.sleep(delay)
+
+    capacity, rows = 200, 2000
+    writer = WriteBehindWriter(engine, table, flush_rows=100, flush_interval=0.01, max_queue_rows=capacity)
+    await writer.start()
+    max_depth = 0
+    started = time.perf_counter()
+    for row in make_rows(machine_ids, rows, datetime(2024, 2, 1, tzinfo=timezone.utc)):
+        await writer.submit(row)
+        max_depth = max(max_depth, writer.queue_depth)
+    waited = time.perf_counter() - started
+    await writer.stop()
+    event.remove(engine, "before_cursor_execute", slow_database)
+    # Sans backpressure, 2000 mises en file prendraient quelques millisecondes
+    minimum = (rows - capacity) / 100 * delay * 0.5
+    assert max_depth <= capacity and waited > minimum, (max_depth, waited)
+    assert writer.rows_written == rows
+    print(f"backpressure : file ≤ {max_depth}/{capacity} lignes, producteur ralenti à {rows / waited:,.0f} lignes/s "
+          f"par une base à {delay * 1000:.0f} ms/lot")
+
+
+async def check_rejected_rows(engine, table, machine_ids):
+    rows = make_rows(machine_ids, 1000, datetime(2024, 3, 1, tzinfo=timezone.utc))
+    unknown = uuid.uuid4()
+    for i in (10, 500, 501, 999):
+        rows[i]["machine_id"] = unknown
+    writer = WriteBehindWriter(engine, table, flush_rows=1000, flush_interval=0.2)
+    await writer.start()
+    await writer.submit_many(rows)
+    await writer.stop()
+    assert (writer.rows_written, writer.rows_failed) == (996, 4), (writer.rows_written, writer.rows_failed)
+    print(f"lignes refusées : {writer.rows_failed} abandonnées (machine inconnue), {writer.rows_written} écrites dans le même lot")
+
+
+async def check_transient_errors(engine, table, machine_ids):
+    failures = [2]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def flaky_database(*_):
+        if failures[0]:
+            failures[0] -= 1
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+
+    writer = WriteBehindWriter(engine, table, flush_rows=1000, flush_interval=0.2, retry_backoff=0.05)
+    await writer.start()
+    await writer.submit_many(make_rows(machine_ids, 1000, datetime(2024, 4, 1, tzinfo=timezone.utc)))
+    await writer.stop()
+    event.remove(engine, "before_cursor_execute", flaky_database)
+    assert (writer.rows_written, writer.rows_failed, writer.retries) == (1000, 0, 2), writer.metrics()
+    print(f"erreurs transitoires : {writer.retries} nouvelles tentatives, {writer.rows_written} lignes écrites, aucune perdue")
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        engine, machines, sensor_data = make_tables(os.path.join(directory, "ingestion.db"))
+        machine_ids = [uuid.uuid4() for _ in range(args.machines)]
+        with engine.begin() as connection:
+            connection.execute(machines.insert(), [{"id": machine_id} for machine_id in machine_ids])
+        await check_throughput(engine, sensor_data, machine_ids, args.rows)
+        await check_backpressure(engine, sensor_data, machine_ids)
+        await check_rejected_rows(engine, sensor_data, machine_ids)
+        await check_transient_errors(engine, sensor_data, machine_ids)
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--machines", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
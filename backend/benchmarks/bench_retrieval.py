@@ -0,0 +1,101 @@
+# backend/benchmarks/bench_retrieval.py
+"""
+Mesure l'index de recherche de l'historique (app/retrieval.py) : débit d'indexation incrémentale,
+taille de l'index, puis latence des requêtes sur une machine, sur tout le parc (par pertinence et
+« dernière fois »), et des incidents similaires, comparée à un parcours complet des messages
+(recherche d'une sous-chaîne dans chaque alerte, comme sans index).
+
+    cd backend && python benchmarks/bench_retrieval.py --alerts 1000000 --machines 100
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.retrieval import KIND_ALERT, RetrievalIndex
+from app.rules import SEVERITY_CRITICAL, SEVERITY_EMERGENCY, SEVERITY_WARNING
+
+# (libellé, unité, seuil) des règles, pour des messages semblables à ceux de RuleEngine.message
+RULES = [("Température", "°C", 85.0), ("Vibration", "", 18.5), ("Pression", "", 5.0), ("Courant", "A", 25.0)]
+LABELS = ["roulement", "desalignement", "cavitation", "surcharge", "fuite", "balourd", "lubrification", "encrassement"]
+
+
+def make_alert(rng, machine_id, timestamp):
+    parts = []
+    for label, unit, threshold in rng.sample(RULES, rng.choice((1, 1, 1, 2))):
+        qualifier = rng.choice(("critique", "maximal"))
+        parts.append(f"{label} ({threshold * rng.uniform(1.05, 1.6):.1f}{unit}) dépasse le seuil {qualifier} ({threshold}{unit}).")
+    labels = rng.sample(LABELS, rng.randint(0, 2))
+    return SimpleNamespace(
+        id=uuid.uuid4(), machine_id=machine_id, timestamp=timestamp, type="anomaly_detection",
+        severity=rng.choice((SEVERITY_WARNING, SEVERITY_CRITICAL, SEVERITY_EMERGENCY)),
+        message=" et ".join(parts), details={"labels": labels} if labels else None,
+    )
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=1_000_000)
+    parser.add_argument("--machines", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    machine_ids = [uuid.uuid4() for _ in range(args.machines)]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    alerts = [make_alert(rng, rng.choice(machine_ids), start + timedelta(seconds=30 * i)) for i in range(args.alerts)]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    index = RetrievalIndex()
+    started = time.perf_counter()
+    for alert in alerts:
+        index.add_alert(alert)
+    elapsed = time.perf_counter() - started
+    metrics = index.metrics()
+    print(f"{args.alerts} alertes indexées en {elapsed:.1f}s ({elapsed / args.alerts * 1e6:.1f} µs/alerte), "
+          f"{metrics['terms']} termes, {metrics['postings']} entrées, tableaux {metrics['index_bytes'] / 2**20:.0f} MiB, "
+          f"RSS +{(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024:.0f} MiB")
+
+    machine_id = machine_ids[0]
+    reference = next(alert for alert in reversed(alerts) if alert.machine_id == machine_id and alert.details)
+
+    def scan(term, machine=None):
+        # Sans index : parcours de toutes les alertes
+        return [alert for alert in alerts if (machine is None or alert.machine_id == machine) and term in alert.message.lower()][-10:]
+
+    cases = [
+        ("machine: cavitation pression", lambda: index.search("cavitation pression", machine_id=machine_id),
+         lambda: scan("pression", machine_id)),
+        ("fleet: cavitation pression", lambda: index.search("cavitation pression"), lambda: scan("pression")),
+        ("fleet: last overheat (recent)", lambda: index.search("surchauffe", kind=KIND_ALERT, sort="recent", limit=1),
+         lambda: scan("température")),
+        ("machine: similar incidents", lambda: index.similar(reference, limit=5), None),
+        ("fleet: similar incidents", lambda: index.similar(reference, limit=5, same_machine=False), None),
+    ]
+    print(f"{'query':<34}{'index (ms)':>12}{'scan (ms)':>12}")
+    for name, indexed, scanned in cases:
+        index_ms = timeit(indexed, args.repeat) * 1000
+        scan_ms = f"{timeit(scanned, 1) * 1000:>12.1f}" if scanned is not None else f"{'-':>12}"
+        print(f"{name:<34}{index_ms:>12.2f}{scan_ms}")
+    hit = index.search("surchauffe", kind=KIND_ALERT, sort="recent", limit=1)[0]
+    print(f"dernière surchauffe : {hit.timestamp:%Y-%m-%d %H:%M:%S} — {hit.text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# backend/benchmarks/bench_rules.py
+"""
+Compare l'évaluation des seuils d'un lot de lectures de nombreuses machines :
+ancien chemin (quatre contrôles if par lecture, clés lues par dict.get) contre RuleEngine
+(configurations compilées une fois en matrices, comparaison vectorisée du lot entier).
+
+    cd backend && python benchmarks/bench_rules.py --readings 200000 --machines 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.rules import CHANNELS, RuleEngine
+
+
+def old_evaluate(machine_configs, machine_ids, values):
+    results = []
+    for machine_id, (temperature, vibration, pressure, current) in zip(machine_ids, values.tolist()):
+        thresholds_config = machine_configs[machine_id]
+        is_anomaly = False
+        anomaly_score = 0.0
+        severity = "Avertissement"
+        if temperature > thresholds_config.get("temperature_critique", 90.0):
+            is_anomaly = True
+            anomaly_score += 0.4
+            severity = "Critique"
+        if vibration > thresholds_config.get("vibration_max", 20.0):
+            is_anomaly = True
+            anomaly_score += 0.3
+            severity = "Critique"
+        if pressure > thresholds_config.get("pressure_max", 7.0):
+            is_anomaly = True
+            anomaly_score += 0.15
+        if current > thresholds_config.get("current_max", 35.0):
+            is_anomaly = True
+            anomaly_score += 0.15
+            severity = "Critique"
+        if anomaly_score > 0.7:
+            severity = "Urgence"
+        elif anomaly_score > 0.4:
+            severity = "Critique"
+        results.append((is_anomaly, min(anomaly_score, 1.0), severity))
+    return results
+
+
+def new_evaluate(engine, machine_configs, machine_ids, values):
+    machine_rows = {}
+    rows = np.empty(len(machine_ids), dtype=np.intp)
+    for i, machine_id in enumerate(machine_ids):
+        row = machine_rows.get(machine_id)
+        if row is None:
+            row = machine_rows[machine_id] = engine.row(machine_id, machine_configs[machine_id])
+        rows[i] = row
+    result = engine.evaluate(rows, values)
+    return result.violated.any(axis=1), result.scores, result.severities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=200_000)
+    parser.add_argument("--machines", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    machine_configs = {
+        machine_id: {
+            "temperature_critique": random.uniform(70, 90),
+            "vibration_max": random.uniform(10, 20),
+            "pressure_max": random.uniform(3, 7),
+            "current_max": random.uniform(18, 35),
+        }
+        for machine_id in range(args.machines)
+    }
+    machine_ids = [random.randrange(args.machines) for _ in range(args.readings)]
+    rng = np.random.default_rng(0)
+    values = np.column_stack([
+        rng.normal(75, 10, args.readings),
+        rng.normal(12, 5, args.readings),
+        rng.normal(4, 1.5, args.readings),
+        rng.normal(22, 6, args.readings),
+    ])
+    assert values.shape[1] == len(CHANNELS)
+
+    engine = RuleEngine()
+    old_best = new_best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        old = old_evaluate(machine_configs, machine_ids, values)
+        old_best = min(old_best, time.perf_counter() - started)
+        started = time.perf_counter()
+        new = new_evaluate(engine, machine_configs, machine_ids, values)
+        new_best = min(new_best, time.perf_counter() - started)
+
+    old_anomaly = np.array([r[0] for r in old])
+    old_scores = np.array([r[1] for r in old])
+    old_severities = np.array([r[2] for r in old])
+    assert (old_anomaly == new[0]).all() and (old_scores == new[1]).all()
+    assert (old_severities[old_anomaly] == new[2][old_anomaly]).all()
+
+    print(f"{args.readings} readings, {args.machines} machines, {engine.compilations} compilations")
+    print(f"{'path':<22}{'time (ms)':>12}{'readings/s':>14}")
+    print(f"{'per-reading if':<22}{old_best * 1000:>12.1f}{args.readings / old_best:>14.0f}")
+    print(f"{'compiled engine':<22}{new_best * 1000:>12.1f}{args.readings / new_best:>14.0f}")
+    print(f"speedup: {old_best / new_best:.1f}x")
+
+    # Une configuration modifiée n'est recompilée qu'après invalidate()
+    compilations = engine.compilations
+    machine_configs[0] = {**machine_configs[0], "temperature_critique": -1000.0}
+    row = engine.row(0, machine_configs[0])
+    assert engine.compilations == compilations and engine.upper[row][CHANNELS.index("temperature")] != -1000.0
+    engine.invalidate(0)
+    row = engine.row(0, machine_configs[0])
+    assert engine.compilations == compilations + 1 and engine.upper[row][CHANNELS.index("temperature")] == -1000.0
+    print("invalidate : configuration modifiée recompilée une fois, aucune recompilation sans invalidate()")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# backend/benchmarks/bench_sensor_memory.py
+"""
+Compare l'empreinte mémoire de l'historique des capteurs :
+ancien format (deque de SensorDataPoint Pydantic par machine) contre SensorDataStore (colonnes NumPy).
+
+Les deux formats sont mesurés avec tracemalloc sur un échantillon de machines, puis extrapolés
+au parc cible (10k machines x 10k points par défaut), qu'il serait impossible d'allouer avec
+l'ancien format.
+
+    cd backend && python benchmarks/bench_sensor_memory.py --machines 10000 --points 10000
+"""
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.main import SensorDataPoint
+from app.sensor_store import COLUMNS, SensorDataStore
+
+
+def random_reading(machine_id, timestamp):
+    return SensorDataPoint(
+        machine_id=machine_id,
+        timestamp=timestamp,
+        temperature=random.uniform(60.0, 75.0),
+        vibration=random.uniform(5.0, 12.0),
+        pressure=random.uniform(2.0, 4.0),
+        current=random.uniform(10.0, 20.0),
+        operating_hours=random.uniform(100.0, 5000.0),
+        labels=[],
+    )
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--machines", type=int, default=10_000, help="Nombre de machines du parc cible")
+    parser.add_argument("--points", type=int, default=10_000, help="Points retenus par machine")
+    parser.add_argument("--sample-machines", type=int, default=5, help="Machines réellement allouées pour la mesure")
+    args = parser.parse_args()
+
+    start = datetime.now(timezone.utc)
+    machine_ids = [uuid4() for _ in range(args.sample_machines)]
+    readings = {
+        machine_id: [random_reading(machine_id, start + timedelta(seconds=i)) for i in range(args.points)]
+        for machine_id in machine_ids
+    }
+
+    # Ancien format : les objets Pydantic sont mesurés au moment de leur création
+    def build_old():
+        db = {}
+        for machine_id in machine_ids:
+            db[machine_id] = deque(maxlen=args.points)
+            for i in range(args.points):
+                db[machine_id].append(random_reading(machine_id, start + timedelta(seconds=i)))
+        return db
+
+    def build_new():
+        store = SensorDataStore(retention_points=args.points)
+        for machine_id, points in readings.items():
+            for point in points:
+                store.append(machine_id, point.timestamp, [getattr(point, name) for name in COLUMNS], point.labels)
+        return store
+
+    old_db, old_bytes = measure(build_old)
+    del old_db
+    store, new_bytes = measure(build_new)
+
+    sample_points = args.sample_machines * args.points
+    total_points = args.machines * args.points
+    scale = total_points / sample_points
+
+    print(f"Sample: {args.sample_machines} machines x {args.points} points ({sample_points:,} readings)")
+    print(f"{'layout':<28}{'bytes/point':>14}{'fleet total':>16}")
+    for label, measured in (("deque[SensorDataPoint]", old_bytes), ("SensorDataStore (NumPy)", new_bytes)):
+        print(f"{label:<28}{measured / sample_points:>14.1f}{measured * scale / 2**30:>13.2f} GiB")
+    print(f"Preallocated NumPy columns: {store.nbytes / sample_points:.1f} bytes/point")
+    print(f"Reduction: x{old_bytes / new_bytes:.1f} for {args.machines:,} machines x {args.points:,} points")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_sensor_range.py
+"""
+Compare le coût d'une requête temporelle sur l'historique d'une machine :
+ancien chemin (copie de la deque, filtres par compréhension, sorted, [-limit:])
+contre SensorRingBuffer.range (dichotomie sur les timestamps triés) + reconstruction des points.
+La colonne "bisect only" isole le coût de la recherche, indépendant de la reconstruction.
+
+    cd backend && python benchmarks/bench_sensor_range.py --sizes 1000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.main import SensorDataPoint
+from app.sensor_store import SensorRingBuffer, datetime_to_ns
+
+
+def old_query(data, start_time, end_time, limit):
+    all_data = list(data)
+    if start_time:
+        all_data = [d for d in all_data if d.timestamp >= start_time]
+    if end_time:
+        all_data = [d for d in all_data if d.timestamp <= end_time]
+    sorted_data = sorted(all_data, key=lambda x: x.timestamp)
+    return sorted_data[-limit:]
+
+
+def new_query(buffer, start_time, end_time, limit):
+    lo, hi = buffer.range(datetime_to_ns(start_time), datetime_to_ns(end_time))
+    return list(buffer.records(range(lo, hi)[-limit:]))
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    machine_id = uuid4()
+    origin = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    print(f"{'points':>10}{'old (ms)':>12}{'new (ms)':>12}{'speed-up':>10}{'bisect only (us)':>18}")
+    for size in args.sizes:
+        old_data = deque(maxlen=size)
+        buffer = SensorRingBuffer(capacity=size)
+        for i in range(size):
+            timestamp = origin + timedelta(seconds=i)
+            values = (random.uniform(60, 75), random.uniform(5, 12), random.uniform(2, 4), random.uniform(10, 20), None)
+            old_data.append(SensorDataPoint.model_construct(
+                machine_id=machine_id, timestamp=timestamp, temperature=values[0], vibration=values[1],
+                pressure=values[2], current=values[3], operating_hours=None, labels=None,
+            ))
+            buffer.append(datetime_to_ns(timestamp), values)
+
+        # Fenêtre couvrant la dernière heure de l'historique, tronquée à `limit` points
+        end_time = origin + timedelta(seconds=size - 1)
+        start_time = end_time - timedelta(hours=1)
+        assert len(old_query(old_data, start_time, end_time, args.limit)) == len(new_query(buffer, start_time, end_time, args.limit))
+
+        old = timeit(lambda: old_query(old_data, start_time, end_time, args.limit), args.repeat)
+        new = timeit(lambda: new_query(buffer, start_time, end_time, args.limit), args.repeat)
+        lookup = timeit(lambda: buffer.range(datetime_to_ns(start_time), datetime_to_ns(end_time)), args.repeat)
+        print(f"{size:>10,}{old * 1e3:>12.3f}{new * 1e3:>12.3f}{old / new:>9.1f}x{lookup * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
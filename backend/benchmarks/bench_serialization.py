@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_serialization.py
+"""
+Compare la sérialisation des lectures et des prédictions d'une machine :
+ancien chemin (un SensorDataPoint par lecture, puis validation et sérialisation par FastAPI
+via response_model=List[...]) contre le chemin direct (colonnes du tampon sérialisées par
+orjson, champs des prédictions sérialisés par orjson), en fonctions puis de bout en bout
+à travers une application FastAPI.
+
+    cd backend && python benchmarks/bench_serialization.py --points 500 --repeat 200
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from app.main import AnomalyPrediction, SensorDataPoint
+from app.sensor_store import COLUMNS, SensorRingBuffer, datetime_to_ns
+from app.serialization import dumps, sensor_data_json
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    machine_id = uuid4()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    buffer = SensorRingBuffer(capacity=args.points)
+    predictions = []
+    for i in range(args.points):
+        timestamp = start + timedelta(seconds=i, microseconds=random.randrange(1_000_000))
+        values = [random.uniform(60, 75), random.uniform(5, 12), random.uniform(2, 4), random.uniform(10, 20), random.uniform(100, 5000)]
+        buffer.append(datetime_to_ns(timestamp), values)
+        point = SensorDataPoint(machine_id=machine_id, timestamp=timestamp, **dict(zip(COLUMNS, values)))
+        is_anomaly = i % 10 == 0
+        predictions.append(AnomalyPrediction(
+            machine_id=machine_id, timestamp=timestamp, anomaly_score=random.random(), is_anomaly=is_anomaly,
+            predicted_label="Anomaly" if is_anomaly else "Normal", sensor_readings=point.model_dump() if is_anomaly else None,
+        ))
+    selected = range(len(buffer))
+    # Ce que fait FastAPI avec response_model : validation de la valeur renvoyée, puis sérialisation par pydantic
+    points_adapter = TypeAdapter(List[SensorDataPoint])
+    predictions_adapter = TypeAdapter(List[AnomalyPrediction])
+
+    def old_sensor():
+        points = [SensorDataPoint(machine_id=machine_id, **record) for record in buffer.records(selected)]
+        return points_adapter.dump_json(points_adapter.validate_python(points))
+
+    def old_predictions():
+        return predictions_adapter.dump_json(predictions_adapter.validate_python(predictions))
+
+    assert json.loads(old_sensor()) == json.loads(sensor_data_json(machine_id, buffer, selected))
+    assert json.loads(old_predictions()) == json.loads(dumps([vars(prediction) for prediction in predictions]))
+    cases = [
+        ("sensor rows", old_sensor, lambda: sensor_data_json(machine_id, buffer, selected)),
+        ("sensor columnar", old_sensor, lambda: sensor_data_json(machine_id, buffer, selected, "columnar")),
+        ("predictions", old_predictions, lambda: dumps([vars(prediction) for prediction in predictions])),
+    ]
+    print(f"{args.points} points, best of {args.repeat}")
+    print(f"{'serialization':<20}{'old (ms)':>10}{'new (ms)':>10}{'speedup':>9}{'old KB':>8}{'new KB':>8}")
+    for name, old_fn, new_fn in cases:
+        old, new = timeit(old_fn, args.repeat), timeit(new_fn, args.repeat)
+        print(f"{name:<20}{old * 1000:>10.2f}{new * 1000:>10.2f}{old / new:>8.1f}x{len(old_fn()) / 1024:>8.1f}{len(new_fn()) / 1024:>8.1f}")
+
+    app = FastAPI()
+
+    @app.get("/old/sensor-data", response_model=List[SensorDataPoint])
+    async def old_endpoint():
+        return [SensorDataPoint(machine_id=machine_id, **record) for record in buffer.records(selected)]
+
+    @app.get("/new/sensor-data", response_model=List[SensorDataPoint])
+    async def new_endpoint(format: str = "rows"):
+        return Response(sensor_data_json(machine_id, buffer, selected, format), media_type="application/json")
+
+    @app.get("/old/predictions", response_model=List[AnomalyPrediction])
+    async def old_predictions_endpoint():
+        return predictions
+
+    @app.get("/new/predictions", response_model=List[AnomalyPrediction])
+    async def new_predictions_endpoint():
+        return Response(dumps([vars(prediction) for prediction in predictions]), media_type="application/json")
+
+    client = TestClient(app)
+    requests = [
+        ("GET sensor-data", "/old/sensor-data", "/new/sensor-data"),
+        ("GET sensor columnar", "/old/sensor-data", "/new/sensor-data?format=columnar"),
+        ("GET predictions", "/old/predictions", "/new/predictions"),
+    ]
+    print(f"{'end to end':<20}{'old (ms)':>10}{'new (ms)':>10}{'speedup':>9}")
+    for name, old_url, new_url in requests:
+        old = timeit(lambda: client.get(old_url), args.repeat // 4 or 1)
+        new = timeit(lambda: client.get(new_url), args.repeat // 4 or 1)
+        print(f"{name:<20}{old * 1000:>10.2f}{new * 1000:>10.2f}{old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# backend/benchmarks/bench_state.py
+"""
+Débit de l'API selon le nombre de workers uvicorn (--workers N), l'état étant partagé entre
+workers par STATE_BACKEND (voir app/state.py). Les --machines machines sont créées dans une base
+SQLite (DATA_BACKEND=database-sync), pour que leurs partitions se répartissent entre les workers.
+Pour chaque N, lance uvicorn, envoie pendant --duration secondes des lots de lectures
+(POST /sensor-data/batch), puis des lectures de la santé du parc (GET /fleet/health), depuis
+--clients processus clients en connexions keep-alive. Vérifie ensuite, sur /state/metrics, que
+les partitions des workers sont disjointes et couvrent toutes les machines, que chaque lecture
+acceptée a été stockée par un seul worker (son propriétaire) et, en shared-memory, que chaque
+worker a lu ou écarté tous les événements publiés par les autres. La première ligne
+(STATE_BACKEND=memory, 1 worker) sert de référence sans partage d'état. Les débits ne montent
+avec N que si l'hôte a au moins N cœurs libres en plus de ceux des clients.
+
+    cd backend && python benchmarks/bench_state.py --workers 1,2,4,8 --clients 16 --duration 10 --machines 64
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(BACKEND_DIR)
+# app.models importe app.database, qui crée son moteur dès l'import : les serveurs reçoivent leur propre DATABASE_URL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+
+from app.models import Base, Machine, StateEvent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        connection.request(method, path, body, {"Content-Type": "application/json"} if body else {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def create_database(url, count):
+    """
+    Base SQLite avec les tables machines et state_events (STATE_BACKEND=database) du schéma de
+    app.models, et count machines, chargées par chaque worker au démarrage. Les autres tables
+    (sensor_data et ses colonnes ARRAY) ne sont pas utilisées ici.
+    """
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[Machine.__table__, StateEvent.__table__])
+    with engine.begin() as connection:
+        connection.execute(Machine.__table__.insert(), [
+            {"id": uuid.uuid4(), "name": f"Machine {i}", "serial_number": f"BENCH-{i:05d}",
+             "thresholds_config": {"temperature_critique": 85.0, "vibration_max": 18.5, "pressure_max": 5.0, "current_max": 25.0}}
+            for i in range(count)
+        ])
+    engine.dispose()
+
+
+def start_server(port, workers, backend, directory, database_url):
+    env = {
+        **os.environ,
+        "STATE_BACKEND": backend,
+        "STATE_SHM_PATH": os.path.join(directory, f"state-{port}"),
+        "STATE_LEADER_LOCK_PATH": os.path.join(directory, f"leader-{port}.lock"),
+        "STATE_PARTITION_LOCK_PATH": os.path.join(directory, f"partitions-{port}.lock"),
+        "WEB_CONCURRENCY": str(workers),
+        "DATA_BACKEND": "database-sync",
+        "DATABASE_URL": database_url,
+    }
+    env.setdefault("INFERENCE_ENABLED", "false")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if request(port, "GET", "/machines/")[0] == 200:
+                # Laisse aux autres workers le temps de finir leur démarrage
+                time.sleep(1 + 0.25 * workers)
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"uvicorn did not start on port {port}")
+
+
+def client(args):
+    """Envoie des requêtes sur une connexion keep-alive jusqu'à l'échéance ; retourne (requêtes, erreurs)."""
+    port, method, path, body, deadline = args
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"} if body else {}
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            done += 1
+            errors += response.status >= 400
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    connection.close()
+    return done, errors
+
+
+def run_load(pool, clients, port, method, path, body, duration):
+    deadline = time.time() + duration
+    results = pool.map(client, [(port, method, path, body, deadline)] * clients)
+    return sum(done for done, _ in results) / duration, sum(errors for _, errors in results)
+
+
+def worker_metrics(port, workers, attempts=200):
+    """/state/metrics de chaque worker, chaque requête ouvrant une connexion (répartie entre workers par le noyau)."""
+    seen = {}
+    for _ in range(attempts):
+        metrics = json.loads(request(port, "GET", "/state/metrics")[1])
+        seen[metrics["worker"]] = metrics
+        if len(seen) == workers:
+            break
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--backend", default="shared-memory")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--machines", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU, {args.clients} clients, lots de {args.batch} lectures, {args.machines} machines")
+    print(f"{'backend':>14}{'workers':>9}{'batch req/s':>13}{'readings/s':>12}{'health req/s':>14}{'errors':>8}  partitions")
+    runs = [("memory", 1)] + [(args.backend, int(value)) for value in args.workers.split(",")]
+    with tempfile.TemporaryDirectory() as directory, multiprocessing.Pool(args.clients) as pool:
+        for backend, workers in runs:
+            port = free_port()
+            # Une base par lancement : STATE_BACKEND=database rejoue au démarrage le journal conservé
+            database_url = f"sqlite:///{os.path.join(directory, f'bench-{port}.db')}"
+            create_database(database_url, args.machines)
+            server = start_server(port, workers, backend, directory, database_url)
+            try:
+                machine_ids = [machine["id"] for machine in json.loads(request(port, "GET", "/machines/")[1])]
+                rng = random.Random(0)
+                body = json.dumps([
+                    {"machine_id": rng.choice(machine_ids), "temperature": rng.uniform(60, 95), "vibration": rng.uniform(5, 20),
+                     "pressure": rng.uniform(2, 6), "current": rng.uniform(10, 28)}
+                    for _ in range(args.batch)
+                ]).encode()
+                writes, write_errors = run_load(pool, args.clients, port, "POST", "/sensor-data/batch", body, args.duration)
+                reads, read_errors = run_load(pool, args.clients, port, "GET", "/fleet/health?limit=10", None, args.duration)
+
+                ownership = "-"
+                if backend != "memory":
+                    # Le simulateur du leader publie en continu : quelques essais pour un relevé stable
+                    for _ in range(5):
+                        time.sleep(1)
+                        seen = worker_metrics(port, workers)
+                        ingested = sum(metrics["readings_ingested"] for metrics in seen.values())
+                        stored = sum(metrics["readings_stored"] for metrics in seen.values())
+                        published = sum(metrics["events_published"] for metrics in seen.values())
+                        # Événements des autres ni lus ni écartés (shared-memory : database filtre en SQL)
+                        behind = sum(
+                            published - metrics["events_published"] - metrics["events_received"] - metrics["events_skipped"]
+                            for metrics in seen.values()
+                        ) if backend == "shared-memory" else 0
+                        if len(seen) == workers and ingested == stored and behind == 0:
+                            break
+                    owned = [len(metrics["partitions"]) for metrics in seen.values()]
+                    covered = set().union(*(metrics["partitions"] for metrics in seen.values()))
+                    disjoint = sum(owned) == len(covered) == next(iter(seen.values()))["partition_count"]
+                    forwarded = sum(metrics["readings_forwarded"] for metrics in seen.values())
+                    ownership = (f"{len(seen)}/{workers} workers vus, "
+                                 f"{'/'.join(map(str, owned))} ({'disjointes, complètes' if disjoint else 'INCOHÉRENTES'}), "
+                                 f"{stored}/{ingested} lectures stockées, {forwarded} transmises, "
+                                 f"{'journal lu' if behind == 0 else f'{behind} événements manquants'}")
+                print(f"{backend:>14}{workers:>9}{writes:>13.1f}{writes * args.batch:>12.0f}{reads:>14.1f}"
+                      f"{write_errors + read_errors:>8}  {ownership}")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# backend/benchmarks/bench_training_loader.py
+"""
+Compare le chargement de l'historique d'entraînement d'une machine, suivi de l'entraînement
+Isolation Forest : ancien chargement (requête f-string, pd.read_sql de toute la plage puis
+pd.to_datetime) contre ml_model.fetch_data_for_training (requête paramétrée, curseur côté
+serveur lu par lots typés, échantillon réservoir borné).
+
+Chaque cas tourne dans un processus neuf, sur une base SQLite temporaire, pour mesurer le pic
+de RSS. --rows 7776000 correspond à 90 jours à 1 Hz.
+
+    cd backend && python benchmarks/bench_training_loader.py --rows 2000000
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+
+def create_database(path: str, machine_id: uuid.UUID, rows: int):
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE sensor_data (timestamp DATETIME, machine_id TEXT, temperature NUMERIC, vibration NUMERIC, "
+        "pressure NUMERIC, current NUMERIC, operating_hours NUMERIC)"
+    )
+    rng = np.random.default_rng(0)
+    start = datetime.utcnow() - timedelta(seconds=rows)
+    for offset in range(0, rows, 500_000):
+        count = min(500_000, rows - offset)
+        values = rng.normal([68, 8, 3, 15], [3, 1, 0.3, 2], size=(count, 4)).tolist()
+        connection.executemany(
+            "INSERT INTO sensor_data VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                ((start + timedelta(seconds=offset + i)).isoformat(" "), str(machine_id), *row, float(offset + i) / 3600)
+                for i, row in enumerate(values)
+            ),
+        )
+    connection.execute("CREATE INDEX ix_sensor_data ON sensor_data (machine_id, timestamp)")
+    connection.commit()
+    connection.close()
+
+
+def run_case(case: str, machine_id: str, days: int) -> dict:
+    import pandas as pd
+    from sqlalchemy import text
+    from app.ml import ml_model
+
+    started = time.perf_counter()
+    if case == "old":
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=days)
+        query = f"""
+        SELECT timestamp, temperature, vibration, pressure, "current", operating_hours
+        FROM sensor_data
+        WHERE machine_id = '{machine_id}'
+          AND timestamp >= '{start_time.isoformat()}'
+          AND timestamp <= '{end_time.isoformat()}'
+        ORDER BY timestamp ASC;
+        """
+        df = pd.read_sql(text(query), ml_model.engine)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        rows = len(df)
+    else:
+        df = ml_model.fetch_data_for_training(uuid.UUID(machine_id), days)
+        rows = df.attrs["n_rows"]
+    loaded = time.perf_counter()
+    model = ml_model.train_isolation_forest(df)
+    model.decision_function(df[ml_model.FEATURES].to_numpy(dtype=np.float64))
+    finished = time.perf_counter()
+    return {
+        "rows": rows,
+        "kept": len(df),
+        "load_s": loaded - started,
+        "total_s": finished - started,
+        # ru_maxrss est en Kio sous Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--case", choices=("old", "new"), help=argparse.SUPPRESS)
+    parser.add_argument("--machine-id", help=argparse.SUPPRESS)
+    parser.add_argument("--days", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.machine_id, args.days)))
+        return
+
+    machine_id = uuid.uuid4()
+    days = args.rows // 86400 + 2
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "training.db")
+        started = time.perf_counter()
+        create_database(path, machine_id, args.rows)
+        print(f"{args.rows} readings ({args.rows / 86400:.1f} days at 1 Hz) written in {time.perf_counter() - started:.1f}s")
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "PYTHONWARNINGS": "ignore"}
+        print(f"{'loader':<8}{'rows':>10}{'kept':>10}{'load (s)':>10}{'total (s)':>11}{'peak RSS (MiB)':>16}")
+        for case in ("old", "new"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--case", case, "--machine-id", str(machine_id), "--days", str(days)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{case:<8}{result['rows']:>10}{result['kept']:>10}{result['load_s']:>10.2f}{result['total_s']:>11.2f}{result['peak_rss_mib']:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,14 @@
 
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { openLiveStream } from '@/app/components/liveStream';
 import { BellAlertIcon, CheckCircleIcon, XCircleIcon, ExclamationTriangleIcon } from '@heroicons/react/24/outline';
 
 interface Alert {
   id: string;
   machine_id: string;
   machine_name?: string;
+  machine?: { id: string; name: string; type: string; location: string; status: string } | null;
   timestamp: string;
   type: string;
   severity: 'Avertissement' | 'Critique' | 'Urgence';
@@ -28,27 +30,18 @@ export default function AlertsPage() {
       setLoading(true);
       setError(null);
       try {
-        let url = `${API_BASE_URL}/alerts/`;
+        // Le nom de la machine est joint par le backend (expand=machine) : une seule requête
+        let url = `${API_BASE_URL}/alerts/?expand=machine`;
         if (filterResolved !== 'all') {
-          url += `?resolved=${filterResolved}`;
+          url += `&resolved=${filterResolved}`;
         }
 
         const response = await axios.get<Alert[]>(url);
 
-        const alertsWithMachineNames = await Promise.all(response.data.map(async (alert) => {
-          try {
-            if (alert.machine_id) {
-              const machineResponse = await axios.get(`${API_BASE_URL}/machines/${alert.machine_id}`);
-              return { ...alert, machine_name: machineResponse.data.name };
-            }
-            return { ...alert, machine_name: 'Inconnu (ID manquant)' };
-          } catch (machineError) {
-            console.error(`Failed to fetch machine for alert ${alert.id} (machine_id: ${alert.machine_id}):`, machineError);
-            return { ...alert, machine_name: 'Inconnu' };
-          }
-        }));
-
-        setAlerts(alertsWithMachineNames);
+        setAlerts(response.data.map((alert) => ({
+          ...alert,
+          machine_name: alert.machine?.name ?? (alert.machine_id ? 'Inconnu' : 'Inconnu (ID manquant)'),
+        })));
       } catch (err) {
         console.error('Failed to fetch alerts:', err);
         if (axios.isAxiosError(err)) {
@@ -62,8 +55,23 @@ export default function AlertsPage() {
     };
 
     fetchAlerts();
-    const interval = setInterval(fetchAlerts, 15000);
-    return () => clearInterval(interval);
+    // Rechargement sur événement d'alerte poussé par le backend (regroupé sur 1 s) ;
+    // retour au rafraîchissement périodique si le flux est indisponible
+    let interval: ReturnType<typeof setInterval> | undefined;
+    let pending: ReturnType<typeof setTimeout> | undefined;
+    const scheduleRefresh = () => {
+      if (!pending) pending = setTimeout(() => { pending = undefined; fetchAlerts(); }, 1000);
+    };
+    const closeStream = openLiveStream('/ws/alerts', {
+      onAlert: scheduleRefresh,
+      onResync: scheduleRefresh,
+      onClose: () => { interval = setInterval(fetchAlerts, 15000); },
+    });
+    return () => {
+      closeStream();
+      if (interval) clearInterval(interval);
+      if (pending) clearTimeout(pending);
+    };
   }, [filterResolved]);
 
   const handleResolveAlert = async (id: string) => {
@@ -1,7 +1,6 @@
 'use client';
 
 import React, { useState, useRef, useEffect } from 'react';
-import axios from 'axios';
 import { PaperAirplaneIcon, SparklesIcon } from '@heroicons/react/24/solid';
 import { Transition } from '@headlessui/react';
 
@@ -74,14 +73,47 @@ export default function AIAssistant({ selectedMachine }: AIAssistantProps) {
         question: input,
         machine_id: selectedMachine?.id,
       };
-      const response = await axios.post(`${API_BASE_URL}/ai-assistant/`, payload);
-      const aiResponse: Message = {
-        id: (Date.now() + 1).toString(),
-        sender: 'ai',
-        text: response.data.response,
-        timestamp: new Date(),
+      // Réponse diffusée mot à mot (Server-Sent Events) : le message s'affiche dès le premier mot
+      const response = await fetch(`${API_BASE_URL}/ai-assistant/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload),
+      });
+      if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+      const aiMessageId = (Date.now() + 1).toString();
+      const setAiText = (update: (text: string) => string) => {
+        setMessages((prev) => {
+          const existing = prev.find((msg) => msg.id === aiMessageId);
+          if (!existing) {
+            return [...prev, { id: aiMessageId, sender: 'ai', text: update(''), timestamp: new Date() }];
+          }
+          return prev.map((msg) => (msg.id === aiMessageId ? { ...msg, text: update(msg.text) } : msg));
+        });
       };
-      setMessages((prev) => [...prev, aiResponse]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() ?? '';
+        for (const event of events) {
+          const type = event.match(/^event: (.*)$/m)?.[1];
+          const data = event.match(/^data: (.*)$/m)?.[1];
+          if (!data) continue;
+          const parsed = JSON.parse(data);
+          if (type === 'token') {
+            setIsLoading(false);
+            setAiText((text) => text + parsed.text);
+          } else if (type === 'done') {
+            setAiText(() => parsed.response);
+          }
+        }
+      }
     } catch (error) {
       console.error('Erreur lors de la communication avec l\'assistant IA :', error);
       setMessages((prev) => [
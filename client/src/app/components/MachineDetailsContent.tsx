@@ -15,6 +15,7 @@ import {
   TimeScale
 } from 'chart.js';
 import 'chartjs-adapter-date-fns';
+import { openLiveStream } from './liveStream';
 import { ExclamationCircleIcon } from '@heroicons/react/24/outline'; // Pour les alertes
 
 ChartJS.register(
@@ -101,6 +102,9 @@ export default function MachineDetailsContent({ machine }: MachineDetailsContent
   useEffect(() => {
     if (!machine || !machine.id) return;
 
+    // Curseur d'ingestion (X-Next-Cursor) de la dernière lecture reçue, pour les rafraîchissements incrémentaux
+    let cursor: string | null = null;
+
     const fetchSensorData = async () => {
       setLoadingData(true);
       setErrorData(null);
@@ -111,6 +115,7 @@ export default function MachineDetailsContent({ machine }: MachineDetailsContent
           { params: { start_time: oneDayAgo, limit: 500 } }
         );
         setSensorData(response.data);
+        cursor = response.headers['x-next-cursor'] ?? null;
       } catch (err) {
         console.error('Failed to fetch sensor data:', err);
         setErrorData('Impossible de charger les données des capteurs.');
@@ -119,13 +124,23 @@ export default function MachineDetailsContent({ machine }: MachineDetailsContent
       }
     };
 
-    fetchSensorData();
-    const interval = setInterval(fetchSensorData, 10000);
-    return () => clearInterval(interval);
-  }, [machine]);
-
-  useEffect(() => {
-    if (!machine || !machine.id) return;
+    const fetchNewSensorData = async () => {
+      if (cursor === null) return fetchSensorData();
+      try {
+        const response = await axios.get<SensorDataPoint[]>(
+          `${API_BASE_URL}/machines/${machine.id}/sensor-data/`,
+          { params: { since: cursor, limit: 500 } }
+        );
+        cursor = response.headers['x-next-cursor'] ?? cursor;
+        if (response.data.length) {
+          setSensorData(previous => [...previous, ...response.data]
+            .sort((a, b) => new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime())
+            .slice(-500));
+        }
+      } catch (err) {
+        console.error('Failed to fetch new sensor data:', err);
+      }
+    };
 
     const fetchAlerts = async () => {
       setLoadingAlerts(true);
@@ -141,9 +156,39 @@ export default function MachineDetailsContent({ machine }: MachineDetailsContent
       }
     };
 
+    fetchSensorData();
     fetchAlerts();
-    const interval = setInterval(fetchAlerts, 10000);
-    return () => clearInterval(interval);
+    // Nouvelles lectures et événements d'alerte poussés par le backend ;
+    // retour au rafraîchissement périodique si le flux est indisponible
+    let interval: ReturnType<typeof setInterval> | undefined;
+    const closeStream = openLiveStream(`/ws/machines/${machine.id}`, {
+      onReading: (reading) => setSensorData(previous => {
+        const last = previous[previous.length - 1];
+        if (last && new Date(reading.timestamp) <= new Date(last.timestamp)) return previous;
+        return [...previous, reading].slice(-500);
+      }),
+      onAlert: (event) => {
+        if (event.event === 'opened') {
+          setAlerts(previous => [event.alert, ...previous]);
+        } else if (event.event === 'resolved') {
+          setAlerts(previous => previous.filter(alert => alert.id !== event.id));
+        }
+      },
+      onResync: () => {
+        fetchSensorData();
+        fetchAlerts();
+      },
+      onClose: () => {
+        interval = setInterval(() => {
+          fetchNewSensorData();
+          fetchAlerts();
+        }, 10000);
+      },
+    });
+    return () => {
+      closeStream();
+      if (interval) clearInterval(interval);
+    };
   }, [machine]);
 
   const chartData = {
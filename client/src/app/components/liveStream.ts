@@ -0,0 +1,92 @@
+// Abonnement aux flux WebSocket du backend (/ws/machines/{id}, /ws/alerts).
+// Les lectures arrivent en snapshot puis en deltas entiers (voir backend/app/broadcast.py).
+
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000';
+
+export interface LiveReading {
+  timestamp: string;
+  temperature: number;
+  vibration: number;
+  pressure: number;
+  current: number;
+  operating_hours?: number;
+}
+
+export interface LiveAlertEvent {
+  type: 'alert';
+  event: 'opened' | 'updated' | 'resolved';
+  machine_id: string;
+  id?: string;
+  alert?: any;
+  count?: number;
+  last_seen?: string;
+}
+
+interface LiveStreamHandlers {
+  onReading?: (reading: LiveReading) => void;
+  onAlert?: (event: LiveAlertEvent) => void;
+  // Messages perdus (client trop lent ou reconnexion) : l'appelant recharge ses données par l'API REST
+  onResync?: () => void;
+  // Flux indisponible : l'appelant revient au rafraîchissement périodique
+  onClose?: () => void;
+}
+
+export function openLiveStream(path: string, handlers: LiveStreamHandlers): () => void {
+  const socket = new WebSocket(API_BASE_URL.replace(/^http/, 'ws') + path);
+  let seq: number | null = null;
+  let timestampMs = 0;
+  let scale = 1;
+  let values: { [column: string]: number | null } = {};
+  let closedByCaller = false;
+
+  const emitReading = () => {
+    const reading: any = { timestamp: new Date(timestampMs).toISOString() };
+    for (const [column, value] of Object.entries(values)) {
+      if (value !== null) reading[column] = value / scale;
+    }
+    handlers.onReading?.(reading as LiveReading);
+  };
+
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    switch (message.type) {
+      case 'snapshot':
+        seq = message.seq;
+        timestampMs = message.timestamp_ms;
+        scale = message.scale;
+        values = { ...message.values };
+        emitReading();
+        break;
+      case 'reading':
+        if (seq === null || message.seq !== seq + 1) {
+          // Delta manquant : on attend le prochain snapshot
+          seq = null;
+          handlers.onResync?.();
+          break;
+        }
+        seq = message.seq;
+        timestampMs += message.dt;
+        for (const [column, delta] of Object.entries(message.d as { [column: string]: number })) {
+          values[column] = (values[column] ?? 0) + delta;
+        }
+        Object.assign(values, message.set ?? {});
+        emitReading();
+        break;
+      case 'alert':
+        handlers.onAlert?.(message as LiveAlertEvent);
+        break;
+      case 'resync':
+        seq = null;
+        handlers.onResync?.();
+        break;
+    }
+  };
+  socket.onclose = () => {
+    if (!closedByCaller) handlers.onClose?.();
+  };
+
+  return () => {
+    closedByCaller = true;
+    socket.close();
+  };
+}
@@ -2,6 +2,7 @@
 
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { openLiveStream } from '@/app/components/liveStream';
 import { Line } from 'react-chartjs-2';
 import {
     Chart as ChartJS,
@@ -35,27 +36,32 @@ interface GlobalAlert {
     timestamp: string;
 }
 
+interface FleetHealth {
+    machines: number;
+    machines_at_risk: number;
+    active_alerts: Record<string, number>;
+}
+
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000';
 
 export default function GlobalDashboardPage() {
     const [globalAlerts, setGlobalAlerts] = useState<GlobalAlert[]>([]);
     const [loadingAlerts, setLoadingAlerts] = useState<boolean>(true);
     const [errorAlerts, setErrorAlerts] = useState<string | null>(null);
+    const [fleetHealth, setFleetHealth] = useState<FleetHealth | null>(null);
+    const [fleetHealthUpdatedAt, setFleetHealthUpdatedAt] = useState<Date | null>(null);
 
     useEffect(() => {
         const fetchGlobalAlerts = async () => {
             setLoadingAlerts(true);
             setErrorAlerts(null);
             try {
-                const response = await axios.get(`${API_BASE_URL}/alerts/?resolved=false&limit=10`);
-                const alertsWithMachineNames = await Promise.all(response.data.map(async (alert: any) => {
-                    const machineRes = await axios.get(`${API_BASE_URL}/machines/${alert.machine_id}`);
-                    return {
-                        ...alert,
-                        machine_name: machineRes.data.name
-                    };
-                }));
-                setGlobalAlerts(alertsWithMachineNames);
+                // Le nom de la machine est joint par le backend (expand=machine) : une seule requête
+                const response = await axios.get(`${API_BASE_URL}/alerts/?resolved=false&limit=10&expand=machine`);
+                setGlobalAlerts(response.data.map((alert: any) => ({
+                    ...alert,
+                    machine_name: alert.machine?.name ?? 'Inconnu'
+                })));
             } catch (err) {
                 console.error('Failed to fetch global alerts:', err);
                 setErrorAlerts('Impossible de charger les alertes globales.');
@@ -64,9 +70,36 @@ export default function GlobalDashboardPage() {
             }
         };
 
-        fetchGlobalAlerts();
-        const interval = setInterval(fetchGlobalAlerts, 15000);
-        return () => clearInterval(interval);
+        // Vue d'ensemble tenue à jour par le backend (/fleet/health) : une requête, quel que soit le nombre de machines
+        const fetchFleetHealth = async () => {
+            try {
+                const response = await axios.get<FleetHealth>(`${API_BASE_URL}/fleet/health?limit=0`);
+                setFleetHealth(response.data);
+                setFleetHealthUpdatedAt(new Date());
+            } catch (err) {
+                console.error('Failed to fetch fleet health:', err);
+            }
+        };
+        const refresh = () => { fetchGlobalAlerts(); fetchFleetHealth(); };
+
+        refresh();
+        // Rechargement sur événement d'alerte poussé par le backend (regroupé sur 1 s) ;
+        // retour au rafraîchissement périodique si le flux est indisponible
+        let interval: ReturnType<typeof setInterval> | undefined;
+        let pending: ReturnType<typeof setTimeout> | undefined;
+        const scheduleRefresh = () => {
+            if (!pending) pending = setTimeout(() => { pending = undefined; refresh(); }, 1000);
+        };
+        const closeStream = openLiveStream('/ws/alerts', {
+            onAlert: scheduleRefresh,
+            onResync: scheduleRefresh,
+            onClose: () => { interval = setInterval(refresh, 15000); },
+        });
+        return () => {
+            closeStream();
+            if (interval) clearInterval(interval);
+            if (pending) clearTimeout(pending);
+        };
     }, []);
 
     const getSeverityColorClass = (severity: string) => {
@@ -135,15 +168,19 @@ export default function GlobalDashboardPage() {
                 <h2 className="text-2xl font-bold text-gray-100 mb-4">Statut Général du Parc</h2>
                 <div className="flex justify-around w-full text-center mb-6">
                     <div>
-                        <p className="text-5xl font-bold text-green-400">12</p>
+                        <p className="text-5xl font-bold text-green-400">
+                            {fleetHealth ? fleetHealth.machines - fleetHealth.machines_at_risk : '-'}
+                        </p>
                         <p className="text-gray-400">Machines Normales</p>
                     </div>
                     <div>
-                        <p className="text-5xl font-bold text-orange-400">3</p>
+                        <p className="text-5xl font-bold text-orange-400">{fleetHealth ? fleetHealth.machines_at_risk : '-'}</p>
                         <p className="text-gray-400">Machines en Alerte</p>
                     </div>
                 </div>
-                <p className="text-sm text-gray-500">Mise à jour il y a 30 secondes</p>
+                <p className="text-sm text-gray-500">
+                    {fleetHealthUpdatedAt ? `Mis à jour à ${fleetHealthUpdatedAt.toLocaleTimeString()}` : 'Chargement...'}
+                </p>
             </div>
 
             {/* Widget 2: Graphique d'évolution des alertes */}
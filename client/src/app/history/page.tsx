@@ -29,27 +29,17 @@ export default function HistoryPage() {
             setLoading(true);
             setError(null);
             try {
-                const alertsResponse = await axios.get(`${API_BASE_URL}/alerts/?limit=20`);
-
-                const fetchedLogs: LogEntry[] = await Promise.all(alertsResponse.data.map(async (alert: any) => {
-                    let machineName = 'N/A';
-                    if (alert.machine_id) {
-                        try {
-                            const machineRes = await axios.get(`${API_BASE_URL}/machines/${alert.machine_id}`);
-                            machineName = machineRes.data.name;
-                        } catch (machineErr) {
-                            console.warn(`Could not fetch machine name for ID ${alert.machine_id}`);
-                        }
-                    }
-                    return {
-                        id: alert.id,
-                        timestamp: alert.timestamp,
-                        type: 'Alert',
-                        machine_id: alert.machine_id,
-                        machine_name: machineName,
-                        severity: alert.severity,
-                        message: alert.message,
-                    };
+                // Le nom de la machine est joint par le backend (expand=machine) : une seule requête
+                const alertsResponse = await axios.get(`${API_BASE_URL}/alerts/?limit=20&expand=machine`);
+
+                const fetchedLogs: LogEntry[] = alertsResponse.data.map((alert: any) => ({
+                    id: alert.id,
+                    timestamp: alert.timestamp,
+                    type: 'Alert',
+                    machine_id: alert.machine_id,
+                    machine_name: alert.machine?.name ?? 'N/A',
+                    severity: alert.severity,
+                    message: alert.message,
                 }));
                 const simulatedLogs: LogEntry[] = [
                     {
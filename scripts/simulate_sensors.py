@@ -7,6 +7,10 @@ import os
 # Configuration de l'API
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 INGESTION_ENDPOINT = f"{API_BASE_URL}/sensor-data/"
+BATCH_INGESTION_ENDPOINT = f"{API_BASE_URL}/sensor-data/batch"
+
+# Mode batch : nombre de lectures regroupées par requête (0 = une requête par lecture)
+BATCH_SIZE = int(os.getenv("SIMULATOR_BATCH_SIZE", "0"))
 
 
 # Intervalle d'envoi des données (en secondes)
@@ -80,8 +84,8 @@ def generate_sensor_data_for_machine(machine_info):
         "labels": [] # Les labels seront ajoutés par le modèle ML plus tard
     }
 
-def send_data_to_api(data): # Supprime is_batch car nous n'avons pas d'endpoint batch pour l'instant
-    url = INGESTION_ENDPOINT # Nous utilisons l'endpoint unitaire
+def send_data_to_api(data):
+    url = INGESTION_ENDPOINT # Endpoint unitaire : une lecture par requête
     try:
         response = requests.post(url, json=data)
         response.raise_for_status() # Lève une exception pour les codes d'erreur HTTP (4xx ou 5xx)
@@ -94,6 +98,22 @@ def send_data_to_api(data): # Supprime is_batch car nous n'avons pas d'endpoint
     except Exception as e:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] An unexpected error occurred: {e}")
 
+def send_batch_to_api(batch):
+    url = BATCH_INGESTION_ENDPOINT # Endpoint batch : plusieurs lectures par requête
+    try:
+        response = requests.post(url, json=batch)
+        response.raise_for_status()
+        summary = response.json()
+        if summary["rejected"]:
+            rejected = [item for item in summary["items"] if not item["accepted"]]
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {summary['rejected']}/{summary['received']} readings rejected, first error: {rejected[0]['error']}")
+    except requests.exceptions.HTTPError as e:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] HTTP Error for batch of {len(batch)} readings: {e.response.status_code} - {e.response.text}")
+    except requests.exceptions.ConnectionError as e:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Connection Error: Could not connect to API at {API_BASE_URL}. Is the backend running?")
+    except Exception as e:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] An unexpected error occurred: {e}")
+
 def main():
     print(f"Starting sensor data simulation. Sending data every {SEND_INTERVAL_SECONDS} seconds.")
     print(f"API Base URL: {API_BASE_URL}")
@@ -106,11 +126,18 @@ def main():
         return
 
     print(f"Simulating {len(SIMULATED_MACHINES)} machines with fetched IDs.")
+    if BATCH_SIZE > 0:
+        print(f"Batch mode enabled: up to {BATCH_SIZE} readings per request.")
 
     while True:
-        for machine in SIMULATED_MACHINES:
-            data = generate_sensor_data_for_machine(machine)
-            send_data_to_api(data) # Envoyer un seul point de donnée
+        if BATCH_SIZE > 0:
+            batch = [generate_sensor_data_for_machine(machine) for machine in SIMULATED_MACHINES]
+            for start in range(0, len(batch), BATCH_SIZE):
+                send_batch_to_api(batch[start:start + BATCH_SIZE])
+        else:
+            for machine in SIMULATED_MACHINES:
+                data = generate_sensor_data_for_machine(machine)
+                send_data_to_api(data) # Envoyer un seul point de donnée
 
         time.sleep(SEND_INTERVAL_SECONDS)
 